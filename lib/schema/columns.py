@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+
+'''
+lib/schema/columns.py
+Columnar encoding for completion responses.
+
+Large completion responses can be decoded in a child process (see
+`lib.ycmd.offload`). Instead of sending back a list of dictionaries, which
+is slow to pickle and unpickle, each field is sent as a single string with
+the values joined by a separator. Splitting them back up is cheap.
+
+This module only depends on the standard library, so that it can be imported
+by the child process.
+'''
+
+import json
+import logging
+
+logger = logging.getLogger('sublime-ycmd.' + __name__)
+
+COLUMN_SEPARATOR = '\0'
+# stands in for `None`, since the columns only hold strings
+COLUMN_NULL = '\x01'
+
+# completion option fields that are kept, in the order they are encoded
+COMPLETION_COLUMNS = (
+    'insertion_text',
+    'extra_menu_info',
+    'menu_text',
+    'kind',
+    'detailed_info',
+)
+# completion option fields that hold arbitrary json values, encoded as json
+# text (which never contains the separator)
+COMPLETION_JSON_COLUMNS = (
+    'extra_data',
+)
+
+
+def encode_column(values):
+    '''
+    Joins `values` into a single `str`. Each value must be a `str` or `None`.
+    Raises a `ValueError` for anything else, or for values that contain the
+    separator, since they cannot be encoded.
+    '''
+    encoded_values = []
+    for value in values:
+        if value is None:
+            encoded_values.append(COLUMN_NULL)
+            continue
+        if not isinstance(value, str) or COLUMN_SEPARATOR in value or \
+                value == COLUMN_NULL:
+            raise ValueError('cannot encode column value: %r' % (value))
+        encoded_values.append(value)
+
+    return COLUMN_SEPARATOR.join(encoded_values)
+
+
+def decode_column(data, count):
+    '''
+    Splits a column produced by `encode_column` back into a list of `count`
+    values.
+    '''
+    if not count:
+        return []
+
+    values = data.split(COLUMN_SEPARATOR)
+    if len(values) != count:
+        raise ValueError(
+            'column has %d values, expected %d' % (len(values), count)
+        )
+
+    if COLUMN_NULL in data:
+        return [None if v == COLUMN_NULL else v for v in values]
+    return values
+
+
+def decode_completion_response(content):
+    '''
+    Parses a json completion response, given as `bytes` or `str`, into a
+    `dict` with the completion count, start column, encoded completion
+    columns, and the list of errors. The `COMPLETION_JSON_COLUMNS` are
+    re-encoded as json text, so they can be joined like the others.
+
+    This is meant to run in a child process. The result only contains a few
+    strings per column, so it is cheap to send back to the parent.
+    '''
+    if isinstance(content, bytes):
+        content = content.decode('utf-8')
+    parsed = json.loads(content)
+
+    if not isinstance(parsed, dict):
+        raise ValueError('response is not a dict: %r' % (type(parsed)))
+
+    completions = parsed.get('completions')
+    if not isinstance(completions, list):
+        raise ValueError('response is missing "completions" list')
+
+    columns = dict(
+        (name, encode_column(node.get(name) for node in completions))
+        for name in COMPLETION_COLUMNS
+    )
+    for name in COMPLETION_JSON_COLUMNS:
+        columns[name] = encode_column(
+            None if node.get(name) is None else json.dumps(node.get(name))
+            for node in completions
+        )
+
+    return {
+        'count': len(completions),
+        'start_column': parsed.get('completion_start_column'),
+        'columns': columns,
+        'errors': parsed.get('errors', []),
+    }
@@ -5,9 +5,15 @@ lib/schema/completions.py
 Schema definition for responses from completion requests.
 '''
 
+import json
 import logging
 import re
 
+from ..schema.columns import (
+    COMPLETION_COLUMNS,
+    COMPLETION_JSON_COLUMNS,
+    decode_column,
+)
 from ..schema.request import RequestParameters
 from ..util.format import json_parse
 
@@ -23,6 +29,7 @@ class CompletionResponse(object):
     def __init__(self, completions=None, diagnostics=None):
         self._completions = completions
         self._diagnostics = diagnostics
+        self._timings = None
 
     @property
     def completions(self):
@@ -32,6 +39,18 @@ class CompletionResponse(object):
     def diagnostics(self):
         return self._diagnostics
 
+    @property
+    def timings(self):
+        '''
+        Returns a `dict` mapping each phase of the request to the seconds
+        spent in it, or `None` if they were not recorded.
+        '''
+        return self._timings
+
+    @timings.setter
+    def timings(self, timings):
+        self._timings = timings
+
     def __repr__(self):
         return '%s({%r})' % ('CompletionResponse', {
             'completions': self._completions,
@@ -83,6 +102,48 @@ class Completions(object):
         )
 
 
+class CompletionColumns(object):
+    '''
+    Read-only list of completion options, backed by the columns decoded from
+    a large response (see `lib.schema.columns`). The `CompletionOption`
+    instances are only created when accessed, and the `extra_data` of each
+    one is only parsed then.
+    '''
+
+    def __init__(self, columns, count, file_types=None):
+        self._count = count
+        self._file_types = file_types
+        self._columns = dict(
+            (name, decode_column(columns[name], count))
+            for name in COMPLETION_COLUMNS + COMPLETION_JSON_COLUMNS
+        )
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._count))]
+
+        columns = self._columns
+        extra_data = columns['extra_data'][index]
+        return CompletionOption(
+            menu_info=columns['extra_menu_info'][index],
+            insertion_text=columns['insertion_text'][index],
+            extra_data=(
+                json.loads(extra_data) if extra_data is not None else None
+            ),
+            detailed_info=columns['detailed_info'][index],
+            file_types=self._file_types,
+            menu_text=columns['menu_text'][index],
+            kind=columns['kind'][index],
+        )
+
+    def __iter__(self):
+        for index in range(self._count):
+            yield self[index]
+
+
 class Diagnostics(object):
     '''
     Wrapper around the diagnostics/errors received from ycmd completions.
@@ -495,6 +556,10 @@ def parse_completions(json, request_parameters=None):
             logger.error('error while parsing response: %r', e)
         return None
 
+    if isinstance(json, (str, bytes)):
+        # parse it once, instead of once for each parser
+        json = _attempt_parse(json_parse, json)
+
     completions = _attempt_parse(parse_compoptions, json, request_parameters)
     diagnostics = _attempt_parse(parse_diagnostics, json, request_parameters)
 
@@ -503,6 +568,41 @@ def parse_completions(json, request_parameters=None):
     )
 
 
+def parse_completion_columns(decoded, request_parameters=None):
+    '''
+    Same as `parse_completions`, but for a response that was already decoded
+    into columns by `decode_completion_response`. The completion options are
+    created lazily, see `CompletionColumns`.
+    '''
+    if request_parameters is not None and \
+            not isinstance(request_parameters, RequestParameters):
+        raise TypeError(
+            'request parameters must be RequestParameters: %r' %
+            (request_parameters)
+        )
+
+    file_types = request_parameters.file_types if request_parameters else None
+    completions = Completions(
+        completion_options=CompletionColumns(
+            decoded['columns'], decoded['count'], file_types=file_types,
+        ),
+        start_column=decoded['start_column'],
+    )
+
+    try:
+        diagnostics = parse_diagnostics(
+            {'completions': [], 'errors': decoded['errors']},
+            request_parameters,
+        )
+    except ValueError as e:
+        logger.warning('response has unexpected format: %r', e)
+        diagnostics = None
+
+    return CompletionResponse(
+        completions=completions, diagnostics=diagnostics,
+    )
+
+
 '''
 Syntax-specific utilities.
 
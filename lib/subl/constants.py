@@ -43,6 +43,15 @@ SUBLIME_SETTINGS_RECOGNIZED_KEYS = [
     'sublime_ycmd_log_level',
     'sublime_ycmd_log_file',
     'sublime_ycmd_background_threads',
+    'sublime_ycmd_task_executor',
+    'sublime_ycmd_parse_delay_ms',
+    'sublime_ycmd_parse_policy',
+    'sublime_ycmd_event_coalesce_ms',
+    'sublime_ycmd_offload_threshold_kb',
+    'sublime_ycmd_bulkhead_limits',
+    'sublime_ycmd_server_max_requests',
+    'sublime_ycmd_standby_servers',
+    'sublime_ycmd_standby_idle_seconds',
 ]
 SUBLIME_SETTINGS_YCMD_SERVER_KEYS = [
     'ycmd_root_directory',
@@ -57,6 +66,7 @@ SUBLIME_SETTINGS_YCMD_SERVER_KEYS = [
 ]
 SUBLIME_SETTINGS_TASK_POOL_KEYS = [
     'sublime_ycmd_background_threads',
+    'sublime_ycmd_task_executor',
 ]
 
 '''
@@ -77,3 +87,32 @@ SUBLIME_DEFAULT_LANGUAGE_FILETYPE_MAPPING = {
 }
 
 SUBLIME_LANGUAGE_SCOPE_PREFIX = 'source.'
+
+'''
+Parse policies. These control when modified buffers are sent to ycmd to be
+parsed (i.e. a `FileReadyToParse` notification).
+
+The idle policy sends the buffer after a pause in editing, and on save.
+The save policy only sends the buffer on save.
+The never policy does not send the buffer for modifications at all. It will
+still be sent when the view is activated.
+
+The wildcard file type is used for any file type without its own policy.
+'''
+
+SUBLIME_PARSE_POLICY_IDLE = 'idle'
+SUBLIME_PARSE_POLICY_SAVE = 'save'
+SUBLIME_PARSE_POLICY_NEVER = 'never'
+SUBLIME_PARSE_POLICIES = [
+    SUBLIME_PARSE_POLICY_IDLE,
+    SUBLIME_PARSE_POLICY_SAVE,
+    SUBLIME_PARSE_POLICY_NEVER,
+]
+SUBLIME_PARSE_POLICY_WILDCARD = '*'
+
+SUBLIME_DEFAULT_PARSE_DELAY_MS = 500
+SUBLIME_DEFAULT_EVENT_COALESCE_MS = 100
+SUBLIME_DEFAULT_OFFLOAD_THRESHOLD_KB = 0
+SUBLIME_DEFAULT_PARSE_POLICY = {
+    SUBLIME_PARSE_POLICY_WILDCARD: SUBLIME_PARSE_POLICY_IDLE,
+}
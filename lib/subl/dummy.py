@@ -29,6 +29,10 @@ class SublimeDummyBase(object):
     pass
 
 
+class SublimeDummyWindow(object):
+    pass
+
+
 class SublimeDummySettings(dict):
     def clear_on_change(self, key):
         pass
@@ -45,6 +49,7 @@ def sublime_dummy_load_settings(filename):
 SublimeDummy = collections.namedtuple('SublimeDummy', [
     'Settings',
     'View',
+    'Window',
     'load_settings',
 ])
 SublimePluginDummy = collections.namedtuple('SublimePluginDummy', [
@@ -56,6 +61,7 @@ SublimePluginDummy = collections.namedtuple('SublimePluginDummy', [
 sublime = SublimeDummy(
     SublimeDummyBase,
     SublimeDummyBase,
+    SublimeDummyWindow,
     sublime_dummy_load_settings,
 )
 sublime_plugin = SublimePluginDummy(
@@ -41,6 +41,7 @@ class SettingsError(PluginError):
     '''
     MISSING = 'missing configuration'
     TYPE = 'type mismatch'
+    VALUE = 'invalid value'
 
     def __init__(self, msg, type=None, key=None, value=None):
         super(SettingsError, self).__init__(msg)
@@ -54,6 +55,8 @@ class SettingsError(PluginError):
             desc_prefix = 'Missing value'
         elif self._type == SettingsError.TYPE:
             desc_prefix = 'Type mismatch'
+        elif self._type == SettingsError.VALUE:
+            desc_prefix = 'Invalid value'
         else:
             desc_prefix = 'Settings error'
 
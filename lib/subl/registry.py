@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+
+'''
+lib/subl/registry.py
+View registry. Tracks `View` wrappers by view id, while each view is open.
+
+Views should be unregistered when they are closed. Views that are closed
+without an event (e.g. while the plugin is reloading) are found by a periodic
+sweep, so the registry stays bounded by the number of open views.
+'''
+
+import logging
+import threading
+import time
+
+from ..subl.view import View
+from ..util.dict import CopyOnWriteDict
+
+logger = logging.getLogger('sublime-ycmd.' + __name__)
+
+# minimum number of seconds between sweeps
+DEFAULT_SWEEP_INTERVAL = 60
+# number of registered views that forces a sweep, regardless of the interval
+DEFAULT_SWEEP_THRESHOLD = 256
+
+
+class ViewRegistry(object):
+    '''
+    Registry of `View` wrappers, keyed by view id.
+
+    Lookups are lock-free, since the map is copy-on-write. Registration and
+    removal are serialized by an internal lock.
+
+    The sweep threshold grows with the number of live views (it is reset to
+    twice the live count after each sweep), so a session with many open views
+    does not sweep on every registration.
+    '''
+
+    def __init__(self,
+                 sweep_interval=DEFAULT_SWEEP_INTERVAL,
+                 sweep_threshold=DEFAULT_SWEEP_THRESHOLD):
+        if not isinstance(sweep_interval, (int, float)):
+            raise TypeError(
+                'sweep interval must be a number: %r' % (sweep_interval)
+            )
+        if not isinstance(sweep_threshold, int):
+            raise TypeError(
+                'sweep threshold must be an int: %r' % (sweep_threshold)
+            )
+
+        self._lock = threading.Lock()
+        self._views = CopyOnWriteDict()
+
+        self._sweep_interval = sweep_interval
+        self._sweep_threshold = sweep_threshold
+        self._next_sweep_size = sweep_threshold
+        self._last_sweep_time = time.monotonic()
+
+    def get(self, view_id):
+        ''' Returns the `View` registered for `view_id`, or `None`. '''
+        return self._views.get(view_id)
+
+    def register(self, view, view_id=None):
+        '''
+        Wraps and registers `view`, and returns the wrapper. If a wrapper is
+        already registered for the view id, that is returned instead.
+        '''
+        if view_id is None:
+            view_id = view.id()
+        if not isinstance(view_id, int):
+            raise TypeError('view id must be an int: %r' % (view))
+
+        wrapped_view = self._views.get(view_id)
+        if wrapped_view is not None:
+            return wrapped_view
+
+        logger.debug('registering view with id: %r, %r', view_id, view)
+        with self._lock:
+            return self._views.setdefault(view_id, View(view))
+
+    def unregister(self, view_id):
+        '''
+        Removes the wrapper for `view_id`. Returns the wrapper, or `None` if
+        the view was not registered.
+        '''
+        with self._lock:
+            return self._views.pop(view_id)
+
+    def sweep(self):
+        '''
+        Unregisters all views that are no longer alive. Returns the list of
+        view ids that were removed.
+        '''
+        # check liveness without the lock, since it calls into the view API
+        dead_views = [
+            (view_id, wrapped_view)
+            for view_id, wrapped_view in self._views.snapshot().items()
+            if not wrapped_view.alive()
+        ]
+
+        with self._lock:
+            removed_view_ids = []
+            if dead_views:
+                with self._views.mutate() as views:
+                    for view_id, wrapped_view in dead_views:
+                        # skip it if the id was re-registered in the meantime
+                        if views.get(view_id) is wrapped_view:
+                            del views[view_id]
+                            removed_view_ids.append(view_id)
+
+            self._next_sweep_size = max(
+                self._sweep_threshold, 2 * len(self._views),
+            )
+            self._last_sweep_time = time.monotonic()
+
+        if removed_view_ids:
+            logger.debug('swept dead view ids: %r', removed_view_ids)
+        return removed_view_ids
+
+    def sweep_if_due(self, now=None):
+        '''
+        Runs `sweep` if the sweep interval has elapsed, or if the number of
+        registered views has passed the sweep threshold. Returns the list of
+        view ids that were removed (empty if no sweep was run).
+        '''
+        if now is None:
+            now = time.monotonic()
+
+        is_due = (
+            len(self._views) > self._next_sweep_size or
+            now - self._last_sweep_time >= self._sweep_interval
+        )
+        if not is_due:
+            return []
+
+        return self.sweep()
+
+    def get_views(self):
+        ''' Returns a shallow-copy of the map of registered views. '''
+        return self._views.copy()
+
+    def clear(self):
+        ''' Unregisters all views. '''
+        with self._lock:
+            self._views.clear()
+            self._next_sweep_size = self._sweep_threshold
+
+    def __contains__(self, view_id):
+        return view_id in self._views
+
+    def __iter__(self):
+        return iter(self._views)
+
+    def __len__(self):
+        return len(self._views)
+
+    def __bool__(self):
+        ''' Returns `True`, so an instance is always truthy. '''
+        return True
+
+    def __repr__(self):
+        return '%s(%r)' % ('ViewRegistry', {
+            'views': len(self._views),
+            'next_sweep_size': self._next_sweep_size,
+        })
@@ -20,6 +20,13 @@ except ImportError:
     from ..subl.dummy import sublime
 
 from ..subl.constants import (
+    SUBLIME_DEFAULT_EVENT_COALESCE_MS,
+    SUBLIME_DEFAULT_OFFLOAD_THRESHOLD_KB,
+    SUBLIME_DEFAULT_PARSE_DELAY_MS,
+    SUBLIME_DEFAULT_PARSE_POLICY,
+    SUBLIME_PARSE_POLICIES,
+    SUBLIME_PARSE_POLICY_IDLE,
+    SUBLIME_PARSE_POLICY_WILDCARD,
     SUBLIME_SETTINGS_FILENAME,
     SUBLIME_SETTINGS_RECOGNIZED_KEYS,
     SUBLIME_SETTINGS_WATCH_KEY,
@@ -29,13 +36,23 @@ from ..subl.constants import (
 from ..subl.errors import (
     SettingsError,
 )
+from ..task.backend import (
+    DEFAULT_EXECUTOR_BACKEND,
+    EXECUTOR_BACKENDS,
+)
+from ..task.bulkhead import (
+    DEFAULT_BULKHEAD_LIMITS,
+    check_bulkhead_limits,
+)
 from ..util.fs import (
     resolve_abspath,
     resolve_binary_path,
     default_python_binary_path,
 )
 from ..util.sys import get_cpu_count
+from ..ycmd.limiter import DEFAULT_MAX_IN_FLIGHT
 from ..ycmd.settings import get_default_settings_path
+from ..ycmd.standby import DEFAULT_STANDBY_IDLE_SECONDS
 
 logger = logging.getLogger('sublime-ycmd.' + __name__)
 
@@ -64,6 +81,15 @@ class Settings(object):
         self._sublime_ycmd_log_level = None
         self._sublime_ycmd_log_file = None
         self._sublime_ycmd_background_threads = None
+        self._sublime_ycmd_task_executor = None
+        self._sublime_ycmd_parse_delay_ms = None
+        self._sublime_ycmd_parse_policy = None
+        self._sublime_ycmd_event_coalesce_ms = None
+        self._sublime_ycmd_offload_threshold_kb = None
+        self._sublime_ycmd_bulkhead_limits = None
+        self._sublime_ycmd_server_max_requests = None
+        self._sublime_ycmd_standby_servers = None
+        self._sublime_ycmd_standby_idle_seconds = None
 
         if settings is not None:
             self.parse(settings)
@@ -115,6 +141,24 @@ class Settings(object):
             settings.get('sublime_ycmd_log_file', None)
         self._sublime_ycmd_background_threads = \
             settings.get('sublime_ycmd_background_threads', None)
+        self._sublime_ycmd_task_executor = \
+            settings.get('sublime_ycmd_task_executor', None)
+        self._sublime_ycmd_parse_delay_ms = \
+            settings.get('sublime_ycmd_parse_delay_ms', None)
+        self._sublime_ycmd_parse_policy = \
+            settings.get('sublime_ycmd_parse_policy', None)
+        self._sublime_ycmd_event_coalesce_ms = \
+            settings.get('sublime_ycmd_event_coalesce_ms', None)
+        self._sublime_ycmd_offload_threshold_kb = \
+            settings.get('sublime_ycmd_offload_threshold_kb', None)
+        self._sublime_ycmd_bulkhead_limits = \
+            settings.get('sublime_ycmd_bulkhead_limits', None)
+        self._sublime_ycmd_server_max_requests = \
+            settings.get('sublime_ycmd_server_max_requests', None)
+        self._sublime_ycmd_standby_servers = \
+            settings.get('sublime_ycmd_standby_servers', None)
+        self._sublime_ycmd_standby_idle_seconds = \
+            settings.get('sublime_ycmd_standby_idle_seconds', None)
 
         try:
             self._normalize()
@@ -214,6 +258,43 @@ class Settings(object):
             )
             self._sublime_ycmd_background_threads = thread_count
 
+        if self._sublime_ycmd_task_executor is None:
+            self._sublime_ycmd_task_executor = DEFAULT_EXECUTOR_BACKEND
+
+        if self._sublime_ycmd_parse_delay_ms is None:
+            self._sublime_ycmd_parse_delay_ms = SUBLIME_DEFAULT_PARSE_DELAY_MS
+
+        if self._sublime_ycmd_parse_policy is None:
+            logger.debug('using default parse policy: idle for all files')
+            self._sublime_ycmd_parse_policy = \
+                dict(SUBLIME_DEFAULT_PARSE_POLICY)
+
+        if self._sublime_ycmd_event_coalesce_ms is None:
+            self._sublime_ycmd_event_coalesce_ms = \
+                SUBLIME_DEFAULT_EVENT_COALESCE_MS
+
+        if self._sublime_ycmd_offload_threshold_kb is None:
+            self._sublime_ycmd_offload_threshold_kb = \
+                SUBLIME_DEFAULT_OFFLOAD_THRESHOLD_KB
+
+        if self._sublime_ycmd_bulkhead_limits is None:
+            self._sublime_ycmd_bulkhead_limits = dict(DEFAULT_BULKHEAD_LIMITS)
+        elif isinstance(self._sublime_ycmd_bulkhead_limits, dict):
+            # missing limits use the defaults
+            bulkhead_limits = dict(DEFAULT_BULKHEAD_LIMITS)
+            bulkhead_limits.update(self._sublime_ycmd_bulkhead_limits)
+            self._sublime_ycmd_bulkhead_limits = bulkhead_limits
+
+        if self._sublime_ycmd_server_max_requests is None:
+            self._sublime_ycmd_server_max_requests = DEFAULT_MAX_IN_FLIGHT
+
+        if self._sublime_ycmd_standby_servers is None:
+            self._sublime_ycmd_standby_servers = 0
+
+        if self._sublime_ycmd_standby_idle_seconds is None:
+            self._sublime_ycmd_standby_idle_seconds = \
+                DEFAULT_STANDBY_IDLE_SECONDS
+
     @property
     def ycmd_root_directory(self):
         '''
@@ -346,6 +427,100 @@ class Settings(object):
         '''
         return self._sublime_ycmd_background_threads
 
+    @property
+    def sublime_ycmd_task_executor(self):
+        '''
+        Returns the name of the executor backend that runs background tasks.
+        This will be one of the `EXECUTOR_*` names in `lib.task.backend`.
+        '''
+        return self._sublime_ycmd_task_executor
+
+    @property
+    def sublime_ycmd_parse_delay_ms(self):
+        '''
+        Returns the idle time, in milliseconds, to wait after a modification
+        before sending the buffer to be parsed.
+        This will be a non-negative integer.
+        '''
+        return self._sublime_ycmd_parse_delay_ms
+
+    @property
+    def sublime_ycmd_parse_policy(self):
+        '''
+        Returns the mapping of file types to parse policies.
+        This will be a dictionary, but may be empty.
+        '''
+        return self._sublime_ycmd_parse_policy
+
+    @property
+    def sublime_ycmd_event_coalesce_ms(self):
+        '''
+        Returns the window, in milliseconds, used to coalesce buffer enter and
+        leave events. A value of `0` disables coalescing.
+        This will be a non-negative integer.
+        '''
+        return self._sublime_ycmd_event_coalesce_ms
+
+    @property
+    def sublime_ycmd_offload_threshold_kb(self):
+        '''
+        Returns the size, in kilobytes, above which completion responses are
+        parsed in a child process. A value of `0` disables this.
+        This will be a non-negative integer.
+        '''
+        return self._sublime_ycmd_offload_threshold_kb
+
+    @property
+    def sublime_ycmd_bulkhead_limits(self):
+        '''
+        Returns the limits on outstanding requests for each server, and for
+        each request class. A limit of `0` means unlimited.
+        This will be a dictionary with an entry for each bulkhead kind.
+        '''
+        return self._sublime_ycmd_bulkhead_limits
+
+    @property
+    def sublime_ycmd_server_max_requests(self):
+        '''
+        Returns the maximum number of requests in flight to each server. A
+        value of `0` removes the limit.
+        This will be a non-negative integer.
+        '''
+        return self._sublime_ycmd_server_max_requests
+
+    @property
+    def sublime_ycmd_standby_servers(self):
+        '''
+        Returns the number of standby servers to keep started for new
+        projects. A value of `0` disables them.
+        This will be a non-negative integer.
+        '''
+        return self._sublime_ycmd_standby_servers
+
+    @property
+    def sublime_ycmd_standby_idle_seconds(self):
+        '''
+        Returns the number of seconds without a new project before standby
+        servers are stopped. A value of `0` keeps them running.
+        This will be a non-negative integer.
+        '''
+        return self._sublime_ycmd_standby_idle_seconds
+
+    def get_parse_policy(self, file_types):
+        '''
+        Returns the parse policy to use for a buffer with the given
+        `file_types`. The first file type with a policy is used. Otherwise,
+        the wildcard policy is used, which defaults to the idle policy.
+        '''
+        parse_policy = self._sublime_ycmd_parse_policy or {}
+        for file_type in file_types or ():
+            if file_type in parse_policy:
+                return parse_policy[file_type]
+
+        return parse_policy.get(
+            SUBLIME_PARSE_POLICY_WILDCARD, SUBLIME_PARSE_POLICY_IDLE,
+        )
+
     def __eq__(self, other):
         '''
         Returns true if the settings instance `other` has the same ycmd server
@@ -471,6 +646,18 @@ def validate_settings(settings):
     sublime_ycmd_log_file = settings.sublime_ycmd_log_file
     sublime_ycmd_background_threads = \
         settings.sublime_ycmd_background_threads
+    sublime_ycmd_task_executor = settings.sublime_ycmd_task_executor
+    sublime_ycmd_parse_delay_ms = settings.sublime_ycmd_parse_delay_ms
+    sublime_ycmd_parse_policy = settings.sublime_ycmd_parse_policy
+    sublime_ycmd_event_coalesce_ms = settings.sublime_ycmd_event_coalesce_ms
+    sublime_ycmd_offload_threshold_kb = \
+        settings.sublime_ycmd_offload_threshold_kb
+    sublime_ycmd_bulkhead_limits = settings.sublime_ycmd_bulkhead_limits
+    sublime_ycmd_server_max_requests = \
+        settings.sublime_ycmd_server_max_requests
+    sublime_ycmd_standby_servers = settings.sublime_ycmd_standby_servers
+    sublime_ycmd_standby_idle_seconds = \
+        settings.sublime_ycmd_standby_idle_seconds
 
     # required settings
     if not ycmd_root_directory:
@@ -583,6 +770,120 @@ def validate_settings(settings):
     check_int(
         'sublime_ycmd_background_threads', sublime_ycmd_background_threads,
     )
+    check_str('sublime_ycmd_task_executor', sublime_ycmd_task_executor)
+    check_int('sublime_ycmd_parse_delay_ms', sublime_ycmd_parse_delay_ms)
+    check_dict_str('sublime_ycmd_parse_policy', sublime_ycmd_parse_policy)
+    check_int(
+        'sublime_ycmd_event_coalesce_ms', sublime_ycmd_event_coalesce_ms,
+    )
+    check_int(
+        'sublime_ycmd_offload_threshold_kb',
+        sublime_ycmd_offload_threshold_kb,
+    )
+    check_int(
+        'sublime_ycmd_server_max_requests', sublime_ycmd_server_max_requests,
+    )
+    check_int('sublime_ycmd_standby_servers', sublime_ycmd_standby_servers)
+    check_int(
+        'sublime_ycmd_standby_idle_seconds',
+        sublime_ycmd_standby_idle_seconds,
+    )
+
+    # values
+    if sublime_ycmd_parse_delay_ms is not None and \
+            sublime_ycmd_parse_delay_ms < 0:
+        raise SettingsError(
+            'sublime ycmd parse delay ms must be non-negative: %r' %
+            (sublime_ycmd_parse_delay_ms),
+            type=SettingsError.VALUE, key='sublime_ycmd_parse_delay_ms',
+            value=sublime_ycmd_parse_delay_ms,
+        )
+
+    if sublime_ycmd_event_coalesce_ms is not None and \
+            sublime_ycmd_event_coalesce_ms < 0:
+        raise SettingsError(
+            'sublime ycmd event coalesce ms must be non-negative: %r' %
+            (sublime_ycmd_event_coalesce_ms),
+            type=SettingsError.VALUE, key='sublime_ycmd_event_coalesce_ms',
+            value=sublime_ycmd_event_coalesce_ms,
+        )
+
+    if sublime_ycmd_offload_threshold_kb is not None and \
+            sublime_ycmd_offload_threshold_kb < 0:
+        raise SettingsError(
+            'sublime ycmd offload threshold kb must be non-negative: %r' %
+            (sublime_ycmd_offload_threshold_kb),
+            type=SettingsError.VALUE,
+            key='sublime_ycmd_offload_threshold_kb',
+            value=sublime_ycmd_offload_threshold_kb,
+        )
+
+    if sublime_ycmd_server_max_requests is not None and \
+            sublime_ycmd_server_max_requests < 0:
+        raise SettingsError(
+            'sublime ycmd server max requests must be non-negative: %r' %
+            (sublime_ycmd_server_max_requests),
+            type=SettingsError.VALUE,
+            key='sublime_ycmd_server_max_requests',
+            value=sublime_ycmd_server_max_requests,
+        )
+
+    if sublime_ycmd_standby_servers is not None and \
+            sublime_ycmd_standby_servers < 0:
+        raise SettingsError(
+            'sublime ycmd standby servers must be non-negative: %r' %
+            (sublime_ycmd_standby_servers),
+            type=SettingsError.VALUE,
+            key='sublime_ycmd_standby_servers',
+            value=sublime_ycmd_standby_servers,
+        )
+
+    if sublime_ycmd_standby_idle_seconds is not None and \
+            sublime_ycmd_standby_idle_seconds < 0:
+        raise SettingsError(
+            'sublime ycmd standby idle seconds must be non-negative: %r' %
+            (sublime_ycmd_standby_idle_seconds),
+            type=SettingsError.VALUE,
+            key='sublime_ycmd_standby_idle_seconds',
+            value=sublime_ycmd_standby_idle_seconds,
+        )
+
+    if sublime_ycmd_bulkhead_limits is not None:
+        try:
+            check_bulkhead_limits(sublime_ycmd_bulkhead_limits)
+        except (TypeError, ValueError) as e:
+            raise SettingsError(
+                'sublime ycmd bulkhead limits are invalid: %s' % (e),
+                type=SettingsError.VALUE,
+                key='sublime_ycmd_bulkhead_limits',
+                value=sublime_ycmd_bulkhead_limits,
+            )
+
+    if sublime_ycmd_task_executor is not None and \
+            sublime_ycmd_task_executor not in EXECUTOR_BACKENDS:
+        raise SettingsError(
+            'sublime ycmd task executor must be one of %r: %r' %
+            (EXECUTOR_BACKENDS, sublime_ycmd_task_executor),
+            type=SettingsError.VALUE, key='sublime_ycmd_task_executor',
+            value=sublime_ycmd_task_executor,
+        )
+
+    bad_parse_policies = list(
+        k for k, v in (sublime_ycmd_parse_policy or {}).items()
+        if v not in SUBLIME_PARSE_POLICIES
+    )
+    if bad_parse_policies:
+        raise SettingsError(
+            'sublime ycmd parse policy must be one of %r: { %s }' % (
+                SUBLIME_PARSE_POLICIES,
+                ', '.join(
+                    '%r: %r' % (k, sublime_ycmd_parse_policy[k])
+                    for k in bad_parse_policies
+                ),
+            ),
+            type=SettingsError.VALUE, key='sublime_ycmd_parse_policy',
+            value=sublime_ycmd_parse_policy,
+        )
 
 
 def has_same_ycmd_settings(settings1, settings2):
@@ -620,11 +921,11 @@ def has_same_task_pool_settings(settings1, settings2):
     if not isinstance(settings2, Settings):
         raise TypeError('settings are not Settings: %r' % (settings2))
 
-    for ycmd_setting_key in SUBLIME_SETTINGS_YCMD_SERVER_KEYS:
-        ycmd_setting_value1 = getattr(settings1, ycmd_setting_key)
-        ycmd_setting_value2 = getattr(settings2, ycmd_setting_key)
+    for task_pool_setting_key in SUBLIME_SETTINGS_TASK_POOL_KEYS:
+        task_pool_setting_value1 = getattr(settings1, task_pool_setting_key)
+        task_pool_setting_value2 = getattr(settings2, task_pool_setting_key)
 
-        if ycmd_setting_value1 != ycmd_setting_value2:
+        if task_pool_setting_value1 != task_pool_setting_value2:
             return False
 
     # else, everything matched!
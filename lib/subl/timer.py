@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+
+'''
+lib/subl/timer.py
+Timer helpers.
+
+Runs delayed callbacks on the sublime async or main thread, when available.
+Outside of Sublime Text, a daemon `threading.Timer` is used instead.
+'''
+
+import logging
+
+try:
+    import sublime
+except ImportError:
+    from ..subl.dummy import sublime
+
+from ..task.debounce import threading_set_timeout
+
+logger = logging.getLogger('sublime-ycmd.' + __name__)
+
+
+def set_timeout(callback, delay):
+    '''
+    Runs `callback` after `delay` seconds, without blocking the caller.
+    '''
+    set_timeout_async = getattr(sublime, 'set_timeout_async', None)
+    if set_timeout_async is not None:
+        set_timeout_async(callback, int(delay * 1000))
+        return
+
+    threading_set_timeout(callback, delay)
+
+
+def set_main_timeout(callback, delay):
+    '''
+    Runs `callback` on the sublime main thread after `delay` seconds. Outside
+    of Sublime Text, this is the same as `set_timeout`.
+    '''
+    set_timeout_main = getattr(sublime, 'set_timeout', None)
+    if set_timeout_main is not None:
+        set_timeout_main(callback, int(delay * 1000))
+        return
+
+    threading_set_timeout(callback, delay)
@@ -32,15 +32,130 @@ from ..ycmd.server import Server   # noqa: F401
 logger = logging.getLogger('sublime-ycmd.' + __name__)
 
 
+class ViewState(object):
+    '''
+    Plugin state for a single view. Kept as plain attributes, so that checks
+    on the completion path are attribute reads.
+
+    Servers are identified by `Server.id`, which does not require the server
+    lock (unlike `str(server)`).
+
+    The buffer version last parsed by each server is recorded as a pair of
+    `view.change_count()` and a content hash. The change count is checked
+    first, since it is free. The hash catches edits that restore previously
+    parsed contents (e.g. an undo), since those still bump the change count.
+    '''
+
+    __slots__ = (
+        'notified_server_ids', 'parsed_versions',
+        'file_types', 'project_root', 'is_project_root', 'last_request_time',
+        'file_name',
+    )
+
+    def __init__(self):
+        # ids of the servers that have been sent the buffer contents
+        self.notified_server_ids = set()
+        # maps server ids to the (change count, content hash) last parsed
+        self.parsed_versions = {}
+        # cached results of `get_file_types` and
+        # `get_working_directory_for_view`
+        self.file_types = None
+        self.project_root = None
+        self.is_project_root = False
+        # `time.monotonic()` of the last request made for the view
+        self.last_request_time = None
+        # path of the view when it was last saved, `None` if never saved
+        self.file_name = None
+
+    def set_file_name(self, file_name):
+        '''
+        Records `file_name` as the path of the view. Returns true if it differs
+        from the path recorded previously, i.e. the view was saved under a new
+        name (or saved for the first time).
+        '''
+        is_renamed = file_name != self.file_name
+        self.file_name = file_name
+        return is_renamed
+
+    def needs_parse(self, server_id, change_count, file_contents):
+        '''
+        Returns true if `file_contents`, at `change_count`, differ from the
+        contents last parsed by the server with `server_id`.
+
+        If only the change count differs, the recorded change count is updated
+        so that the next check does not need to hash the contents again.
+        '''
+        parsed_version = self.parsed_versions.get(server_id)
+        if parsed_version is None:
+            return True
+
+        parsed_change_count, parsed_content_hash = parsed_version
+        if change_count is not None and change_count == parsed_change_count:
+            return False
+
+        if get_content_hash(file_contents) != parsed_content_hash:
+            return True
+
+        self.parsed_versions[server_id] = (change_count, parsed_content_hash)
+        return False
+
+    def set_parsed(self, server_id, change_count, file_contents):
+        '''
+        Records that the server with `server_id` has parsed `file_contents`,
+        taken at `change_count`.
+        '''
+        self.parsed_versions[server_id] = (
+            change_count, get_content_hash(file_contents),
+        )
+
+    def clear_parsed(self, server_id):
+        ''' Forgets the version parsed by the server with `server_id`. '''
+        self.parsed_versions.pop(server_id, None)
+
+    def __repr__(self):
+        return '%s(%r)' % ('ViewState', dict(
+            (attr, getattr(self, attr)) for attr in self.__slots__
+        ))
+
+
 class View(object):
     '''
     Wrapper class that provides extra functionality over `sublime.View`.
     This allows tracking state for each view independently.
+
+    The view handle is held along with its id. In Sublime Text, a handle is
+    only a thin wrapper around the view id, so holding it does not keep a
+    closed view alive. Wrappers for closed views are dropped by the view
+    registry (see `lib.subl.registry`).
     '''
 
     def __init__(self, view=None):
-        self._view = view   # type: sublime.View
+        self._view = None       # type: sublime.View
+        self._view_id = None
         self._cache = None
+        self._state = ViewState()
+
+        if view is not None:
+            self._set_view(view)
+
+    def _set_view(self, view):
+        self._view = view
+        self._view_id = view.id() if view is not None else None
+
+    def alive(self):
+        '''
+        Returns true if the underlying view still exists, i.e. it has not been
+        closed. Views without a handle are never alive.
+        '''
+        view = self._view
+        if view is None:
+            return False
+
+        is_valid = getattr(view, 'is_valid', None)
+        if is_valid is None:
+            # no way to tell, so assume it is alive while the handle is
+            return True
+        return bool(is_valid())
 
     def ready(self):
         '''
@@ -145,7 +260,12 @@ class View(object):
     def view(self, view):
         if not isinstance(view, sublime.View):
             logger.warning('view is not sublime.View: %r', view)
-        self._view = view
+        self._set_view(view)
+
+    @property
+    def state(self):
+        ''' Returns the `ViewState` record for this view. '''
+        return self._state
 
     # helpers for using views in other collections
     def __eq__(self, other):
@@ -162,17 +282,16 @@ class View(object):
         else:
             raise TypeError('view must be a View: %r' % (other))
 
-        if not self._view:
+        if self._view_id is None:
             return False
 
-        self_id = self._view.id()
-        return self_id == other_id
+        return self._view_id == other_id
 
     def __hash__(self):
-        if not self._view:
+        if self._view_id is None:
             logger.error('no view handle has been set')
             raise TypeError
-        return hash(self._view.id())
+        return hash(self._view_id)
 
     # pass-through to underlying cache
     # this allows callers to store arbirary view-specific information, like
@@ -200,10 +319,15 @@ class View(object):
     # pass-through to `sublime.View` methods:
 
     def id(self):
-        if not self._view:
+        if self._view_id is None:
+            logger.error('no view handle has been set')
+        return self._view_id
+
+    def change_count(self):
+        if self._view is None:
             logger.error('no view handle has been set')
             return None
-        return self._view.id()
+        return self._view.change_count()
 
     def size(self):
         if not self._view:
@@ -230,6 +354,30 @@ class View(object):
         return self._view.file_name()
 
 
+def get_content_hash(file_contents):
+    '''
+    Returns a fast, non-cryptographic hash of the buffer `file_contents`.
+
+    This uses the built-in string hash. It is salted per process, so the value
+    must never be persisted, but that is fine for comparing buffer versions.
+    '''
+    return hash(file_contents)
+
+
+def _make_view_handle(view_id):
+    '''
+    Creates a new `sublime.View` handle for `view_id`. Returns `None` if that
+    is not supported (e.g. when running outside of Sublime Text).
+
+    In Sublime Text, view handles are thin wrappers around the view id, so
+    this is cheap. The handle may refer to a view that has since been closed.
+    '''
+    try:
+        return sublime.View(view_id)
+    except TypeError:
+        return None
+
+
 def get_view_id(view):
     '''
     Returns the id of a given `view`.
@@ -251,6 +399,23 @@ def get_view_id(view):
     return view.id()
 
 
+def get_window_id_for_view(view):
+    '''
+    Returns the id of the window containing `view`, which may be a view id.
+    Returns `None` if the view is not in a window (e.g. it has been closed),
+    or when running outside of Sublime Text.
+    '''
+    if isinstance(view, int):
+        view = _make_view_handle(view)
+        if view is None:
+            return None
+
+    window = view.window()
+    if not window:
+        return None
+    return window.id()
+
+
 def _get_path_from_window(window):
     if window is None:
         logger.debug('no window data available, cannot determine project path')
@@ -354,6 +519,17 @@ def get_path_for_view(view):
     Finally, if the path cannot be determined by either of the two strategies
     above, then this will just return `None`.
     '''
+    path, _ = get_working_directory_for_view(view)
+    return path
+
+
+def get_working_directory_for_view(view):
+    '''
+    Same as `get_path_for_view`, but returns a tuple of the path, and whether
+    it is a project root. It is only a project root if it came from the
+    project/folders of the window, and the file (if any) is inside it. Paths
+    from the file name, or from a common ancestor of the two, are not.
+    '''
     assert isinstance(view, (sublime.View, View)), \
         'view must be a View: %r' % (view)
 
@@ -381,7 +557,7 @@ def get_path_for_view(view):
     #       if not, that's fine, the common ancestor will take care of that
     if path_from_window is None and path_from_file is None:
         logger.debug('could not determine directory from window or file')
-        return None
+        return None, False
 
     if path_from_window is not None and path_from_file is not None:
         logger.debug('returning common ancestor of window and file paths')
@@ -389,22 +565,25 @@ def get_path_for_view(view):
             path_from_window, path_from_file,
         ])
         if path_common_ancestor:
-            return path_common_ancestor
+            return (
+                path_common_ancestor,
+                path_common_ancestor == path_from_window,
+            )
         # otherwise, prefer to use the file's directory
-        return path_from_file
+        return path_from_file, False
 
     if path_from_window is not None:
         logger.debug('no path from file, so using path from window as-is')
-        return path_from_window
+        return path_from_window, True
 
     if path_from_file is not None:
         logger.debug('no path from window, so using path from file as-is')
-        return path_from_file
+        return path_from_file, False
 
     assert False, \
         'unhandled case, path from window, file: %r, %r' % \
         (path_from_window, path_from_file)
-    return None
+    return None, False
 
 
 def get_file_types(view, scope_position=0):
@@ -12,11 +12,30 @@ This module is built on primitives from `queue` and `threading`, so it should
 be supported in just about all environments.
 '''
 
+from .cancel import CancellationToken    # noqa
+from .continuation import (     # noqa
+    ON_MAIN,
+    ON_WORKER,
+    MainThreadDispatcher,
+    chain_future,
+)
+from .deadline import Deadline     # noqa
+from .executor import Executor     # noqa
 from .pool import Pool      # noqa
+from .priority import (     # noqa
+    PRIORITY_INTERACTIVE,
+    PRIORITY_HEALTH,
+    PRIORITY_NOTIFICATION,
+    PRIORITY_STARTUP,
+    PriorityTaskQueue,
+)
 from .task import Task      # noqa
 from .worker import (       # noqa
     spawn_worker,
     Worker,
 )
 
-__all__ = ['pool', 'task', 'worker']
+__all__ = [
+    'backend', 'bulkhead', 'cancel', 'continuation', 'deadline', 'executor',
+    'pool', 'priority', 'task', 'worker',
+]
@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+
+'''
+lib/task/backend.py
+Executor backends.
+
+Besides the task `Pool`, tasks can run on a `concurrent.futures` thread pool,
+on sublime's async thread, or on an asyncio event loop thread. All backends
+share the `Executor` API, so the server manager can use any of them.
+
+The thread pool backend works from python 3.3 (the Sublime Text 3 plugin
+host). The asyncio backend requires python 3.4.
+'''
+
+import concurrent.futures
+import functools
+import logging
+import sys
+import threading
+
+from ..task.debounce import threading_set_timeout
+from ..task.executor import Executor
+from ..task.pool import Pool
+from ..util.id import generate_id
+from ..util.sys import get_cpu_count
+
+logger = logging.getLogger('sublime-ycmd.' + __name__)
+
+EXECUTOR_POOL = 'pool'
+EXECUTOR_THREAD_POOL = 'thread_pool'
+EXECUTOR_SUBLIME_ASYNC = 'sublime_async'
+EXECUTOR_ASYNCIO = 'asyncio'
+EXECUTOR_BACKENDS = (
+    EXECUTOR_POOL,
+    EXECUTOR_THREAD_POOL,
+    EXECUTOR_SUBLIME_ASYNC,
+    EXECUTOR_ASYNCIO,
+)
+DEFAULT_EXECUTOR_BACKEND = EXECUTOR_POOL
+
+# `ThreadPoolExecutor` accepts a `thread_name_prefix` from python 3.6
+_HAS_THREAD_NAME_PREFIX = sys.version_info >= (3, 6)
+
+
+def check_executor_backend(backend):
+    '''
+    Raises an exception if `backend` is not one of the `EXECUTOR_*` names.
+    '''
+    if not isinstance(backend, str):
+        raise TypeError('executor backend must be a str: %r' % (backend))
+    if backend not in EXECUTOR_BACKENDS:
+        raise ValueError('executor backend must be one of %r: %r' %
+                         (EXECUTOR_BACKENDS, backend))
+
+
+class DispatchExecutor(Executor):
+    '''
+    Base class for backends that run each task as a callback on some other
+    scheduler. Tracks the number of outstanding tasks, so `shutdown` can wait
+    for them to finish.
+
+    Subclasses implement `_dispatch(callback)`, and may override `_close`,
+    which is called once the executor has shut down.
+    '''
+
+    def __init__(self, num_workers):
+        super(DispatchExecutor, self).__init__()
+        # queued or running, like the pool queue depth plus busy workers
+        self._outstanding = 0
+        self._idle = threading.Condition(self._lock)
+
+        self._running = True
+        self._num_workers = num_workers
+        self._metrics.record_worker_count(num_workers)
+
+    def _dispatch(self, callback):
+        raise NotImplementedError
+
+    def _close(self):
+        pass
+
+    def _enqueue(self, task, priority):
+        # [internal] must be called with the lock held
+        self._outstanding += 1
+        self._metrics.record_queue_depth(self._outstanding)
+        self._dispatch(functools.partial(self._run_dispatched, task))
+
+    def _run_dispatched(self, task):
+        try:
+            self.run_task(task)
+        finally:
+            with self._lock:
+                self._outstanding -= 1
+                if not self._outstanding:
+                    self._idle.notify_all()
+
+    def resize(self, min_workers=None, max_workers=None):
+        '''
+        Single-threaded backends cannot be resized, so this does nothing.
+        '''
+        logger.debug('executor cannot be resized, ignoring: %r', self)
+
+    def shutdown(self, wait=True, timeout=None):
+        '''
+        Stops accepting tasks. Tasks that are already queued still run.
+
+        If `wait` is truthy, this blocks for up to `timeout` seconds (or
+        indefinitely) until they are done, and returns false on timeout.
+        '''
+        with self._lock:
+            self._running = False
+            if wait and not self._idle.wait_for(
+                    lambda: not self._outstanding, timeout=timeout):
+                return False
+
+        self._close()
+        return True
+
+    def get_metrics(self):
+        metrics = super(DispatchExecutor, self).get_metrics()
+        with self._lock:
+            metrics.update({
+                'queue_depth': self._outstanding,
+                'workers': self._num_workers,
+                'min_workers': self._num_workers,
+                'max_workers': self._num_workers,
+            })
+        return metrics
+
+
+class ThreadPoolBackend(DispatchExecutor):
+    '''
+    Runs tasks on a `concurrent.futures.ThreadPoolExecutor`. Tasks run in
+    submission order, and `priority` is ignored. Resizing replaces the
+    executor, and lets the previous one finish its queued tasks.
+
+    Before python 3.6, the executor cannot name its threads. Instead, each
+    thread is renamed when it runs its first task.
+    '''
+
+    def __init__(self, max_workers=None, thread_name_prefix=''):
+        if max_workers is None:
+            max_workers = (get_cpu_count() or 1) * 5
+        super(ThreadPoolBackend, self).__init__(max_workers)
+
+        self._thread_name_prefix = thread_name_prefix
+        self._executor = self._create_executor(max_workers)
+
+    def _create_executor(self, max_workers):
+        if not _HAS_THREAD_NAME_PREFIX:
+            return concurrent.futures.ThreadPoolExecutor(
+                max_workers=max_workers,
+            )
+        return concurrent.futures.ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix=self._thread_name_prefix,
+        )
+
+    def _dispatch(self, callback):
+        if _HAS_THREAD_NAME_PREFIX or not self._thread_name_prefix:
+            self._executor.submit(callback)
+        else:
+            self._executor.submit(self._run_named, callback)
+
+    def _run_named(self, callback):
+        thread = threading.current_thread()
+        if not thread.name.startswith(self._thread_name_prefix):
+            thread.name = generate_id(self._thread_name_prefix)
+        callback()
+
+    def _close(self):
+        self._executor.shutdown(wait=False)
+
+    def resize(self, min_workers=None, max_workers=None):
+        '''
+        Replaces the executor with one of `max_workers` threads. The minimum
+        is ignored, as threads are only created on demand.
+        '''
+        with self._lock:
+            if max_workers is None or max_workers == self._num_workers:
+                return
+
+            previous_executor = self._executor
+            self._executor = self._create_executor(max_workers)
+            self._num_workers = max_workers
+            self._metrics.record_worker_count(max_workers)
+
+        previous_executor.shutdown(wait=False)
+
+    def __repr__(self):
+        return '%s(%r)' % ('ThreadPoolBackend', self._num_workers)
+
+
+class SublimeAsyncBackend(DispatchExecutor):
+    '''
+    Runs tasks on sublime's async thread, with `set_timeout_async`. There is
+    only one such thread, shared with the other plugins, so tasks run one at
+    a time, in submission order.
+
+    Outside of sublime, `set_timeout_async` defaults to `threading.Timer`,
+    which runs each task on its own thread instead.
+    '''
+
+    def __init__(self, set_timeout_async=None):
+        if set_timeout_async is None:
+            set_timeout_async = threading_set_timeout
+        if not callable(set_timeout_async):
+            raise TypeError(
+                'set timeout async must be callable: %r' % (set_timeout_async)
+            )
+        super(SublimeAsyncBackend, self).__init__(1)
+
+        self._set_timeout_async = set_timeout_async
+
+    def _dispatch(self, callback):
+        self._set_timeout_async(callback, 0)
+
+    def __repr__(self):
+        return 'SublimeAsyncBackend()'
+
+
+class AsyncioBackend(DispatchExecutor):
+    '''
+    Runs tasks on an asyncio event loop, in a dedicated daemon thread. Tasks
+    are called on the loop thread one at a time, so blocking tasks hold up
+    the rest of the queue.
+    '''
+
+    def __init__(self, thread_name_prefix=''):
+        # imported here, as older plugin hosts do not provide it
+        import asyncio
+
+        super(AsyncioBackend, self).__init__(1)
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._run_loop, name=generate_id(thread_name_prefix),
+        )
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _run_loop(self):
+        logger.debug('event loop thread starting: %r', self)
+        try:
+            self._loop.run_forever()
+        finally:
+            self._loop.close()
+        logger.debug('event loop thread exiting: %r', self)
+
+    def _dispatch(self, callback):
+        self._loop.call_soon_threadsafe(callback)
+
+    def _close(self):
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+    def __repr__(self):
+        return 'AsyncioBackend()'
+
+
+def create_executor(backend=None, max_workers=None, thread_name_prefix='',
+                    set_timeout_async=None):
+    '''
+    Creates an executor for the `backend`, which should be one of the
+    `EXECUTOR_*` names. Defaults to the task pool.
+
+    The `max_workers` only applies to the thread pool backends. The
+    `set_timeout_async` is only used by the sublime async backend.
+    '''
+    if backend is None:
+        backend = DEFAULT_EXECUTOR_BACKEND
+    check_executor_backend(backend)
+
+    if backend == EXECUTOR_POOL:
+        return Pool(
+            max_workers=max_workers, thread_name_prefix=thread_name_prefix,
+        )
+    if backend == EXECUTOR_THREAD_POOL:
+        return ThreadPoolBackend(
+            max_workers=max_workers, thread_name_prefix=thread_name_prefix,
+        )
+    if backend == EXECUTOR_SUBLIME_ASYNC:
+        return SublimeAsyncBackend(set_timeout_async=set_timeout_async)
+    if backend == EXECUTOR_ASYNCIO:
+        return AsyncioBackend(thread_name_prefix=thread_name_prefix)
+
+    raise AssertionError('[internal] unhandled executor backend: %r' % backend)
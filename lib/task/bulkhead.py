@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+
+'''
+lib/task/bulkhead.py
+Concurrency limits for groups of tasks.
+
+All tasks share the workers of one executor, so a server that stops
+responding can tie up every worker, and block requests for all of the other
+servers. A bulkhead caps the number of outstanding tasks (queued or running)
+for one group, such as one server or one request class. Tasks over the limit
+are rejected right away instead of being queued behind the stuck ones.
+'''
+
+import logging
+import threading
+
+from ..task.priority import PRIORITY_INTERACTIVE
+
+logger = logging.getLogger('sublime-ycmd.' + __name__)
+
+# request classes, each with their own bulkhead:
+BULKHEAD_INTERACTIVE = 'interactive'
+BULKHEAD_BACKGROUND = 'background'
+# per-server bulkheads, shared by both request classes
+BULKHEAD_SERVER = 'server'
+
+BULKHEAD_KINDS = (
+    BULKHEAD_SERVER,
+    BULKHEAD_INTERACTIVE,
+    BULKHEAD_BACKGROUND,
+)
+# limits for each kind of bulkhead, `0` means unlimited
+DEFAULT_BULKHEAD_LIMITS = {
+    BULKHEAD_SERVER: 16,
+    BULKHEAD_INTERACTIVE: 8,
+    BULKHEAD_BACKGROUND: 32,
+}
+
+
+def get_request_class(priority):
+    '''
+    Returns the request class (bulkhead name) for a task `priority`. Only
+    interactive tasks are separated from the rest.
+    '''
+    if priority == PRIORITY_INTERACTIVE:
+        return BULKHEAD_INTERACTIVE
+    return BULKHEAD_BACKGROUND
+
+
+def check_bulkhead_limits(limits):
+    '''
+    Raises an exception if `limits` is not a `dict` mapping bulkhead kinds to
+    non-negative limits.
+    '''
+    if not isinstance(limits, dict):
+        raise TypeError('bulkhead limits must be a dict: %r' % (limits))
+
+    for kind, limit in limits.items():
+        if kind not in BULKHEAD_KINDS:
+            raise ValueError(
+                'bulkhead must be one of %r: %r' % (BULKHEAD_KINDS, kind)
+            )
+        if not isinstance(limit, int):
+            raise TypeError('bulkhead limit must be an int: %r' % (limit))
+        if limit < 0:
+            raise ValueError(
+                'bulkhead limit must be non-negative: %r' % (limit)
+            )
+
+
+class BulkheadFullError(RuntimeError):
+    '''
+    Raised when a task is rejected because a bulkhead is at its limit.
+    '''
+    pass
+
+
+class Bulkhead(object):
+    '''
+    Counter of outstanding tasks for one group, with a limit. A `limit` of `0`
+    means unlimited, in which case tasks are only counted.
+
+    This is not thread-safe. `Bulkheads` guards it with its own lock.
+    '''
+
+    __slots__ = ('limit', 'active', 'peak', 'accepted', 'rejected')
+
+    def __init__(self, limit=0):
+        self.limit = limit
+        self.active = 0
+        self.peak = 0
+        self.accepted = 0
+        self.rejected = 0
+
+    def is_full(self):
+        return bool(self.limit) and self.active >= self.limit
+
+    def acquire(self):
+        self.active += 1
+        self.accepted += 1
+        if self.active > self.peak:
+            self.peak = self.active
+
+    def release(self):
+        assert self.active > 0, \
+            '[internal] bulkhead released more than acquired: %r' % (self)
+        self.active -= 1
+
+    def to_dict(self):
+        return {
+            'limit': self.limit,
+            'active': self.active,
+            'peak': self.peak,
+            'accepted': self.accepted,
+            'rejected': self.rejected,
+        }
+
+    def __repr__(self):
+        return '%s(%r)' % ('Bulkhead', self.to_dict())
+
+
+class Bulkheads(object):
+    '''
+    Set of bulkheads, one per request class and one per server. Each task
+    takes a slot in both the bulkhead for its request class and for its
+    server, and is rejected if either one is full.
+
+    These limits sit on top of the executor worker count. They bound how much
+    of it one server, or one request class, can use up.
+
+    The `limits` should map the `BULKHEAD_*` kinds to limits. Missing kinds
+    use the defaults in `DEFAULT_BULKHEAD_LIMITS`.
+    '''
+
+    def __init__(self, limits=None):
+        self._lock = threading.Lock()
+        self._limits = dict(DEFAULT_BULKHEAD_LIMITS)
+
+        self._class_bulkheads = {
+            BULKHEAD_INTERACTIVE: Bulkhead(),
+            BULKHEAD_BACKGROUND: Bulkhead(),
+        }
+        # maps server key -> `Bulkhead`, created on first use
+        self._server_bulkheads = {}
+        # includes rejections for servers that have been discarded
+        self._rejected = 0
+
+        self.set_limits(limits or {})
+
+    def set_limits(self, limits):
+        '''
+        Updates the limits. Tasks over a lowered limit are not affected, but
+        new tasks are rejected until enough of them finish.
+        '''
+        check_bulkhead_limits(limits)
+
+        with self._lock:
+            self._limits.update(limits)
+            for request_class, bulkhead in self._class_bulkheads.items():
+                bulkhead.limit = self._limits[request_class]
+            for bulkhead in self._server_bulkheads.values():
+                bulkhead.limit = self._limits[BULKHEAD_SERVER]
+
+    def acquire(self, server_key, request_class, check_limit=True):
+        '''
+        Takes a slot for a task for the server identified by `server_key`, in
+        `request_class`. Raises a `BulkheadFullError` if either bulkhead is
+        full. Otherwise, returns the slot, and the caller must pass it to
+        `release` once the task is done.
+
+        If `check_limit` is false, the slot is taken even if the bulkheads are
+        full. This is for tasks that were already accepted (e.g. parked while
+        a server was starting), which should not be dropped now.
+        '''
+        with self._lock:
+            class_bulkhead = self._class_bulkheads[request_class]
+            server_bulkhead = self._server_bulkheads.get(server_key)
+            if server_bulkhead is None:
+                server_bulkhead = Bulkhead(self._limits[BULKHEAD_SERVER])
+                self._server_bulkheads[server_key] = server_bulkhead
+
+            if check_limit and server_bulkhead.is_full():
+                server_bulkhead.rejected += 1
+                self._rejected += 1
+                raise BulkheadFullError(
+                    'too many tasks for server: %r' % (server_key)
+                )
+            if check_limit and class_bulkhead.is_full():
+                class_bulkhead.rejected += 1
+                self._rejected += 1
+                raise BulkheadFullError(
+                    'too many %s tasks' % (request_class)
+                )
+
+            server_bulkhead.acquire()
+            class_bulkhead.acquire()
+
+        # holds on to the bulkheads themselves, as the server bulkhead may be
+        # discarded and re-created under the same key before it is released
+        return (server_bulkhead, class_bulkhead)
+
+    def release(self, slot):
+        ''' Releases a `slot` returned by `acquire`. '''
+        with self._lock:
+            for bulkhead in slot:
+                bulkhead.release()
+
+    def discard(self, server_key):
+        '''
+        Drops the bulkhead for a server that has stopped. Outstanding tasks for
+        it still release their slots, but do not affect a new bulkhead for the
+        same key.
+        '''
+        with self._lock:
+            self._server_bulkheads.pop(server_key, None)
+
+    def get_stats(self):
+        '''
+        Returns a `dict` with the limit, number of active tasks, peak active
+        tasks, and the number of tasks accepted and rejected for each request
+        class, and for each server (keyed by server key). The total number of
+        rejected tasks is also included.
+        '''
+        with self._lock:
+            stats = dict(
+                (request_class, bulkhead.to_dict())
+                for request_class, bulkhead in self._class_bulkheads.items()
+            )
+            stats['servers'] = dict(
+                (server_key, bulkhead.to_dict())
+                for server_key, bulkhead in self._server_bulkheads.items()
+            )
+            stats['rejected'] = self._rejected
+        return stats
+
+    def __repr__(self):
+        with self._lock:
+            limits = dict(self._limits)
+        return '%s(%r)' % ('Bulkheads', limits)
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+
+'''
+lib/task/cancel.py
+Cooperative cancellation token.
+
+Futures can only be cancelled before they start running. A token is passed
+into long-running task callables instead, so they can check it between steps
+and stop early. A token may also carry an absolute deadline, after which it
+counts as cancelled.
+'''
+
+import logging
+import threading
+import time
+
+from concurrent.futures import CancelledError
+
+logger = logging.getLogger('sublime-ycmd.' + __name__)
+
+
+class CancellationToken(object):
+    '''
+    Flag shared between the submitter of a task and the task callable.
+
+    If `deadline` is provided, it should be a `time.monotonic()` timestamp.
+    Once it has passed, the token is considered expired, and `cancelled`
+    returns true.
+    '''
+
+    def __init__(self, deadline=None):
+        if deadline is not None and not isinstance(deadline, (int, float)):
+            raise TypeError('deadline must be a number: %r' % (deadline))
+
+        self._deadline = deadline
+        self._event = threading.Event()
+
+    def cancel(self):
+        ''' Requests that the task stop. Safe to call more than once. '''
+        self._event.set()
+
+    def expired(self, now=None):
+        ''' Returns true if the deadline has passed. '''
+        if self._deadline is None:
+            return False
+        if now is None:
+            now = time.monotonic()
+        return now >= self._deadline
+
+    def cancelled(self):
+        ''' Returns true if `cancel` was called, or the deadline passed. '''
+        return self._event.is_set() or self.expired()
+
+    def remaining(self, timeout=None):
+        '''
+        Returns the number of seconds left until the deadline, capped at
+        `timeout` if provided. Returns `timeout` if there is no deadline.
+        '''
+        if self._deadline is None:
+            return timeout
+
+        remaining = max(self._deadline - time.monotonic(), 0)
+        if timeout is not None and timeout < remaining:
+            return timeout
+        return remaining
+
+    def wait(self, timeout=None):
+        '''
+        Blocks until the token is cancelled, or `timeout` seconds pass. Returns
+        true if the token was cancelled.
+        '''
+        self._event.wait(self.remaining(timeout))
+        return self.cancelled()
+
+    def raise_if_cancelled(self):
+        ''' Raises `CancelledError` if the token is cancelled. '''
+        if self.cancelled():
+            raise CancelledError
+
+    @property
+    def deadline(self):
+        return self._deadline
+
+    def __bool__(self):
+        ''' Returns `True`, so an instance is always truthy. '''
+        return True
+
+    def __repr__(self):
+        return '%s(%r)' % ('CancellationToken', {
+            'cancelled': self._event.is_set(),
+            'deadline': self._deadline,
+        })
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+
+'''
+lib/task/continuation.py
+Future continuations.
+
+Attaches follow-up work to task futures, either on the thread that finished
+the task or on the main thread. Main thread callbacks are batched, so a burst
+of completions is applied in a single timer tick, and the worker that finished
+the task goes straight back to the pool.
+'''
+
+import concurrent.futures
+import logging
+import threading
+
+from .debounce import threading_set_timeout
+
+logger = logging.getLogger('sublime-ycmd.' + __name__)
+
+# where a continuation runs
+ON_MAIN = 'main'
+ON_WORKER = 'worker'
+CONTINUATION_TARGETS = (ON_MAIN, ON_WORKER)
+
+
+def check_continuation_target(on):
+    '''
+    Raises an exception if `on` is not a valid continuation target.
+    '''
+    if on not in CONTINUATION_TARGETS:
+        raise ValueError('continuation target must be one of %r: %r' %
+                         (CONTINUATION_TARGETS, on))
+
+
+def chain_future(future, target):
+    '''
+    Copies the outcome of `future` to `target` once it is done. If `target` is
+    cancelled first, `future` is cancelled too.
+
+    This is used when the caller was handed `target` before the task for it
+    was submitted (e.g. while the request was held back).
+    '''
+    def copy_outcome(future):
+        if target.done():
+            return
+        if future.cancelled():
+            target.cancel()
+        elif future.exception() is not None:
+            target.set_exception(future.exception())
+        else:
+            target.set_result(future.result())
+
+    def propagate_cancel(target):
+        if target.cancelled():
+            future.cancel()
+
+    future.add_done_callback(copy_outcome)
+    target.add_done_callback(propagate_cancel)
+
+
+class MainThreadDispatcher(object):
+    '''
+    Runs callbacks on the main thread, in batches.
+
+    Callbacks dispatched while a tick is already scheduled are added to it,
+    instead of scheduling another one. Ticks are scheduled with
+    `set_timeout(callback, delay)`, which defaults to `threading.Timer`. In
+    the plugin, this should be `sublime.set_timeout`.
+    '''
+
+    def __init__(self, set_timeout=None):
+        if set_timeout is None:
+            set_timeout = threading_set_timeout
+        if not callable(set_timeout):
+            raise TypeError('set timeout must be callable: %r' % (set_timeout))
+
+        self._set_timeout = set_timeout
+        self._lock = threading.Lock()
+        # list of (callback, args), in dispatch order
+        self._pending = []
+        self._tick_scheduled = False
+
+        self._dispatched = 0
+        self._ticks = 0
+
+    def dispatch(self, callback, *args):
+        '''
+        Queues `callback(*args)` to run on the main thread. Returns
+        immediately, without waiting for it to run.
+        '''
+        if not callable(callback):
+            raise TypeError('callback must be callable: %r' % (callback))
+
+        with self._lock:
+            self._pending.append((callback, args))
+            self._dispatched += 1
+            if self._tick_scheduled:
+                return
+            self._tick_scheduled = True
+
+        self._set_timeout(self._run_pending, 0)
+
+    def then(self, future, fn, on=ON_MAIN):
+        '''
+        Calls `fn(future)` once `future` is done, on the main thread or on
+        the thread that completed it, depending on `on`.
+
+        Returns a new future, which resolves to the result of `fn`. If `fn`
+        raises, the exception is set on the returned future instead.
+        '''
+        check_continuation_target(on)
+        if not callable(fn):
+            raise TypeError('continuation must be callable: %r' % (fn))
+
+        continuation = concurrent.futures.Future()
+
+        def run_continuation(done_future):
+            if not continuation.set_running_or_notify_cancel():
+                return
+            try:
+                result = fn(done_future)
+            except BaseException as e:
+                logger.debug('continuation raised: %r', e)
+                continuation.set_exception(e)
+            else:
+                continuation.set_result(result)
+
+        if on == ON_WORKER:
+            future.add_done_callback(run_continuation)
+        else:
+            future.add_done_callback(
+                lambda done_future: self.dispatch(
+                    run_continuation, done_future,
+                )
+            )
+
+        return continuation
+
+    def _run_pending(self):
+        with self._lock:
+            pending = self._pending
+            self._pending = []
+            self._tick_scheduled = False
+            self._ticks += 1
+
+        for callback, args in pending:
+            try:
+                callback(*args)
+            except Exception as e:
+                logger.error('unhandled error in main thread callback: %r', e)
+
+    def get_stats(self):
+        '''
+        Returns a `dict` with the number of callbacks dispatched, and the
+        number of ticks they were run in.
+        '''
+        with self._lock:
+            return {
+                'dispatched': self._dispatched,
+                'ticks': self._ticks,
+                'pending': len(self._pending),
+            }
+
+    def __repr__(self):
+        return '%s(%r)' % ('MainThreadDispatcher', self.get_stats())
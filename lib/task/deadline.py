@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+
+'''
+lib/task/deadline.py
+End-to-end request deadline.
+
+A timeout that is applied separately to each step of a request (waiting in
+the queue, connecting, sending, reading) can add up to several times the
+intended budget. A `Deadline` is created once, where the request starts, and
+passed along as the cancellation token. Each step only gets what is left of
+the budget, and the time spent in each one is recorded for diagnosis.
+'''
+
+import collections
+import logging
+import threading
+import time
+
+from ..task.cancel import CancellationToken
+
+logger = logging.getLogger('sublime-ycmd.' + __name__)
+
+# request phases, in the order they usually happen:
+PHASE_SNAPSHOT = 'snapshot'
+PHASE_QUEUE = 'queue'
+PHASE_STATUS = 'status'
+PHASE_CONNECT = 'connect'
+PHASE_SEND = 'send'
+PHASE_READ = 'read'
+PHASE_PARSE = 'parse'
+
+
+class Deadline(CancellationToken):
+    '''
+    Cancellation token with a time budget of `timeout` seconds, starting now.
+
+    Each step of the request should call `mark` once it is done, which
+    records how long the step took, and `remaining` to get the budget for the
+    next one. Steps may be skipped.
+    '''
+
+    def __init__(self, timeout):
+        if not isinstance(timeout, (int, float)):
+            raise TypeError('timeout must be a number: %r' % (timeout))
+
+        start_time = time.monotonic()
+        super(Deadline, self).__init__(deadline=start_time + timeout)
+
+        self._timeout = timeout
+        self._start_time = start_time
+
+        self._phase_lock = threading.Lock()
+        self._last_mark_time = start_time
+        # maps phase -> seconds spent in it, in the order they were marked
+        self._phases = collections.OrderedDict()
+
+    def mark(self, phase):
+        '''
+        Records the time since the previous mark (or since the deadline was
+        created) as spent in `phase`. Marking the same phase again adds to it.
+        '''
+        now = time.monotonic()
+        with self._phase_lock:
+            self._phases[phase] = \
+                self._phases.get(phase, 0.0) + now - self._last_mark_time
+            self._last_mark_time = now
+
+    def check_remaining(self, phase, timeout=None):
+        '''
+        Same as `remaining`, but raises a `TimeoutError` if there is no time
+        left to start `phase`.
+        '''
+        remaining = self.remaining(timeout)
+        if remaining is not None and remaining <= 0:
+            raise TimeoutError(
+                'deadline of %ss passed before %s' % (self._timeout, phase)
+            )
+        return remaining
+
+    def get_phases(self):
+        '''
+        Returns an ordered `dict` mapping each phase to the seconds spent in
+        it, and the total elapsed time under `"total"`.
+        '''
+        with self._phase_lock:
+            phases = collections.OrderedDict(self._phases)
+            phases['total'] = self._last_mark_time - self._start_time
+        return phases
+
+    @property
+    def timeout(self):
+        return self._timeout
+
+    def __repr__(self):
+        return '%s(%r)' % ('Deadline', {
+            'timeout': self._timeout,
+            'remaining': self.remaining(),
+            'phases': self.get_phases(),
+        })
+
+
+def mark_phase(cancel_token, phase):
+    '''
+    Calls `mark` on `cancel_token` if it is a `Deadline`. Other tokens do not
+    record phases, so this does nothing for them.
+    '''
+    if isinstance(cancel_token, Deadline):
+        cancel_token.mark(phase)
+
+
+def check_remaining(cancel_token, phase, timeout=None):
+    '''
+    Returns the time left for `phase`, capped at `timeout`. Raises a
+    `TimeoutError` if `cancel_token` is a `Deadline` that has run out. Other
+    tokens raise `CancelledError` instead, as they count as cancelled once
+    their deadline passes.
+    '''
+    if cancel_token is None:
+        return timeout
+    if isinstance(cancel_token, Deadline):
+        return cancel_token.check_remaining(phase, timeout)
+
+    remaining = cancel_token.remaining(timeout)
+    if remaining is not None and remaining <= 0:
+        cancel_token.raise_if_cancelled()
+    return remaining
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+
+'''
+lib/task/debounce.py
+Keyed debouncer. Delays work until there is a pause in activity.
+
+Used to send buffers to ycmd once the user stops typing, instead of on every
+modification. Each key (e.g. view id) has at most one outstanding timer, and
+at most one run in flight.
+'''
+
+import logging
+import threading
+import time
+
+logger = logging.getLogger('sublime-ycmd.' + __name__)
+
+
+def threading_set_timeout(callback, delay):
+    '''
+    Runs `callback` after `delay` seconds on a daemon `threading.Timer`.
+    '''
+    timer = threading.Timer(delay, callback)
+    timer.daemon = True
+    timer.start()
+
+
+class _DebounceEntry(object):
+    __slots__ = (
+        'key', 'callback', 'deadline', 'timer_armed', 'in_flight', 'pending',
+    )
+
+    def __init__(self, key):
+        self.key = key
+        self.callback = None
+        # `time.monotonic()` after which the callback should run, or `None`
+        self.deadline = None
+        self.timer_armed = False
+        self.in_flight = False
+        # set when a run is requested while one is already in flight
+        self.pending = False
+
+
+class Debouncer(object):
+    '''
+    Runs a callback for a key once `delay` seconds have passed without another
+    `touch` for that key.
+
+    Touching a key only moves its deadline. If a timer is already armed, no
+    new timer is created. Instead, when the timer fires before the deadline,
+    it is re-armed for the remaining time.
+
+    The callback may return a future. While that future is pending, further
+    runs for the key are coalesced into a single run after it completes.
+
+    Timers are created with `set_timeout(callback, delay)`, which defaults to
+    `threading.Timer`. Callbacks are invoked without any locks held.
+    '''
+
+    def __init__(self, delay, set_timeout=None):
+        if not isinstance(delay, (int, float)):
+            raise TypeError('delay must be a number: %r' % (delay))
+        if delay < 0:
+            raise ValueError('delay must be non-negative: %r' % (delay))
+
+        if set_timeout is None:
+            set_timeout = threading_set_timeout
+        if not callable(set_timeout):
+            raise TypeError('set timeout must be callable: %r' % (set_timeout))
+
+        self._delay = delay
+        self._set_timeout = set_timeout
+
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    def touch(self, key, callback):
+        '''
+        Schedules `callback` to run for `key` once `delay` seconds pass with
+        no other calls for `key`. Replaces any previous callback for `key`.
+        '''
+        deadline = time.monotonic() + self._delay
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = _DebounceEntry(key)
+                self._entries[key] = entry
+
+            entry.callback = callback
+            entry.deadline = deadline
+            if entry.timer_armed:
+                return
+
+            entry.timer_armed = True
+
+        self._arm(key, self._delay)
+
+    def flush(self, key, callback):
+        '''
+        Runs `callback` for `key` now, instead of waiting for the delay. Any
+        armed timer for `key` will find nothing to do when it fires.
+        '''
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = _DebounceEntry(key)
+                self._entries[key] = entry
+
+            entry.callback = callback
+            entry.deadline = None
+
+        self._run(key)
+
+    def cancel(self, key):
+        '''
+        Drops any scheduled run for `key`. A run that is already in flight is
+        not interrupted.
+        '''
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def is_scheduled(self, key):
+        ''' Returns true if a run is waiting on the delay for `key`. '''
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and entry.deadline is not None
+
+    def _arm(self, key, delay):
+        self._set_timeout(lambda: self._on_timeout(key), delay)
+
+    def _on_timeout(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+
+            entry.timer_armed = False
+            if entry.deadline is None:
+                # flushed or already run
+                return
+
+            remaining = entry.deadline - time.monotonic()
+            if remaining > 0:
+                # touched again since the timer was armed, so wait some more
+                entry.timer_armed = True
+            else:
+                entry.deadline = None
+
+        if remaining > 0:
+            self._arm(key, remaining)
+        else:
+            self._run(key)
+
+    def _run(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+            if entry.in_flight:
+                entry.pending = True
+                return
+
+            entry.in_flight = True
+            entry.pending = False
+            callback = entry.callback
+
+        try:
+            result = callback()
+        except Exception as e:
+            logger.warning('debounced callback failed: %r', e, exc_info=e)
+            result = None
+
+        if result is not None and hasattr(result, 'add_done_callback'):
+            result.add_done_callback(lambda _: self._finish(entry))
+        else:
+            self._finish(entry)
+
+    def _finish(self, entry):
+        with self._lock:
+            entry.in_flight = False
+            # if the deadline is set, the armed timer will take care of it
+            rerun = (
+                entry.pending and entry.deadline is None and
+                self._entries.get(entry.key) is entry
+            )
+            entry.pending = False
+
+        if rerun:
+            self._run(entry.key)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def __repr__(self):
+        return '%s(%r)' % ('Debouncer', {
+            'delay': self._delay,
+            'keys': len(self),
+        })
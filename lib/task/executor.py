@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+
+'''
+lib/task/executor.py
+Executor base class.
+
+Implements the task API shared by all executor backends: submitting single,
+bulk, and keyed tasks, dropping expired or cancelled tasks, and recording
+metrics. Backends only decide where queued tasks run (see `lib.task.backend`
+and `lib.task.pool`).
+'''
+
+from concurrent.futures import _base as futurebase
+import collections
+import logging
+import threading
+import time
+
+from ..task.cancel import CancellationToken
+from ..task.deadline import (
+    PHASE_QUEUE,
+    mark_phase,
+)
+from ..task.metrics import (
+    PoolMetrics,
+    get_callable_name,
+)
+from ..task.priority import check_priority
+from ..task.task import Task
+
+logger = logging.getLogger('sublime-ycmd.' + __name__)
+
+# tasks that run for longer than this many seconds are logged
+SLOW_TASK_THRESHOLD = 1
+
+
+class Executor(object):
+    '''
+    Base class for executor backends.
+
+    Subclasses implement `_enqueue` (and optionally `_enqueue_many`) to hand
+    tasks to whatever runs them, which should call `run_task` for each one.
+    They also implement `resize` and `shutdown`.
+
+    Backends that do not support priority classes run tasks in submission
+    order, and ignore the `priority` arguments.
+    '''
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._running = None
+        self._metrics = PoolMetrics()
+        # maps `Task.DROP_*` reason -> number of tasks dropped before running
+        self._dropped_counts = {
+            Task.DROP_CANCELLED: 0,
+            Task.DROP_EXPIRED: 0,
+        }
+
+        # maps key -> future of the task that is queued or running for it
+        self._keyed_active = {}
+        # maps key -> deque of (task, priority) waiting on the active task
+        self._keyed_pending = {}
+
+    def _enqueue(self, task, priority):
+        '''
+        Queues a single task. Called with the lock held, while running.
+        '''
+        raise NotImplementedError
+
+    def _enqueue_many(self, tasks, priority):
+        '''
+        Queues a batch of tasks. Called with the lock held, while running.
+        '''
+        for task in tasks:
+            self._enqueue(task, priority)
+
+    def resize(self, min_workers=None, max_workers=None):
+        raise NotImplementedError
+
+    def shutdown(self, wait=True, timeout=None):
+        raise NotImplementedError
+
+    def submit(self, fn, *args,
+               priority=None, deadline=None, cancel_token=None, **kwargs):
+        '''
+        Schedules `fn(*args, **kwargs)` to run in the background, and returns
+        a future for the result.
+
+        If `priority` is omitted, the task is queued as a notification. It
+        should otherwise be one of the `PRIORITY_*` constants defined in
+        `lib.task.priority`.
+
+        If `deadline` is provided, it should be a `time.monotonic()` timestamp.
+        The task is dropped (and the future cancelled) if it is still queued
+        at that time.
+
+        If `cancel_token` is provided, it should be a `CancellationToken`. It
+        is passed to `fn` as the `cancel_token` keyword argument, and the task
+        is dropped if it is cancelled before it starts running.
+        '''
+        task = self._create_task(
+            fn, args, kwargs,
+            priority=priority, deadline=deadline, cancel_token=cancel_token,
+        )
+
+        with self._lock:
+            if not self._running:
+                raise RuntimeError('task pool is not running')
+
+            self._enqueue(task, priority)
+
+        return task.future
+
+    def submit_many(self, calls, priority=None, deadline=None):
+        '''
+        Schedules a batch of calls, and returns a list of futures for them, in
+        the same order. Each call should be a tuple of `(fn, args)` or
+        `(fn, args, kwargs)`.
+
+        The batch is queued with one lock acquisition, so this is cheaper than
+        calling `submit` in a loop. The `priority` and `deadline` apply to all
+        of the calls. See `submit`.
+        '''
+        tasks = []
+        for call in calls:
+            if not isinstance(call, tuple) or len(call) not in (2, 3):
+                raise TypeError(
+                    'call must be a tuple of (fn, args[, kwargs]): %r' %
+                    (call)
+                )
+            fn, args = call[0], call[1]
+            kwargs = call[2] if len(call) == 3 else {}
+            tasks.append(self._create_task(
+                fn, tuple(args), kwargs,
+                priority=priority, deadline=deadline,
+            ))
+
+        with self._lock:
+            if not self._running:
+                raise RuntimeError('task pool is not running')
+
+            self._enqueue_many(tasks, priority)
+
+        return [task.future for task in tasks]
+
+    def map(self, fn, *iterables, timeout=None, priority=None):
+        '''
+        Same as `concurrent.futures.Executor.map`. Calls are queued together
+        with `submit_many`, and the results are yielded in order.
+
+        If `timeout` is provided, a `TimeoutError` is raised if a result is
+        not available within `timeout` seconds from the original call.
+        '''
+        end_time = time.monotonic() + timeout if timeout is not None else None
+        futures = self.submit_many(
+            [(fn, args) for args in zip(*iterables)], priority=priority,
+        )
+
+        def result_iterator():
+            try:
+                # reversed, so finished futures can be dropped as we go
+                futures.reverse()
+                while futures:
+                    future = futures.pop()
+                    if end_time is None:
+                        yield future.result()
+                    else:
+                        yield future.result(end_time - time.monotonic())
+            finally:
+                for future in futures:
+                    future.cancel()
+
+        return result_iterator()
+
+    def submit_keyed(self, key, fn, *args,
+                     priority=None, deadline=None, cancel_token=None,
+                     **kwargs):
+        '''
+        Same as `submit`, but tasks with the same `key` are run one at a time,
+        in the order they were submitted. Tasks with different keys run in
+        parallel, sharing the workers of this executor.
+
+        Only one task per key is in the queue at a time. The rest wait in a
+        per-key backlog, and the next one is queued when the previous one is
+        done (or dropped). Tasks that are cancelled while in the backlog are
+        skipped.
+
+        The `key` must be hashable.
+        '''
+        task = self._create_task(
+            fn, args, kwargs,
+            priority=priority, deadline=deadline, cancel_token=cancel_token,
+        )
+        future = task.future
+        # the future is new, so this will not invoke the callback right away
+        future.add_done_callback(
+            lambda future, key=key: self._on_keyed_done(key, future)
+        )
+
+        with self._lock:
+            if not self._running:
+                raise RuntimeError('task pool is not running')
+
+            pending = self._keyed_pending.get(key)
+            if pending is None:
+                self._keyed_pending[key] = collections.deque()
+                self._keyed_active[key] = future
+                self._enqueue(task, priority)
+            else:
+                pending.append((task, priority))
+
+        return future
+
+    def _on_keyed_done(self, key, future):
+        with self._lock:
+            if self._keyed_active.get(key) is not future:
+                # cancelled while in the backlog, it will be skipped
+                return
+
+            pending = self._keyed_pending[key]
+            while pending:
+                task, priority = pending.popleft()
+                if task.future.cancelled():
+                    task.drop()
+                    self._dropped_counts[Task.DROP_CANCELLED] += 1
+                    continue
+
+                self._keyed_active[key] = task.future
+                self._enqueue(task, priority)
+                return
+
+            del self._keyed_pending[key]
+            del self._keyed_active[key]
+
+    def get_keyed_depths(self):
+        '''
+        Returns a `dict` mapping each key with outstanding keyed tasks to the
+        number of them, including the one that is queued or running.
+        '''
+        with self._lock:
+            return dict(
+                (key, len(pending) + 1)
+                for key, pending in self._keyed_pending.items()
+            )
+
+    def _create_task(self, fn, args, kwargs,
+                     priority=None, deadline=None, cancel_token=None):
+        if priority is not None:
+            check_priority(priority)
+        if deadline is not None and not isinstance(deadline, (int, float)):
+            raise TypeError('deadline must be a number: %r' % (deadline))
+        if cancel_token is not None and \
+                not isinstance(cancel_token, CancellationToken):
+            raise TypeError(
+                'cancel token must be a CancellationToken: %r' %
+                (cancel_token)
+            )
+
+        future = futurebase.Future()
+        return Task(
+            future, fn, args, kwargs,
+            deadline=deadline, cancel_token=cancel_token,
+        )
+
+    def run_task(self, task):
+        '''
+        Runs a dequeued task, unless it should be dropped, and records how
+        long it waited and ran for. Called by whatever runs the tasks. If the
+        task has a `Deadline`, the wait is recorded on it too.
+        '''
+        drop_reason = task.drop_reason()
+        if drop_reason is not None:
+            task.drop()
+            self.record_dropped(drop_reason)
+            return
+
+        start_time = time.monotonic()
+        mark_phase(task.cancel_token, PHASE_QUEUE)
+
+        # NOTE : Tasks should catch their own exceptions.
+        try:
+            task.run()
+        except Exception as e:
+            logger.error(
+                'exception during task execution: %r', e, exc_info=True,
+            )
+
+        self.record_task(
+            task, start_time - task.submit_time,
+            time.monotonic() - start_time,
+        )
+
+    def record_task(self, task, wait_time, run_time):
+        '''
+        Records the time a task spent waiting in the queue, and running. Both
+        times are in seconds.
+        '''
+        name = get_callable_name(task.fn)
+        if run_time > SLOW_TASK_THRESHOLD:
+            logger.info('slow task took %.3fs: %s', run_time, name)
+
+        self._metrics.record_task(name, wait_time, run_time)
+
+    def get_metrics(self):
+        '''
+        Returns a `dict` with the peak queue depth, worker utilization (busy
+        ratio), histograms of the queue wait and run times, the slowest recent
+        tasks, the number of dropped tasks, and the keyed backlog depths.
+        Backends add their own entries. Times are in seconds.
+        '''
+        metrics = self._metrics.to_dict()
+        metrics.update({
+            'dropped': self.get_dropped_counts(),
+            'keyed_depths': self.get_keyed_depths(),
+        })
+        return metrics
+
+    def reset_metrics(self):
+        ''' Clears the recorded metrics, except for the dropped counts. '''
+        self._metrics.reset()
+
+    def record_dropped(self, reason):
+        '''
+        Counts a task that was dropped instead of being run. The `reason`
+        should be one of the `Task.DROP_*` constants.
+        '''
+        with self._lock:
+            self._dropped_counts[reason] += 1
+
+    def get_dropped_counts(self):
+        '''
+        Returns a `dict` mapping each drop reason (cancelled or expired) to the
+        number of tasks dropped for it.
+        '''
+        with self._lock:
+            return dict(self._dropped_counts)
+
+    @property
+    def running(self):
+        with self._lock:
+            return self._running
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+
+'''
+lib/task/metrics.py
+Task pool metrics.
+
+Records queue depth, per-task queue wait and run times, worker utilization,
+and the slowest recent tasks. Used to size the task pool from data.
+'''
+
+import bisect
+import logging
+import threading
+import time
+
+logger = logging.getLogger('sublime-ycmd.' + __name__)
+
+# histogram bucket upper bounds, in seconds (the last bucket is unbounded)
+DEFAULT_HISTOGRAM_BOUNDS = (
+    0.001, 0.002, 0.005, 0.01, 0.02, 0.05,
+    0.1, 0.2, 0.5, 1, 2, 5, 10,
+)
+# number of slow tasks to keep, and how long to keep them for, in seconds
+DEFAULT_SLOW_TASK_COUNT = 10
+DEFAULT_SLOW_TASK_WINDOW = 5 * 60
+
+
+def get_callable_name(fn):
+    '''
+    Returns a readable name for `fn`, including the module if available.
+    Partials are unwrapped to the underlying function.
+    '''
+    fn = getattr(fn, 'func', fn)
+    name = getattr(fn, '__qualname__', None) or getattr(fn, '__name__', None)
+    if name is None:
+        return repr(fn)
+
+    module = getattr(fn, '__module__', None)
+    if module:
+        return '%s.%s' % (module, name)
+    return name
+
+
+class Histogram(object):
+    '''
+    Fixed-bucket histogram of durations, in seconds. Not thread-safe, so the
+    owner should lock around it.
+    '''
+
+    __slots__ = ('bounds', 'counts', 'count', 'total', 'max')
+
+    def __init__(self, bounds=DEFAULT_HISTOGRAM_BOUNDS):
+        self.bounds = tuple(bounds)
+        self.reset()
+
+    def reset(self):
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, fraction):
+        '''
+        Returns the upper bound of the bucket containing the `fraction`
+        percentile (e.g. `0.95`). Values in the last bucket report the max.
+        '''
+        if not self.count:
+            return 0.0
+
+        threshold = fraction * self.count
+        cumulative = 0
+        for index, bucket_count in enumerate(self.counts):
+            cumulative += bucket_count
+            if cumulative >= threshold:
+                if index < len(self.bounds):
+                    return min(self.bounds[index], self.max)
+                return self.max
+
+        return self.max
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'total': self.total,
+            'max': self.max,
+            'mean': self.total / self.count if self.count else 0.0,
+            'p50': self.percentile(0.5),
+            'p95': self.percentile(0.95),
+            'buckets': list(zip(self.bounds + (None,), self.counts)),
+        }
+
+
+class PoolMetrics(object):
+    '''
+    Metrics for a single task pool.
+
+    Worker utilization is the total task run time divided by the total time
+    workers were alive (integrated over changes in the worker count).
+    '''
+
+    def __init__(self, slow_task_count=DEFAULT_SLOW_TASK_COUNT,
+                 slow_task_window=DEFAULT_SLOW_TASK_WINDOW):
+        self._slow_task_count = slow_task_count
+        self._slow_task_window = slow_task_window
+
+        self._lock = threading.Lock()
+        self._wait_times = Histogram()
+        self._run_times = Histogram()
+        self._worker_count = 0
+        self.reset()
+
+    def reset(self):
+        now = time.monotonic()
+        with self._lock:
+            self._wait_times.reset()
+            self._run_times.reset()
+            self._peak_queue_depth = 0
+            self._busy_time = 0.0
+            self._worker_time = 0.0
+            self._worker_count_time = now
+            # list of (run time, name, finish time), slowest first
+            self._slow_tasks = []
+
+    def record_queue_depth(self, depth):
+        # called on every submit, so this skips the lock - a racing update
+        # may be lost, which is acceptable for a peak
+        if depth > self._peak_queue_depth:
+            self._peak_queue_depth = depth
+
+    def record_worker_count(self, worker_count):
+        now = time.monotonic()
+        with self._lock:
+            self._accumulate_worker_time(now)
+            self._worker_count = worker_count
+
+    def record_task(self, name, wait_time, run_time):
+        now = time.monotonic()
+        with self._lock:
+            self._wait_times.record(wait_time)
+            self._run_times.record(run_time)
+            self._busy_time += run_time
+
+            self._prune_slow_tasks(now)
+            slow_tasks = self._slow_tasks
+            if len(slow_tasks) >= self._slow_task_count and \
+                    run_time <= slow_tasks[-1][0]:
+                return
+
+            slow_tasks.append((run_time, name, now))
+            slow_tasks.sort(key=lambda entry: -entry[0])
+            del slow_tasks[self._slow_task_count:]
+
+    def _accumulate_worker_time(self, now):
+        # [internal] must be called with the lock held
+        self._worker_time += \
+            self._worker_count * (now - self._worker_count_time)
+        self._worker_count_time = now
+
+    def _prune_slow_tasks(self, now):
+        # [internal] must be called with the lock held
+        cutoff = now - self._slow_task_window
+        self._slow_tasks = [
+            entry for entry in self._slow_tasks if entry[2] >= cutoff
+        ]
+
+    def to_dict(self):
+        '''
+        Returns a snapshot of the metrics as a `dict`. Times are in seconds.
+        The slow tasks are listed slowest first, with their age.
+        '''
+        now = time.monotonic()
+        with self._lock:
+            self._accumulate_worker_time(now)
+            self._prune_slow_tasks(now)
+
+            worker_time = self._worker_time
+            return {
+                'peak_queue_depth': self._peak_queue_depth,
+                'wait_time': self._wait_times.to_dict(),
+                'run_time': self._run_times.to_dict(),
+                'busy_ratio': (
+                    min(self._busy_time / worker_time, 1.0) if worker_time
+                    else 0.0
+                ),
+                'slow_tasks': [
+                    {'name': name, 'run_time': run_time, 'age': now - finish}
+                    for run_time, name, finish in self._slow_tasks
+                ],
+            }
+
+    def __repr__(self):
+        return '%s(%r)' % ('PoolMetrics', self.to_dict())
@@ -11,20 +11,41 @@ https://github.com/agronholm/pythonfutures
 https://git.io/vdCQ2
 '''
 
-from concurrent.futures import _base as futurebase
 import logging
-import queue
 import threading
 
-from ..task.task import Task
+from ..task.executor import Executor
+from ..task.priority import PriorityTaskQueue
 from ..task.worker import spawn_worker
 from ..util.id import generate_id
 from ..util.sys import get_cpu_count
 
 logger = logging.getLogger('sublime-ycmd.' + __name__)
 
+DEFAULT_MIN_WORKERS = 1
+# seconds a worker above the minimum may stay idle before exiting
+DEFAULT_IDLE_TIMEOUT = 60
 
-class Pool(object):
+
+def check_worker_bounds(min_workers, max_workers):
+    '''
+    Raises a `TypeError` or `ValueError` if the worker bounds are invalid. The
+    maximum must be positive, and the minimum must be between 0 and it.
+    '''
+    if not isinstance(min_workers, int):
+        raise TypeError('min workers must be an int: %r' % (min_workers))
+    if not isinstance(max_workers, int):
+        raise TypeError('max workers must be an int: %r' % (max_workers))
+    if max_workers <= 0:
+        raise ValueError('max workers must be positive: %r' % (max_workers))
+    if min_workers < 0 or min_workers > max_workers:
+        raise ValueError(
+            'min workers must be between 0 and %d: %r' %
+            (max_workers, min_workers)
+        )
+
+
+class Pool(Executor):
     '''
     Task pool. Schedules work to run in a thread pool.
 
@@ -32,17 +53,35 @@ class Pool(object):
     weak references, however, so it is expected that the application shuts down
     the pool properly. Worker threads are created as daemons, so they won't
     stop the program from shutting down.
+
+    Tasks are queued by priority class (see `lib.task.priority`). Tasks that
+    wait for `aging_interval` seconds are promoted by one class, so low
+    priority tasks are not starved.
+
+    The pool is elastic. It starts with `min_workers` threads, and spawns more
+    (up to `max_workers`) when tasks are submitted with no idle workers to
+    pick them up. Workers above the minimum exit after `idle_timeout` seconds
+    without a task. The bounds can be changed on a running pool with `resize`.
     '''
 
-    def __init__(self, max_workers=None, thread_name_prefix=''):
+    def __init__(self, max_workers=None, thread_name_prefix='',
+                 aging_interval=None, min_workers=None, idle_timeout=None):
         if max_workers is None:
             max_workers = (get_cpu_count() or 1) * 5
+        if min_workers is None:
+            min_workers = min(DEFAULT_MIN_WORKERS, max_workers)
+        if idle_timeout is None:
+            idle_timeout = DEFAULT_IDLE_TIMEOUT
 
-        if not isinstance(max_workers, int):
-            raise TypeError('max workers must be an int: %r' % (max_workers))
-        if max_workers <= 0:
+        check_worker_bounds(min_workers, max_workers)
+
+        if not isinstance(idle_timeout, (int, float)):
+            raise TypeError(
+                'idle timeout must be a number: %r' % (idle_timeout)
+            )
+        if idle_timeout <= 0:
             raise ValueError(
-                'max workers must be positive: %r' % (max_workers)
+                'idle timeout must be positive: %r' % (idle_timeout)
             )
 
         if not isinstance(thread_name_prefix, str):
@@ -50,13 +89,15 @@ class Pool(object):
                 'thread name prefix must be a str: %r' % (thread_name_prefix)
             )
 
+        super(Pool, self).__init__()
+
+        self._min_workers = min_workers
         self._max_workers = max_workers
+        self._idle_timeout = idle_timeout
         self._thread_name_prefix = thread_name_prefix
 
-        self._queue = queue.Queue()
-        self._workers = None
-        self._lock = threading.Lock()
-        self._running = None
+        self._queue = PriorityTaskQueue(aging_interval=aging_interval)
+        self._workers = set()
 
         self._name = None
         self.name = thread_name_prefix
@@ -67,25 +108,61 @@ class Pool(object):
         with self._lock:
             self._running = True
 
-            # NOTE : This unconditionally adds more workers (can go over max).
-            self._create_workers()
+            num_missing = self._min_workers - len(self._workers)
+            if num_missing > 0:
+                self._create_workers(num_missing)
 
-    def _create_workers(self, num_workers=None):
-        if num_workers is None:
-            num_workers = self._max_workers
-        assert isinstance(num_workers, int), \
-            'num workers must be an int: %r' % (num_workers)
+    def resize(self, min_workers=None, max_workers=None):
+        '''
+        Changes the worker bounds of a running pool. Omitted bounds are left
+        as-is.
 
-        # check existing workers and issue a warning if it exceeds max
-        num_existing = len(self._workers) if self._workers else 0
-        num_expected = num_workers + num_existing
-        if num_expected > self._max_workers:
-            logger.warning(
-                'starting %d workers when %d already exist, '
-                'total workers will exceed max workers: %d / %d',
-                num_workers, num_existing, num_expected, self._max_workers,
+        If there are fewer than `min_workers` workers, more are started
+        immediately. If there are more than `max_workers` workers, the extra
+        workers exit once they are idle. Queued tasks are not affected.
+        '''
+        with self._lock:
+            if min_workers is None:
+                min_workers = self._min_workers
+            if max_workers is None:
+                max_workers = self._max_workers
+            check_worker_bounds(min_workers, max_workers)
+
+            self._min_workers = min_workers
+            self._max_workers = max_workers
+
+            num_workers = len(self._workers)
+            if num_workers < min_workers and self._running:
+                self._create_workers(min_workers - num_workers)
+            elif num_workers > max_workers:
+                # `None` ranks below all tasks, so these are only picked up
+                # by workers that are out of work
+                for _ in range(num_workers - max_workers):
+                    self._queue.put(None)
+
+            logger.debug(
+                'resized task pool to %d-%d workers', min_workers, max_workers,
             )
-            # but fall through and start the new workers anyway
+
+    def retire_worker(self, worker):
+        '''
+        Called by an idle worker. Returns true if the pool has more than the
+        minimum number of workers, in which case the worker is removed from
+        the pool and should exit.
+        '''
+        with self._lock:
+            if not self._running or len(self._workers) <= self._min_workers:
+                return False
+
+            self._workers.discard(worker)
+            self._metrics.record_worker_count(len(self._workers))
+            logger.debug('retiring idle worker: %r', worker)
+            return True
+
+    def _create_workers(self, num_workers):
+        # [internal] must be called with the lock held
+        assert isinstance(num_workers, int), \
+            'num workers must be an int: %r' % (num_workers)
 
         created_workers = set(
             spawn_worker(self, name=generate_id(self._thread_name_prefix))
@@ -93,21 +170,34 @@ class Pool(object):
         )
         logger.debug('created workers: %r', created_workers)
 
-        if self._workers is None:
-            self._workers = set()
         self._workers.update(created_workers)
+        self._metrics.record_worker_count(len(self._workers))
 
-    def submit(self, fn, *args, **kwargs):
-        with self._lock:
-            if not self._running:
-                raise RuntimeError('task pool is not running')
+    def _maybe_create_worker(self, queue_depth, num_waiting):
+        # [internal] must be called with the lock held, after queueing tasks
+        # with the queue depth and number of idle workers returned by `put`
+        self._metrics.record_queue_depth(queue_depth)
 
-            future = futurebase.Future()
-            task = Task(future, fn, args, kwargs)
+        if not self._running:
+            return
+
+        # spawn enough workers to pick up the tasks that idle workers can't
+        num_needed = min(
+            queue_depth - num_waiting,
+            self._max_workers - len(self._workers),
+        )
+        if num_needed > 0:
+            self._create_workers(num_needed)
 
-            self._queue.put(task)
+    def _enqueue(self, task, priority):
+        # [internal] must be called with the lock held
+        self._maybe_create_worker(*self._queue.put(task, priority=priority))
 
-            return future
+    def _enqueue_many(self, tasks, priority):
+        # [internal] must be called with the lock held
+        self._maybe_create_worker(
+            *self._queue.put_many(tasks, priority=priority)
+        )
 
     def shutdown(self, wait=True, timeout=None):
         '''
@@ -133,7 +223,8 @@ class Pool(object):
         if wait:
             # create a copy of the worker set, as we'll be removing workers
             # once they get joined successfully
-            workers = list(self._workers)
+            with self._lock:
+                workers = list(self._workers)
 
             for worker in workers:  # type: Worker
                 try:
@@ -143,18 +234,51 @@ class Pool(object):
                     wait_result = False
                 else:
                     # remove worker from worker set
-                    self._workers.remove(worker)
+                    with self._lock:
+                        self._workers.discard(worker)
+                        self._metrics.record_worker_count(len(self._workers))
 
         return wait_result
 
+    def get_metrics(self):
+        '''
+        Returns a `dict` with the current and peak queue depth, the worker
+        count and bounds, worker utilization (busy ratio), histograms of the
+        queue wait and run times, the slowest recent tasks, the wait time per
+        priority class, and the number of dropped tasks. Times are in seconds.
+        '''
+        metrics = super(Pool, self).get_metrics()
+        metrics.update({
+            'queue_depth': self._queue.qsize(),
+            'priority_wait_time': self._queue.get_wait_stats(),
+        })
+        with self._lock:
+            metrics.update({
+                'workers': len(self._workers),
+                'min_workers': self._min_workers,
+                'max_workers': self._max_workers,
+            })
+        return metrics
+
+    def get_wait_stats(self):
+        '''
+        Returns the time tasks spent waiting in the queue, per priority class.
+        See `PriorityTaskQueue.get_wait_stats`.
+        '''
+        return self._queue.get_wait_stats()
+
     @property
     def queue(self):
         return self._queue
 
     @property
-    def running(self):
+    def idle_timeout(self):
+        return self._idle_timeout
+
+    @property
+    def num_workers(self):
         with self._lock:
-            return self._running
+            return len(self._workers)
 
     def __repr__(self):
         if self._thread_name_prefix:
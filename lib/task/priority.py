@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+
+'''
+lib/task/priority.py
+Priority task queue. Used by task pools in place of a plain FIFO queue.
+
+Tasks are submitted with a priority class. Within a class, tasks are run in
+the order they were submitted. Across classes, the highest priority task runs
+first, but waiting tasks are aged so that low priority work is not starved by
+a steady stream of high priority work.
+'''
+
+import collections
+import logging
+import queue
+import threading
+import time
+
+logger = logging.getLogger('sublime-ycmd.' + __name__)
+
+# priority classes, from highest to lowest:
+PRIORITY_INTERACTIVE = 0
+PRIORITY_HEALTH = 1
+PRIORITY_NOTIFICATION = 2
+PRIORITY_STARTUP = 3
+
+PRIORITIES = (
+    PRIORITY_INTERACTIVE,
+    PRIORITY_HEALTH,
+    PRIORITY_NOTIFICATION,
+    PRIORITY_STARTUP,
+)
+PRIORITY_NAMES = {
+    PRIORITY_INTERACTIVE: 'interactive',
+    PRIORITY_HEALTH: 'health',
+    PRIORITY_NOTIFICATION: 'notification',
+    PRIORITY_STARTUP: 'startup',
+}
+
+DEFAULT_PRIORITY = PRIORITY_NOTIFICATION
+# seconds a task must wait to be promoted by one priority class
+DEFAULT_AGING_INTERVAL = 1.0
+
+
+def check_priority(priority):
+    '''
+    Raises a `TypeError` or `ValueError` if `priority` is not one of the known
+    priority classes.
+    '''
+    if not isinstance(priority, int):
+        raise TypeError('priority must be an int: %r' % (priority))
+    if priority not in PRIORITY_NAMES:
+        raise ValueError(
+            'priority must be one of %r: %r' % (PRIORITIES, priority)
+        )
+
+
+class _WaitStats(object):
+    __slots__ = ('count', 'total', 'max')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, wait_time):
+        self.count += 1
+        self.total += wait_time
+        if wait_time > self.max:
+            self.max = wait_time
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'total': self.total,
+            'max': self.max,
+            'mean': self.total / self.count if self.count else 0.0,
+        }
+
+
+class PriorityTaskQueue(object):
+    '''
+    Unbounded task queue with priority classes. The interface matches the
+    parts of `queue.Queue` used by the task workers.
+
+    Each class is a FIFO. When getting an item, the head of each class is
+    ranked by its class, minus one for every `aging_interval` seconds it has
+    been waiting. The lowest rank wins, and ties go to the oldest item.
+
+    The `None` item (used to signal workers to exit) is always ranked below
+    every task, so pending tasks are run before the workers exit.
+
+    The time each item spends in the queue is tracked per class. See
+    `get_wait_stats`.
+    '''
+
+    def __init__(self, aging_interval=None):
+        if aging_interval is None:
+            aging_interval = DEFAULT_AGING_INTERVAL
+        if not isinstance(aging_interval, (int, float)):
+            raise TypeError(
+                'aging interval must be a number: %r' % (aging_interval)
+            )
+        if aging_interval <= 0:
+            raise ValueError(
+                'aging interval must be positive: %r' % (aging_interval)
+            )
+
+        self._aging_interval = aging_interval
+
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+
+        # maps priority -> deque of (enqueue time, item)
+        self._queues = dict(
+            (priority, collections.deque()) for priority in PRIORITIES
+        )
+        # number of pending `None` items
+        self._sentinels = 0
+        self._size = 0
+        # number of threads blocked in `get`
+        self._waiting = 0
+
+        self._wait_stats = dict(
+            (priority, _WaitStats()) for priority in PRIORITIES
+        )
+
+    def put(self, item, block=True, timeout=None, priority=None):
+        '''
+        Adds `item` to the queue under the `priority` class. The queue is
+        unbounded, so `block` and `timeout` are ignored.
+
+        Returns a tuple of the queue size and the number of waiting threads,
+        as of just after the item was added.
+        '''
+        if priority is None:
+            priority = DEFAULT_PRIORITY
+        check_priority(priority)
+
+        with self._not_empty:
+            if item is None:
+                self._sentinels += 1
+            else:
+                self._queues[priority].append((time.monotonic(), item))
+            self._size += 1
+            self._not_empty.notify()
+            return self._size, self._waiting
+
+    def put_many(self, items, priority=None):
+        '''
+        Adds all `items` to the queue under the `priority` class, in order.
+        The lock is only acquired once, and waiting workers are woken up
+        together. Returns the same as `put`.
+        '''
+        if priority is None:
+            priority = DEFAULT_PRIORITY
+        check_priority(priority)
+
+        enqueue_time = time.monotonic()
+        entries = [(enqueue_time, item) for item in items]
+        if not entries:
+            return self.qsize(), self.waiting()
+
+        assert all(entry[1] is not None for entry in entries), \
+            '[internal] cannot put None in bulk'
+
+        with self._not_empty:
+            self._queues[priority].extend(entries)
+            self._size += len(entries)
+            self._not_empty.notify(len(entries))
+            return self._size, self._waiting
+
+    def get(self, block=True, timeout=None):
+        '''
+        Removes and returns the next item, as described in the class docs.
+
+        If `block` is false, or `timeout` seconds pass with no items, this
+        raises `queue.Empty`.
+        '''
+        with self._not_empty:
+            if not block:
+                if not self._size:
+                    raise queue.Empty
+                return self._pop()
+
+            if timeout is not None and timeout < 0:
+                raise ValueError(
+                    'timeout must be non-negative: %r' % (timeout)
+                )
+
+            self._waiting += 1
+            try:
+                if timeout is None:
+                    while not self._size:
+                        self._not_empty.wait()
+                else:
+                    deadline = time.monotonic() + timeout
+                    while not self._size:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            raise queue.Empty
+                        self._not_empty.wait(remaining)
+            finally:
+                self._waiting -= 1
+
+            return self._pop()
+
+    def _pop(self):
+        # [internal] must be called with the lock held, and a non-empty queue
+        now = time.monotonic()
+
+        best_key = None
+        best_priority = None
+        for priority in PRIORITIES:
+            class_queue = self._queues[priority]
+            if not class_queue:
+                continue
+
+            enqueue_time = class_queue[0][0]
+            aged_steps = int((now - enqueue_time) / self._aging_interval)
+            key = (priority - aged_steps, enqueue_time)
+            if best_key is None or key < best_key:
+                best_key = key
+                best_priority = priority
+
+        self._size -= 1
+
+        if best_priority is None:
+            assert self._sentinels > 0, \
+                '[internal] queue is empty, but size was non-zero'
+            self._sentinels -= 1
+            return None
+
+        enqueue_time, item = self._queues[best_priority].popleft()
+        self._wait_stats[best_priority].add(now - enqueue_time)
+        return item
+
+    def get_wait_stats(self):
+        '''
+        Returns a `dict` mapping each priority class name to the number of
+        items taken from it, and the total, max, and mean time (in seconds)
+        those items spent waiting in the queue.
+        '''
+        with self._lock:
+            return dict(
+                (PRIORITY_NAMES[priority], stats.to_dict())
+                for priority, stats in self._wait_stats.items()
+            )
+
+    def qsize(self):
+        with self._lock:
+            return self._size
+
+    def waiting(self):
+        '''
+        Returns the number of threads blocked in `get`. This includes threads
+        that have been woken up, but have not yet taken an item.
+        '''
+        with self._lock:
+            return self._waiting
+
+    def empty(self):
+        with self._lock:
+            return not self._size
+
+    def __repr__(self):
+        with self._lock:
+            sizes = dict(
+                (PRIORITY_NAMES[priority], len(class_queue))
+                for priority, class_queue in self._queues.items()
+            )
+        return '%s(%r)' % ('PriorityTaskQueue', sizes)
@@ -9,21 +9,95 @@ Defines a task which should be run off-thread in a task pool.
 
 import logging
 import sys
+import time
 
 # for type annotations only:
 import concurrent                   # noqa: F401
+from ..task.cancel import CancellationToken     # noqa: F401
 
 logger = logging.getLogger('sublime-ycmd.' + __name__)
 
 
 class Task(object):
+    '''
+    Callable along with its arguments and future.
 
-    def __init__(self, future, fn, args, kwargs):
+    If `deadline` is provided, it should be a `time.monotonic()` timestamp.
+    Workers drop the task without running it once the deadline has passed.
+
+    If `cancel_token` is provided, it is passed to the callable as the
+    `cancel_token` keyword argument. Workers drop the task if the token has
+    been cancelled by the time it is dequeued.
+    '''
+
+    __slots__ = (
+        '_future', '_fn', '_args', '_kwargs',
+        '_deadline', '_cancel_token', '_submit_time',
+    )
+
+    DROP_CANCELLED = 'cancelled'
+    DROP_EXPIRED = 'expired'
+
+    def __init__(self, future, fn, args, kwargs,
+                 deadline=None, cancel_token=None):
         self._future = future   # type: concurrent.futures.Future
         self._fn = fn           # type: callable
         self._args = args
         self._kwargs = kwargs
 
+        self._deadline = deadline
+        self._cancel_token = cancel_token   # type: CancellationToken
+
+        # used to measure how long the task waited to run
+        self._submit_time = time.monotonic()
+
+    def drop_reason(self, now=None):
+        '''
+        Returns the reason the task should be dropped instead of run, or `None`
+        if it should be run. The reason is one of the `DROP_*` constants.
+        '''
+        if self._future.cancelled():
+            return Task.DROP_CANCELLED
+
+        if now is None:
+            now = time.monotonic()
+        if self._deadline is not None and now >= self._deadline:
+            return Task.DROP_EXPIRED
+
+        cancel_token = self._cancel_token
+        if cancel_token is not None:
+            if cancel_token.expired(now=now):
+                return Task.DROP_EXPIRED
+            if cancel_token.cancelled():
+                return Task.DROP_CANCELLED
+
+        return None
+
+    def drop(self):
+        '''
+        Cancels the future without running the task. Waiters and callbacks on
+        the future see it as cancelled.
+        '''
+        self._future.cancel()
+        self._future.set_running_or_notify_cancel()
+        logger.debug('dropped task: %r', self)
+
+    @property
+    def future(self):
+        return self._future
+
+    @property
+    def fn(self):
+        return self._fn
+
+    @property
+    def submit_time(self):
+        return self._submit_time
+
+    @property
+    def cancel_token(self):
+        return self._cancel_token
+
     def run(self):
         if not self._future.set_running_or_notify_cancel():
             # cancelled, skip it
@@ -31,8 +105,12 @@ class Task(object):
 
         logger.debug('starting task: %r', self)
 
+        kwargs = self._kwargs
+        if self._cancel_token is not None:
+            kwargs = dict(kwargs, cancel_token=self._cancel_token)
+
         try:
-            result = self._fn(*self._args, **self._kwargs)
+            result = self._fn(*self._args, **kwargs)
         except Exception as exception:
             self._future.set_exception(exception)
         except:     # noqa: E722
@@ -51,4 +129,5 @@ class Task(object):
             'fn': self._fn,
             'args': self._args,
             'kwargs': self._kwargs,
+            'deadline': self._deadline,
         })
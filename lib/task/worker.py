@@ -74,22 +74,25 @@ class Worker(object):
 
         This should be run on an alternate thread, as it will block.
         '''
-        task_queue = self.pool.queue    # type: queue.Queue
+        task_queue = self.pool.queue    # type: PriorityTaskQueue
+        idle_timeout = self.pool.idle_timeout
 
         logger.debug('task worker starting: %r', self)
         while True:
-            # explicitly specify `block`, in case the queue has custom settings
-            task = task_queue.get(block=True)   # type: Task
+            try:
+                # explicitly specify `block`, in case the queue has custom
+                # settings
+                task = task_queue.get(
+                    block=True, timeout=idle_timeout,
+                )   # type: Task
+            except queue.Empty:
+                if self.pool.retire_worker(self):
+                    logger.debug('task worker is idle, exit loop')
+                    break
+                continue
 
             if task is not None:
-                # NOTE : Tasks should catch their own exceptions.
-                try:
-                    task.run()
-                except Exception as e:
-                    logger.error(
-                        'exception during task execution: %r',
-                        e, exc_info=True,
-                    )
+                self.pool.run_task(task)
 
                 # explicitly clear reference to task
                 del task
@@ -110,7 +113,10 @@ class Worker(object):
 
                 break
 
-            logger.warning('unhandled task on worker thread: %r', task)
+            # the pool was shrunk, so exit if there are too many workers
+            if self.pool.retire_worker(self):
+                logger.debug('task pool was resized, exit loop')
+                break
 
         logger.debug('task worker exiting:  %r', self)
 
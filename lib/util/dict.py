@@ -5,8 +5,10 @@ lib/util/dict.py
 Contains dictionary utility functions.
 '''
 
+import contextlib
 import copy
 import logging
+import threading
 
 logger = logging.getLogger('sublime-ycmd.' + __name__)
 
@@ -145,3 +147,116 @@ def merge_dicts(base, *rest):
         _merge_recursively(result, src)
 
     return result
+
+
+class CopyOnWriteDict(object):
+    '''
+    Read-mostly dictionary. Readers never take a lock.
+
+    Every write builds a new `dict` and publishes it with a single reference
+    swap. Readers always see a complete snapshot, either from before or after
+    a write, and never block behind a writer. Writers are serialized by an
+    internal lock, so each write (or `mutate` block) is atomic.
+
+    Writes cost a full copy, so this is only suitable for maps that are read
+    far more often than they are modified.
+    '''
+
+    def __init__(self, initial=None):
+        self._write_lock = threading.Lock()
+        self._data = dict(initial) if initial else {}
+
+    def snapshot(self):
+        '''
+        Returns the current snapshot. The result must not be modified, but can
+        be read freely, even while other threads are writing.
+        '''
+        return self._data
+
+    def get(self, key, default=None):
+        return self._data.get(key, default)
+
+    def copy(self):
+        ''' Returns a shallow-copy of the current snapshot. '''
+        return self._data.copy()
+
+    def set(self, key, value):
+        with self._write_lock:
+            data = self._data.copy()
+            data[key] = value
+            self._data = data
+
+    def pop(self, key, default=None):
+        '''
+        Removes `key` and returns its value, or `default` if it is not present.
+        Nothing is copied if the key is not present.
+        '''
+        with self._write_lock:
+            if key not in self._data:
+                return default
+            data = self._data.copy()
+            value = data.pop(key)
+            self._data = data
+            return value
+
+    def setdefault(self, key, default=None):
+        '''
+        Returns the value for `key`, inserting `default` first if it is not
+        present. The check and the insert are atomic.
+        '''
+        data = self._data
+        if key in data:
+            return data[key]
+
+        with self._write_lock:
+            if key in self._data:
+                return self._data[key]
+            data = self._data.copy()
+            data[key] = default
+            self._data = data
+            return default
+
+    def clear(self):
+        with self._write_lock:
+            self._data = {}
+
+    @contextlib.contextmanager
+    def mutate(self):
+        '''
+        Context manager for batched writes. Yields a private copy of the data,
+        which is published when the block exits without an exception. Other
+        writers are blocked for the duration of the block, so readers see
+        either none or all of the changes.
+        '''
+        with self._write_lock:
+            data = self._data.copy()
+            yield data
+            self._data = data
+
+    def __getitem__(self, key):
+        return self._data[key]
+
+    def __setitem__(self, key, value):
+        self.set(key, value)
+
+    def __delitem__(self, key):
+        with self._write_lock:
+            data = self._data.copy()
+            del data[key]
+            self._data = data
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __iter__(self):
+        # iterate a snapshot, so concurrent writes can't break iteration
+        return iter(self._data)
+
+    def __len__(self):
+        return len(self._data)
+
+    def __bool__(self):
+        return bool(self._data)
+
+    def __repr__(self):
+        return '%s(%r)' % ('CopyOnWriteDict', self._data)
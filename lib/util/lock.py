@@ -3,25 +3,44 @@
 '''
 lib/util/lock.py
 Contains lock utilities.
+
+Includes an instrumented lock, which records wait time, hold time, and
+contention counts. Statistics are aggregated by lock name, so all instances of
+a class can share a single entry (e.g. all `Server` locks).
 '''
 
 import functools
 import logging
 import threading
+import time
 
 logger = logging.getLogger('sublime-ycmd.' + __name__)
 
 
+def _is_method(fn):
+    '''
+    Returns true if `fn` looks like it was defined in a class body, based on
+    the name of the first parameter.
+
+    This has to be checked by name, since functions in a class body are not
+    bound to anything when the decorator runs.
+    '''
+    code = getattr(fn, '__code__', None)
+    if code is None or code.co_argcount < 1:
+        return False
+    return code.co_varnames[0] == 'self'
+
+
 def lock_guard(lock=None):
     '''
     Locking decorator.
 
     Calls the decorated function with the `lock` held, and releases when done.
 
-    If `lock` is omitted, and a class method is passed in, the decorated method
-    will attempt to use the instance-specific `self._lock` variable. If the
-    instance has no lock, or if a static function is decorated, a unique
-    `threading.RLock` will be created.
+    If `lock` is omitted, and a method is decorated (i.e. its first parameter
+    is `self`), the decorated method will acquire the instance-specific
+    `self._lock` variable on each call. If the instance has no lock, or if a
+    plain function is decorated, a unique `threading.RLock` will be created.
     '''
 
     _lock = lock if lock is not None else threading.RLock()
@@ -31,13 +50,15 @@ def lock_guard(lock=None):
 
     def lock_guard_function(fn):
 
-        if hasattr(fn, '__self__'):
+        if lock is None and _is_method(fn):
             # given a method, so attempt to use an instance-specific lock
             @functools.wraps(fn)
             def lock_guard_run(self, *args, **kwargs):
-                __lock = getattr(self, '_lock', _lock)
+                __lock = getattr(self, '_lock', None)
+                if __lock is None:
+                    __lock = _lock
                 with __lock:
-                    return fn(*args, **kwargs)
+                    return fn(self, *args, **kwargs)
         else:
             # given a function, always use the default lock
             @functools.wraps(fn)
@@ -49,3 +70,233 @@ def lock_guard(lock=None):
         return lock_guard_run
 
     return lock_guard_function
+
+
+class LockStats(object):
+    '''
+    Lock statistics for a single lock name.
+
+    Times are in seconds. Only the outermost acquire/release of a reentrant
+    lock is recorded, so recursive acquisitions do not inflate the counts.
+    Attempts that fail to take the lock (non-blocking, or timed out) are only
+    counted as `failed`.
+    '''
+
+    __slots__ = (
+        '_lock', 'name', 'acquisitions', 'contentions', 'failed',
+        'total_wait_time', 'max_wait_time',
+        'total_hold_time', 'max_hold_time',
+    )
+
+    def __init__(self, name):
+        self._lock = threading.Lock()
+        self.name = name
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.acquisitions = 0
+            self.contentions = 0
+            self.failed = 0
+            self.total_wait_time = 0.0
+            self.max_wait_time = 0.0
+            self.total_hold_time = 0.0
+            self.max_hold_time = 0.0
+
+    def record_acquire(self, wait_time, contended):
+        with self._lock:
+            self.acquisitions += 1
+            if contended:
+                self.contentions += 1
+                self.total_wait_time += wait_time
+                if wait_time > self.max_wait_time:
+                    self.max_wait_time = wait_time
+
+    def record_failed(self):
+        with self._lock:
+            self.failed += 1
+
+    def record_release(self, hold_time):
+        with self._lock:
+            self.total_hold_time += hold_time
+            if hold_time > self.max_hold_time:
+                self.max_hold_time = hold_time
+
+    def to_dict(self):
+        '''
+        Returns a snapshot of the statistics as a `dict`.
+        '''
+        with self._lock:
+            acquisitions = self.acquisitions
+            contentions = self.contentions
+            return {
+                'name': self.name,
+                'acquisitions': acquisitions,
+                'contentions': contentions,
+                'failed': self.failed,
+                'contention_ratio': (
+                    float(contentions) / acquisitions if acquisitions else 0.0
+                ),
+                'total_wait_time': self.total_wait_time,
+                'max_wait_time': self.max_wait_time,
+                'mean_wait_time': (
+                    self.total_wait_time / contentions if contentions else 0.0
+                ),
+                'total_hold_time': self.total_hold_time,
+                'max_hold_time': self.max_hold_time,
+                'mean_hold_time': (
+                    self.total_hold_time / acquisitions if acquisitions
+                    else 0.0
+                ),
+            }
+
+    def __repr__(self):
+        return '%s(%r)' % ('LockStats', self.to_dict())
+
+
+_LOCK_STATS = {}
+_LOCK_STATS_LOCK = threading.Lock()
+
+
+def get_lock_stats_entry(name):
+    '''
+    Returns the `LockStats` instance for `name`, creating it if required.
+    '''
+    with _LOCK_STATS_LOCK:
+        lock_stats = _LOCK_STATS.get(name)
+        if lock_stats is None:
+            lock_stats = LockStats(name)
+            _LOCK_STATS[name] = lock_stats
+        return lock_stats
+
+
+def get_lock_stats():
+    '''
+    Returns a `dict` mapping each lock name to a snapshot of its statistics.
+    '''
+    with _LOCK_STATS_LOCK:
+        lock_stats_entries = list(_LOCK_STATS.values())
+    return dict(
+        (lock_stats.name, lock_stats.to_dict())
+        for lock_stats in lock_stats_entries
+    )
+
+
+def reset_lock_stats():
+    ''' Clears the statistics for all lock names. '''
+    with _LOCK_STATS_LOCK:
+        lock_stats_entries = list(_LOCK_STATS.values())
+    for lock_stats in lock_stats_entries:
+        lock_stats.reset()
+
+
+class InstrumentedLock(object):
+    '''
+    Reentrant lock that records wait time, hold time, and contention counts.
+
+    This is a drop-in replacement for `threading.RLock`, and can be used with
+    `threading.Condition`. Statistics are recorded under `name` and can be
+    retrieved with `get_lock_stats`.
+
+    An acquisition is considered contended if the lock could not be taken
+    immediately. Wait time is only measured for contended acquisitions.
+    '''
+
+    def __init__(self, name):
+        if not isinstance(name, str):
+            raise TypeError('lock name must be a str: %r' % (name))
+
+        self._lock = threading.RLock()
+        self._stats = get_lock_stats_entry(name)
+        self._name = name
+
+        # only modified while the lock is held:
+        self._depth = 0
+        self._acquired_at = None
+
+    def acquire(self, blocking=True, timeout=-1):
+        if self._lock.acquire(blocking=False):
+            wait_time = 0.0
+            contended = False
+        else:
+            if not blocking:
+                self._stats.record_failed()
+                return False
+
+            wait_start = time.perf_counter()
+            if not self._lock.acquire(blocking=True, timeout=timeout):
+                self._stats.record_failed()
+                return False
+            wait_time = time.perf_counter() - wait_start
+            contended = True
+
+        if self._depth == 0:
+            self._acquired_at = time.perf_counter()
+            self._stats.record_acquire(wait_time, contended)
+        self._depth += 1
+
+        return True
+
+    def release(self):
+        # pylint: disable=protected-access
+        if not self._lock._is_owned():
+            # not held by this thread, so leave the bookkeeping alone, and let
+            # the underlying lock raise
+            self._lock.release()
+
+        hold_time = None
+        if self._depth == 1:
+            hold_time = time.perf_counter() - self._acquired_at
+            self._acquired_at = None
+        self._depth -= 1
+
+        self._lock.release()
+        if hold_time is not None:
+            self._stats.record_release(hold_time)
+
+    __enter__ = acquire
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+
+    # `threading.Condition` support:
+    # these mirror the private `threading.RLock` methods used by conditions
+
+    def _release_save(self):
+        if self._acquired_at is not None:
+            self._stats.record_release(
+                time.perf_counter() - self._acquired_at,
+            )
+        depth = self._depth
+        self._depth = 0
+        self._acquired_at = None
+        # pylint: disable=protected-access
+        return (self._lock._release_save(), depth)
+
+    def _acquire_restore(self, state):
+        lock_state, depth = state
+        wait_start = time.perf_counter()
+        # pylint: disable=protected-access
+        self._lock._acquire_restore(lock_state)
+        acquired_at = time.perf_counter()
+
+        self._depth = depth
+        self._acquired_at = acquired_at
+        # waking up from a condition always has to re-take the lock, so the
+        # wait is counted, but it is not treated as contention
+        self._stats.record_acquire(acquired_at - wait_start, False)
+
+    def _is_owned(self):
+        # pylint: disable=protected-access
+        return self._lock._is_owned()
+
+    @property
+    def name(self):
+        return self._name
+
+    @property
+    def stats(self):
+        return self._stats
+
+    def __repr__(self):
+        return '%s(%r)' % ('InstrumentedLock', self._name)
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+
+'''
+lib/util/trie.py
+Path trie. Maps file-system paths to values, and supports longest-prefix
+lookups (i.e. finding the closest registered ancestor directory of a path).
+
+The trie is persistent. Nodes are never modified once they are reachable from
+the root. Writers copy the nodes along the modified path, and then swap in the
+new root, so readers can walk the trie without any locking.
+'''
+
+import logging
+import os
+
+logger = logging.getLogger('sublime-ycmd.' + __name__)
+
+# sentinel for nodes that do not hold a value (`None` is a valid value)
+_NO_VALUE = object()
+
+
+class _PathTrieNode(object):
+    __slots__ = ('children', 'value')
+
+    def __init__(self):
+        self.children = {}
+        self.value = _NO_VALUE
+
+    def copy(self):
+        node = _PathTrieNode()
+        node.children = self.children.copy()
+        node.value = self.value
+        return node
+
+
+def split_path(path):
+    '''
+    Splits `path` into a tuple of components, suitable for use as trie keys.
+    The path is normalized first, so redundant separators and up-level
+    references do not produce different keys for the same directory.
+    The root component is kept (e.g. `'/'` or `'C:\\'`), so absolute and
+    relative paths never share a prefix.
+    '''
+    if not isinstance(path, str):
+        raise TypeError('path must be a str: %r' % (path))
+
+    path = os.path.normpath(path)
+    drive, rest = os.path.splitdrive(path)
+
+    root = drive
+    if rest.startswith(os.sep) or (os.altsep and rest.startswith(os.altsep)):
+        root += os.sep
+        rest = rest[1:]
+
+    components = [c for c in rest.split(os.sep) if c and c != os.curdir]
+    if root:
+        components.insert(0, root)
+
+    return tuple(components)
+
+
+class PathTrie(object):
+    '''
+    Trie keyed on path components.
+
+    Insertions, removals, and lookups run in time proportional to the depth of
+    the path, independent of the number of stored paths.
+
+    Lookups are lock-free, and always see a complete snapshot of the trie.
+    Writes must be serialized by the owner (e.g. with a lock).
+    '''
+
+    def __init__(self):
+        self._root = _PathTrieNode()
+        self._size = 0
+
+    def insert(self, path, value):
+        '''
+        Stores `value` for `path`, replacing any existing value.
+        '''
+        components = split_path(path)
+
+        # collect the existing nodes along the path (`None` where missing)
+        trail = []
+        node = self._root
+        for component in components:
+            trail.append(node)
+            node = node.children.get(component) if node is not None else None
+
+        if node is None:
+            leaf = _PathTrieNode()
+            is_new = True
+        else:
+            leaf = node.copy()
+            is_new = node.value is _NO_VALUE
+        leaf.value = value
+
+        # rebuild the path bottom-up, with copies of each parent node
+        child = leaf
+        for parent, component in zip(reversed(trail), reversed(components)):
+            new_parent = (
+                parent.copy() if parent is not None else _PathTrieNode()
+            )
+            new_parent.children[component] = child
+            child = new_parent
+
+        self._root = child
+        if is_new:
+            self._size += 1
+
+    def remove(self, path):
+        '''
+        Removes the value stored for `path`, and prunes any branches that no
+        longer hold values. Raises a `KeyError` if `path` is not stored.
+        '''
+        components = split_path(path)
+
+        trail = []
+        node = self._root
+        for component in components:
+            child = node.children.get(component)
+            if child is None:
+                raise KeyError(path,)
+            trail.append(node)
+            node = child
+
+        if node.value is _NO_VALUE:
+            raise KeyError(path,)
+        value = node.value
+
+        if node.children:
+            child = node.copy()
+            child.value = _NO_VALUE
+        else:
+            # prune it
+            child = None
+
+        for depth in range(len(trail) - 1, -1, -1):
+            new_parent = trail[depth].copy()
+            component = components[depth]
+            if child is None:
+                del new_parent.children[component]
+            else:
+                new_parent.children[component] = child
+
+            is_empty = (
+                not new_parent.children and new_parent.value is _NO_VALUE
+            )
+            # never prune the root
+            child = None if is_empty and depth > 0 else new_parent
+
+        # removing the root value itself leaves `child` as the new root
+        self._root = child if child is not None else _PathTrieNode()
+        self._size -= 1
+
+        return value
+
+    def get(self, path, default=None):
+        '''
+        Returns the value stored for exactly `path`, or `default` if there is
+        none.
+        '''
+        node = self._root
+        for component in split_path(path):
+            node = node.children.get(component)
+            if node is None:
+                return default
+
+        if node.value is _NO_VALUE:
+            return default
+        return node.value
+
+    def longest_prefix(self, path, default=None):
+        '''
+        Returns the value stored for the longest stored path that is either
+        equal to `path` or an ancestor of it. If no such path is stored, this
+        returns `default`.
+        '''
+        node = self._root
+        result = default if node.value is _NO_VALUE else node.value
+
+        for component in split_path(path):
+            node = node.children.get(component)
+            if node is None:
+                break
+            if node.value is not _NO_VALUE:
+                result = node.value
+
+        return result
+
+    def clear(self):
+        self._root = _PathTrieNode()
+        self._size = 0
+
+    def __contains__(self, path):
+        return self.get(path, _NO_VALUE) is not _NO_VALUE
+
+    def __getitem__(self, path):
+        value = self.get(path, _NO_VALUE)
+        if value is _NO_VALUE:
+            raise KeyError(path,)
+        return value
+
+    def __setitem__(self, path, value):
+        self.insert(path, value)
+
+    def __delitem__(self, path):
+        self.remove(path)
+
+    def __len__(self):
+        return self._size
+
+    def __bool__(self):
+        return self._size > 0
+
+    def __repr__(self):
+        return '%s(%d)' % ('PathTrie', self._size)
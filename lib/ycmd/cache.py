@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+
+'''
+lib/ycmd/cache.py
+Cache for server startup artifacts.
+
+Every server start used to re-read and re-parse the ycmd settings template,
+search `PATH` for the python binary, and check the ycmd module directory. The
+inputs rarely change between starts, so the `StartupCache` keeps the results.
+Each entry records the modification time and size of the file it came from,
+and is recalculated if that file changes. Checking that costs a single `stat`.
+'''
+
+import logging
+import os
+import threading
+
+from ..util.fs import (
+    default_python_binary_path,
+    resolve_binary_path,
+)
+from ..ycmd.settings import generate_settings_template
+
+logger = logging.getLogger('sublime-ycmd.' + __name__)
+
+
+def get_file_stamp(path):
+    '''
+    Returns a value that changes whenever the file or directory at `path` is
+    modified, or `None` if it does not exist.
+    '''
+    try:
+        stat_result = os.stat(path)
+    except OSError:
+        return None
+    return (stat_result.st_mtime_ns, stat_result.st_size)
+
+
+class StartupCache(object):
+    '''
+    Cache for the settings template, python binary, and ycmd module directory
+    checks used when starting servers. This is thread-safe.
+
+    Results are only cached if the file they depend on exists. Otherwise, they
+    are recalculated on every call, so errors are reported each time.
+    '''
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # maps key -> (file path, file stamp, value)
+        self._entries = {}
+        self._hits = 0
+        self._misses = 0
+
+    def _lookup(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        path, stamp, value = entry
+        if get_file_stamp(path) != stamp:
+            logger.debug('startup cache entry is stale: %r', key)
+            return None
+        return entry
+
+    def _get(self, key, calculate):
+        '''
+        Returns the cached value for `key`, or calls `calculate()` to get it.
+        That should return the value, and the path to the file that it was
+        derived from.
+        '''
+        entry = self._lookup(key)
+        if entry is not None:
+            with self._lock:
+                self._hits += 1
+            return entry[2]
+
+        value, path = calculate()
+        stamp = get_file_stamp(path) if path else None
+        with self._lock:
+            self._misses += 1
+            if stamp is not None:
+                self._entries[key] = (path, stamp, value)
+            else:
+                self._entries.pop(key, None)
+        return value
+
+    def get_settings_template(self, ycmd_settings_path):
+        '''
+        Returns the pre-serialized settings template for the ycmd settings at
+        `ycmd_settings_path`. See `generate_settings_template`.
+        '''
+        def calculate():
+            logger.debug(
+                'generating settings template: %s', ycmd_settings_path,
+            )
+            settings_template = generate_settings_template(ycmd_settings_path)
+            return settings_template, ycmd_settings_path
+
+        return self._get(('settings', ycmd_settings_path), calculate)
+
+    def resolve_python_binary(self, python_binary_path=None):
+        '''
+        Returns the absolute path to `python_binary_path`, searching `PATH` if
+        it is relative. If it is omitted, the default python is used. If it
+        cannot be found, it is returned as-is.
+        '''
+        def calculate():
+            if python_binary_path is None:
+                resolved_path = default_python_binary_path()
+            else:
+                resolved_path = resolve_binary_path(python_binary_path)
+            logger.debug(
+                'resolved python binary: %r -> %r',
+                python_binary_path, resolved_path,
+            )
+            if not resolved_path:
+                return python_binary_path, None
+            return resolved_path, resolved_path
+
+        # changes to `PATH` may resolve it differently
+        return self._get(
+            ('python', python_binary_path, os.getenv('PATH')), calculate,
+        )
+
+    def check_ycmd_module_directory(self, ycmd_module_directory):
+        '''
+        Raises a `RuntimeError` if `ycmd_module_directory` does not look like
+        the ycmd module (a directory with a `__main__.py` in it).
+        '''
+        def calculate():
+            main_path = os.path.join(ycmd_module_directory, '__main__.py')
+            if not os.path.isfile(main_path):
+                raise RuntimeError(
+                    'ycmd module directory is invalid: %r' %
+                    (ycmd_module_directory)
+                )
+            return True, ycmd_module_directory
+
+        self._get(('module', ycmd_module_directory), calculate)
+
+    def clear(self):
+        ''' Drops all cached entries. '''
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self):
+        '''
+        Returns a `dict` with the number of cached entries, and the number of
+        lookups that were served from the cache (hits) or not (misses).
+        '''
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'hits': self._hits,
+                'misses': self._misses,
+            }
+
+    def __repr__(self):
+        return '%s(%r)' % ('StartupCache', self.get_stats())
+
+
+# shared by all servers, see `get_startup_cache`
+_startup_cache = StartupCache()
+
+
+def get_startup_cache():
+    ''' Returns the `StartupCache` shared by all servers. '''
+    return _startup_cache
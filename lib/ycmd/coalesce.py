@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+
+'''
+lib/ycmd/coalesce.py
+Buffer event coalescer.
+
+Holds buffer enter/leave notifications for a short window before sending
+them. Quickly switching through tabs generates an enter and a leave for each
+tab, and each one uploads the full buffer. Within the window, only the final
+state of each buffer is kept, and it is only sent if it differs from what the
+server was last told.
+'''
+
+import logging
+import threading
+
+from concurrent.futures import Future
+
+from ..task.debounce import threading_set_timeout
+
+logger = logging.getLogger('sublime-ycmd.' + __name__)
+
+
+class _PendingEvent(object):
+    __slots__ = ('server', 'key', 'state', 'send', 'force', 'future')
+
+    def __init__(self, server, key, state, send, force, future):
+        self.server = server
+        self.key = key
+        self.state = state
+        self.send = send
+        self.force = force
+        self.future = future
+
+
+class EventCoalescer(object):
+    '''
+    Per-server coalescer for buffer enter/leave events.
+
+    Each event is given as a `send` callable, which performs the request. At
+    the end of the window, the final event for each buffer is handed off to
+    `submit` (e.g. a task pool), unless the server already has that state.
+    It is called as `submit(fn, server, key)`, so that it can keep events for
+    the same buffer in order. If it returns a future that fails without
+    running `fn` (e.g. the request was rejected), the event fails with it.
+    Enter events with `force` set (e.g. when the buffer needs to be parsed)
+    are always sent.
+
+    Each call returns a future. It resolves with the result of `send`, or is
+    cancelled if the event was coalesced away.
+
+    An event is recorded as sent when it is submitted, so later events are
+    compared against it right away. If it fails (or is dropped) instead, the
+    buffer state is rolled back, unless a later event was sent since.
+
+    A window of `0` disables coalescing, so every event is submitted as-is.
+    '''
+
+    ENTER = 'enter'
+    LEAVE = 'leave'
+
+    def __init__(self, window, submit, set_timeout=None):
+        if not isinstance(window, (int, float)):
+            raise TypeError('window must be a number: %r' % (window))
+        if window < 0:
+            raise ValueError('window must be non-negative: %r' % (window))
+        if not callable(submit):
+            raise TypeError('submit must be callable: %r' % (submit))
+
+        if set_timeout is None:
+            set_timeout = threading_set_timeout
+
+        self._window = window
+        self._submit = submit
+        self._set_timeout = set_timeout
+
+        self._lock = threading.Lock()
+        # maps server -> { buffer key -> `_PendingEvent` }
+        self._pending = {}
+        # maps server -> set of buffer keys that were last sent an enter
+        self._entered = {}
+        # maps server -> { buffer key -> `_PendingEvent` } for events that
+        # were submitted, but are not done yet
+        self._in_flight = {}
+
+        self._received_count = 0
+        self._coalesced_count = 0
+        self._sent_count = 0
+
+    def enter(self, server, key, send, force=False):
+        '''
+        Queues an enter event for the buffer `key` on `server`.
+        If `force` is true, the event is sent even if the server already has
+        the buffer entered.
+        '''
+        return self._queue(server, key, EventCoalescer.ENTER, send, force)
+
+    def leave(self, server, key, send):
+        ''' Queues a leave event for the buffer `key` on `server`. '''
+        return self._queue(server, key, EventCoalescer.LEAVE, send, False)
+
+    def discard(self, server):
+        '''
+        Drops all pending events and state for `server`. Should be called
+        once the server has stopped.
+        '''
+        with self._lock:
+            pending = self._pending.pop(server, {})
+            self._entered.pop(server, None)
+            self._in_flight.pop(server, None)
+            self._coalesced_count += len(pending)
+
+        for event in pending.values():
+            event.future.cancel()
+
+    def flush(self, server=None):
+        '''
+        Sends the pending events for `server` now, instead of waiting for the
+        end of the window. If `server` is omitted, all servers are flushed.
+        '''
+        if server is not None:
+            self._flush_server(server)
+            return
+
+        with self._lock:
+            servers = list(self._pending.keys())
+        for pending_server in servers:
+            self._flush_server(pending_server)
+
+    def get_stats(self):
+        '''
+        Returns a `dict` with the number of events received, coalesced away,
+        and sent.
+        '''
+        with self._lock:
+            return {
+                'received': self._received_count,
+                'coalesced': self._coalesced_count,
+                'sent': self._sent_count,
+            }
+
+    def _queue(self, server, key, state, send, force):
+        future = Future()
+        event = _PendingEvent(server, key, state, send, force, future)
+
+        if self._window == 0:
+            with self._lock:
+                self._received_count += 1
+                self._record_sent(event)
+            self._send(event)
+            return future
+
+        with self._lock:
+            self._received_count += 1
+
+            server_pending = self._pending.get(server)
+            is_new_window = server_pending is None
+            if is_new_window:
+                server_pending = {}
+                self._pending[server] = server_pending
+
+            superseded = server_pending.get(key)
+            if superseded is not None:
+                self._coalesced_count += 1
+                # keep the forced flag, so a required parse isn't lost
+                if state == EventCoalescer.ENTER and superseded.force:
+                    event.force = True
+            server_pending[key] = event
+
+        if superseded is not None:
+            superseded.future.cancel()
+        if is_new_window:
+            self._set_timeout(lambda: self._flush_server(server), self._window)
+
+        return future
+
+    def _flush_server(self, server):
+        with self._lock:
+            server_pending = self._pending.pop(server, None)
+            if not server_pending:
+                return
+
+            server_entered = self._entered.get(server, set())
+            to_send = []
+            to_cancel = []
+            for key, event in server_pending.items():
+                was_entered = key in server_entered
+                is_enter = event.state == EventCoalescer.ENTER
+                if is_enter == was_entered and not event.force:
+                    to_cancel.append(event)
+                    continue
+
+                self._record_sent(event)
+                to_send.append(event)
+
+            self._coalesced_count += len(to_cancel)
+
+        for event in to_cancel:
+            event.future.cancel()
+        for event in to_send:
+            self._send(event)
+
+        if to_cancel:
+            logger.debug(
+                'coalesced %d buffer events, sending %d',
+                len(to_cancel), len(to_send),
+            )
+
+    def _record_sent(self, event):
+        # [internal] must be called with the lock held
+        self._sent_count += 1
+        self._in_flight.setdefault(event.server, {})[event.key] = event
+        self._set_entered(
+            event.server, event.key, event.state == EventCoalescer.ENTER,
+        )
+
+    def _set_entered(self, server, key, is_entered):
+        # [internal] must be called with the lock held
+        if is_entered:
+            self._entered.setdefault(server, set()).add(key)
+            return
+
+        server_entered = self._entered.get(server)
+        if server_entered is not None:
+            server_entered.discard(key)
+            if not server_entered:
+                del self._entered[server]
+
+    def _on_done(self, event, is_sent):
+        '''
+        Called once a submitted event is done. If it was not sent, it is no
+        longer counted, and the buffer state is restored to what it was
+        before (it is only ever sent if that state was different).
+        '''
+        with self._lock:
+            if not is_sent:
+                self._sent_count -= 1
+
+            server_in_flight = self._in_flight.get(event.server)
+            if server_in_flight is None or \
+                    server_in_flight.get(event.key) is not event:
+                # a later event for the buffer was sent since, keep its state
+                return
+
+            del server_in_flight[event.key]
+            if not server_in_flight:
+                del self._in_flight[event.server]
+
+            if not is_sent:
+                self._set_entered(
+                    event.server, event.key,
+                    event.state != EventCoalescer.ENTER,
+                )
+
+    def _send(self, event):
+        future = event.future
+        send = event.send
+
+        def send_and_resolve():
+            if not future.set_running_or_notify_cancel():
+                self._on_done(event, False)
+                return
+            try:
+                result = send()
+            except Exception as e:
+                self._on_done(event, False)
+                future.set_exception(e)
+            else:
+                self._on_done(event, True)
+                future.set_result(result)
+
+        def resolve_if_not_sent(submitted_future):
+            # the submission may be rejected or dropped without running
+            if future.done() or future.running():
+                return
+            self._on_done(event, False)
+            if submitted_future.cancelled():
+                future.cancel()
+            elif submitted_future.exception() is not None:
+                if future.set_running_or_notify_cancel():
+                    future.set_exception(submitted_future.exception())
+
+        try:
+            submitted_future = self._submit(
+                send_and_resolve, event.server, event.key,
+            )
+        except Exception as e:
+            logger.warning('failed to submit buffer event: %r', e)
+            self._on_done(event, False)
+            if future.set_running_or_notify_cancel():
+                future.set_exception(e)
+            return
+
+        if submitted_future is not None:
+            submitted_future.add_done_callback(resolve_if_not_sent)
+
+    def __repr__(self):
+        return '%s(%r)' % ('EventCoalescer', self.get_stats())
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+
+'''
+lib/ycmd/limiter.py
+Per-server in-flight request limit.
+
+ycmd handles requests on a small thread pool. A burst of notifications (e.g.
+while a project is re-indexed) can occupy all of it, and completion requests
+then wait behind them on the server side. The `RequestLimiter` caps the number
+of requests in flight to one server, and queues the rest on the client side.
+
+Queued requests are grouped by flow (a buffer), and flows are grouped by
+window. Slots are handed out round-robin, first across windows and then
+across the flows in a window, so one busy buffer cannot starve the others.
+Requests in the same flow are always sent in order.
+'''
+
+import collections
+import logging
+import threading
+import time
+
+from concurrent.futures import Future
+
+from ..task.continuation import chain_future
+from ..task.metrics import Histogram
+
+logger = logging.getLogger('sublime-ycmd.' + __name__)
+
+# in-flight requests allowed per server, `0` means unlimited
+DEFAULT_MAX_IN_FLIGHT = 4
+
+
+class _QueuedRequest(object):
+    __slots__ = ('queue_time', 'future', 'submit', 'args', 'kwargs')
+
+    def __init__(self, queue_time, future, submit, args, kwargs):
+        self.queue_time = queue_time
+        self.future = future
+        self.submit = submit
+        self.args = args
+        self.kwargs = kwargs
+
+
+class RequestLimiter(object):
+    '''
+    Limits the number of in-flight requests to one server.
+
+    Requests are handed to `submit` (e.g. a task pool method), which must
+    return a future. A request is in flight from the time it is submitted
+    until that future is done. If `max_in_flight` is `0`, requests are never
+    queued, but the queue delay is still recorded.
+    '''
+
+    def __init__(self, max_in_flight=DEFAULT_MAX_IN_FLIGHT):
+        self._lock = threading.Lock()
+        self._max_in_flight = 0
+        self._in_flight = 0
+
+        # maps group -> { flow -> deque of `_QueuedRequest` }, in the order
+        # they will be served next (both levels are rotated as they are used)
+        self._groups = collections.OrderedDict()
+        self._queued = 0
+        self._peak_queued = 0
+        self._dispatched = 0
+        self._queue_delays = Histogram()
+
+        self.set_max_in_flight(max_in_flight)
+
+    def set_max_in_flight(self, max_in_flight):
+        '''
+        Sets the maximum number of in-flight requests. If it was raised, queued
+        requests are sent right away to fill the new slots.
+        '''
+        if not isinstance(max_in_flight, int):
+            raise TypeError(
+                'max in flight must be an int: %r' % (max_in_flight)
+            )
+        if max_in_flight < 0:
+            raise ValueError(
+                'max in flight must be non-negative: %r' % (max_in_flight)
+            )
+
+        with self._lock:
+            self._max_in_flight = max_in_flight
+            requests = self._take_requests()
+
+        for request in requests:
+            self._send_queued(request)
+
+    def submit(self, group, flow, submit, *args, **kwargs):
+        '''
+        Calls `submit(*args, **kwargs)` once a slot is available, and returns a
+        future for the result of the submitted request.
+
+        The `group` (e.g. a window id) and `flow` (e.g. a view id) must be
+        hashable. Queued requests are sent round-robin across them.
+        '''
+        with self._lock:
+            if self._has_free_slot() and not self._queued:
+                self._in_flight += 1
+                self._dispatched += 1
+                self._queue_delays.record(0.0)
+                queued_request = None
+            else:
+                queued_request = _QueuedRequest(
+                    time.monotonic(), Future(), submit, args, kwargs,
+                )
+                flows = self._groups.get(group)
+                if flows is None:
+                    flows = collections.OrderedDict()
+                    self._groups[group] = flows
+                flows.setdefault(flow, collections.deque()).append(
+                    queued_request
+                )
+                self._queued += 1
+                if self._queued > self._peak_queued:
+                    self._peak_queued = self._queued
+
+        if queued_request is not None:
+            return queued_request.future
+
+        return self._send(submit, args, kwargs)
+
+    def _has_free_slot(self):
+        # [internal] must be called with the lock held
+        return not self._max_in_flight or \
+            self._in_flight < self._max_in_flight
+
+    def _take_requests(self):
+        # [internal] must be called with the lock held
+        # takes queued requests, round-robin, until the slots are full
+        # the returned requests are counted as in flight already
+        requests = []
+        now = time.monotonic()
+        while self._queued and self._has_free_slot():
+            group, flows = next(iter(self._groups.items()))
+            flow, queued_requests = next(iter(flows.items()))
+
+            request = queued_requests.popleft()
+            if queued_requests:
+                flows.move_to_end(flow)
+            else:
+                del flows[flow]
+            if flows:
+                self._groups.move_to_end(group)
+            else:
+                del self._groups[group]
+            self._queued -= 1
+
+            if request.future.cancelled():
+                continue
+
+            self._in_flight += 1
+            self._dispatched += 1
+            self._queue_delays.record(now - request.queue_time)
+            requests.append(request)
+
+        return requests
+
+    def _send(self, submit, args, kwargs):
+        try:
+            future = submit(*args, **kwargs)
+        except Exception:
+            self._on_request_done()
+            raise
+
+        future.add_done_callback(self._on_request_done)
+        return future
+
+    def _send_queued(self, request):
+        try:
+            future = self._send(request.submit, request.args, request.kwargs)
+        except Exception as e:
+            request.future.set_exception(e)
+            return
+
+        chain_future(future, request.future)
+
+    def _on_request_done(self, future=None):
+        with self._lock:
+            self._in_flight -= 1
+            requests = self._take_requests()
+
+        for request in requests:
+            self._send_queued(request)
+
+    def get_stats(self):
+        '''
+        Returns a `dict` with the in-flight limit, the number of requests in
+        flight and queued, the peak number queued, the number sent, and a
+        histogram of the time they spent queued, in seconds.
+        '''
+        with self._lock:
+            return {
+                'max_in_flight': self._max_in_flight,
+                'in_flight': self._in_flight,
+                'queued': self._queued,
+                'peak_queued': self._peak_queued,
+                'dispatched': self._dispatched,
+                'queue_delay': self._queue_delays.to_dict(),
+            }
+
+    def __repr__(self):
+        return '%s(%r)' % ('RequestLimiter', self.get_stats())
@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+
+'''
+lib/ycmd/offload.py
+Process pool for parsing large responses.
+
+Decoding a large completion response (tens of thousands of candidates) holds
+the GIL for long enough to stall every other thread in the plugin host. The
+`ResponseOffloader` decodes responses above a size threshold in a child
+process instead, and receives them back in a compact columnar form (see
+`lib.schema.columns`). Smaller responses are parsed in-process, as the round
+trip to the child would cost more than it saves.
+
+This is off by default. It keeps the plugin host responsive, but each
+offloaded response takes longer to parse end-to-end. It requires python 3.7
+(for `mp_context`), and the plugin must be installed as a directory whose name
+can be imported in the child process (not a zipped `.sublime-package`). If
+either is not the case, responses are always parsed in-process.
+'''
+
+import concurrent.futures
+import logging
+import multiprocessing
+import os
+import sys
+import threading
+
+from ..schema import columns
+from ..schema.columns import decode_completion_response
+from ..schema.completions import (
+    parse_completion_columns,
+    parse_completions,
+)
+
+logger = logging.getLogger('sublime-ycmd.' + __name__)
+
+# responses smaller than this many bytes are parsed in-process
+DEFAULT_OFFLOAD_THRESHOLD = 256 * 1024
+# seconds to wait for the child process to decode a response
+DEFAULT_OFFLOAD_TIMEOUT = 2
+
+# `ProcessPoolExecutor` only accepts `mp_context` in python 3.7+
+_HAS_MP_CONTEXT = sys.version_info >= (3, 7)
+# module the child process imports to decode responses
+_COLUMNS_MODULE_NAME = decode_completion_response.__module__
+# decoded by the child process on start up, to check that it can import it
+_WARM_UP_RESPONSE = b'{"completions": []}'
+
+
+def _get_unsupported_reason():
+    '''
+    Returns a `str` describing why responses cannot be offloaded, or `None`
+    if they can. This only checks what is known up front, the child process
+    may still fail to import the columns module.
+    '''
+    if not _HAS_MP_CONTEXT:
+        return 'requires python 3.7+'
+
+    if not all(part.isidentifier()
+               for part in _COLUMNS_MODULE_NAME.split('.')):
+        return 'module cannot be imported by name: %r' % (
+            _COLUMNS_MODULE_NAME
+        )
+
+    columns_path = getattr(columns, '__file__', None)
+    if not columns_path or not os.path.isfile(columns_path):
+        # e.g. loaded from a zipped package, which the child cannot import
+        return 'module is not loaded from a file: %r' % (columns_path)
+
+    return None
+
+
+class ResponseOffloader(object):
+    '''
+    Parses completion responses, offloading the large ones to a process pool.
+
+    The pool uses the "spawn" start method, as forking the plugin host is not
+    safe. If `python_binary_path` is provided, the child processes are run
+    with that interpreter. This is required in the plugin host, where the
+    default executable is the editor itself.
+
+    The pool is started on the first large response, or with `start`. If the
+    child process fails to decode a response, it is parsed in-process
+    instead. If offloading is not supported (see `_get_unsupported_reason`),
+    or the child process cannot import the columns module when the pool is
+    warmed up, the pool is not used again, and all responses are parsed
+    in-process.
+    '''
+
+    def __init__(self, threshold=DEFAULT_OFFLOAD_THRESHOLD,
+                 python_binary_path=None, max_workers=1,
+                 timeout=DEFAULT_OFFLOAD_TIMEOUT):
+        if not isinstance(threshold, int):
+            raise TypeError('threshold must be an int: %r' % (threshold))
+        if threshold <= 0:
+            raise ValueError('threshold must be positive: %r' % (threshold))
+        if python_binary_path is not None and \
+                not isinstance(python_binary_path, str):
+            raise TypeError(
+                'python binary path must be a str: %r' % (python_binary_path)
+            )
+
+        self._threshold = threshold
+        self._python_binary_path = python_binary_path
+        self._max_workers = max_workers
+        self._timeout = timeout
+
+        self._lock = threading.Lock()
+        self._executor = None
+        self._disabled_reason = None
+        self._offloaded = 0
+        self._inline = 0
+        self._failed = 0
+
+    def start(self):
+        '''
+        Starts the process pool, if it is not already running. The child
+        processes are warmed up in the background.
+        '''
+        self._get_executor()
+
+    def _get_executor(self):
+        '''
+        Returns the process pool, starting it if needed. Returns `None` if
+        offloading is disabled.
+        '''
+        with self._lock:
+            if self._disabled_reason is None and self._executor is not None:
+                return self._executor
+
+            if self._disabled_reason is None:
+                executor = self._create_executor_unlocked()
+                stale_executor = None
+            else:
+                executor = None
+                stale_executor = self._executor
+            self._executor = executor
+
+        if stale_executor is not None:
+            # shut down here, instead of in the warm up callback, which runs on
+            # a thread owned by the pool
+            logger.debug('shutting down response parser process pool')
+            stale_executor.shutdown(wait=False)
+        if executor is None:
+            return None
+
+        # spawns the workers now, instead of on the first response, and checks
+        # that they can import the columns module
+        # this is done without the lock, as the callback may run immediately
+        try:
+            warm_up_future = executor.submit(
+                decode_completion_response, _WARM_UP_RESPONSE,
+            )
+        except Exception as e:
+            self._disable('child process failed to start: %r' % (e))
+            return self._get_executor()
+
+        warm_up_future.add_done_callback(self._on_warm_up)
+        return executor
+
+    def _create_executor_unlocked(self):
+        # [internal] must be called with the lock held
+        unsupported_reason = _get_unsupported_reason()
+        if unsupported_reason is not None:
+            logger.warning(
+                'cannot offload responses, parsing them in-process: %s',
+                unsupported_reason,
+            )
+            self._disabled_reason = unsupported_reason
+            return None
+
+        mp_context = multiprocessing.get_context('spawn')
+        if self._python_binary_path:
+            mp_context.set_executable(self._python_binary_path)
+
+        logger.debug(
+            'starting response parser process pool with %d workers',
+            self._max_workers,
+        )
+        return concurrent.futures.ProcessPoolExecutor(
+            max_workers=self._max_workers, mp_context=mp_context,
+        )
+
+    def _on_warm_up(self, future):
+        if future.cancelled() or future.exception() is None:
+            return
+        self._disable(
+            'child process failed to start: %r' % (future.exception())
+        )
+
+    def _disable(self, reason):
+        '''
+        Stops offloading responses. The process pool is shut down on the next
+        call to `_get_executor`.
+        '''
+        logger.warning(
+            'cannot offload responses, parsing them in-process: %s', reason,
+        )
+        with self._lock:
+            if self._disabled_reason is None:
+                self._disabled_reason = reason
+
+    def parse_completions(self, content, request_parameters=None,
+                          timeout=None):
+        '''
+        Parses the raw `content` of a completion response into a
+        `CompletionResponse`. See `parse_completions`.
+
+        Raises a `TimeoutError` if the child process takes too long. If
+        `timeout` is provided, it caps the configured timeout (e.g. to fit the
+        rest of a request deadline).
+        '''
+        if not content or len(content) < self._threshold:
+            with self._lock:
+                self._inline += 1
+            return parse_completions(content, request_parameters)
+
+        if timeout is None or timeout > self._timeout:
+            timeout = self._timeout
+
+        executor = self._get_executor()
+        if executor is None:
+            with self._lock:
+                self._inline += 1
+            return parse_completions(content, request_parameters)
+
+        try:
+            # the pool may have been shut down since, so this can fail too
+            future = executor.submit(decode_completion_response, content)
+            decoded = future.result(timeout=timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise TimeoutError(
+                'response parser took longer than %ss' % (timeout)
+            )
+        except Exception as e:
+            logger.warning(
+                'failed to parse response in child process, '
+                'parsing it in-process instead: %r', e,
+            )
+            with self._lock:
+                self._failed += 1
+            return parse_completions(content, request_parameters)
+
+        with self._lock:
+            self._offloaded += 1
+        return parse_completion_columns(decoded, request_parameters)
+
+    def shutdown(self, wait=False):
+        ''' Stops the process pool, if it is running. '''
+        with self._lock:
+            executor = self._executor
+            self._executor = None
+
+        if executor is not None:
+            logger.debug('shutting down response parser process pool')
+            executor.shutdown(wait=wait)
+
+    def get_stats(self):
+        '''
+        Returns a `dict` with the number of responses parsed in-process,
+        offloaded to the process pool, and that failed to be offloaded. If
+        offloading is disabled, the reason is included as well.
+        '''
+        with self._lock:
+            return {
+                'threshold': self._threshold,
+                'disabled': self._disabled_reason,
+                'inline': self._inline,
+                'offloaded': self._offloaded,
+                'failed': self._failed,
+            }
+
+    @property
+    def threshold(self):
+        return self._threshold
+
+    @property
+    def python_binary_path(self):
+        return self._python_binary_path
+
+    def __repr__(self):
+        return '%s(%r)' % ('ResponseOffloader', self.get_stats())
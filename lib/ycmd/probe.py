@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+
+'''
+lib/ycmd/probe.py
+Readiness probing for newly launched servers.
+
+A ycmd process is alive well before it can answer requests. It still has to
+import its completers and bind its port. The `ReadinessProber` polls the
+server until it reports that it is ready, waiting a little longer after each
+failed attempt. The delays are jittered, so servers launched together (e.g.
+when a project with several folders is opened) do not probe in lockstep.
+
+Probes are scheduled on timers instead of sleeping, so no worker is blocked
+while the server starts.
+'''
+
+import logging
+import random
+import threading
+import time
+
+from concurrent.futures import CancelledError
+
+from ..task.debounce import threading_set_timeout
+
+logger = logging.getLogger('sublime-ycmd.' + __name__)
+
+# delay before the first retry, doubled after each failed attempt
+DEFAULT_READY_INITIAL_DELAY = 0.05
+# upper bound on the delay between attempts
+DEFAULT_READY_MAX_DELAY = 1.0
+# total time to wait for the server before giving up on it
+DEFAULT_READY_TIMEOUT = 30.0
+
+
+def get_backoff_delay(attempt,
+                      initial_delay=DEFAULT_READY_INITIAL_DELAY,
+                      max_delay=DEFAULT_READY_MAX_DELAY,
+                      random_fn=random.random):
+    '''
+    Returns the delay, in seconds, to wait after failed attempt number
+    `attempt` (starting from `0`).
+
+    The delay doubles with each attempt, up to `max_delay`. Only the upper
+    half of it is fixed, the lower half is picked at random. This keeps the
+    delay from growing too short, while still spreading out the attempts.
+    '''
+    delay = min(max_delay, initial_delay * (2 ** min(attempt, 32)))
+    return delay / 2 + delay / 2 * random_fn()
+
+
+class ReadinessProber(object):
+    '''
+    Calls `probe()` until it returns true, with a backoff delay between
+    attempts. Then calls `on_ready(time_to_ready)`, with the seconds since
+    `start` was called.
+
+    The `probe` should return false if the server is not ready yet, and raise
+    an exception if it never will be (e.g. the process has died). In that
+    case, or if it is still not ready after `timeout` seconds, or if it is
+    cancelled, `on_failed(error)` is called instead. Only one of the two
+    callbacks is ever called.
+
+    Probes are run with `set_timeout(callback, delay)`, which defaults to
+    `threading.Timer`. The first one runs right away, on the calling thread.
+    '''
+
+    def __init__(self, probe, on_ready, on_failed,
+                 timeout=DEFAULT_READY_TIMEOUT,
+                 initial_delay=DEFAULT_READY_INITIAL_DELAY,
+                 max_delay=DEFAULT_READY_MAX_DELAY,
+                 set_timeout=None, random_fn=random.random):
+        if set_timeout is None:
+            set_timeout = threading_set_timeout
+
+        self._probe = probe
+        self._on_ready = on_ready
+        self._on_failed = on_failed
+        self._timeout = timeout
+        self._initial_delay = initial_delay
+        self._max_delay = max_delay
+        self._set_timeout = set_timeout
+        self._random_fn = random_fn
+
+        self._lock = threading.Lock()
+        self._start_time = None
+        self._attempts = 0
+        self._done = False
+
+    def start(self):
+        ''' Sends the first probe. '''
+        with self._lock:
+            if self._start_time is not None:
+                raise RuntimeError('prober has already been started')
+            self._start_time = time.monotonic()
+
+        self._run_probe()
+
+    def cancel(self):
+        '''
+        Stops probing, and fails with a `CancelledError`. Does nothing if the
+        prober has already finished.
+        '''
+        self._finish(False, CancelledError('readiness probe cancelled'))
+
+    def _run_probe(self):
+        with self._lock:
+            if self._done:
+                return
+            attempt = self._attempts
+            self._attempts += 1
+
+        try:
+            is_ready = self._probe()
+        except Exception as e:
+            logger.debug('readiness probe failed, giving up: %r', e)
+            self._finish(False, e)
+            return
+
+        if is_ready:
+            self._finish(True, None)
+            return
+
+        delay = get_backoff_delay(
+            attempt, initial_delay=self._initial_delay,
+            max_delay=self._max_delay, random_fn=self._random_fn,
+        )
+        elapsed = time.monotonic() - self._start_time
+        if elapsed + delay > self._timeout:
+            self._finish(False, TimeoutError(
+                'server was not ready after %ss' % (self._timeout)
+            ))
+            return
+
+        logger.debug(
+            'server not ready after attempt %d, retrying in %.3fs',
+            attempt + 1, delay,
+        )
+        self._set_timeout(self._run_probe, delay)
+
+    def _finish(self, is_ready, error):
+        with self._lock:
+            if self._done:
+                return
+            self._done = True
+            time_to_ready = time.monotonic() - (
+                self._start_time or time.monotonic()
+            )
+
+        if is_ready:
+            self._on_ready(time_to_ready)
+        else:
+            self._on_failed(error)
+
+    @property
+    def attempts(self):
+        with self._lock:
+            return self._attempts
+
+    def __repr__(self):
+        with self._lock:
+            return '%s(%r)' % ('ReadinessProber', {
+                'timeout': self._timeout,
+                'attempts': self._attempts,
+                'done': self._done,
+            })
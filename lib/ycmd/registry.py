@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+
+'''
+lib/ycmd/registry.py
+Server registry. Indexes servers by view id and by working directory.
+
+Keeps reverse indexes from each server to the views and directories bound to
+it, so unregistering a server does not need to scan every binding. Project
+roots are stored in a path trie, so a file nested anywhere under a project
+resolves to the server for that project. Other working directories (e.g. the
+directory of a file opened without a project) only match exactly, so they do
+not capture unrelated projects nested under them.
+
+The forward indexes are published as snapshots, so lookups never take a lock.
+'''
+
+import logging
+import threading
+
+from ..util.dict import CopyOnWriteDict
+from ..util.trie import PathTrie
+
+logger = logging.getLogger('sublime-ycmd.' + __name__)
+
+
+class ServerRegistry(object):
+    '''
+    Registry of servers and their view/directory bindings.
+
+    Servers are treated as opaque, hashable values. All APIs are thread-safe.
+
+    Writers are serialized by an internal lock. The lock is never held while
+    calling out of this class, so it is safe to use from callbacks that run
+    with other locks held.
+
+    Readers do not take the lock. The server set and forward indexes are only
+    ever replaced (never modified in place), so lookups see a consistent
+    snapshot and never block behind a writer.
+    '''
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+        # published snapshots, readable without the lock:
+        self._servers = frozenset()
+        self._view_id_to_server = CopyOnWriteDict()
+        self._directory_to_server = PathTrie()
+        self._exact_directory_to_server = CopyOnWriteDict()
+
+        # reverse indexes, only accessed with the lock held:
+        self._server_to_view_ids = {}
+        self._server_to_directories = {}
+
+    def add(self, server):
+        '''
+        Registers `server`. Does nothing if it is already registered.
+        '''
+        with self._lock:
+            self._add_unlocked(server)
+
+    def remove(self, server):
+        '''
+        Unregisters `server`, along with all of its view and directory
+        bindings. Returns a tuple of the view ids and directories that were
+        unbound. Raises a `KeyError` if the server is not registered.
+        '''
+        with self._lock:
+            if server not in self._servers:
+                raise KeyError(server,)
+
+            view_ids = self._server_to_view_ids.pop(server)
+            directories = self._server_to_directories.pop(server)
+
+            with self._view_id_to_server.mutate() as view_id_to_server:
+                for view_id in view_ids:
+                    del view_id_to_server[view_id]
+            for directory in directories:
+                self._unbind_directory_unlocked(directory)
+
+            self._servers = self._servers - frozenset((server,))
+
+        return view_ids, directories
+
+    def bind_view(self, view_id, server):
+        '''
+        Binds `view_id` to `server`, replacing any existing binding for it.
+        The server is registered if it has not been already.
+        '''
+        with self._lock:
+            self._add_unlocked(server)
+
+            previous_server = self._view_id_to_server.get(view_id)
+            if previous_server is server:
+                return
+            if previous_server is not None:
+                self._server_to_view_ids[previous_server].discard(view_id)
+
+            self._view_id_to_server[view_id] = server
+            self._server_to_view_ids[server].add(view_id)
+
+    def unbind_view(self, view_id):
+        '''
+        Removes the binding for `view_id`, if there is one. Returns the server
+        it was bound to, or `None`.
+        '''
+        with self._lock:
+            server = self._view_id_to_server.pop(view_id, None)
+            if server is not None:
+                self._server_to_view_ids[server].discard(view_id)
+            return server
+
+    def unbind_views(self, server):
+        '''
+        Removes all view bindings for `server`, but leaves the server (and its
+        directory bindings) registered. Returns the view ids that were unbound.
+        '''
+        with self._lock:
+            view_ids = self._server_to_view_ids.get(server)
+            if not view_ids:
+                return set()
+
+            self._server_to_view_ids[server] = set()
+            with self._view_id_to_server.mutate() as view_id_to_server:
+                for view_id in view_ids:
+                    del view_id_to_server[view_id]
+
+            return view_ids
+
+    def bind_directory(self, directory, server, is_project_root=True):
+        '''
+        Binds the working `directory` to `server`, replacing any existing
+        binding for that exact directory.
+        The server is registered if it has not been already.
+
+        If `is_project_root` is true, the directory is a project root, and
+        directories nested under it resolve to `server` as well. Otherwise,
+        only `directory` itself does.
+        '''
+        with self._lock:
+            self._add_unlocked(server)
+
+            previous_server = self._unbind_directory_unlocked(directory)
+            if previous_server is not None:
+                self._server_to_directories[previous_server].discard(
+                    directory,
+                )
+
+            if is_project_root:
+                self._directory_to_server.insert(directory, server)
+            else:
+                self._exact_directory_to_server[directory] = server
+            self._server_to_directories[server].add(directory)
+
+    def lookup_view(self, view_id):
+        '''
+        Returns the server bound to `view_id`, or `None`.
+
+        This is a single dictionary read, so it does not take the lock.
+        '''
+        return self._view_id_to_server.get(view_id)
+
+    def lookup_directory(self, path):
+        '''
+        Returns the server bound to exactly `path`, or else the server for the
+        closest project root that contains it. Returns `None` if there is no
+        such server.
+
+        The path trie is persistent, so this does not take the lock.
+        '''
+        if path is None:
+            return None
+
+        server = self._exact_directory_to_server.get(path)
+        if server is not None:
+            return server
+        return self._directory_to_server.longest_prefix(path)
+
+    def get_view_ids(self, server):
+        ''' Returns a copy of the set of view ids bound to `server`. '''
+        with self._lock:
+            return set(self._server_to_view_ids.get(server, ()))
+
+    def get_directories(self, server):
+        ''' Returns a copy of the set of directories bound to `server`. '''
+        with self._lock:
+            return set(self._server_to_directories.get(server, ()))
+
+    def get_servers(self):
+        ''' Returns a shallow-copy of the set of registered servers. '''
+        return set(self._servers)
+
+    def clear(self):
+        ''' Unregisters all servers and removes all bindings. '''
+        with self._lock:
+            self._servers = frozenset()
+            self._view_id_to_server = CopyOnWriteDict()
+            self._directory_to_server = PathTrie()
+            self._exact_directory_to_server = CopyOnWriteDict()
+            self._server_to_view_ids = {}
+            self._server_to_directories = {}
+
+    def _unbind_directory_unlocked(self, directory):
+        # [internal] must be called with the lock held
+        # a directory is bound in at most one of the two indexes
+        if directory in self._directory_to_server:
+            return self._directory_to_server.remove(directory)
+        return self._exact_directory_to_server.pop(directory, None)
+
+    def _add_unlocked(self, server):
+        if server not in self._servers:
+            self._servers = self._servers | frozenset((server,))
+            self._server_to_view_ids[server] = set()
+            self._server_to_directories[server] = set()
+
+    def __contains__(self, server):
+        return server in self._servers
+
+    def __iter__(self):
+        return iter(self._servers)
+
+    def __len__(self):
+        return len(self._servers)
+
+    def __bool__(self):
+        ''' Returns `True`, so an instance is always truthy. '''
+        return True
+
+    def __repr__(self):
+        return '%s(%r)' % ('ServerRegistry', {
+            'servers': len(self._servers),
+            'views': len(self._view_id_to_server),
+            'directories': (
+                len(self._directory_to_server) +
+                len(self._exact_directory_to_server)
+            ),
+        })
@@ -17,14 +17,28 @@ NOTE : This uses `http` instead of `urllib`, as `urllib` raises exceptions when
        the response body to parse/retrieve the error message.
 '''
 
-import http
+import collections
+import http.client
+import itertools
 import logging
 import os
+import socket
 import threading
+import time
 
 from ..process import Process
 from ..schema.completions import parse_completions
 from ..schema.request import RequestParameters
+from ..task.deadline import (
+    PHASE_CONNECT,
+    PHASE_PARSE,
+    PHASE_READ,
+    PHASE_SEND,
+    PHASE_STATUS,
+    Deadline,
+    check_remaining,
+    mark_phase,
+)
 from ..util.format import (
     json_serialize,
     json_parse,
@@ -37,7 +51,10 @@ from ..util.hmac import (
     calculate_hmac,
     new_hmac_secret,
 )
-from ..util.lock import lock_guard
+from ..util.lock import (
+    InstrumentedLock,
+    lock_guard,
+)
 from ..util.str import (
     str_to_bytes,
     truncate,
@@ -56,10 +73,12 @@ from ..ycmd.constants import (
     YCMD_HANDLER_HEALTHY,
     YCMD_HANDLER_IGNORE_EXTRA_CONF,
     YCMD_HANDLER_LOAD_EXTRA_CONF,
+    YCMD_HANDLER_READY,
     YCMD_HANDLER_SHUTDOWN,
     YCMD_HMAC_HEADER,
     YCMD_HMAC_SECRET_LENGTH,
 )
+from ..ycmd.probe import ReadinessProber
 from ..ycmd.start import (
     StartupParameters,
     to_startup_parameters,
@@ -72,9 +91,11 @@ logger = logging.getLogger('sublime-ycmd.' + __name__)
 # this logger uses a filter to add server information to all log statements
 _server_logger = logging.getLogger('sublime-ycmd.' + __name__ + '.server')
 
-# time limit for queued requests, in seconds
-# it's a good idea to have one, so requests can't be queued indefinitely
-QUEUED_REQUEST_MAX_WAIT_TIME = 1
+# source of unique server ids, `next` on this is atomic
+_server_id_counter = itertools.count(1)
+
+# timeout for each readiness probe request, the server is on localhost
+READY_PROBE_REQUEST_TIMEOUT = 0.5
 
 
 class Server(object):
@@ -91,7 +112,10 @@ class Server(object):
     STOPPING = 'Server.STOPPING'
 
     def __init__(self):
-        self._lock = threading.RLock()
+        # unique for the lifetime of the process, never changes after this
+        self._id = next(_server_id_counter)
+
+        self._lock = InstrumentedLock('Server')
         self._status = Server.NULL
         self._status_cv = threading.Condition(self._lock)
 
@@ -109,6 +133,18 @@ class Server(object):
         self._hmac = None
         self._label = None
 
+        # listeners for status transitions, see `add_status_callback`
+        self._status_callbacks = []
+        # (callback, errback) pairs parked until startup, see `when_running`
+        self._pending_requests = collections.deque()
+
+        # polls the server after launch, see `_wait_until_ready`
+        self._readiness_prober = None
+        # seconds from launching the process until it was ready, if it was
+        self._time_to_ready = None
+        # maps startup phase -> seconds spent in it, see `startup_timings`
+        self._startup_timings = collections.OrderedDict()
+
         self.reset()
 
     def reset(self):
@@ -126,12 +162,16 @@ class Server(object):
         self._hmac = None
         self._label = None
 
+        self._readiness_prober = None
+        self._time_to_ready = None
+        self._startup_timings = collections.OrderedDict()
+
         self._reset_logger()
 
     def start(self, ycmd_root_directory,
               ycmd_settings_path=None, working_directory=None,
               python_binary_path=None, server_idle_suicide_seconds=None,
-              server_check_interval_seconds=None):
+              server_check_interval_seconds=None, cancel_token=None):
         '''
         Launches a ycmd server process with the given startup parameters. The
         only required startup parameter is `ycmd_root_directory`. If it is a
@@ -156,6 +196,16 @@ class Server(object):
 
         It is preferable to use the concrete `StartupParameters` class, since
         this ends up constructing one anyway if it isn't already in that form.
+
+        If `cancel_token` is provided, it is checked before the process is
+        launched. If it has been cancelled, the server is reset to the null
+        status and this returns without launching the process.
+
+        This returns once the process is launched. The server stays in the
+        starting status until it responds to readiness probes, and only then
+        changes to running (see `_wait_until_ready`).
+
+        The time spent in each step is recorded in `startup_timings`.
         '''
         startup_parameters = to_startup_parameters(
             ycmd_root_directory,
@@ -176,6 +226,15 @@ class Server(object):
         )
         self.set_status(Server.STARTING)
 
+        startup_timings = collections.OrderedDict()
+        last_mark_time = time.monotonic()
+
+        def mark_startup_phase(phase):
+            nonlocal last_mark_time
+            now = time.monotonic()
+            startup_timings[phase] = now - last_mark_time
+            last_mark_time = now
+
         # update parameters to reflect normalized settings:
         ycmd_root_directory = startup_parameters.ycmd_root_directory
         ycmd_settings_path = startup_parameters.ycmd_settings_path
@@ -189,6 +248,7 @@ class Server(object):
         ycmd_server_hostname = '127.0.0.1'
         ycmd_server_port = get_unused_port(ycmd_server_hostname)
         ycmd_server_label = get_base_name(working_directory)
+        mark_startup_phase('port')
 
         # initialize connection parameters asap to set up the instance logger:
         with self._lock:
@@ -211,12 +271,14 @@ class Server(object):
                 raise RuntimeError(
                     'failed to generate ycmd server settings file'
                 )
+            mark_startup_phase('settings')
 
             # NOTE : This does not start the process.
             ycmd_process_handle = prepare_ycmd_process(
                 startup_parameters, ycmd_settings_tempfile_path,
                 ycmd_server_hostname, ycmd_server_port,
             )
+            mark_startup_phase('prepare')
         except Exception as e:
             self._logger.error(
                 'failed to prepare ycmd server process: %r', e, exc_info=True,
@@ -239,7 +301,8 @@ class Server(object):
             self.hostname = ycmd_server_hostname
             self.port = ycmd_server_port
             self.hmac = ycmd_hmac_secret
-            self.label = ycmd_server_label
+            # a standby server may have been claimed for a project already
+            self.label = self._label or ycmd_server_label
 
         def _check_and_remove_settings_tmp():
             try:
@@ -255,6 +318,12 @@ class Server(object):
                     ycmd_settings_tempfile_path,
                 )
 
+        if cancel_token is not None and cancel_token.cancelled():
+            self._logger.debug('startup cancelled, not launching process')
+            _check_and_remove_settings_tmp()
+            self.set_status(Server.NULL)
+            return
+
         try:
             ycmd_process_handle.start()
         except ValueError as e:
@@ -267,10 +336,15 @@ class Server(object):
                 'failed to launch ycmd server, system error: %s', e,
             )
             _check_and_remove_settings_tmp()
+        mark_startup_phase('launch')
+
+        with self._lock:
+            self._startup_timings = startup_timings
+        self._logger.debug('startup timings: %r', startup_timings)
 
         if ycmd_process_handle.alive():
-            self._logger.debug('process launched successfully!')
-            self.set_status(Server.RUNNING)
+            self._logger.debug('process launched, waiting for it to be ready')
+            self._wait_until_ready(cancel_token)
         else:
             # nothing much we can do here - caller can check the output
             self._logger.debug(
@@ -278,7 +352,76 @@ class Server(object):
             )
             self.set_status(Server.NULL)
 
+    def _wait_until_ready(self, cancel_token=None):
+        '''
+        Probes the server with ready requests, with a backoff delay between
+        them, and changes the status to running once it responds. Until then,
+        requests stay parked on the server (see `when_running`).
+
+        If the process exits, or does not become ready in time, or if
+        `cancel_token` is cancelled, the process is killed and the status is
+        reset to null. That fails the parked requests.
+        '''
+        def probe():
+            if cancel_token is not None:
+                cancel_token.raise_if_cancelled()
+
+            with self._lock:
+                process_handle = self._process_handle
+            if process_handle is None or not process_handle.alive():
+                raise RuntimeError('server process exited before it was ready')
+
+            try:
+                response = self._send_request(
+                    YCMD_HANDLER_READY,
+                    timeout=READY_PROBE_REQUEST_TIMEOUT, allow_starting=True,
+                )
+            except TimeoutError:
+                return False
+            return bool(response)
+
+        def on_ready(time_to_ready):
+            with self._lock:
+                prober = self._readiness_prober
+                self._readiness_prober = None
+                self._time_to_ready = time_to_ready
+                self._startup_timings['ready'] = time_to_ready
+                status = self._status
+
+            self._logger.info(
+                'server is ready after %.3fs, %d probes',
+                time_to_ready, prober.attempts if prober else 0,
+            )
+            if status == Server.STARTING:
+                self.set_status(Server.RUNNING)
+
+        def on_failed(error):
+            self._logger.warning('server did not become ready: %s', error)
+            with self._lock:
+                self._readiness_prober = None
+                process_handle = self._process_handle
+                self._process_handle = None
+                status = self._status
+
+            if process_handle is not None and process_handle.alive():
+                process_handle.kill()
+            if status == Server.STARTING:
+                self.set_status(Server.NULL)
+
+        prober = ReadinessProber(probe, on_ready, on_failed)
+        with self._lock:
+            self._readiness_prober = prober
+        prober.start()
+
     def stop(self, hard=False, timeout=None):
+        with self._lock:
+            prober = self._readiness_prober
+        if prober is not None:
+            # not ready yet, nothing to shut down gracefully
+            self._logger.debug('server is still starting, killing it')
+            prober.cancel()
+            return
+
         with self._lock:
             if not self.is_alive(timeout=0):
                 self._logger.debug('not alive, nothing to stop, returning')
@@ -448,7 +591,7 @@ class Server(object):
         if status == Server.NULL:
             valid_previous_states = None
         elif status == Server.STARTING:
-            valid_previous_states = [Server.NULL]
+            valid_previous_states = [Server.NULL, Server.STARTING]
         elif status == Server.RUNNING:
             valid_previous_states = [Server.NULL, Server.STARTING]
         elif status == Server.STOPPING:
@@ -480,6 +623,107 @@ class Server(object):
         with self._lock:
             self._status = status
             self._status_cv.notify_all()
+            status_callbacks = list(self._status_callbacks)
+
+            if status != Server.STARTING:
+                pending_requests = list(self._pending_requests)
+                self._pending_requests.clear()
+            else:
+                pending_requests = None
+
+        if pending_requests:
+            self._flush_pending_requests(pending_requests, status)
+
+        if previous_status == status:
+            return
+
+        for status_callback in status_callbacks:
+            try:
+                status_callback(self, previous_status, status)
+            except Exception as e:
+                self._logger.warning(
+                    'unhandled error in status callback: %r', e, exc_info=e,
+                )
+
+    def when_running(self, callback, errback=None):
+        '''
+        Calls `callback()` once the server is running. If it is already
+        running, this happens right away. If it is starting, the callback is
+        parked, and called when startup finishes, in the order it was parked.
+
+        If the server is not running, or stops before startup finishes,
+        `errback` is called with a `RuntimeError` instead (if provided).
+
+        Returns true if the callback was called or parked, and false if the
+        server is not running. Nothing blocks on the server status, so this
+        is safe to call from a task pool worker. The callbacks run on the
+        thread that changes the server status, so they must not block.
+        '''
+        if not callable(callback):
+            raise TypeError('callback must be callable: %r' % (callback))
+        if errback is not None and not callable(errback):
+            raise TypeError('errback must be callable: %r' % (errback))
+
+        with self._lock:
+            status = self._status
+            if status == Server.STARTING:
+                self._pending_requests.append((callback, errback))
+                return True
+
+        if status == Server.RUNNING:
+            callback()
+            return True
+
+        if errback is not None:
+            errback(RuntimeError('server is not running: %s' % (status)))
+        return False
+
+    def _flush_pending_requests(self, pending_requests, status):
+        '''
+        Calls the callbacks for parked requests if the server is now running,
+        or the errbacks otherwise. Must be called without the lock held.
+        '''
+        self._logger.debug(
+            '%s %d parked requests',
+            'sending' if status == Server.RUNNING else 'failing',
+            len(pending_requests),
+        )
+
+        for callback, errback in pending_requests:
+            try:
+                if status == Server.RUNNING:
+                    callback()
+                elif errback is not None:
+                    errback(RuntimeError(
+                        'server stopped before it was running: %s' % (status)
+                    ))
+            except Exception as e:
+                self._logger.warning(
+                    'unhandled error in parked request: %r', e, exc_info=e,
+                )
+
+    def get_pending_request_count(self):
+        '''
+        Returns the number of requests parked until the server is running.
+        '''
+        with self._lock:
+            return len(self._pending_requests)
+
+    def add_status_callback(self, callback):
+        '''
+        Registers `callback` to be invoked whenever the server status changes.
+        The callback receives the server, the previous status, and the new
+        status as positional arguments.
+
+        Callbacks may be invoked while the server lock is held (e.g. from
+        `is_alive`), so they must not block, and must not acquire any lock
+        that is also held while calling into the server.
+        '''
+        if not callable(callback):
+            raise TypeError('callback must be callable: %r' % (callback))
+
+        with self._lock:
+            self._status_callbacks.append(callback)
 
     def _generate_hmac_header(self, method, path, body=None):
         if body is None:
@@ -498,7 +742,9 @@ class Server(object):
         }
 
     def _send_request(self, handler,
-                      request_params=None, method=None, timeout=None):
+                      request_params=None, method=None, timeout=None,
+                      cancel_token=None, parse_json=True,
+                      allow_starting=False):
         '''
         Sends a request to the associated ycmd server and returns the response.
         The `handler` should be one of the ycmd handler constants.
@@ -508,25 +754,41 @@ class Server(object):
         If `method` is provided, it should be an HTTP verb (e.g. 'GET',
         'POST'). If omitted, it is set to 'GET' when no parameters are given,
         and 'POST' otherwise.
+        If `cancel_token` is provided, the request is abandoned if the token is
+        cancelled before it is sent, and the timeouts are capped so that the
+        request gives up at the token deadline. A cancelled request raises
+        `CancelledError`.
+        The `timeout` covers the request as a whole. Connecting, sending, and
+        reading the response each get what is left of it, and a `TimeoutError`
+        is raised if it runs out (including socket timeouts, which are not a
+        `TimeoutError` before python 3.10). If `cancel_token` is a `Deadline`,
+        the time spent in each of those phases is recorded on it.
+        If `parse_json` is false, the json response is returned as the raw
+        `bytes`, so the caller can decide how to parse it.
+        This does not wait for the server to start. If it is not running, a
+        `TimeoutError` is raised right away. Use `when_running` to send
+        requests once startup finishes. If `allow_starting` is true, the
+        request is also sent while starting (e.g. for readiness probes).
         '''
         with self._lock:
-            if self._status == Server.STOPPING:
-                self._logger.warning(
-                    'server is shutting down, cannot send request to it',
-                )
-                return None
+            status = self._status
 
-        try:
-            wait_status_timeout = (
-                timeout if timeout is not None
-                else QUEUED_REQUEST_MAX_WAIT_TIME
-            )
-            self.wait_for_status(Server.RUNNING, timeout=wait_status_timeout)
-        except TimeoutError as e:
+        if status == Server.STOPPING:
             self._logger.warning(
-                'server not ready, dropping due to timeout: %r', e, exc_info=e,
+                'server is shutting down, cannot send request to it',
             )
-            raise
+            return None
+
+        deadline = cancel_token
+        if deadline is None and timeout is not None:
+            # applies the timeout to the request as a whole
+            deadline = Deadline(timeout)
+
+        if status != Server.RUNNING and \
+                not (allow_starting and status == Server.STARTING):
+            self._logger.debug('server not ready, dropping request')
+            raise TimeoutError('server is not running: %s' % (status))
+        mark_phase(deadline, PHASE_STATUS)
 
         assert request_params is None or \
             isinstance(request_params, (RequestParameters, dict)), \
@@ -579,6 +841,10 @@ class Server(object):
             host = self.hostname
             port = self.port
 
+        if deadline is not None:
+            timeout = check_remaining(deadline, PHASE_CONNECT, timeout)
+            deadline.raise_if_cancelled()
+
         response_status = None
         response_reason = None
         response_headers = None
@@ -587,13 +853,24 @@ class Server(object):
             connection = http.client.HTTPConnection(
                 host=host, port=port, timeout=timeout,
             )
+            # each step only gets what is left of the deadline
+            connection.connect()
+            mark_phase(deadline, PHASE_CONNECT)
+            # the response keeps using it after the connection lets go of it
+            sock = connection.sock
+
+            if deadline is not None:
+                sock.settimeout(check_remaining(deadline, PHASE_SEND, timeout))
             connection.request(
                 method=method,
                 url=handler,
                 body=body,
                 headers=headers,
             )
+            mark_phase(deadline, PHASE_SEND)
 
+            if deadline is not None:
+                sock.settimeout(check_remaining(deadline, PHASE_READ, timeout))
             response = connection.getresponse()
 
             response_status = response.status
@@ -615,6 +892,10 @@ class Server(object):
 
             # extract response to check hmac
             if has_content:
+                if deadline is not None:
+                    sock.settimeout(
+                        check_remaining(deadline, PHASE_READ, timeout)
+                    )
                 response_content = response.read()
                 with self._lock:
                     hmac = self._hmac
@@ -636,10 +917,14 @@ class Server(object):
                     )
             else:
                 response_content = None
+            mark_phase(deadline, PHASE_READ)
 
             # parse response as json
             if response_content and is_content_json:
-                response_data = json_parse(response_content)
+                response_data = (
+                    json_parse(response_content) if parse_json
+                    else response_content
+                )
             else:
                 if has_content or response_content:
                     self._logger.warning(
@@ -648,6 +933,11 @@ class Server(object):
                     )
                 response_data = None
 
+        except TimeoutError:
+            raise
+        except socket.timeout as e:
+            # only a subclass of `TimeoutError` since python 3.10
+            raise TimeoutError('request timed out: %s' % (e))
         except http.client.HTTPException as e:
             self._logger.error('error during ycmd request: %s', e, exc_info=e)
         except ConnectionError as e:
@@ -677,7 +967,16 @@ class Server(object):
             timeout=timeout,
         )
 
-    def get_code_completions(self, request_params, timeout=None):
+    def get_code_completions(self, request_params, timeout=None,
+                             offloader=None, cancel_token=None):
+        '''
+        Requests completions, and returns the parsed `CompletionResponse`.
+        If `offloader` is provided, it should be a `ResponseOffloader`, which
+        is used to parse large responses in a child process.
+        If `cancel_token` is a `Deadline`, parsing the response also counts
+        against it, and the time spent in each phase is set as the `timings`
+        of the response.
+        '''
         assert isinstance(request_params, RequestParameters), \
             'request parameters must be RequestParameters: %r' % \
             (request_params)
@@ -687,18 +986,30 @@ class Server(object):
             request_params=request_params,
             method='POST',
             timeout=timeout,
+            cancel_token=cancel_token,
+            parse_json=offloader is None,
         )
         self._logger.debug(
             'received completion results: %s', truncate(completion_data),
         )
 
-        completion_response = parse_completions(
-            completion_data, request_params,
-        )
+        if offloader is not None:
+            completion_response = offloader.parse_completions(
+                completion_data, request_params,
+                timeout=check_remaining(cancel_token, PHASE_PARSE),
+            )
+        else:
+            completion_response = parse_completions(
+                completion_data, request_params,
+            )
         self._logger.debug(
             'parsed completion response: %r', completion_response,
         )
 
+        if isinstance(cancel_token, Deadline):
+            cancel_token.mark(PHASE_PARSE)
+            completion_response.timings = cancel_token.get_phases()
+
         return completion_response
 
     def load_extra_conf(self, extra_conf_path, timeout=None):
@@ -729,7 +1040,8 @@ class Server(object):
             timeout=timeout,
         )
 
-    def _notify_event(self, event_name, request_params, method='POST'):
+    def _notify_event(self, event_name, request_params, method='POST',
+                      cancel_token=None):
         assert isinstance(request_params, RequestParameters), \
             'request parameters must be RequestParameters: %r' % \
             (request_params)
@@ -743,24 +1055,28 @@ class Server(object):
             YCMD_HANDLER_EVENT_NOTIFICATION,
             request_params=request_params,
             method=method,
+            cancel_token=cancel_token,
         )
 
-    def notify_file_ready_to_parse(self, request_params):
+    def notify_file_ready_to_parse(self, request_params, cancel_token=None):
         return self._notify_event(
             YCMD_EVENT_FILE_READY_TO_PARSE,
             request_params=request_params,
+            cancel_token=cancel_token,
         )
 
-    def notify_buffer_enter(self, request_params):
+    def notify_buffer_enter(self, request_params, cancel_token=None):
         return self._notify_event(
             YCMD_EVENT_BUFFER_VISIT,
             request_params=request_params,
+            cancel_token=cancel_token,
         )
 
-    def notify_buffer_leave(self, request_params):
+    def notify_buffer_leave(self, request_params, cancel_token=None):
         return self._notify_event(
             YCMD_EVENT_BUFFER_UNLOAD,
             request_params=request_params,
+            cancel_token=cancel_token,
         )
 
     def notify_leave_insert_mode(self, request_params):
@@ -820,6 +1136,14 @@ class Server(object):
             self._logger.warning('server hmac secret is not a str: %r', hmac)
         self._hmac = hmac
 
+    @property
+    def id(self):
+        '''
+        Returns a unique integer id for this server instance. The id is fixed
+        for the life of the instance, so this does not take the lock.
+        '''
+        return self._id
+
     @property
     @lock_guard()
     def label(self):
@@ -832,6 +1156,27 @@ class Server(object):
             self._logger.warning('server label is not a str: %r', label)
         self._label = label
 
+    @property
+    @lock_guard()
+    def time_to_ready(self):
+        '''
+        Returns the number of seconds from launching the server process until
+        it responded to a readiness probe, or `None` if it has not yet.
+        '''
+        return self._time_to_ready
+
+    @property
+    @lock_guard()
+    def startup_timings(self):
+        '''
+        Returns an ordered `dict` mapping each step of the last startup to
+        the seconds spent in it. The steps are finding a port ("port"),
+        writing the settings file ("settings"), preparing the command line
+        ("prepare"), launching the process ("launch"), and waiting for it to
+        respond ("ready"). Steps that have not happened yet are left out.
+        '''
+        return collections.OrderedDict(self._startup_timings)
+
     @property
     @lock_guard()
     def pid(self):
@@ -5,6 +5,7 @@ lib/ycmd/settings.py
 Utility functions for ycmd settings.
 '''
 
+import json
 import logging
 import os
 
@@ -18,6 +19,9 @@ from ..util.str import bytes_to_str
 
 logger = logging.getLogger('sublime-ycmd.' + __name__)
 
+# stands in for the hmac secret in pre-serialized settings templates
+SETTINGS_HMAC_PLACEHOLDER = '__sublime_ycmd_hmac_secret__'
+
 
 def get_default_settings_path(ycmd_root_directory):
     '''
@@ -39,6 +43,64 @@ def generate_settings_data(ycmd_settings_path, hmac_secret):
     The `hmac_secret` argument should be the binary-encoded HMAC secret. It
     will be base64-encoded before adding it to the settings object.
     '''
+    ycmd_settings = _load_settings_data(ycmd_settings_path)
+    ycmd_settings['hmac_secret'] = encode_hmac_secret(hmac_secret)
+    return ycmd_settings
+
+
+def generate_settings_template(ycmd_settings_path):
+    '''
+    Generates the same settings as `generate_settings_data`, and serializes
+    them ahead of time, without the HMAC secret. Returns a `tuple` of the
+    serialized `bytes` before and after the secret. Use
+    `render_settings_template` to fill it in.
+    '''
+    ycmd_settings = _load_settings_data(ycmd_settings_path)
+    ycmd_settings['hmac_secret'] = SETTINGS_HMAC_PLACEHOLDER
+
+    serialized_settings = json.dumps(ycmd_settings)
+    serialized_placeholder = json.dumps(SETTINGS_HMAC_PLACEHOLDER)
+    if serialized_settings.count(serialized_placeholder) != 1:
+        raise ValueError(
+            'ycmd settings template already contains the hmac placeholder: %r'
+            % (ycmd_settings_path)
+        )
+
+    prefix, suffix = serialized_settings.split(serialized_placeholder)
+    return (prefix.encode('utf-8'), suffix.encode('utf-8'))
+
+
+def render_settings_template(settings_template, hmac_secret):
+    '''
+    Returns the serialized settings `bytes` for `settings_template` (from
+    `generate_settings_template`), with `hmac_secret` filled in.
+    '''
+    prefix, suffix = settings_template
+    hmac_secret_json = json.dumps(encode_hmac_secret(hmac_secret))
+    return prefix + hmac_secret_json.encode('utf-8') + suffix
+
+
+def encode_hmac_secret(hmac_secret):
+    '''
+    Returns the base64-encoded `str` for the binary-encoded `hmac_secret`, as
+    expected in the ycmd settings. Other values are returned as-is.
+    '''
+    if not isinstance(hmac_secret, bytes):
+        logger.warning(
+            'hmac secret was not passed in as binary, it might be incorrect'
+        )
+        return hmac_secret
+
+    logger.debug('converting hmac secret to base64')
+    hmac_secret_encoded = base64_encode(hmac_secret)
+    return bytes_to_str(hmac_secret_encoded)
+
+
+def _load_settings_data(ycmd_settings_path):
+    '''
+    Loads the settings template at `ycmd_settings_path`, and applies the
+    overrides used by this plugin. The HMAC secret still has to be set.
+    '''
     assert isinstance(ycmd_settings_path, str), \
         'ycmd settings path must be a str: %r' % (ycmd_settings_path)
     if not is_file(ycmd_settings_path):
@@ -72,25 +134,12 @@ def generate_settings_data(ycmd_settings_path, hmac_secret):
     ycmd_settings['filetype_blacklist'] = {}
 
     # HMAC
-    # Pass in the hmac parameter. It needs to be base-64 encoded first.
+    # Filled in by the caller. It needs to be base-64 encoded first.
     if 'hmac_secret' not in ycmd_settings:
         logger.warning(
             'ycmd settings template is missing the hmac_secret placeholder'
         )
 
-    if not isinstance(hmac_secret, bytes):
-        logger.warning(
-            'hmac secret was not passed in as binary, it might be incorrect'
-        )
-    else:
-        logger.debug('converting hmac secret to base64')
-        hmac_secret_binary = hmac_secret
-        hmac_secret_encoded = base64_encode(hmac_secret_binary)
-        hmac_secret_str = bytes_to_str(hmac_secret_encoded)
-        hmac_secret = hmac_secret_str
-
-    ycmd_settings['hmac_secret'] = hmac_secret
-
     # MISC
     # Settings to ensure that the ycmd server is enabled whenever possible.
     ycmd_settings['min_num_of_chars_for_completion'] = 0
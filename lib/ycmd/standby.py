@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+
+'''
+lib/ycmd/standby.py
+Warm standby servers.
+
+Starting ycmd takes a few seconds (python startup, imports, completer setup),
+and completions are unavailable until it is done. The `StandbyPool` keeps a
+few servers started ahead of time, with a neutral working directory. When a
+new project is opened, one of them is claimed for it instead of starting one
+from scratch, and a replacement is started in the background.
+
+Standbys that are not claimed for a while are stopped, so idle editors do not
+keep extra ycmd processes around. The pool is refilled on the next claim.
+'''
+
+import logging
+import threading
+import time
+
+from ..task.debounce import threading_set_timeout
+from ..ycmd.server import Server
+
+logger = logging.getLogger('sublime-ycmd.' + __name__)
+
+# seconds without a claim before standbys are stopped, `0` means never
+DEFAULT_STANDBY_IDLE_SECONDS = 600
+
+
+class StandbyPool(object):
+    '''
+    Keeps up to `size` standby servers started.
+
+    New standbys are created with `spawn()`, which should return a `Server`
+    that is starting (or `None` if it cannot be started). Standbys that are
+    dropped or reaped are stopped with `stop(server)`. Neither is called with
+    the pool lock held, and both should not block.
+
+    Refills and reaping run with `set_timeout(callback, delay)`, which
+    defaults to `threading.Timer`.
+    '''
+
+    def __init__(self, spawn, stop, size=0,
+                 idle_seconds=DEFAULT_STANDBY_IDLE_SECONDS, set_timeout=None):
+        if set_timeout is None:
+            set_timeout = threading_set_timeout
+
+        self._spawn = spawn
+        self._stop = stop
+        self._set_timeout = set_timeout
+
+        self._lock = threading.Lock()
+        self._size = 0
+        self._idle_seconds = 0
+        # standby servers, oldest first
+        self._servers = []
+        self._last_activity_time = time.monotonic()
+        # set once reaped, cleared on the next claim
+        self._is_cold = False
+        self._replenish_scheduled = False
+        self._reap_scheduled = False
+
+        self._spawned = 0
+        self._claimed = 0
+        self._missed = 0
+        self._reaped = 0
+
+        self.configure(size, idle_seconds)
+
+    def configure(self, size, idle_seconds=DEFAULT_STANDBY_IDLE_SECONDS):
+        '''
+        Sets the number of standbys to keep, and the seconds without a claim
+        before they are stopped. Extra standbys are stopped right away, and
+        missing ones are started in the background.
+        '''
+        if not isinstance(size, int):
+            raise TypeError('standby size must be an int: %r' % (size))
+        if size < 0:
+            raise ValueError('standby size must be non-negative: %r' % (size))
+        if not isinstance(idle_seconds, (int, float)):
+            raise TypeError(
+                'standby idle seconds must be a number: %r' % (idle_seconds)
+            )
+
+        with self._lock:
+            self._size = size
+            self._idle_seconds = idle_seconds
+            self._last_activity_time = time.monotonic()
+            self._is_cold = False
+            extra_servers = self._servers[size:]
+            del self._servers[size:]
+            self._schedule_replenish()
+
+        for server in extra_servers:
+            self._stop(server)
+
+    def claim(self):
+        '''
+        Takes a standby server out of the pool, and returns it. Servers that
+        are ready are preferred over ones that are still starting. Returns
+        `None` if there are no live standbys.
+
+        Either way, the pool is refilled in the background.
+        '''
+        with self._lock:
+            servers = list(self._servers)
+
+        # standbys that have exited on their own (e.g. idle suicide) are reset
+        # to null by this, and dropped in `_on_server_status`
+        # it may call into the status callbacks, so the lock is not held
+        candidates = [
+            server for server in servers if server.is_alive(timeout=0)
+        ] + [
+            server for server in servers if server.is_starting()
+        ]
+
+        with self._lock:
+            server = None
+            for candidate in candidates:
+                if candidate in self._servers:
+                    server = candidate
+                    self._servers.remove(server)
+                    break
+
+            if server is not None:
+                self._claimed += 1
+            else:
+                self._missed += 1
+            self._last_activity_time = time.monotonic()
+            self._is_cold = False
+            self._schedule_replenish()
+
+        return server
+
+    def clear(self):
+        '''
+        Stops all standbys. The pool is refilled on the next claim, or when it
+        is configured again.
+        '''
+        with self._lock:
+            servers = self._servers
+            self._servers = []
+            self._is_cold = True
+
+        for server in servers:
+            self._stop(server)
+
+    def _schedule_replenish(self):
+        # [internal] must be called with the lock held
+        if self._replenish_scheduled or self._is_cold or \
+                len(self._servers) >= self._size:
+            return
+        self._replenish_scheduled = True
+        self._set_timeout(self._replenish, 0)
+
+    def _schedule_reap(self, delay):
+        # [internal] must be called with the lock held
+        if self._reap_scheduled or not self._idle_seconds:
+            return
+        self._reap_scheduled = True
+        self._set_timeout(self._reap, delay)
+
+    def _replenish(self):
+        with self._lock:
+            self._replenish_scheduled = False
+            if self._is_cold:
+                return
+            missing = self._size - len(self._servers)
+
+        servers = []
+        for _ in range(missing):
+            try:
+                server = self._spawn()
+            except Exception as e:
+                logger.warning(
+                    'failed to start standby server: %r', e, exc_info=e,
+                )
+                server = None
+            if server is None:
+                break
+            server.add_status_callback(self._on_server_status)
+            servers.append(server)
+
+        if not servers:
+            return
+
+        logger.debug('started %d standby servers', len(servers))
+        with self._lock:
+            self._spawned += len(servers)
+            self._servers.extend(servers)
+            extra_servers = self._servers[self._size:]
+            del self._servers[self._size:]
+            if self._servers:
+                self._schedule_reap(self._idle_seconds)
+
+        for server in extra_servers:
+            self._stop(server)
+
+    def _reap(self):
+        with self._lock:
+            self._reap_scheduled = False
+            if not self._servers or not self._idle_seconds:
+                return
+
+            idle_time = time.monotonic() - self._last_activity_time
+            if idle_time < self._idle_seconds:
+                self._schedule_reap(self._idle_seconds - idle_time)
+                return
+
+            servers = self._servers
+            self._servers = []
+            self._is_cold = True
+            self._reaped += len(servers)
+
+        logger.debug('stopping %d idle standby servers', len(servers))
+        for server in servers:
+            self._stop(server)
+
+    def _on_server_status(self, server, previous_status, status):
+        if status != Server.NULL:
+            return
+        with self._lock:
+            if server in self._servers:
+                logger.debug('standby server has stopped: %r', server)
+                self._servers.remove(server)
+
+    def get_stats(self):
+        '''
+        Returns a `dict` with the target number of standbys, the number
+        currently held, and the number started, claimed, missed (claims that
+        found no standby), and stopped for being idle.
+        '''
+        with self._lock:
+            return {
+                'size': self._size,
+                'standby': len(self._servers),
+                'spawned': self._spawned,
+                'claimed': self._claimed,
+                'missed': self._missed,
+                'reaped': self._reaped,
+            }
+
+    def __repr__(self):
+        return '%s(%r)' % ('StandbyPool', self.get_stats())
@@ -15,10 +15,7 @@ from ..process import (
     FileHandles,
     Process,
 )
-from ..util.fs import (
-    default_python_binary_path,
-    save_json_file,
-)
+from ..ycmd.cache import get_startup_cache
 from ..ycmd.constants import (
     YCMD_LOG_SPOOL_OUTPUT,
     YCMD_LOG_SPOOL_SIZE,
@@ -27,7 +24,7 @@ from ..ycmd.constants import (
 )
 from ..ycmd.settings import (
     get_default_settings_path,
-    generate_settings_data,
+    render_settings_template,
 )
 
 logger = logging.getLogger('sublime-ycmd.' + __name__)
@@ -112,7 +109,7 @@ class StartupParameters(object):
     @property
     def python_binary_path(self):
         if self._python_binary_path is None:
-            return default_python_binary_path()
+            return get_startup_cache().resolve_python_binary()
         return self._python_binary_path
 
     @python_binary_path.setter
@@ -368,9 +365,13 @@ def write_ycmd_settings_file(ycmd_settings_path, ycmd_hmac_secret, out=None):
     If `out` is provided, it should be a path to an output file (`str`), or a
     file-like handle (must support `.write`). This is not recommended for use
     with ycmd, as it may be insecure.
+    The template is parsed and serialized once, and cached until it changes
+    (see `StartupCache`). Only the `ycmd_hmac_secret` is filled in here.
     '''
-    ycmd_settings_data = generate_settings_data(
-        ycmd_settings_path, ycmd_hmac_secret,
+    settings_template = \
+        get_startup_cache().get_settings_template(ycmd_settings_path)
+    ycmd_settings_bytes = render_settings_template(
+        settings_template, ycmd_hmac_secret,
     )
 
     out_path = None
@@ -398,7 +399,7 @@ def write_ycmd_settings_file(ycmd_settings_path, ycmd_hmac_secret, out=None):
         logger.error('failed to get path for output file: %r', out)
         # fall through and write it out anyway
 
-    save_json_file(out, ycmd_settings_data)
+    out.write(ycmd_settings_bytes)
 
     flush()
     close()
@@ -428,13 +429,18 @@ def prepare_ycmd_process(startup_parameters, ycmd_settings_tempfile_path,
     # this may throw:
     check_startup_parameters(startup_parameters)
 
+    startup_cache = get_startup_cache()
     working_directory = startup_parameters.working_directory
-    python_binary_path = startup_parameters.python_binary_path
+    python_binary_path = startup_cache.resolve_python_binary(
+        startup_parameters.python_binary_path,
+    )
     server_idle_suicide_seconds = \
         startup_parameters.server_idle_suicide_seconds
     server_check_interval_seconds = \
         startup_parameters.server_check_interval_seconds
     ycmd_module_directory = startup_parameters.ycmd_module_directory
+    # this may also throw, but it is usually cached:
+    startup_cache.check_ycmd_module_directory(ycmd_module_directory)
 
     if YCMD_LOG_SPOOL_OUTPUT:
         stdout_log_spool = \
@@ -11,22 +11,58 @@ blocking calls whenever possible.
 import logging
 import tempfile
 import threading
+import time
 
 # for type annotations only:
 import concurrent                   # noqa: F401
 
+from concurrent.futures import Future
+
+from ..lib.subl.timer import set_timeout
 from ..lib.subl.view import (
     View,
     get_view_id,
-    get_path_for_window,
-    get_path_for_view,
+    get_window_id_for_view,
+    get_working_directory_for_view,
+)
+from ..lib.task.backend import (
+    DEFAULT_EXECUTOR_BACKEND,
+    check_executor_backend,
+    create_executor,
+)
+from ..lib.task.bulkhead import (
+    BulkheadFullError,
+    Bulkheads,
+    get_request_class,
+)
+from ..lib.task.cancel import CancellationToken
+from ..lib.task.continuation import chain_future
+from ..lib.task.executor import Executor     # noqa: F401
+from ..lib.task.metrics import Histogram
+from ..lib.task.pool import disown_task_pool
+from ..lib.task.priority import (
+    PRIORITY_INTERACTIVE,
+    PRIORITY_NOTIFICATION,
+    PRIORITY_STARTUP,
 )
-from ..lib.task.pool import (
-    Pool,
-    disown_task_pool,
+from ..lib.util.fs import get_base_name
+from ..lib.util.lock import (
+    InstrumentedLock,
+    lock_guard,
 )
-from ..lib.util.lock import lock_guard
+from ..lib.ycmd.cache import get_startup_cache
+from ..lib.ycmd.coalesce import EventCoalescer
+from ..lib.ycmd.limiter import (
+    DEFAULT_MAX_IN_FLIGHT,
+    RequestLimiter,
+)
+from ..lib.ycmd.offload import ResponseOffloader
+from ..lib.ycmd.registry import ServerRegistry
 from ..lib.ycmd.server import Server
+from ..lib.ycmd.standby import (
+    DEFAULT_STANDBY_IDLE_SECONDS,
+    StandbyPool,
+)
 from ..lib.ycmd.start import (
     StartupParameters,
     check_startup_parameters,
@@ -39,6 +75,13 @@ try:
 except ImportError:
     from ..lib.subl.dummy import sublime
 
+# histogram bucket upper bounds for the time to first completion, in seconds
+FIRST_COMPLETION_HISTOGRAM_BOUNDS = (
+    0.1, 0.2, 0.5, 1, 2, 5, 10, 20, 30, 60,
+)
+# seconds to wait for a standby server to shut down before giving up on it
+STANDBY_STOP_TIMEOUT = 5
+
 
 class SublimeYcmdServerManager(object):
     '''
@@ -49,16 +92,46 @@ class SublimeYcmdServerManager(object):
     '''
 
     def __init__(self):
-        self._servers = set()
-
         self._startup_parameters = None     # type: StartupParameters
-        self._task_pool = None              # type: Pool
+        self._log_file = None
+        self._task_pool = None              # type: Executor
+        self._task_pool_backend = None
+
+        self._lock = InstrumentedLock('SublimeYcmdServerManager')
+
+        # managed servers, along with the view/directory lookup tables:
+        self._registry = ServerRegistry()
+
+        # maps server -> `CancellationToken` for servers that are starting
+        self._startup_tokens = {}
 
-        self._lock = threading.RLock()
+        # buffer enter/leave events, sent immediately until configured:
+        self._event_coalescer = self._create_event_coalescer(0)
 
-        # lookup tables:
-        self._view_id_to_server = {}
-        self._working_directory_to_server = {}
+        # parses large completion responses in a child process, if enabled
+        self._response_offloader = None     # type: ResponseOffloader
+
+        # limits on outstanding requests per server and per request class
+        self._bulkheads = Bulkheads()
+
+        # maps server -> `RequestLimiter`, created on first request
+        self._request_limiters = {}
+        self._max_in_flight = DEFAULT_MAX_IN_FLIGHT
+
+        # servers started ahead of time, claimed for new projects
+        self._standby_pool = StandbyPool(
+            self._spawn_standby_server, self._stop_standby_server,
+            set_timeout=set_timeout,
+        )
+
+        # maps server -> (monotonic time, start kind) from when it was given
+        # to a project, until its first completion response
+        self._first_completion_lock = threading.Lock()
+        self._attach_times = {}
+        self._first_completion_times = {
+            'cold': Histogram(FIRST_COMPLETION_HISTOGRAM_BOUNDS),
+            'warm': Histogram(FIRST_COMPLETION_HISTOGRAM_BOUNDS),
+        }
 
     @lock_guard()
     def shutdown(self, hard=False, timeout=None):
@@ -96,15 +169,23 @@ class SublimeYcmdServerManager(object):
                 server.stop(timeout=timeout)
                 return server
 
-        if not self._servers:
+        # standbys are not registered, so stop them separately
+        self._standby_pool.clear()
+
+        # stop any servers that have not launched yet from doing so
+        for startup_token in list(self._startup_tokens.values()):
+            startup_token.cancel()
+
+        servers = self._registry.get_servers()
+        if not servers:
             # no servers to shutdown, so done
             logger.debug('no servers to shut down, done')
             return True
 
-        shutdown_futures = [
-            self._task_pool.submit(shutdown_server, server)
-            for server in self._servers
-        ]
+        shutdown_futures = self._task_pool.submit_many(
+            [(shutdown_server, (server,)) for server in servers],
+            priority=PRIORITY_STARTUP,
+        )
         finished_futures, unfinished_futures = concurrent.futures.wait(
             shutdown_futures, timeout=timeout,
         )
@@ -122,7 +203,7 @@ class SublimeYcmdServerManager(object):
                 assert isinstance(stopped_server, Server), \
                     '[internal] async shutdown did not return a Server: %r' % \
                     (stopped_server)
-                assert stopped_server in self._servers, \
+                assert stopped_server in self._registry, \
                     '[internal] server is not in managed server set: %r' % \
                     (stopped_server)
 
@@ -136,13 +217,17 @@ class SublimeYcmdServerManager(object):
 
         return all_shutdown_successfully
 
-    @lock_guard()
     def get(self, view):
         '''
         Returns a `Server` instance that has a suitable working directory for
         use with the supplied `view`.
         If one does not exist, it will be created asynchronously. In that case,
         the caller should inspect the returned instance and ensure it is ready.
+
+        The common case is a single dictionary lookup by view id, done without
+        taking the manager lock. View bindings are dropped when the server
+        dies, when the window project changes, or when the file is renamed, so
+        any binding found here is assumed to be valid.
         '''
         if not isinstance(view, (sublime.View, View)):
             raise TypeError('view must be a View: %r' % (view))
@@ -152,53 +237,36 @@ class SublimeYcmdServerManager(object):
             logger.error('failed to get view ID for view: %r', view)
             raise TypeError('view id must be an int: %r' % (view))
 
-        view_working_dir = get_path_for_view(view)
-
-        # also inspect the window for a working directory
-        # this is used to decide how to cache the lookup
-        should_cache_view_id = get_path_for_window(view) is not None
-
-        def lookup_by_view_id(view_id=view_id):
-            if view_id is not None and view_id in self._view_id_to_server:
-                return self._view_id_to_server[view_id]
-            return None
+        # fast path - dictionary reads are atomic, so no lock is required
+        server = self._registry.lookup_view(view_id)
+        if server is not None:
+            return server   # type: Server
 
-        def lookup_by_working_dir(working_dir):
-            if working_dir is not None and \
-                    working_dir in self._working_directory_to_server:
-                return self._working_directory_to_server[working_dir]
-            return None
+        return self._get_slow(view, view_id)
 
-        def cache_for_view_id(view_id=view_id, server=None):
-            if not view_id:
-                raise ValueError('view id must be an int: %r' % (view_id))
-            if view_id not in self._view_id_to_server:
-                logger.debug(
-                    'caching server by view id: %r -> %r', view_id, server,
-                )
-            self._view_id_to_server[view_id] = server
+    @lock_guard()
+    def _get_slow(self, view, view_id):
+        '''
+        Slow path for `get`. Calculates the working directory for `view`, and
+        looks up (or creates) a server for it. The result is bound to the view
+        id so subsequent calls can use the fast path.
+        '''
+        # another thread may have bound the view while we waited for the lock
+        server = self._registry.lookup_view(view_id)
+        if server is not None:
+            return server   # type: Server
 
-        def cache_for_working_dir(working_dir, server=None):
-            if not working_dir:
-                raise ValueError(
-                    'working directory must be a str: %r' % (working_dir)
-                )
-            if working_dir not in self._working_directory_to_server:
-                logger.debug(
-                    'caching server by working dir: %r -> %r',
-                    working_dir, server,
-                )
-            self._working_directory_to_server[working_dir] = server
+        view_working_dir, is_project_root = get_working_directory(view)
 
-        server = lookup_by_view_id(view_id)
+        logger.debug('no cached entry for view id: %r', view_id)
+        # matches the working directory, or the closest project root above
+        # it, so files in subdirectories share the enclosing project's server
+        server = self._registry.lookup_directory(view_working_dir)
         if server is None:
-            logger.debug('no cached entry for view id: %r', view_id)
-            server = lookup_by_working_dir(view_working_dir)
-            if server is None:
-                logger.debug(
-                    'no cached entry for working directory: %r',
-                    view_working_dir,
-                )
+            logger.debug(
+                'no cached entry for working directory: %r',
+                view_working_dir,
+            )
 
         if server is not None:
             # ensure server is either starting, or running
@@ -219,6 +287,14 @@ class SublimeYcmdServerManager(object):
                 self._unregister_server(server)
                 server = None
 
+        # set if a server is claimed or started for the project
+        start_kind = None
+        if not server:
+            server = self._claim_standby_server(
+                view_working_dir, is_project_root,
+            )
+            start_kind = 'warm'
+
         if not server:
             logger.info(
                 'creating ycmd server for project directory: %s',
@@ -241,18 +317,292 @@ class SublimeYcmdServerManager(object):
             )
 
             # create an empty handle and then fill it in off-thread
-            server = Server()
-            self._servers.add(server)
+            server = self._start_server(server_startup_parameters)
+            self._registry.add(server)
+            start_kind = 'cold'
+
+            if view_working_dir:
+                logger.debug(
+                    'caching server by working dir: %r -> %r',
+                    view_working_dir, server,
+                )
+                self._registry.bind_directory(
+                    view_working_dir, server, is_project_root=is_project_root,
+                )
 
-            self._task_pool.submit(server.start, server_startup_parameters)
-            logger.debug('initializing server off-thread: %r', server)
+        if start_kind is not None:
+            with self._first_completion_lock:
+                self._attach_times[server] = (time.monotonic(), start_kind)
 
-        if should_cache_view_id:
-            cache_for_view_id(view_id, server)
-        cache_for_working_dir(view_working_dir, server)
+        # the binding is dropped on rename (see `invalidate_view`), so it is
+        # safe to cache by view id even when the path came from the file name
+        logger.debug('caching server by view id: %r -> %r', view_id, server)
+        self._registry.bind_view(view_id, server)
 
         return server   # type: Server
 
+    def _start_server(self, startup_parameters):
+        '''
+        Creates a `Server`, and starts it off-thread with `startup_parameters`.
+        Returns the server, which is marked as starting. It is not registered.
+        '''
+        server = Server()
+        server.add_status_callback(self._on_server_status)
+        # mark it as starting now, so requests for it are parked until it
+        # is running, instead of failing (see `_submit_when_running`)
+        server.set_status(Server.STARTING)
+
+        startup_token = CancellationToken()
+        self._startup_tokens[server] = startup_token
+        startup_future = self._task_pool.submit(
+            server.start, startup_parameters,
+            priority=PRIORITY_STARTUP, cancel_token=startup_token,
+        )
+        startup_future.add_done_callback(
+            lambda future, server=server:
+            self._on_server_startup_done(server, future)
+        )
+        logger.debug('initializing server off-thread: %r', server)
+        return server
+
+    def _claim_standby_server(self, working_directory, is_project_root):
+        '''
+        Claims a standby server for the project in `working_directory`, and
+        registers it. Returns `None` if there are no standbys. The directory
+        is bound as in `ServerRegistry.bind_directory`.
+
+        Standbys run in a neutral working directory. Completers that resolve
+        files relative to it (e.g. tern) may work better with a server started
+        for the project, so standbys are disabled by default.
+        '''
+        server = self._standby_pool.claim()
+        if server is None:
+            return None
+
+        logger.info(
+            'using standby server for project directory: %s',
+            working_directory,
+        )
+        self._registry.add(server)
+        if working_directory:
+            server.label = get_base_name(working_directory)
+            self._registry.bind_directory(
+                working_directory, server, is_project_root=is_project_root,
+            )
+        return server
+
+    def _spawn_standby_server(self):
+        '''
+        Starts a standby server, using the startup parameters with a neutral
+        working directory. Returns `None` if servers cannot be started yet.
+        '''
+        task_pool = self._task_pool
+        with self._lock:
+            if task_pool is None or self._startup_parameters is None:
+                return None
+            startup_parameters = self._startup_parameters.copy()
+            log_file = self._log_file
+
+        startup_parameters.working_directory = tempfile.gettempdir()
+        add_log_file_parameters(startup_parameters, log_file=log_file)
+        check_startup_parameters(startup_parameters)
+
+        logger.debug('starting standby server')
+        return self._start_server(startup_parameters)
+
+    def _stop_standby_server(self, server):
+        '''
+        Stops an unclaimed standby server off-thread. If it has not launched
+        yet, it is cancelled instead.
+        '''
+        startup_token = self._startup_tokens.get(server)
+        if startup_token is not None:
+            startup_token.cancel()
+
+        task_pool = self._task_pool
+        if task_pool is None:
+            logger.warning('no task pool, cannot stop server: %r', server)
+            return
+        task_pool.submit(
+            server.stop, timeout=STANDBY_STOP_TIMEOUT,
+            priority=PRIORITY_STARTUP,
+        )
+
+    def invalidate_view(self, view):
+        '''
+        Drops the cached server binding for `view`. The next call to `get` will
+        recalculate the working directory for it.
+
+        This should be called whenever the path for a view changes, e.g. after
+        the file is saved under a new name.
+        '''
+        view_id = get_view_id(view)
+        if view_id is None:
+            logger.error('failed to get view id for view: %r', view)
+            raise TypeError('view must be a View: %r' % (view))
+
+        if self._registry.unbind_view(view_id) is not None:
+            logger.debug('cleared server binding for view id: %r', view_id)
+
+    def invalidate_window(self, window):
+        '''
+        Drops the cached server bindings for all views in `window`.
+
+        This should be called whenever the project data for a window changes,
+        as that affects the working directory of every view in it.
+        '''
+        if window is None:
+            logger.debug('no window, nothing to invalidate')
+            return
+
+        for view in window.views():
+            self.invalidate_view(view)
+
+    def _on_server_startup_done(self, server, startup_future):
+        '''
+        Done callback for the server startup task. If the task was dropped, or
+        failed before the server could update its status, it is still marked
+        as starting. Reset it, which fails any requests parked on it.
+        '''
+        if not startup_future.cancelled() and \
+                startup_future.exception() is None:
+            return
+
+        if server.is_starting():
+            logger.debug('server startup did not finish: %r', server)
+            server.set_status(Server.NULL)
+
+    def _submit_request(self, ycmd_server, view_id, submit, *args, **kwargs):
+        '''
+        Same as `_submit_when_running`, but once the server is running, the
+        request is sent through its request limiter, which queues it fairly
+        with requests for other views (using `view_id`) if too many are in
+        flight.
+
+        When the limiter sends the request, it takes a slot in the bulkheads
+        for `ycmd_server` and its request class (based on the `priority`
+        keyword argument) until it is done. Requests that are only queued in
+        the limiter (or parked while the server is starting) are not counted,
+        so a burst of requests to a healthy server is not mistaken for a
+        stuck one.
+
+        If either bulkhead is full when the request is sent, it is not
+        submitted, and the returned future fails with a `BulkheadFullError`.
+        Requests parked while the server is starting were already accepted,
+        so they are never rejected.
+        '''
+        server_key = ycmd_server.id
+        request_class = get_request_class(kwargs.get('priority'))
+        request_limiter = self._get_request_limiter(ycmd_server)
+        window_id = get_window_id_for_view(view_id)
+
+        def submit_with_slot(check_limit):
+            slot = self._bulkheads.acquire(
+                server_key, request_class, check_limit=check_limit,
+            )
+            try:
+                future = submit(*args, **kwargs)
+            except Exception:
+                self._bulkheads.release(slot)
+                raise
+
+            future.add_done_callback(
+                lambda future: self._bulkheads.release(slot)
+            )
+            return future
+
+        def submit_request(check_limit):
+            return request_limiter.submit(
+                window_id, view_id, submit_with_slot, check_limit,
+            )
+
+        if ycmd_server.is_starting():
+            return self._submit_when_running(
+                ycmd_server, submit_request, False,
+            )
+
+        try:
+            return submit_request(True)
+        except BulkheadFullError as e:
+            logger.debug('rejecting request, bulkhead is full: %s', e)
+            future = Future()
+            future.set_exception(e)
+            return future
+
+    def _get_request_limiter(self, server):
+        request_limiter = self._request_limiters.get(server)
+        if request_limiter is None:
+            # may race with another thread, so keep whichever was set first
+            request_limiter = self._request_limiters.setdefault(
+                server, RequestLimiter(self._max_in_flight),
+            )
+        return request_limiter
+
+    def _submit_when_running(self, ycmd_server, submit, *args, **kwargs):
+        '''
+        Calls `submit(*args, **kwargs)` (e.g. a task pool method) once
+        `ycmd_server` is running, and returns a future for the result of the
+        submitted task. It is not called `server`, since that is a common
+        keyword argument for the task functions.
+
+        Requests for a server that is still starting are parked on it, instead
+        of occupying a worker that waits for startup to finish. They are
+        submitted in order once it is running. If the server stops instead,
+        the returned future fails with a `RuntimeError`.
+        '''
+        if not ycmd_server.is_starting():
+            # submit it directly, it fails when sent if the server is stopped
+            return submit(*args, **kwargs)
+
+        future = Future()
+
+        def on_running():
+            if future.cancelled():
+                return
+            try:
+                task_future = submit(*args, **kwargs)
+            except Exception as e:
+                future.set_exception(e)
+                return
+            chain_future(task_future, future)
+
+        def on_failed(error):
+            if not future.cancelled():
+                future.set_exception(error)
+
+        ycmd_server.when_running(on_running, on_failed)
+        return future
+
+    def _on_server_status(self, server, previous_status, status):
+        '''
+        Status callback registered on each managed server. Drops the view id
+        bindings for a server once it has stopped, so `get` falls back to the
+        slow path (which will then unregister it).
+
+        This may run with the server lock held, so the manager lock is not
+        acquired here. The registry lock is never held while calling out, so
+        it is safe to take.
+        '''
+        if status != Server.STARTING:
+            # dictionary writes are atomic, so no lock is required
+            self._startup_tokens.pop(server, None)
+
+        if status != Server.NULL:
+            return
+
+        self._event_coalescer.discard(server)
+        self._bulkheads.discard(server.id)
+        self._request_limiters.pop(server, None)
+        with self._first_completion_lock:
+            self._attach_times.pop(server, None)
+
+        view_ids = self._registry.unbind_views(server)
+        if view_ids:
+            logger.debug(
+                'server has stopped, clearing bindings for views: %s',
+                view_ids,
+            )
+
     @lock_guard()
     def set_startup_parameters(self, startup_parameters):
         '''
@@ -276,42 +626,248 @@ class SublimeYcmdServerManager(object):
         self._startup_parameters = startup_parameters
 
     @lock_guard()
-    def set_background_threads(self, background_threads):
+    def set_background_threads(self, background_threads, backend=None):
         '''
-        Sets the number of background threads used for running tasks.
+        Sets the number of background threads used for running tasks, and the
+        executor backend that runs them (see `lib.task.backend`). The backend
+        defaults to the task pool.
 
         These tasks are run off-thread so they won't block the main thread. It
         includes process management (starting and shutting down the servers),
         and sending event notifications (loading and unloading buffers).
 
-        When called, the pre-existing task pool is shut down. This is done on
-        a detached thread, so it won't block the caller. All tasks in that pool
-        will run to completion, and then the pool will be terminated. The old
-        task pool will no longer be accessible via this instance.
-
-        If `background_threads` is omitted, this method then returns without
-        re-allocating a new task pool.
+        The task pool is elastic, so `background_threads` is the maximum. The
+        workers are only started when there is work for them, and exit again
+        once idle. If a task pool already exists with the same backend, it is
+        resized in place, and queued tasks are kept. Otherwise, the previous
+        pool is shut down in the background, as below.
 
-        Otherwise, a new task pool will be allocated, and `background_threads`
-        workers are automatically started for it. This task pool will then be
-        used for all subsequent operations by this manager.
+        If `background_threads` is omitted, the pre-existing task pool is shut
+        down. This is done on a detached thread, so it won't block the caller.
+        All tasks in that pool will run to completion, and then the pool will
+        be terminated.
         '''
-        if self._task_pool is not None:
-            logger.debug('discarding current task pool')
-            disown_task_pool(self._task_pool)
-            del self._task_pool
-
-        if background_threads is None:
-            logger.debug('not starting another task pool, returning')
+        if backend is None:
+            backend = DEFAULT_EXECUTOR_BACKEND
+        check_executor_backend(backend)
+
+        if background_threads is None or \
+                backend != self._task_pool_backend:
+            if self._task_pool is not None:
+                logger.debug('discarding current task pool')
+                disown_task_pool(self._task_pool)
+                self._task_pool = None
+                self._task_pool_backend = None
+            if background_threads is None:
+                return
+
+        if self._task_pool is not None and self._task_pool.running:
+            logger.debug(
+                'resizing task pool to %d workers', background_threads,
+            )
+            self._task_pool.resize(
+                min_workers=min(1, background_threads),
+                max_workers=background_threads,
+            )
             return
 
         logger.debug(
-            'creating new task pool with %d workers', background_threads,
+            'creating new %s task pool with up to %d workers',
+            backend, background_threads,
         )
 
-        self._task_pool = Pool(
-            max_workers=background_threads,
+        self._task_pool = create_executor(
+            backend, max_workers=background_threads,
             thread_name_prefix='sublime-ycmd-background-thread-',
+            set_timeout_async=set_timeout,
+        )
+        self._task_pool_backend = backend
+
+    @lock_guard()
+    def set_event_coalescing(self, window_ms):
+        '''
+        Sets the window, in milliseconds, used to coalesce buffer enter/leave
+        events. Events for a buffer within the window are reduced to the final
+        one, and only sent if the server does not already have that state.
+
+        If `window_ms` is `0`, events are sent as soon as they happen.
+
+        Any events pending on the previous coalescer are sent immediately.
+        '''
+        if not isinstance(window_ms, int):
+            raise TypeError('window must be an int: %r' % (window_ms))
+        if window_ms < 0:
+            raise ValueError('window must be non-negative: %r' % (window_ms))
+
+        previous_coalescer = self._event_coalescer
+        self._event_coalescer = self._create_event_coalescer(window_ms)
+        previous_coalescer.flush()
+
+    @lock_guard()
+    def set_response_offloading(self, threshold_kb,
+                                python_binary_path=None):
+        '''
+        Sets the size, in kilobytes, above which completion responses are
+        decoded in a child process. The child runs `python_binary_path`, which
+        should be the ycmd python binary.
+
+        If `threshold_kb` is `0`, all responses are decoded in-process. If the
+        options have changed, any previous process pool is shut down.
+        '''
+        if not isinstance(threshold_kb, int):
+            raise TypeError('threshold must be an int: %r' % (threshold_kb))
+        if threshold_kb < 0:
+            raise ValueError(
+                'threshold must be non-negative: %r' % (threshold_kb)
+            )
+
+        previous_offloader = self._response_offloader
+        if previous_offloader is not None and \
+                previous_offloader.threshold == threshold_kb * 1024 and \
+                previous_offloader.python_binary_path == python_binary_path:
+            return
+
+        self._response_offloader = None
+        if previous_offloader is not None:
+            previous_offloader.shutdown(wait=False)
+
+        if threshold_kb:
+            logger.debug(
+                'offloading completion responses over %dkb', threshold_kb,
+            )
+            self._response_offloader = ResponseOffloader(
+                threshold=threshold_kb * 1024,
+                python_binary_path=python_binary_path,
+            )
+            self._response_offloader.start()
+
+    def get_response_offloader(self):
+        '''
+        Returns the `ResponseOffloader` for large completion responses, or
+        `None` if they are always parsed in-process.
+        '''
+        return self._response_offloader
+
+    def get_task_pool_metrics(self):
+        '''
+        Returns the metrics for the background task pool, or `None` if there
+        is no task pool. See `Pool.get_metrics`. The metrics also include the
+        name of the executor backend, the bulkhead statistics (see
+        `Bulkheads.get_stats`), and the request limiter statistics for each
+        server, keyed by server id (see `RequestLimiter.get_stats`). The time
+        each running server took to become ready is included as well, also
+        keyed by server id (see `Server.time_to_ready`), along with the time
+        spent in each startup step (see `Server.startup_timings`), and the
+        startup cache statistics (see `StartupCache.get_stats`).
+
+        The standby server statistics (see `StandbyPool.get_stats`), and the
+        time from a project getting a server until its first completion are
+        also included. The latter is split into servers started for the
+        project ("cold"), and claimed standbys ("warm").
+        '''
+        task_pool = self._task_pool
+        if task_pool is None:
+            return None
+        metrics = task_pool.get_metrics()
+        metrics['backend'] = self._task_pool_backend
+        metrics['bulkheads'] = self._bulkheads.get_stats()
+        metrics['request_limiters'] = dict(
+            (server.id, request_limiter.get_stats())
+            for server, request_limiter in list(self._request_limiters.items())
+        )
+        metrics['time_to_ready'] = dict(
+            (server.id, server.time_to_ready)
+            for server in self._registry.get_servers()
+            if server.time_to_ready is not None
+        )
+        metrics['startup_timings'] = dict(
+            (server.id, server.startup_timings)
+            for server in self._registry.get_servers()
+        )
+        metrics['startup_cache'] = get_startup_cache().get_stats()
+        metrics['standby'] = self._standby_pool.get_stats()
+        with self._first_completion_lock:
+            metrics['time_to_first_completion'] = dict(
+                (start_kind, times.to_dict())
+                for start_kind, times in self._first_completion_times.items()
+            )
+        return metrics
+
+    def set_bulkhead_limits(self, limits):
+        '''
+        Sets the limits on outstanding requests for each server, and for each
+        request class (interactive and background). The `limits` should map
+        the `BULKHEAD_*` kinds to limits, where `0` means unlimited.
+
+        Requests over a limit are rejected, instead of being queued behind
+        requests for a server that has stopped responding.
+        '''
+        self._bulkheads.set_limits(limits)
+
+    def set_server_max_requests(self, max_in_flight):
+        '''
+        Sets the maximum number of requests in flight to each server. Others
+        are queued, and sent round-robin across views as requests finish.
+        If `max_in_flight` is `0`, requests are never queued.
+        '''
+        if not isinstance(max_in_flight, int):
+            raise TypeError(
+                'max in flight must be an int: %r' % (max_in_flight)
+            )
+        if max_in_flight < 0:
+            raise ValueError(
+                'max in flight must be non-negative: %r' % (max_in_flight)
+            )
+
+        self._max_in_flight = max_in_flight
+        for request_limiter in list(self._request_limiters.values()):
+            request_limiter.set_max_in_flight(max_in_flight)
+
+    def set_standby_servers(self, count,
+                            idle_seconds=DEFAULT_STANDBY_IDLE_SECONDS):
+        '''
+        Sets the number of standby servers to keep started, ready to be
+        claimed by new projects. They are stopped after `idle_seconds` without
+        a new project, and started again when the next one is opened. If
+        `idle_seconds` is `0`, they are kept until shutdown.
+
+        Standbys use the current startup parameters, so this should be called
+        after `set_startup_parameters` and `set_background_threads`.
+        '''
+        self._standby_pool.configure(count, idle_seconds)
+
+    def record_completion(self, server):
+        '''
+        Records that a completion response was received from `server`. The
+        first one after it was given to a project is counted in the time to
+        first completion (see `get_task_pool_metrics`).
+        '''
+        with self._first_completion_lock:
+            attach_info = self._attach_times.pop(server, None)
+            if attach_info is None:
+                return
+            attach_time, start_kind = attach_info
+            self._first_completion_times[start_kind].record(
+                time.monotonic() - attach_time,
+            )
+
+    def get_event_stats(self):
+        '''
+        Returns a `dict` with the number of buffer enter/leave events received,
+        coalesced away, and sent by the current coalescer.
+        '''
+        return self._event_coalescer.get_stats()
+
+    def _create_event_coalescer(self, window_ms):
+        def submit(fn, server, view_id):
+            return self._submit_request(
+                server, view_id, self._task_pool.submit_keyed,
+                get_buffer_task_key(server, view_id), fn,
+                priority=PRIORITY_NOTIFICATION,
+            )
+
+        return EventCoalescer(
+            window_ms / 1000.0, submit, set_timeout=set_timeout,
         )
 
     @lock_guard()
@@ -349,15 +905,14 @@ class SublimeYcmdServerManager(object):
         # are based on other inputs (e.g. working directory).
         self._log_file = log_file
 
-    @lock_guard()
     def get_servers(self):
         '''
         Returns a shallow-copy of the set of managed `Server` instances.
         '''
-        return self._servers.copy()
+        return self._registry.get_servers()
 
     @lock_guard()
-    def notify_enter(self, view, parse_file=True):
+    def notify_enter(self, view, parse_file=True, request_params=None):
         '''
         Sends a notification to the ycmd server that the file for `view` has
         been activated. This will create and cache file-specific identifiers.
@@ -366,13 +921,21 @@ class SublimeYcmdServerManager(object):
         indicate that the file should be parsed for identifiers. Otherwise,
         this step is skipped. This is optional, but gives better completions.
 
+        If `request_params` are omitted, they are generated from the view.
+
+        The request is held briefly to coalesce it with other events for the
+        same buffer (see `set_event_coalescing`). If `parse_file` is true, it
+        is always sent. The returned future is cancelled if the event was
+        coalesced away.
+
         The actual request is sent asynchronously via a task pool, so this
         won't block the caller.
         '''
         if not isinstance(view, View):
             raise TypeError('view must be a View: %r' % (view))
 
-        request_params = view.generate_request_parameters()
+        if request_params is None:
+            request_params = view.generate_request_parameters()
         if not request_params:
             logger.debug('failed to generate request params, abort')
             return None
@@ -406,9 +969,47 @@ class SublimeYcmdServerManager(object):
                     server=server, request_params=request_params,
                 )
 
-        notify_future = self._task_pool.submit(
-            notify_enter_async,
+        notify_future = self._event_coalescer.enter(
+            server, view.id(), notify_enter_async, force=parse_file,
+        )   # type: concurrent.futures.Future
+        return notify_future
+
+    @lock_guard()
+    def notify_ready_to_parse(self, view, request_params=None):
+        '''
+        Sends a notification to the ycmd server that the file for `view`
+        should be parsed. This refreshes identifiers and diagnostics for it.
+
+        If `request_params` are omitted, they are generated from the view.
+
+        The actual request is sent asynchronously via a task pool, so this
+        won't block the caller.
+        '''
+        if not isinstance(view, View):
+            raise TypeError('view must be a View: %r' % (view))
+
+        if request_params is None:
+            request_params = view.generate_request_parameters()
+        if not request_params:
+            logger.debug('failed to generate request params, abort')
+            return None
+
+        server = self.get(view)
+        if not server:
+            logger.warning('failed to get server for view: %r', view)
+            return None
+
+        def notify_ready_to_parse_async(server=server,
+                                        request_params=request_params):
+            server.notify_file_ready_to_parse(request_params)
+
+        # keyed, so it is sent after any pending enter for the same buffer
+        notify_future = self._submit_request(
+            server, view.id(), self._task_pool.submit_keyed,
+            get_buffer_task_key(server, view.id()),
+            notify_ready_to_parse_async,
             server=server, request_params=request_params,
+            priority=PRIORITY_NOTIFICATION,
         )   # type: concurrent.futures.Future
         return notify_future
 
@@ -418,6 +1019,10 @@ class SublimeYcmdServerManager(object):
         Sends a notification to the ycmd server that the file for `view` has
         been deactivated. This will allow the server to release caches.
 
+        The request is held briefly to coalesce it with other events for the
+        same buffer (see `set_event_coalescing`). The returned future is
+        cancelled if the event was coalesced away.
+
         The actual request is sent asynchronously via a task pool, so this
         won't block the caller.
         '''
@@ -439,9 +1044,8 @@ class SublimeYcmdServerManager(object):
             server.notify_buffer_leave(request_params)
 
         notify_exit_async = notify_buffer_leave
-        notify_future = self._task_pool.submit(
-            notify_exit_async,
-            server=server, request_params=request_params,
+        notify_future = self._event_coalescer.leave(
+            server, view.id(), notify_exit_async,
         )   # type: concurrent.futures.Future
 
         return notify_future
@@ -475,14 +1079,16 @@ class SublimeYcmdServerManager(object):
                 server.ignore_extra_conf(extra_conf_path)
 
         notify_use_conf_async = notify_use_conf
-        notify_future = self._task_pool.submit(
+        # the user is waiting on this, as it was prompted for
+        notify_future = self._submit_request(
+            server, get_view_id(view), self._task_pool.submit,
             notify_use_conf_async,
             server=server, extra_conf_path=extra_conf_path,
+            priority=PRIORITY_INTERACTIVE,
         )   # type: concurrent.futures.Future
 
         return notify_future
 
-    @lock_guard()
     def _lookup_server(self, view):
         '''
         Looks up an available server for the given `view`. This calculation is
@@ -497,23 +1103,22 @@ class SublimeYcmdServerManager(object):
             raise TypeError('view must be a View: %r' % (view))
 
         # check each cache, from fastest lookup to slowest
-        if view_id in self._view_id_to_server:
-            server = self._view_id_to_server[view_id]   # type: Server
+        server = self._registry.lookup_view(view_id)
+        if server is not None:
             assert isinstance(server, Server), \
                 '[internal] server is not a Server: %r' % (server)
-            return server
+            return server   # type: Server
 
-        view_path = get_path_for_view(view)
+        view_path, _ = get_working_directory(view)
         if view_path is None:
             # can't do the lookup for working directory
             logger.debug('could not get path for view, ignoring: %r', view)
-        elif view_path in self._working_directory_to_server:
-            # add the mapping in view id as well
-            wdts = self._working_directory_to_server
-            server = wdts[view_path]    # type: Server
-            assert isinstance(server, Server), \
-                '[internal] server is not a Server: %r' % (server)
-            return server
+        else:
+            server = self._registry.lookup_directory(view_path)
+            if server is not None:
+                assert isinstance(server, Server), \
+                    '[internal] server is not a Server: %r' % (server)
+                return server
 
         # not in a cache, so assume no server exists for that view
         return None
@@ -523,36 +1128,26 @@ class SublimeYcmdServerManager(object):
         if not isinstance(server, Server):
             raise TypeError('server must be a Server: %r' % (server))
 
-        if server not in self._servers:
+        try:
+            view_ids, working_directories = self._registry.remove(server)
+        except KeyError:
             logger.error(
                 'server was never registered in server manager: %s',
                 server.pretty_str(),
             )
             return False
 
-        view_map = self._view_id_to_server
-        view_keys = list(filter(
-            lambda k: view_map[k] == server, view_map,
-        ))
-        if view_keys:
-            logger.debug('clearing server for views: %s', view_keys)
-        for view_key in view_keys:
-            del view_map[view_key]
-
-        working_directory_map = self._working_directory_to_server
-        working_directory_keys = list(filter(
-            lambda k: working_directory_map[k] == server,
-            working_directory_map,
-        ))
-        if working_directory_keys:
+        self._startup_tokens.pop(server, None)
+
+        if view_ids:
+            logger.debug('cleared server for views: %s', view_ids)
+        if working_directories:
             logger.debug(
-                'clearing server for working directories: %s',
-                working_directory_keys,
+                'cleared server for working directories: %s',
+                working_directories,
             )
-        for working_directory_key in working_directory_keys:
-            del working_directory_map[working_directory_key]
 
-        self._servers.remove(server)
+        return True
 
     def _generate_startup_parameters(self, view):
         '''
@@ -572,7 +1167,7 @@ class SublimeYcmdServerManager(object):
             log_file = self._log_file
 
         # now mess with the copy and fill in information from the view
-        view_working_dir = get_path_for_view(view)
+        view_working_dir, _ = get_working_directory(view)
         if view_working_dir:
             startup_parameters.working_directory = view_working_dir
         # else, whatever, we tried
@@ -603,16 +1198,41 @@ class SublimeYcmdServerManager(object):
             return
         self._unregister_server(server)
 
-    @lock_guard()
     def __len__(self):
         ''' Returns the number of servers held in the manager. '''
-        return len(self._servers)
+        return len(self._registry)
 
     def __bool__(self):
         ''' Returns true. Meant to prevent `len` from being used. '''
         return True
 
 
+def get_buffer_task_key(server, view_id):
+    '''
+    Returns the task pool key used for notifications about the buffer for
+    `view_id` on `server`. Notifications with the same key are sent in order,
+    while different buffers and servers are notified in parallel.
+    '''
+    return (server.id, view_id)
+
+
+def get_working_directory(view):
+    '''
+    Returns the working directory for `view`, and whether it is a project
+    root, as calculated by `get_working_directory_for_view`. For wrapped
+    views, the result is cached in the view state. The cache is cleared by the
+    view manager when the path may change.
+    '''
+    if not isinstance(view, View):
+        return get_working_directory_for_view(view)
+
+    view_state = view.state
+    if view_state.project_root is None:
+        view_state.project_root, view_state.is_project_root = \
+            get_working_directory_for_view(view)
+    return view_state.project_root, view_state.is_project_root
+
+
 def read_spooled_output(spool):
     def has_method(obj, method):
         return hasattr(obj, method) and callable(getattr(obj, method))
@@ -9,6 +9,7 @@ manager and view manager.
 '''
 
 import logging
+import time
 
 from ..lib.schema import (
     Completions,
@@ -16,6 +17,10 @@ from ..lib.schema import (
     Diagnostics,
     DiagnosticError,
 )
+from ..lib.subl.constants import (
+    SUBLIME_PARSE_POLICY_IDLE,
+    SUBLIME_PARSE_POLICY_SAVE,
+)
 from ..lib.subl.errors import PluginError
 from ..lib.subl.settings import (
     Settings,
@@ -23,10 +28,24 @@ from ..lib.subl.settings import (
     has_same_ycmd_settings,
     has_same_task_pool_settings,
 )
+from ..lib.subl.timer import (
+    set_main_timeout,
+    set_timeout,
+)
 from ..lib.subl.view import (
     View,
     get_file_types,
+    get_view_id,
+)
+from ..lib.task.continuation import (
+    ON_MAIN,
+    MainThreadDispatcher,
 )
+from ..lib.task.deadline import (
+    PHASE_SNAPSHOT,
+    Deadline,
+)
+from ..lib.task.debounce import Debouncer
 from ..lib.ycmd.start import StartupParameters
 
 from ..plugin.log import configure_logging
@@ -44,6 +63,11 @@ try:
 except ImportError:
     from ..lib.subl.dummy import sublime
 
+# time budget for a completion request, in seconds, from the time sublime asks
+# for completions until they are returned
+# TODO : Allow configurable completion timeout.
+COMPLETION_REQUEST_TIMEOUT = 0.6
+
 
 class SublimeYcmdState(object):
     '''
@@ -55,16 +79,23 @@ class SublimeYcmdState(object):
         self._server_manager = SublimeYcmdServerManager()
         self._view_manager = SublimeYcmdViewManager()
         self._settings = None
+        self._parse_scheduler = None
+        # view state updates and prompts are applied on the main thread
+        self._main_dispatcher = MainThreadDispatcher(
+            set_timeout=set_main_timeout,
+        )
         self.reset()
 
     def reset(self):
         ''' Stops all ycmd servers and clears all settings. '''
         self._server_manager.shutdown(hard=True, timeout=0)
         self._server_manager.set_background_threads(1)
+        self._server_manager.set_response_offloading(0)
 
         self._view_manager.reset()
 
         self._settings = None
+        self._parse_scheduler = None
 
     def configure(self, settings):
         '''
@@ -137,7 +168,32 @@ class SublimeYcmdState(object):
         if self._requires_task_pool_restart(settings):
             logger.debug('shutting down and recreating task pool')
             background_threads = settings.sublime_ycmd_background_threads
-            self._server_manager.set_background_threads(background_threads)
+            self._server_manager.set_background_threads(
+                background_threads,
+                backend=settings.sublime_ycmd_task_executor,
+            )
+
+        # outstanding timers on the previous scheduler will find no entries
+        parse_delay = settings.sublime_ycmd_parse_delay_ms / 1000.0
+        self._parse_scheduler = Debouncer(parse_delay, set_timeout=set_timeout)
+
+        self._server_manager.set_event_coalescing(
+            settings.sublime_ycmd_event_coalesce_ms,
+        )
+        self._server_manager.set_response_offloading(
+            settings.sublime_ycmd_offload_threshold_kb,
+            python_binary_path=settings.ycmd_python_binary_path,
+        )
+        self._server_manager.set_bulkhead_limits(
+            settings.sublime_ycmd_bulkhead_limits,
+        )
+        self._server_manager.set_server_max_requests(
+            settings.sublime_ycmd_server_max_requests,
+        )
+        self._server_manager.set_standby_servers(
+            settings.sublime_ycmd_standby_servers,
+            idle_seconds=settings.sublime_ycmd_standby_idle_seconds,
+        )
 
         logger.debug('successfully configured with settings: %s', settings)
         self._settings = settings
@@ -156,6 +212,8 @@ class SublimeYcmdState(object):
 
         NOTE : This does not respect the language whitelist/blacklist.
         '''
+        self._sweep_closed_views()
+
         view = self._view_manager[view]     # type: View
         if not view:
             logger.debug('no view wrapper, ignoring activate event')
@@ -164,7 +222,7 @@ class SublimeYcmdState(object):
         if not view.ready():
             logger.debug('file is not ready for parsing, ignoring')
             return False
-        if not get_file_types(view):
+        if not self._get_file_types(view, refresh=True):
             logger.debug('file has no associated file types, ignoring it')
             # in this case, return true to indicate that this is acceptable
             return True
@@ -177,15 +235,30 @@ class SublimeYcmdState(object):
             logger.debug('no server for view, ignoring activate event')
             return False
 
-        # TODO : Use view manager to determine when file needs to be re-parsed.
-        parse_file = True
+        # read the change count first, so an edit made while the contents are
+        # being read is never recorded as parsed
+        change_count = view.change_count()
+        request_params = view.generate_request_parameters()
+        if not request_params:
+            logger.debug('failed to generate request params, abort')
+            return False
+
+        file_contents = request_params.file_contents
+        parse_file = self._view_manager.needs_ready_to_parse(
+            view, server, change_count, file_contents,
+        )
+        if not parse_file:
+            logger.debug('file is unchanged since last parse, skipping it')
 
         notify_future = self._server_manager.notify_enter(
-            view, parse_file=parse_file,
+            view, parse_file=parse_file, request_params=request_params,
         )
+        if not notify_future:
+            logger.debug('failed to send notification for view')
+            return False
 
         def on_notified_ready_to_parse(future):
-            ''' Called by `Future.add_done_callback` after completion. '''
+            ''' Called on the main thread after completion. '''
             if future.cancelled():
                 logger.debug('notification was cancelled, ignoring result')
                 return
@@ -197,12 +270,19 @@ class SublimeYcmdState(object):
             logger.debug(
                 'finished notifying server, marking view as having been sent'
             )
-            self._view_manager.set_notified_ready_to_parse(
-                view, server, has_notified=True,
-            )
+            if parse_file:
+                self._view_manager.set_notified_ready_to_parse(
+                    view, server, has_notified=True,
+                    change_count=change_count, file_contents=file_contents,
+                )
+            else:
+                self._view_manager.set_notified_ready_to_parse(
+                    view, server, has_notified=True,
+                )
 
-        # As noted above, always notify, so always set the flag
-        notify_future.add_done_callback(on_notified_ready_to_parse)
+        self._main_dispatcher.then(
+            notify_future, on_notified_ready_to_parse, on=ON_MAIN,
+        )
 
         return True
 
@@ -223,7 +303,7 @@ class SublimeYcmdState(object):
         if not view.ready():
             logger.debug('file is not ready for parsing, ignoring')
             return False
-        if not get_file_types(view):
+        if not self._get_file_types(view):
             logger.debug('file has no associated file types, ignoring it')
             # in this case, return true to indicate that this is acceptable
             return True
@@ -241,36 +321,209 @@ class SublimeYcmdState(object):
             logger.debug('failed to generate request params, abort')
             return False
 
-        # NOTE : Technically, this only has to be done when the buffer is
-        #        different than it was when it was activated. But to keep it
-        #        simple, we'll just check if it's dirty...
-        #        (Not optimal, but good enough.)
-        # TODO : Store the last `view.change_count()` to do the comparison.
-        if view.dirty():
-            logger.debug(
-                'file has unsaved changes, '
-                'so it will need to be sent to the server again'
-            )
-            # unlike the buffer enter event, we can unflag immediately, instead
-            # of asynchronously after the notification has been sent
-            # worst case: have to notify ready-to-parse more than required
-            self._view_manager.set_notified_ready_to_parse(
-                view, server, has_notified=False,
-            )
+        # NOTE : No need to unflag the view here, even if it has unsaved
+        #        changes. The parsed version is recorded for each server, and
+        #        the next activation will compare against it.
 
         logger.debug('sending notification for unloading buffer')
         self._server_manager.notify_exit(view)
 
         return True
 
-    def completions_for_view(self, view):
+    def invalidate_view(self, view):
+        '''
+        Clears the cached server for the given `view`. This should be called
+        when the file path for the view changes (e.g. after a "save as"), since
+        the project directory may no longer be the same.
+        '''
+        self._view_manager.invalidate_view(view)
+        self._server_manager.invalidate_view(view)
+
+    def invalidate_window(self, window):
+        '''
+        Clears the cached servers for all views in the given `window`. This
+        should be called when the project for the window changes.
+        '''
+        if window is not None:
+            for view in window.views():
+                self._view_manager.invalidate_view(view)
+        self._server_manager.invalidate_window(window)
+
+    def modify_view(self, view):
+        '''
+        Schedules the buffer for the given `view` to be parsed once editing
+        pauses. This only applies to file types with the idle parse policy.
+        Repeated calls only push back the deadline.
+        '''
+        parse_scheduler = self._parse_scheduler
+        if parse_scheduler is None:
+            logger.debug('plugin has not been configured, ignoring edit')
+            return False
+
+        view = self._view_manager[view]     # type: View
+        if not view:
+            logger.debug('no view wrapper, ignoring modify event')
+            return False
+
+        if not view.ready():
+            logger.debug('file is not ready for parsing, ignoring')
+            return False
+
+        file_types = self._get_file_types(view)
+        if not file_types:
+            logger.debug('file has no associated file types, ignoring it')
+            return True
+
+        parse_policy = self._settings.get_parse_policy(file_types)
+        if parse_policy != SUBLIME_PARSE_POLICY_IDLE:
+            return True
+
+        parse_scheduler.touch(view.id(), lambda: self._parse_view(view))
+        return True
+
+    def pre_save_view(self, view):
+        '''
+        Records the path of the given `view` before it is saved. This should
+        be called before every save, so that `save_view` can tell whether the
+        file was saved under a new name.
+        '''
+        view = self._view_manager[view]     # type: View
+        if not view:
+            logger.debug('no view wrapper, ignoring pre-save event')
+            return False
+
+        view.state.set_file_name(view.file_name())
+        return True
+
+    def save_view(self, view):
+        '''
+        Sends the buffer for the given `view` to be parsed right away. This
+        applies to file types with either the idle or save parse policy.
+
+        If the file was saved under a new name (see `pre_save_view`), the
+        cached server for it is cleared first, as the project may differ.
+        '''
+        view = self._view_manager[view]     # type: View
+        if not view:
+            logger.debug('no view wrapper, ignoring save event')
+            return False
+
+        if view.state.set_file_name(view.file_name()):
+            logger.debug('view was saved under a new name: %r', view)
+            self.invalidate_view(view)
+
+        parse_scheduler = self._parse_scheduler
+        if parse_scheduler is None:
+            logger.debug('plugin has not been configured, ignoring save')
+            return False
+
+        if not view.ready():
+            logger.debug('file is not ready for parsing, ignoring')
+            return False
+
+        file_types = self._get_file_types(view)
+        if not file_types:
+            logger.debug('file has no associated file types, ignoring it')
+            return True
+
+        parse_policy = self._settings.get_parse_policy(file_types)
+        if parse_policy not in (
+                SUBLIME_PARSE_POLICY_IDLE, SUBLIME_PARSE_POLICY_SAVE):
+            return True
+
+        parse_scheduler.flush(view.id(), lambda: self._parse_view(view))
+        return True
+
+    def close_view(self, view):
+        '''
+        Drops all state for the given `view`. This should be called when the
+        view is closed, so that the view and server managers do not keep
+        growing over the course of a session.
+        '''
+        parse_scheduler = self._parse_scheduler
+        if parse_scheduler is not None:
+            parse_scheduler.cancel(get_view_id(view))
+
+        self._view_manager.unregister_view(view)
+        self._server_manager.invalidate_view(view)
+
+    def _parse_view(self, view):
+        '''
+        Sends a `FileReadyToParse` notification for the given `view`, unless
+        the server has already parsed the current contents.
+        Returns the notification future, or `None` if nothing was sent.
+        This is run by the parse scheduler.
+        '''
+        if not view.ready():
+            logger.debug('file is not ready for parsing, ignoring')
+            return None
+        if not self.enabled_for_scopes(view):
+            logger.debug('not enabled for view, ignoring parse request')
+            return None
+
+        server = self._server_manager.get(view)     # type: Server
+        if not server or not server.is_alive(timeout=0):
+            logger.debug('server is not running, ignoring parse request')
+            return None
+
+        change_count = view.change_count()
+        request_params = view.generate_request_parameters()
+        if not request_params:
+            logger.debug('failed to generate request params, abort')
+            return None
+
+        file_contents = request_params.file_contents
+        if not self._view_manager.needs_ready_to_parse(
+                view, server, change_count, file_contents):
+            logger.debug('file is unchanged since last parse, skipping it')
+            return None
+
+        notify_future = self._server_manager.notify_ready_to_parse(
+            view, request_params=request_params,
+        )
+        if not notify_future:
+            return None
+
+        def on_notified_ready_to_parse(future):
+            ''' Called on the main thread after completion. '''
+            if future.cancelled() or future.exception():
+                logger.debug('parse notification failed, ignoring result')
+                return
+
+            self._view_manager.set_notified_ready_to_parse(
+                view, server, has_notified=True,
+                change_count=change_count, file_contents=file_contents,
+            )
+
+        self._main_dispatcher.then(
+            notify_future, on_notified_ready_to_parse, on=ON_MAIN,
+        )
+        return notify_future
+
+    def _sweep_closed_views(self):
+        '''
+        Drops all state for views that were closed without a close event. This
+        only does work when the view manager decides that a sweep is due.
+        '''
+        for view_id in self._view_manager.sweep_if_due():
+            self._server_manager.invalidate_view(view_id)
+
+    def completions_for_view(self, view, deadline=None):
         '''
         Sends a completion request to the ycmd server for a given `view`.
         The response will be parsed and provided in a format that is compatible
         with what `sublime` expects (i.e. an iterable of completion tuples).
 
+        If `deadline` is provided, it should be a `Deadline` created when the
+        completions were requested. Otherwise, one is created here, with a
+        budget of `COMPLETION_REQUEST_TIMEOUT` seconds. Every step of the
+        request counts against it.
+
         This call will block, so it should ideally be run off-thread.
         '''
+        if deadline is None:
+            deadline = Deadline(COMPLETION_REQUEST_TIMEOUT)
+
         view = self._view_manager[view]     # type: View
         if not view:
             logger.debug('no view wrapper, cannot create request parameters')
@@ -279,7 +532,7 @@ class SublimeYcmdState(object):
         if not view.ready():
             logger.debug('file is not ready for parsing, abort')
             return None
-        if get_file_types(view) and not self.enabled_for_scopes(view):
+        if self._get_file_types(view) and not self.enabled_for_scopes(view):
             logger.debug('not enabled for view, abort')
             return None
 
@@ -312,24 +565,36 @@ class SublimeYcmdState(object):
         if self._settings is not None:
             force_semantic = self._settings.ycmd_force_semantic_completion
             request_params.force_semantic = force_semantic
+        deadline.mark(PHASE_SNAPSHOT)
 
         logger.debug('sending completion request for view')
+        view.state.last_request_time = time.monotonic()
         try:
             # NOTE : This call blocks!!
-            # TODO : Allow configurable completion timeout.
             completion_response = server.get_code_completions(
-                request_params, timeout=0.6,
+                request_params, cancel_token=deadline,
+                offloader=self._server_manager.get_response_offloader(),
             )
             completions = completion_response.completions
             diagnostics = completion_response.diagnostics
+            self._server_manager.record_completion(server)
+            logger.debug(
+                'completion request timings: %r', completion_response.timings,
+            )
         except TimeoutError:    # noqa
-            logger.debug('completion request timed out')
+            logger.debug(
+                'completion request timed out, timings: %r',
+                deadline.get_phases(),
+            )
             completions = None
             diagnostics = None
         logger.debug('got completions for view: %s', completions)
 
         if diagnostics:
-            self._handle_diagnostics(view, server, diagnostics)
+            # may prompt the user, so don't block the completion request
+            self._main_dispatcher.dispatch(
+                self._handle_diagnostics, view, server, diagnostics,
+            )
 
         if not completions:
             logger.debug('no completions, returning none')
@@ -372,6 +637,17 @@ class SublimeYcmdState(object):
         ''' Returns `True` if plugin is configured and ready. '''
         return self._settings is not None
 
+    def _get_file_types(self, view, refresh=False):
+        '''
+        Returns the file types for `view`, using the value cached in the view
+        state unless `refresh` is set. The cache is refreshed each time the
+        view is activated, which picks up syntax changes.
+        '''
+        view_state = view.state
+        if refresh or view_state.file_types is None:
+            view_state.file_types = get_file_types(view)
+        return view_state.file_types
+
     def _requires_ycmd_restart(self, settings):
         '''
         Returns true if the given `settings` would require a restart of any
@@ -403,7 +679,7 @@ class SublimeYcmdState(object):
         assert isinstance(self._settings, Settings), \
             '[internal] settings must be Settings: %r' % (self._settings)
 
-        return has_same_task_pool_settings(self._settings, settings)
+        return not has_same_task_pool_settings(self._settings, settings)
 
     def _handle_diagnostics(self, view, server, diagnostics):
         '''
@@ -10,13 +10,16 @@ project may all share a single ycmd server backend.
 '''
 
 import logging
-import threading
 
 from ..lib.subl.view import (
     View,
     get_view_id,
 )
-from ..lib.util.lock import lock_guard
+from ..lib.subl.registry import ViewRegistry
+from ..lib.util.lock import (
+    InstrumentedLock,
+    lock_guard,
+)
 
 logger = logging.getLogger('sublime-ycmd.' + __name__)
 
@@ -34,27 +37,25 @@ class SublimeYcmdViewManager(object):
     Although this abstraction isn't strictly necessary, it can save expensive
     operations like file path calculation and ycmd event notification.
 
-    All APIs are thread-safe.
+    All APIs are thread-safe. The view map is copy-on-write, so lookups for
+    views that are already registered do not take the lock.
+
+    Views are unregistered when they are closed (see `unregister_view`).
+    Views that are closed without notice are cleaned up by `sweep_if_due`.
     '''
 
     def __init__(self):
         # maps view IDs to `View` instances
-        self._views = {}
-        self._lock = threading.RLock()
+        self._views = ViewRegistry()
+        self._lock = InstrumentedLock('SublimeYcmdViewManager')
         self.reset()
 
     @lock_guard()
     def reset(self):
-        if self._views:
-            view_ids = list(self._views.keys())
-            for view_id in view_ids:
-                self._unregister_view(view_id)
-
+        if len(self._views) > 0:
+            self._views.clear()
             logger.info('all views have been unregistered')
 
-        # active views:
-        self._views = {}
-
     def get_wrapped_view(self, view):
         '''
         Returns an instance of `View` corresponding to `view`. If one does
@@ -76,6 +77,11 @@ class SublimeYcmdViewManager(object):
             logger.error('failed to get view ID for view: %r', view)
             raise TypeError('view id must be an int: %r' % (view))
 
+        # fast path, the view is usually registered already
+        wrapped_view = self._views.get(view_id)
+        if wrapped_view is not None:
+            return wrapped_view
+
         with self._lock:
             if view_id not in self._views:
                 # create a wrapped view, if possible
@@ -92,49 +98,97 @@ class SublimeYcmdViewManager(object):
                 )
                 self._register_view(view, view_id)
 
-            assert view_id in self._views, \
+            wrapped_view = self._views.get(view_id)     # type: View
+            assert wrapped_view is not None, \
                 '[internal] view id has not been registered: %r' % (view_id)
-            wrapped_view = self._views[view_id]     # type: View
             return wrapped_view
 
-    @lock_guard()
     def has_notified_ready_to_parse(self, view, server):
         '''
         Returns true if the given `view` has been parsed by the `server`. This
         must be done at least once to ensure that the ycmd server has a list
         of identifiers to offer in completion results.
-        This works by storing a view-specific variable indicating the server,
-        if any, that the view has been uploaded to. If this variable is not
-        set, or if the variable refers to another server, this method will
-        return false. In that case, the notification should probably be sent.
+        This works by checking the set of notified server ids in the view
+        state. If the server is not in the set, this method will return false.
+        In that case, the notification should probably be sent.
+        '''
+        view = self.get_wrapped_view(view)
+        if not view:
+            logger.error('unknown view type: %r', view)
+            raise TypeError('view must be a View: %r' % (view))
+
+        return server.id in view.state.notified_server_ids
+
+    def needs_ready_to_parse(self, view, server, change_count, file_contents):
+        '''
+        Returns true if the `server` has not yet parsed `file_contents` for
+        the given `view`. The `change_count` should be read from the view
+        before the contents, so that a concurrent edit causes a reparse.
+        Unchanged buffers (including buffers where edits have been undone)
+        do not need to be parsed again.
         '''
         view = self.get_wrapped_view(view)
         if not view:
             logger.error('unknown view type: %r', view)
             raise TypeError('view must be a View: %r' % (view))
 
-        init_notified_server_set(view)
-        return has_notified_server(view, server)
+        return view.state.needs_parse(server.id, change_count, file_contents)
 
     @lock_guard()
-    def set_notified_ready_to_parse(self, view, server, has_notified=True):
+    def set_notified_ready_to_parse(self, view, server, has_notified=True,
+                                    change_count=None, file_contents=None):
         '''
         Updates the variable that indicates that the given `view` has been
         parsed by the `server`.
-        This works by setting a view-specific variable indicating the server,
-        that the view has been uploaded to. The same variable can then be
-        checked in `has_notified_ready_to_parse`.
+        This works by updating the set of notified server ids in the view
+        state. The same set is then checked in `has_notified_ready_to_parse`.
+        If `file_contents` is given, the parsed version is recorded as well,
+        for use in `needs_ready_to_parse`.
         '''
         view = self.get_wrapped_view(view)
         if not view:
             logger.error('unknown view type: %r', view)
             raise TypeError('view must be a View: %r' % (view))
 
-        init_notified_server_set(view)
+        view_state = view.state
         if has_notified:
-            add_notified_server(view, server)
+            view_state.notified_server_ids.add(server.id)
+            if file_contents is not None:
+                view_state.set_parsed(server.id, change_count, file_contents)
         else:
-            remove_notified_server(view, server)
+            view_state.notified_server_ids.discard(server.id)
+            view_state.clear_parsed(server.id)
+
+    def invalidate_view(self, view):
+        '''
+        Clears the cached file types and project root for `view`, if it has
+        been registered. This should be called when the path for the view, or
+        the project for its window, changes.
+        '''
+        view_id = get_view_id(view)
+        wrapped_view = self._views.get(view_id)
+        if wrapped_view is None:
+            return
+
+        view_state = wrapped_view.state
+        view_state.file_types = None
+        view_state.project_root = None
+        view_state.is_project_root = False
+
+    def unregister_view(self, view):
+        '''
+        Drops the wrapper, and all stored state, for `view`. This should be
+        called when the view is closed.
+        Returns true if the view was registered.
+        '''
+        return self._unregister_view(view)
+
+    def sweep_if_due(self):
+        '''
+        Unregisters views that have been closed without notice, if a sweep is
+        due. Returns the list of view ids that were removed.
+        '''
+        return self._views.sweep_if_due()
 
     def _register_view(self, view, view_id=None):
         if not isinstance(view, sublime.View):
@@ -145,11 +199,7 @@ class SublimeYcmdViewManager(object):
         if not isinstance(view_id, int):
             raise TypeError('view id must be an int: %r' % (view))
 
-        logger.debug('registering view with id: %r, %r', view_id, view)
-        view = View(view)
-        with self._lock:
-            self._views[view_id] = view
-
+        self._views.register(view, view_id)
         return view_id
 
     def _unregister_view(self, view):
@@ -158,22 +208,20 @@ class SublimeYcmdViewManager(object):
             logger.error('failed to get view ID for view: %r', view)
             raise TypeError('view id must be an int: %r' % (view))
 
-        with self._lock:
-            if view_id not in self._views:
-                logger.debug(
-                    'view was never registered, ignoring id: %s', view_id,
-                )
-                return False
+        if self._views.unregister(view_id) is None:
+            logger.debug(
+                'view was never registered, ignoring id: %s', view_id,
+            )
+            return False
 
-            del self._views[view_id]
-            return True
+        logger.debug('unregistered view with id: %r', view_id)
+        return True
 
-    @lock_guard()
     def get_views(self):
         '''
         Returns a shallow-copy of the map of managed `View` instances.
         '''
-        return self._views.copy()
+        return self._views.get_views()
 
     def __contains__(self, view):
         view_id = get_view_id(view)
@@ -181,14 +229,11 @@ class SublimeYcmdViewManager(object):
             logger.error('failed to get view ID for view: %r', view)
             raise TypeError('view id must be an int: %r' % (view))
 
-        with self._lock:
-            return view_id in self._views
+        return view_id in self._views
 
-    @lock_guard()
     def __getitem__(self, view):
         return self.get_wrapped_view(view)
 
-    @lock_guard()
     def __len__(self):
         return len(self._views)
 
@@ -196,90 +241,3 @@ class SublimeYcmdViewManager(object):
         ''' Returns `True`, so an instance is always truthy. '''
         return True
 
-
-NOTIFIED_SERVERS_KEY = 'notified_servers'
-
-
-def init_notified_server_set(view, key=NOTIFIED_SERVERS_KEY):
-    '''
-    Initializes the set of notified servers for a given `view` if it has not
-    already been initialized.
-
-    This does nothing if it has been initialized already.
-    '''
-    if not isinstance(view, View):
-        logger.warning('view does not appear valid: %r', view)
-
-    if key not in view:
-        logger.debug('view has not been sent to any server, creating metadata')
-        view[key] = set()
-
-
-def get_server_key(server):
-    '''
-    Returns a unique key for `server` to use as an id for it.
-    '''
-    server_key = str(server)
-    return server_key
-
-
-def has_notified_server(view, server, key=NOTIFIED_SERVERS_KEY):
-    '''
-    Checks if a given `server` is in the notified server set for a `view`.
-    '''
-    if not isinstance(view, View):
-        logger.warning('view does not appear valid: %r', view)
-
-    if key not in view:
-        logger.error(
-            'notified server set is not initialized for view: %r', view,
-        )
-
-    notified_servers = view[key]
-    assert isinstance(notified_servers, set), \
-        '[internal] notified server set is not a set: %r' % (notified_servers)
-
-    server_key = get_server_key(server)
-    return server_key in notified_servers
-
-
-def add_notified_server(view, server, key=NOTIFIED_SERVERS_KEY):
-    '''
-    Adds `server` to the notified server set for `view`.
-    '''
-    if not isinstance(view, View):
-        logger.warning('view does not appear valid: %r', view)
-
-    if key not in view:
-        logger.error(
-            'notified server set is not initialized for view: %r', view,
-        )
-
-    notified_servers = view[key]
-    assert isinstance(notified_servers, set), \
-        '[internal] notified server set is not a set: %r' % (notified_servers)
-
-    server_key = get_server_key(server)
-    notified_servers.add(server_key)
-
-
-def remove_notified_server(view, server, key=NOTIFIED_SERVERS_KEY):
-    '''
-    Removes `server` to the notified server set for `view`.
-
-    If the server is not in the notified server set, this does nothing.
-    '''
-    if not isinstance(view, View):
-        logger.warning('view does not appear valid: %r', view)
-
-    if key not in view:
-        logger.error(
-            'notified server set is not initialized for view: %r', view,
-        )
-
-    notified_servers = view[key]
-    assert isinstance(notified_servers, set), \
-        '[internal] notified server set is not a set: %r' % (notified_servers)
-
-    server_key = get_server_key(server)
-    notified_servers.discard(server_key)
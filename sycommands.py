@@ -16,6 +16,7 @@ from .lib.util.format import (
     json_pretty_print,
     json_flat_iterator,
 )
+from .lib.util.lock import get_lock_stats
 
 from .plugin.state import get_plugin_state
 from .plugin.ui import display_plugin_message
@@ -73,8 +74,15 @@ class SublimeYcmdListServers(sublime_plugin.TextCommand):
             ], on_select_empty)
             return
 
+        def _describe_server(server):
+            time_to_ready = server.time_to_ready
+            if time_to_ready is None:
+                return server.pretty_str()
+            return '%s, ready in %.3fs' % (server.pretty_str(), time_to_ready)
+
         panel_options = [
-            [server.label or '', server.pretty_str()] for server in servers
+            [server.label or '', _describe_server(server)]
+            for server in servers
         ]
 
         def on_select_server(selection_index):
@@ -263,3 +271,169 @@ class SublimeYcmdManageServer(sublime_plugin.TextCommand):
             ['Kill', process_desc],
             ['Logs', log_desc],
         ], on_select_item)
+
+
+class SublimeYcmdShowLockStats(sublime_plugin.TextCommand):
+    def run(self, edit):
+        window = self.view.window()
+        if not window:
+            logger.warning('no window, cannot display lock statistics')
+            return
+
+        lock_stats = get_lock_stats()
+        if not lock_stats:
+            display_plugin_message('no lock statistics have been recorded')
+            return
+
+        def _format_ms(seconds):
+            return '%.3fms' % (seconds * 1000)
+
+        def _describe_lock_stats(stats):
+            return (
+                'acquired %(acquisitions)d, contended %(contentions)d, '
+                'failed %(failed)d, '
+                'wait max %(max_wait)s (mean %(mean_wait)s), '
+                'hold max %(max_hold)s (mean %(mean_hold)s)' % {
+                    'acquisitions': stats['acquisitions'],
+                    'contentions': stats['contentions'],
+                    'failed': stats['failed'],
+                    'max_wait': _format_ms(stats['max_wait_time']),
+                    'mean_wait': _format_ms(stats['mean_wait_time']),
+                    'max_hold': _format_ms(stats['max_hold_time']),
+                    'mean_hold': _format_ms(stats['mean_hold_time']),
+                }
+            )
+
+        logger.info('lock statistics: %s', json_pretty_print(lock_stats))
+
+        def on_select_lock(selection_index):
+            pass
+
+        # most contended locks first
+        window.show_quick_panel([
+            [str(name), _describe_lock_stats(stats)]
+            for name, stats in sorted(
+                lock_stats.items(), key=lambda i: -i[1]['total_wait_time'],
+            )
+        ], on_select_lock)
+
+    def description(self):
+        return 'show lock statistics'
+
+
+class SublimeYcmdShowTaskPoolStats(sublime_plugin.TextCommand):
+    def run(self, edit):
+        state = get_plugin_state()
+        if not state:
+            return
+
+        window = self.view.window()
+        if not window:
+            logger.warning('no window, cannot display task pool statistics')
+            return
+
+        metrics = state.server_manager.get_task_pool_metrics()
+        if not metrics:
+            display_plugin_message('no task pool is running')
+            return
+
+        def _format_ms(seconds):
+            return '%.3fms' % (seconds * 1000)
+
+        def _describe_times(times):
+            return (
+                '%(count)d tasks, p50 %(p50)s, p95 %(p95)s, max %(max)s' % {
+                    'count': times['count'],
+                    'p50': _format_ms(times['p50']),
+                    'p95': _format_ms(times['p95']),
+                    'max': _format_ms(times['max']),
+                }
+            )
+
+        def _describe_bulkhead(name, bulkhead):
+            return '%s %d/%s' % (
+                name, bulkhead['active'], bulkhead['limit'] or 'unlimited',
+            )
+
+        def _describe_first_completion(start_kind):
+            times = metrics['time_to_first_completion'][start_kind]
+            return '%s %d, p50 %s' % (
+                start_kind, times['count'], _format_ms(times['p50']),
+            )
+
+        logger.info('task pool statistics: %s', json_pretty_print(metrics))
+        bulkheads = metrics['bulkheads']
+        standby = metrics['standby']
+
+        items = [
+            ['Workers', '%d (%d-%d), busy %.1f%%, %s backend' % (
+                metrics['workers'], metrics['min_workers'],
+                metrics['max_workers'], metrics['busy_ratio'] * 100,
+                metrics['backend'],
+            )],
+            ['Queue depth', '%d (peak %d), dropped %s' % (
+                metrics['queue_depth'], metrics['peak_queue_depth'],
+                ', '.join(
+                    '%d %s' % (count, reason)
+                    for reason, count in sorted(metrics['dropped'].items())
+                ),
+            )],
+            ['Queue wait time', _describe_times(metrics['wait_time'])],
+            ['Run time', _describe_times(metrics['run_time'])],
+            ['Bulkheads', '%s, %s, rejected %d' % (
+                _describe_bulkhead('interactive', bulkheads['interactive']),
+                _describe_bulkhead('background', bulkheads['background']),
+                bulkheads['rejected'],
+            )],
+            ['Standby servers', '%d/%d, %d claimed, %d missed, %d reaped' % (
+                standby['standby'], standby['size'], standby['claimed'],
+                standby['missed'], standby['reaped'],
+            )],
+            ['Startup cache', '%d entries, %d hits, %d misses' % (
+                metrics['startup_cache']['entries'],
+                metrics['startup_cache']['hits'],
+                metrics['startup_cache']['misses'],
+            )],
+            ['First completion', '%s, %s' % (
+                _describe_first_completion('cold'),
+                _describe_first_completion('warm'),
+            )],
+        ]
+        items.extend(
+            ['Server %s requests' % (server_id), (
+                '%d in flight (max %s), %d queued (peak %d), '
+                'queue delay p50 %s, p95 %s' % (
+                    stats['in_flight'], stats['max_in_flight'] or 'unlimited',
+                    stats['queued'], stats['peak_queued'],
+                    _format_ms(stats['queue_delay']['p50']),
+                    _format_ms(stats['queue_delay']['p95']),
+                )
+            )]
+            for server_id, stats in sorted(
+                metrics['request_limiters'].items()
+            )
+        )
+        items.extend(
+            ['Server %s startup' % (server_id), ', '.join(
+                '%s %s' % (phase, _format_ms(seconds))
+                for phase, seconds in startup_timings.items()
+            )]
+            for server_id, startup_timings in sorted(
+                metrics['startup_timings'].items()
+            )
+            if startup_timings
+        )
+        items.extend(
+            ['Slow task: %s' % (slow_task['name']), '%s, %ds ago' % (
+                _format_ms(slow_task['run_time']), slow_task['age'],
+            )]
+            for slow_task in metrics['slow_tasks']
+        )
+
+        def on_select_item(selection_index):
+            pass
+
+        window.show_quick_panel(items, on_select_item)
+
+    def description(self):
+        return 'show task pool statistics'
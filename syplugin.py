@@ -11,9 +11,11 @@ import logging.config
 
 from .cli.args import base_cli_argparser
 from .lib.subl.settings import bind_on_change_settings
+from .lib.task.deadline import Deadline
 
 from .plugin.log import configure_logging
 from .plugin.state import (
+    COMPLETION_REQUEST_TIMEOUT,
     get_plugin_state,
     reset_plugin_state,
 )
@@ -36,6 +38,9 @@ class SublimeYcmdCompleter(sublime_plugin.EventListener):
     '''
 
     def on_query_completions(self, view, prefix, locations):
+        # the budget starts now, so it includes the time spent in the plugin
+        deadline = Deadline(COMPLETION_REQUEST_TIMEOUT)
+
         state = get_plugin_state()
         if not state:
             logger.debug('no plugin state, ignoring query completions')
@@ -46,7 +51,9 @@ class SublimeYcmdCompleter(sublime_plugin.EventListener):
             return None
 
         try:
-            completion_options = state.completions_for_view(view)
+            completion_options = state.completions_for_view(
+                view, deadline=deadline,
+            )
         except Exception as e:
             logger.debug('failed to get completions: %s', e, exc_info=e)
             completion_options = None
@@ -81,6 +88,55 @@ class SublimeYcmdCompleter(sublime_plugin.EventListener):
         if not state.deactivate_view(view):
             logger.warning('failed to deactivate view: %r', view)
 
+    def on_modified_async(self, view):  # type: (sublime.View) -> None
+        state = get_plugin_state()
+        if not state:
+            logger.debug('no plugin state, ignoring modify event')
+            return
+
+        state.modify_view(view)
+
+    def on_pre_save(self, view):    # type: (sublime.View) -> None
+        state = get_plugin_state()
+        if not state:
+            logger.debug('no plugin state, ignoring pre-save event')
+            return
+
+        state.pre_save_view(view)
+
+    def on_post_save_async(self, view):     # type: (sublime.View) -> None
+        state = get_plugin_state()
+        if not state:
+            logger.debug('no plugin state, ignoring save event')
+            return
+
+        # also handles "save as", there is no separate event for it
+        state.save_view(view)
+
+    def on_close(self, view):   # type: (sublime.View) -> None
+        state = get_plugin_state()
+        if not state:
+            logger.debug('no plugin state, ignoring close event')
+            return
+
+        state.close_view(view)
+
+    def on_load_project(self, window):  # type: (sublime.Window) -> None
+        state = get_plugin_state()
+        if not state:
+            logger.debug('no plugin state, ignoring load-project event')
+            return
+
+        state.invalidate_window(window)
+
+    def on_post_save_project(self, window):  # type: (sublime.Window) -> None
+        state = get_plugin_state()
+        if not state:
+            logger.debug('no plugin state, ignoring save-project event')
+            return
+
+        state.invalidate_window(window)
+
 
 def on_change_settings(settings):
     ''' Callback, triggered when settings are loaded/modified. '''
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+
+'''
+tests/lib/plugin.py
+Helpers for loading the plugin modules in tests.
+
+The plugin modules (`syplugin`, `plugin.*`) use relative imports that reach
+the project root, so they only load as part of a package. Sublime Text loads
+the project as one. Here, the project directory is registered as a package
+under a fixed name instead.
+
+Modules loaded this way are separate from the ones imported as `lib.*`, so
+values passed to them should be created from the same package (e.g. with
+`import_plugin_module('lib.subl.dummy')`).
+'''
+
+import importlib
+import logging
+import os
+import sys
+import types
+
+logger = logging.getLogger('sublime-ycmd.' + __name__)
+
+PLUGIN_PACKAGE_NAME = 'sublime_ycmd'
+
+
+def _get_plugin_package():
+    plugin_package = sys.modules.get(PLUGIN_PACKAGE_NAME)
+    if plugin_package is not None:
+        return plugin_package
+
+    project_dir = os.path.abspath(
+        os.path.join(os.path.dirname(__file__), '..', '..'),
+    )
+    logger.debug('loading plugin package from: %s', project_dir)
+
+    plugin_package = types.ModuleType(PLUGIN_PACKAGE_NAME)
+    plugin_package.__path__ = [project_dir]
+    sys.modules[PLUGIN_PACKAGE_NAME] = plugin_package
+    return plugin_package
+
+
+def import_plugin_module(name):
+    '''
+    Imports the module `name` (e.g. `'plugin.state'`) from the project,
+    loaded as a package. Returns the module.
+    '''
+    _get_plugin_package()
+    return importlib.import_module('%s.%s' % (PLUGIN_PACKAGE_NAME, name))
@@ -0,0 +1,6 @@
+#!/usr/bin/env python3
+
+'''
+tests/plugin
+Tests for the plugin state and managers.
+'''
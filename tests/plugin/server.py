@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+
+'''
+tests/plugin/server.py
+Tests for the server manager.
+
+The plugin modules are loaded as a package (see `tests.lib.plugin`). Server
+startup is replaced with a stub that only marks the server as starting, so no
+ycmd processes are launched.
+'''
+
+import logging
+import os
+import unittest
+
+from concurrent.futures import Future
+
+from tests.lib.decorator import log_function
+from tests.lib.plugin import import_plugin_module
+from tests.plugin.state import DummyView
+
+logger = logging.getLogger('sublime-ycmd.' + __name__)
+
+plugin_server = import_plugin_module('plugin.server')
+dummy = import_plugin_module('lib.subl.dummy')
+server_module = import_plugin_module('lib.ycmd.server')
+start_module = import_plugin_module('lib.ycmd.start')
+bulkhead_module = import_plugin_module('lib.task.bulkhead')
+priority_module = import_plugin_module('lib.task.priority')
+
+Server = server_module.Server
+
+HOME_PATH = os.path.join(os.path.abspath(os.sep), 'home', 'user')
+
+
+class DummyWindow(dummy.sublime.Window):
+    ''' Stand-in for `sublime.Window`, with a list of project folders. '''
+
+    def __init__(self, *folders):
+        self._folders = folders
+
+    def project_data(self):
+        if not self._folders:
+            return None
+        return {'folders': [{'path': folder} for folder in self._folders]}
+
+    def project_file_name(self):
+        return None
+
+
+class TestServerManagerLookup(unittest.TestCase):
+    ''' Unit tests for looking up (or starting) the server for a view. '''
+
+    def setUp(self):
+        self.manager = plugin_server.SublimeYcmdServerManager()
+        self.manager.set_startup_parameters(start_module.StartupParameters(
+            os.path.join(HOME_PATH, 'ycmd'),
+            ycmd_settings_path=os.path.join(HOME_PATH, 'settings.json'),
+        ))
+        # pylint: disable=protected-access
+        self.manager._start_server = self._start_server
+        self.working_directories = {}
+
+    def _start_server(self, startup_parameters):
+        server = Server()
+        server.set_status(Server.STARTING)
+        self.working_directories[server] = \
+            startup_parameters.working_directory
+        return server
+
+    def _get(self, view_id, file_name, window=None):
+        server = self.manager.get(DummyView(view_id, file_name, window))
+        self.assertIsNotNone(server)
+        return server
+
+    @log_function('[manager : loose file parent]')
+    def test_sm_loose_file_parent(self):
+        '''
+        Ensures that a server started for a loose file is not shared with
+        projects nested under the directory of that file.
+        '''
+        project_path = os.path.join(HOME_PATH, 'project')
+        project_window = DummyWindow(project_path)
+
+        loose_server = self._get(1, os.path.join(HOME_PATH, 'notes.py'))
+        self.assertEqual(HOME_PATH, self.working_directories[loose_server])
+
+        project_server = self._get(
+            2, os.path.join(project_path, 'src', 'a.py'), project_window,
+        )
+        self.assertIsNot(loose_server, project_server)
+        self.assertEqual(
+            project_path, self.working_directories[project_server],
+        )
+
+        # files under the project share its server, with or without a window
+        self.assertIs(project_server, self._get(
+            3, os.path.join(project_path, 'b.py'), project_window,
+        ))
+        self.assertIs(project_server, self._get(
+            4, os.path.join(project_path, 'lib', 'c.py'),
+        ))
+        # other loose files in the same directory share the loose server
+        self.assertIs(
+            loose_server, self._get(5, os.path.join(HOME_PATH, 'todo.py')),
+        )
+        self.assertEqual(2, len(self.working_directories))
+
+
+class TestServerManagerBurst(unittest.TestCase):
+    '''
+    Unit tests for bursts of requests to one server, over the server bulkhead
+    limit.
+    '''
+
+    def setUp(self):
+        self.manager = plugin_server.SublimeYcmdServerManager()
+        self.manager.set_startup_parameters(start_module.StartupParameters(
+            os.path.join(HOME_PATH, 'ycmd'),
+            ycmd_settings_path=os.path.join(HOME_PATH, 'settings.json'),
+        ))
+        # pylint: disable=protected-access
+        self.manager._start_server = self._start_server
+        self.submitted = []
+        self.num_views = bulkhead_module.DEFAULT_BULKHEAD_LIMITS[
+            bulkhead_module.BULKHEAD_SERVER
+        ] + 8
+
+    def _start_server(self, startup_parameters):
+        # pylint: disable=unused-argument
+        server = Server()
+        server.set_status(Server.STARTING)
+        return server
+
+    def _submit(self, view_id, priority=None):
+        # pylint: disable=unused-argument
+        # stands in for the task pool, the requests stay in flight until the
+        # test completes them
+        future = Future()
+        self.submitted.append((view_id, future))
+        return future
+
+    def _open_views(self):
+        '''
+        Opens `num_views` views in one project. Returns the server, which is
+        still starting.
+        '''
+        project_path = os.path.join(HOME_PATH, 'project')
+        window = DummyWindow(project_path)
+
+        server = None
+        for view_id in range(1, self.num_views + 1):
+            view = DummyView(
+                view_id, os.path.join(project_path, '%d.py' % (view_id)),
+                window,
+            )
+            view_server = self.manager.get(view)
+            self.assertIs(server or view_server, view_server)
+            server = view_server
+
+        self.assertTrue(server.is_starting())
+        return server
+
+    def _submit_requests(self, server):
+        # pylint: disable=protected-access
+        return [
+            self.manager._submit_request(
+                server, view_id, self._submit, view_id,
+                priority=priority_module.PRIORITY_NOTIFICATION,
+            )
+            for view_id in range(1, self.num_views + 1)
+        ]
+
+    def _complete_requests(self, futures):
+        # complete requests as they are sent, until all of them are done
+        while self.submitted:
+            view_id, future = self.submitted.pop(0)
+            future.set_result(view_id)
+
+        self.assertEqual(
+            list(range(1, self.num_views + 1)),
+            [future.result(timeout=0) for future in futures],
+        )
+        # pylint: disable=protected-access
+        self.assertEqual(0, self.manager._bulkheads.get_stats()['rejected'])
+
+    @log_function('[manager : startup burst]')
+    def test_sm_startup_burst(self):
+        '''
+        Ensures that opening more views than the server bulkhead limit, while
+        the server is starting, does not drop any of their requests.
+        '''
+        server = self._open_views()
+        futures = self._submit_requests(server)
+        self.assertEqual([], self.submitted)
+        self.assertFalse(any(future.done() for future in futures))
+
+        server.set_status(Server.RUNNING)
+        self._complete_requests(futures)
+
+    @log_function('[manager : running burst]')
+    def test_sm_running_burst(self):
+        '''
+        Ensures that more notifications than the server bulkhead limit, sent
+        to a running server, are all delivered. Only the requests in flight
+        take a bulkhead slot, the rest wait in the request limiter.
+        '''
+        server = self._open_views()
+        server.set_status(Server.RUNNING)
+
+        futures = self._submit_requests(server)
+        self.assertEqual(
+            plugin_server.DEFAULT_MAX_IN_FLIGHT, len(self.submitted),
+        )
+        self._complete_requests(futures)
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+
+'''
+tests/plugin/state.py
+Tests for the plugin state, driven through the event listener.
+
+The plugin modules are loaded as a package (see `tests.lib.plugin`). Views
+are stood in for by fakes, and no ycmd servers are started.
+'''
+
+import logging
+import unittest
+
+from tests.lib.decorator import log_function
+from tests.lib.plugin import import_plugin_module
+
+logger = logging.getLogger('sublime-ycmd.' + __name__)
+
+syplugin = import_plugin_module('syplugin')
+plugin_state = import_plugin_module('plugin.state')
+dummy = import_plugin_module('lib.subl.dummy')
+server_module = import_plugin_module('lib.ycmd.server')
+settings_module = import_plugin_module('lib.subl.settings')
+
+
+class DummyView(dummy.sublime.View):
+    ''' Stand-in for `sublime.View`, with a file name that can be changed. '''
+
+    def __init__(self, view_id, file_name=None, window=None):
+        self._id = view_id
+        self._file_name = file_name
+        self._window = window
+
+    def id(self):
+        return self._id
+
+    def is_valid(self):
+        return True
+
+    def file_name(self):
+        return self._file_name
+
+    def window(self):
+        return self._window
+
+
+class TestPluginSave(unittest.TestCase):
+    ''' Unit tests for the save events. '''
+
+    def setUp(self):
+        plugin_state.reset_plugin_state()
+        self.addCleanup(plugin_state.reset_plugin_state)
+        self.state = plugin_state.get_plugin_state()
+        # mark it as configured, without `configure`, which would reconfigure
+        # logging and set up servers
+        # pylint: disable=protected-access
+        self.state._settings = settings_module.Settings()
+        self.listener = syplugin.SublimeYcmdCompleter()
+
+    def _bind_view(self, view):
+        server = server_module.Server()
+        # pylint: disable=protected-access
+        self.state._server_manager._registry.bind_view(view.id(), server)
+        return server
+
+    def _lookup_view(self, view):
+        # pylint: disable=protected-access
+        return self.state._server_manager._registry.lookup_view(view.id())
+
+    def _save(self, view, file_name=None):
+        self.listener.on_pre_save(view)
+        if file_name is not None:
+            view._file_name = file_name
+        self.listener.on_post_save_async(view)
+
+    @log_function('[state : save]')
+    def test_ps_save(self):
+        ''' Ensures that saving a file in place keeps its server binding. '''
+        view = DummyView(1, '/project/a/file.py')
+        self._save(view)
+        server = self._bind_view(view)
+
+        self._save(view)
+        self.assertIs(server, self._lookup_view(view))
+
+    @log_function('[state : save as]')
+    def test_ps_save_as(self):
+        '''
+        Ensures that saving a file under a new name, or saving a new file for
+        the first time, drops its server binding.
+        '''
+        view = DummyView(1, '/project/a/file.py')
+        self._save(view)
+        self._bind_view(view)
+
+        self._save(view, '/project/b/file.py')
+        self.assertIsNone(self._lookup_view(view))
+
+        new_view = DummyView(2)
+        self._bind_view(new_view)
+        self._save(new_view, '/project/b/new_file.py')
+        self.assertIsNone(self._lookup_view(new_view))
@@ -0,0 +1,6 @@
+#!/usr/bin/env python3
+
+'''
+tests/subl
+Tests for the sublime helper module.
+'''
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+
+'''
+tests/subl/registry.py
+Tests for the view registry.
+
+Uses stand-in view handles, since the sublime module is not available. Checks
+that view wrappers (and their state) are released once views are closed.
+'''
+
+import gc
+import logging
+import unittest
+import weakref
+
+from lib.subl.dummy import sublime
+from lib.subl.registry import ViewRegistry
+from lib.ycmd.registry import ServerRegistry
+from tests.lib.decorator import log_function
+
+logger = logging.getLogger('sublime-ycmd.' + __name__)
+
+
+class DummyView(sublime.View):
+    ''' Stand-in for `sublime.View`. Can be closed, like a real view. '''
+
+    def __init__(self, view_id):
+        self._id = view_id
+        self._valid = True
+
+    def id(self):
+        return self._id
+
+    def is_valid(self):
+        return self._valid
+
+    def close(self):
+        self._valid = False
+
+
+class TestViewRegistry(unittest.TestCase):
+    '''
+    Unit tests for the view registry. Closed views should be dropped, either
+    explicitly, or by a sweep.
+    '''
+
+    @log_function('[registry : lookup]')
+    def test_vr_lookup(self):
+        ''' Ensures that each view id is wrapped exactly once. '''
+        registry = ViewRegistry()
+        view = DummyView(1)
+
+        wrapped_view = registry.register(view)
+        self.assertIs(wrapped_view, registry.register(view))
+        self.assertIs(wrapped_view, registry.get(1))
+        self.assertEqual(1, wrapped_view.id())
+        self.assertIn(1, registry)
+
+        self.assertIs(wrapped_view, registry.unregister(1))
+        self.assertIsNone(registry.unregister(1))
+        self.assertNotIn(1, registry)
+
+    @log_function('[registry : sweep]')
+    def test_vr_sweep(self):
+        '''
+        Ensures that closed views are removed by a sweep, even if they were
+        never unregistered.
+        '''
+        registry = ViewRegistry()
+        open_view = DummyView(1)
+        closed_view = DummyView(2)
+        other_closed_view = DummyView(3)
+        for view in (open_view, closed_view, other_closed_view):
+            registry.register(view)
+
+        closed_view.close()
+        other_closed_view.close()
+
+        self.assertEqual([2, 3], sorted(registry.sweep()))
+        self.assertEqual([1], list(registry))
+        self.assertTrue(registry.get(1).alive())
+
+    @log_function('[registry : threshold]')
+    def test_vr_sweep_threshold(self):
+        '''
+        Ensures that sweeps are triggered by the registry size, and that the
+        threshold grows with the number of live views.
+        '''
+        registry = ViewRegistry(sweep_interval=3600, sweep_threshold=4)
+        views = [DummyView(view_id) for view_id in range(1, 11)]
+
+        for view in views[:4]:
+            registry.register(view)
+        self.assertEqual([], registry.sweep_if_due())
+
+        # over the threshold, but nothing to collect
+        registry.register(views[4])
+        self.assertEqual([], registry.sweep_if_due())
+        self.assertEqual(5, len(registry))
+
+        # threshold is now 10, so closed views are kept until it is passed
+        for view in views[:5]:
+            view.close()
+        for view in views[5:]:
+            registry.register(view)
+        self.assertEqual([], registry.sweep_if_due())
+
+        views.append(DummyView(11))
+        registry.register(views[-1])
+        self.assertEqual([1, 2, 3, 4, 5], sorted(registry.sweep_if_due()))
+        self.assertEqual(6, len(registry))
+
+        # the interval also forces a sweep
+        views[5].close()
+        self.assertEqual([6], registry.sweep_if_due(now=float('inf')))
+
+    @log_function('[registry : leak]')
+    def test_vr_leak(self):
+        '''
+        Opens and closes 10k views, binding each to a server, and ensures that
+        no wrappers or bindings are left behind.
+        '''
+        num_views = 10000
+
+        registry = ViewRegistry()
+        server_registry = ServerRegistry()
+        server = object()
+        wrapper_refs = []
+
+        for view_id in range(1, num_views + 1):
+            view = DummyView(view_id)
+            wrapped_view = registry.register(view)
+            wrapped_view.state.notified_server_ids.add(1)
+            server_registry.bind_view(view_id, server)
+            wrapper_refs.append(weakref.ref(wrapped_view))
+
+            view.close()
+            if view_id % 2:
+                # closed with an event
+                registry.unregister(view_id)
+                server_registry.unbind_view(view_id)
+            # else, closed without an event, left for the sweep
+
+        del view
+        del wrapped_view
+        gc.collect()
+
+        for view_id in registry.sweep():
+            server_registry.unbind_view(view_id)
+        gc.collect()
+
+        self.assertEqual(0, len(registry))
+        self.assertEqual(set(), server_registry.get_view_ids(server))
+        self.assertIsNone(server_registry.lookup_view(num_views))
+
+        leaked_wrappers = [ref for ref in wrapper_refs if ref() is not None]
+        self.assertEqual([], leaked_wrappers)
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+
+'''
+tests/subl/view.py
+Tests for the view wrapper and its per-view state record.
+'''
+
+import logging
+import unittest
+
+from lib.subl.view import (
+    View,
+    ViewState,
+)
+from lib.ycmd.server import Server
+from tests.lib.decorator import log_function
+from tests.subl.registry import DummyView
+
+logger = logging.getLogger('sublime-ycmd.' + __name__)
+
+
+class TestViewState(unittest.TestCase):
+    '''
+    Unit tests for the per-view state record. It should only hold the known
+    fields, and it should track servers by id.
+    '''
+
+    @log_function('[state : slots]')
+    def test_vs_slots(self):
+        ''' Ensures that the state record does not accept unknown fields. '''
+        view_state = ViewState()
+        self.assertFalse(hasattr(view_state, '__dict__'))
+        with self.assertRaises(AttributeError):
+            view_state.notified_servers = set()
+
+        self.assertEqual(set(), view_state.notified_server_ids)
+        self.assertEqual({}, view_state.parsed_versions)
+        self.assertIsNone(view_state.file_types)
+        self.assertIsNone(view_state.project_root)
+        self.assertIsNone(view_state.last_request_time)
+        self.assertIsNone(view_state.file_name)
+
+    @log_function('[state : server ids]')
+    def test_vs_server_ids(self):
+        ''' Ensures that servers are tracked by unique, fixed ids. '''
+        server1 = Server()
+        server2 = Server()
+        self.assertIsInstance(server1.id, int)
+        self.assertNotEqual(server1.id, server2.id)
+        self.assertEqual(server1.id, server1.id)
+
+        dummy_view = DummyView(1)
+        view = View(dummy_view)
+        view.state.notified_server_ids.add(server1.id)
+
+        self.assertIn(server1.id, view.state.notified_server_ids)
+        self.assertNotIn(server2.id, view.state.notified_server_ids)
+        self.assertEqual(1, view.id())
+
+    @log_function('[state : needs parse]')
+    def test_vs_needs_parse(self):
+        '''
+        Ensures that a reparse is only required when the contents differ from
+        the last parsed contents, even if the change count differs.
+        '''
+        view_state = ViewState()
+        server_id = 1
+        other_server_id = 2
+
+        self.assertTrue(view_state.needs_parse(server_id, 1, 'a'))
+        view_state.set_parsed(server_id, 1, 'a')
+
+        # unchanged
+        self.assertFalse(view_state.needs_parse(server_id, 1, 'a'))
+        # not parsed by the other server yet
+        self.assertTrue(view_state.needs_parse(other_server_id, 1, 'a'))
+
+        # edited
+        self.assertTrue(view_state.needs_parse(server_id, 2, 'ab'))
+
+        # edit undone, same contents as the parsed version
+        self.assertFalse(view_state.needs_parse(server_id, 3, 'a'))
+        self.assertEqual(3, view_state.parsed_versions[server_id][0])
+
+        view_state.clear_parsed(server_id)
+        self.assertTrue(view_state.needs_parse(server_id, 3, 'a'))
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+
+'''
+tests/task/backend.py
+Tests for the executor backends.
+'''
+
+import logging
+import threading
+import unittest
+
+from lib.task import backend
+from lib.task.backend import ThreadPoolBackend
+from tests.lib.decorator import log_function
+
+logger = logging.getLogger('sublime-ycmd.' + __name__)
+
+
+class TestThreadPoolBackend(unittest.TestCase):
+    ''' Unit tests for the `concurrent.futures` thread pool backend. '''
+
+    def _get_thread_names(self, executor, num_tasks=4):
+        futures = [
+            executor.submit(lambda: threading.current_thread().name)
+            for _ in range(num_tasks)
+        ]
+        thread_names = [future.result(timeout=5) for future in futures]
+        self.assertTrue(executor.shutdown(wait=True, timeout=5))
+        return thread_names
+
+    @log_function('[backend : thread names]')
+    def test_tp_thread_names(self):
+        ''' Ensures that worker threads are named with the prefix. '''
+        executor = ThreadPoolBackend(
+            max_workers=2, thread_name_prefix='test-backend-',
+        )
+        for thread_name in self._get_thread_names(executor):
+            self.assertTrue(thread_name.startswith('test-backend-'))
+
+    @log_function('[backend : thread names fallback]')
+    def test_tp_thread_names_fallback(self):
+        '''
+        Ensures that worker threads are still named with the prefix when the
+        executor does not support it (before python 3.6).
+        '''
+        # pylint: disable=protected-access
+        has_thread_name_prefix = backend._HAS_THREAD_NAME_PREFIX
+        backend._HAS_THREAD_NAME_PREFIX = False
+        try:
+            executor = ThreadPoolBackend(
+                max_workers=2, thread_name_prefix='test-fallback-',
+            )
+            thread_names = self._get_thread_names(executor)
+        finally:
+            backend._HAS_THREAD_NAME_PREFIX = has_thread_name_prefix
+
+        for thread_name in thread_names:
+            self.assertTrue(thread_name.startswith('test-fallback-'))
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+
+'''
+tests/task/benchmark.py
+Microbenchmark for the task pool enqueue path.
+
+Compares `Pool.submit`, `Pool.submit_many`, and
+`concurrent.futures.ThreadPoolExecutor.submit` on a batch of no-op tasks.
+Also runs the sleep workload from `tests/task/simulate.py` on each executor
+backend, and compares the task latency and throughput.
+Run it directly to print the results:
+    python -m tests.task.benchmark [num_tasks]
+
+The unit tests below only run small batches, to make sure it still works.
+'''
+
+import concurrent.futures
+import logging
+import sys
+import time
+import unittest
+
+from lib.task import Pool
+from lib.task.backend import (
+    EXECUTOR_BACKENDS,
+    create_executor,
+)
+from lib.task.metrics import Histogram
+from tests.lib.decorator import log_function
+from tests.task.simulate import run_sleep_workload
+
+logger = logging.getLogger('sublime-ycmd.' + __name__)
+
+DEFAULT_NUM_TASKS = 20000
+DEFAULT_NUM_WORKERS = 4
+# the sleep workload, which takes about 1 second on single thread backends
+DEFAULT_SLEEP_TIME = 0.005
+DEFAULT_NUM_SLEEP_TASKS = 200
+
+
+def noop():
+    pass
+
+
+def bench_pool_submit(num_tasks, num_workers=DEFAULT_NUM_WORKERS):
+    pool = Pool(max_workers=num_workers)
+    start_time = time.perf_counter()
+    futures = [pool.submit(noop) for _ in range(num_tasks)]
+    enqueue_time = time.perf_counter() - start_time
+    concurrent.futures.wait(futures)
+    total_time = time.perf_counter() - start_time
+    pool.shutdown(wait=True)
+    return enqueue_time, total_time
+
+
+def bench_pool_submit_many(num_tasks, num_workers=DEFAULT_NUM_WORKERS):
+    pool = Pool(max_workers=num_workers)
+    start_time = time.perf_counter()
+    futures = pool.submit_many([(noop, ())] * num_tasks)
+    enqueue_time = time.perf_counter() - start_time
+    concurrent.futures.wait(futures)
+    total_time = time.perf_counter() - start_time
+    pool.shutdown(wait=True)
+    return enqueue_time, total_time
+
+
+def bench_thread_pool_executor(num_tasks, num_workers=DEFAULT_NUM_WORKERS):
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=num_workers)
+    start_time = time.perf_counter()
+    futures = [executor.submit(noop) for _ in range(num_tasks)]
+    enqueue_time = time.perf_counter() - start_time
+    concurrent.futures.wait(futures)
+    total_time = time.perf_counter() - start_time
+    executor.shutdown(wait=True)
+    return enqueue_time, total_time
+
+
+BENCHMARKS = (
+    ('Pool.submit', bench_pool_submit),
+    ('Pool.submit_many', bench_pool_submit_many),
+    ('ThreadPoolExecutor.submit', bench_thread_pool_executor),
+)
+
+
+def run_benchmarks(num_tasks=DEFAULT_NUM_TASKS):
+    '''
+    Runs each benchmark, and returns a list of tuples containing the name,
+    enqueue time, and total time (in seconds).
+    '''
+    return [
+        (name,) + bench(num_tasks)
+        for name, bench in BENCHMARKS
+    ]
+
+
+def run_backend_benchmarks(sleep_time=DEFAULT_SLEEP_TIME,
+                           num_tasks=DEFAULT_NUM_SLEEP_TASKS,
+                           num_workers=DEFAULT_NUM_WORKERS):
+    '''
+    Runs the sleep workload on each executor backend, and returns a list of
+    tuples containing the backend name, the latency histogram summary (see
+    `Histogram.to_dict`), and the throughput in tasks per second.
+    '''
+    results = []
+    for backend in EXECUTOR_BACKENDS:
+        executor = create_executor(backend, max_workers=num_workers)
+        latencies, total_time = run_sleep_workload(
+            executor, sleep_time, num_tasks,
+            max_wait_time=sleep_time * num_tasks * 2 + 5,
+        )
+        executor.shutdown(wait=True)
+
+        histogram = Histogram()
+        for latency in latencies:
+            histogram.record(latency)
+        results.append((backend, histogram.to_dict(), num_tasks / total_time))
+
+    return results
+
+
+def main():
+    num_tasks = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_NUM_TASKS
+    print('%d no-op tasks, %d workers' % (num_tasks, DEFAULT_NUM_WORKERS))
+    for name, enqueue_time, total_time in run_benchmarks(num_tasks):
+        print('%-28s enqueue %8.2fus/task, total %8.2fus/task' % (
+            name,
+            enqueue_time / num_tasks * 1e6,
+            total_time / num_tasks * 1e6,
+        ))
+
+    print('%d sleep tasks of %.1fms, %d workers' % (
+        DEFAULT_NUM_SLEEP_TASKS, DEFAULT_SLEEP_TIME * 1000,
+        DEFAULT_NUM_WORKERS,
+    ))
+    for backend, latency, throughput in run_backend_benchmarks():
+        print('%-28s latency mean %8.2fms, p95 %8.2fms, %8.1f tasks/s' % (
+            backend, latency['mean'] * 1000, latency['p95'] * 1000,
+            throughput,
+        ))
+
+
+class TestBenchmark(unittest.TestCase):
+    ''' Smoke test for the microbenchmark. '''
+
+    @log_function('[benchmark : smoke]')
+    def test_bm_smoke(self):
+        ''' Ensures that each benchmark runs to completion. '''
+        results = run_benchmarks(num_tasks=100)
+        self.assertEqual(len(BENCHMARKS), len(results))
+        for name, enqueue_time, total_time in results:
+            self.assertLessEqual(enqueue_time, total_time, name)
+
+    @log_function('[benchmark : backends]')
+    def test_bm_backends(self):
+        ''' Ensures that the workload runs on each backend. '''
+        results = run_backend_benchmarks(sleep_time=0.001, num_tasks=10)
+        self.assertEqual(len(EXECUTOR_BACKENDS), len(results))
+        for backend, latency, throughput in results:
+            self.assertEqual(10, latency['count'], backend)
+            self.assertGreater(throughput, 0, backend)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+
+'''
+tests/task/bulkhead.py
+Tests for the per-server and per-request class bulkheads.
+'''
+
+import logging
+import threading
+import unittest
+
+from lib.task.bulkhead import (
+    BULKHEAD_BACKGROUND,
+    BULKHEAD_INTERACTIVE,
+    BULKHEAD_SERVER,
+    BulkheadFullError,
+    Bulkheads,
+    get_request_class,
+)
+from lib.task.pool import Pool
+from lib.task.priority import (
+    PRIORITY_INTERACTIVE,
+    PRIORITY_NOTIFICATION,
+)
+from tests.lib.decorator import log_function
+
+logger = logging.getLogger('sublime-ycmd.' + __name__)
+
+
+class TestBulkheads(unittest.TestCase):
+    ''' Unit tests for bulkhead limits. '''
+
+    @log_function('[bulkhead : server limit]')
+    def test_bh_server_limit(self):
+        '''
+        Ensures that a full server bulkhead only rejects tasks for that server,
+        and that slots are given back on release.
+        '''
+        bulkheads = Bulkheads({BULKHEAD_SERVER: 2, BULKHEAD_BACKGROUND: 0})
+
+        slot = bulkheads.acquire('a', BULKHEAD_BACKGROUND)
+        bulkheads.acquire('a', BULKHEAD_BACKGROUND)
+        with self.assertRaises(BulkheadFullError):
+            bulkheads.acquire('a', BULKHEAD_BACKGROUND)
+        bulkheads.acquire('b', BULKHEAD_BACKGROUND)
+
+        bulkheads.release(slot)
+        bulkheads.acquire('a', BULKHEAD_BACKGROUND)
+
+        stats = bulkheads.get_stats()
+        self.assertEqual(1, stats['rejected'])
+        self.assertEqual(2, stats['servers']['a']['active'])
+        self.assertEqual(1, stats['servers']['a']['rejected'])
+        self.assertEqual(3, stats[BULKHEAD_BACKGROUND]['active'])
+
+    @log_function('[bulkhead : class limit]')
+    def test_bh_class_limit(self):
+        '''
+        Ensures that a full background bulkhead does not reject interactive
+        tasks.
+        '''
+        bulkheads = Bulkheads({
+            BULKHEAD_SERVER: 0, BULKHEAD_BACKGROUND: 1,
+            BULKHEAD_INTERACTIVE: 1,
+        })
+        self.assertEqual(
+            BULKHEAD_INTERACTIVE, get_request_class(PRIORITY_INTERACTIVE),
+        )
+        self.assertEqual(
+            BULKHEAD_BACKGROUND, get_request_class(PRIORITY_NOTIFICATION),
+        )
+
+        bulkheads.acquire('a', BULKHEAD_BACKGROUND)
+        with self.assertRaises(BulkheadFullError):
+            bulkheads.acquire('b', BULKHEAD_BACKGROUND)
+        bulkheads.acquire('b', BULKHEAD_INTERACTIVE)
+
+        with self.assertRaises(ValueError):
+            bulkheads.set_limits({'unknown': 1})
+        with self.assertRaises(ValueError):
+            bulkheads.set_limits({BULKHEAD_SERVER: -1})
+
+    @log_function('[bulkhead : discard]')
+    def test_bh_discard(self):
+        '''
+        Ensures that releasing a slot taken before its server bulkhead was
+        discarded does not affect the new bulkhead for that server.
+        '''
+        bulkheads = Bulkheads({BULKHEAD_SERVER: 2})
+        old_slot = bulkheads.acquire('a', BULKHEAD_BACKGROUND)
+        bulkheads.discard('a')
+
+        bulkheads.acquire('a', BULKHEAD_BACKGROUND)
+        bulkheads.release(old_slot)
+
+        stats = bulkheads.get_stats()
+        self.assertEqual(1, stats['servers']['a']['active'])
+        self.assertEqual(1, stats[BULKHEAD_BACKGROUND]['active'])
+
+    @log_function('[bulkhead : unchecked]')
+    def test_bh_unchecked(self):
+        '''
+        Ensures that slots taken without checking the limit are counted, but
+        never rejected.
+        '''
+        bulkheads = Bulkheads({BULKHEAD_SERVER: 2})
+        for _ in range(3):
+            bulkheads.acquire('a', BULKHEAD_BACKGROUND, check_limit=False)
+
+        with self.assertRaises(BulkheadFullError):
+            bulkheads.acquire('a', BULKHEAD_BACKGROUND)
+
+        stats = bulkheads.get_stats()
+        self.assertEqual(3, stats['servers']['a']['active'])
+        self.assertEqual(1, stats['rejected'])
+
+    @log_function('[bulkhead : hung server]')
+    def test_bh_hung_server(self):
+        '''
+        Ensures that tasks for a server that never responds cannot take up
+        every worker, so tasks for other servers still run.
+        '''
+        pool = Pool(max_workers=4)
+        bulkheads = Bulkheads({BULKHEAD_SERVER: 2, BULKHEAD_BACKGROUND: 0})
+        hung = threading.Event()
+
+        def submit(server_key, fn):
+            try:
+                slot = bulkheads.acquire(server_key, BULKHEAD_BACKGROUND)
+            except BulkheadFullError:
+                return None
+            future = pool.submit(fn)
+            future.add_done_callback(lambda future: bulkheads.release(slot))
+            return future
+
+        try:
+            hung_futures = [submit('hung', hung.wait) for _ in range(8)]
+            self.assertEqual(2, sum(1 for f in hung_futures if f))
+
+            healthy_future = submit('healthy', lambda: True)
+            self.assertTrue(healthy_future.result(timeout=5))
+        finally:
+            hung.set()
+            pool.shutdown(wait=True, timeout=5)
+
+        self.assertEqual(6, bulkheads.get_stats()['rejected'])
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+
+'''
+tests/task/cancel.py
+Tests for task deadlines and cooperative cancellation.
+'''
+
+import logging
+import threading
+import time
+import unittest
+
+from concurrent.futures import CancelledError
+
+from lib.task import (
+    CancellationToken,
+    Pool,
+    Task,
+)
+from tests.lib.decorator import log_function
+
+logger = logging.getLogger('sublime-ycmd.' + __name__)
+
+
+def block_pool(pool):
+    '''
+    Submits a task that occupies a worker until the returned event is set.
+    Returns once the task is running.
+    '''
+    started = threading.Event()
+    release = threading.Event()
+
+    def block():
+        started.set()
+        release.wait(5)
+
+    pool.submit(block)
+    assert started.wait(5), 'blocking task did not start'
+    return release
+
+
+class TestCancellationToken(unittest.TestCase):
+    ''' Unit tests for the cancellation token. '''
+
+    @log_function('[cancel : token]')
+    def test_ct_token(self):
+        ''' Ensures that tokens report cancellation and expiry. '''
+        token = CancellationToken()
+        self.assertFalse(token.cancelled())
+        self.assertIsNone(token.remaining())
+        self.assertEqual(1, token.remaining(1))
+
+        token.cancel()
+        self.assertTrue(token.cancelled())
+        with self.assertRaises(CancelledError):
+            token.raise_if_cancelled()
+
+        expired_token = CancellationToken(deadline=time.monotonic() - 1)
+        self.assertTrue(expired_token.expired())
+        self.assertTrue(expired_token.cancelled())
+        self.assertEqual(0, expired_token.remaining(10))
+
+
+class TestTaskDrop(unittest.TestCase):
+    '''
+    Unit tests for dropping tasks at dequeue. Cancelled and expired tasks
+    should not run, and should be counted.
+    '''
+
+    @log_function('[cancel : drop]')
+    def test_td_drop(self):
+        ''' Ensures that cancelled and expired tasks are skipped. '''
+        pool = Pool(max_workers=1)
+        release = block_pool(pool)
+        runs = []
+
+        cancelled_future = pool.submit(runs.append, 'cancelled')
+        self.assertTrue(cancelled_future.cancel())
+
+        expired_future = pool.submit(
+            runs.append, 'expired', deadline=time.monotonic() + 0.01,
+        )
+
+        token = CancellationToken()
+        token_future = pool.submit(
+            lambda cancel_token: runs.append('token'), cancel_token=token,
+        )
+        token.cancel()
+
+        ok_future = pool.submit(runs.append, 'ok')
+
+        time.sleep(0.05)
+        release.set()
+        ok_future.result(timeout=5)
+        pool.shutdown(wait=True, timeout=5)
+
+        self.assertEqual(['ok'], runs)
+        self.assertTrue(expired_future.cancelled())
+        self.assertTrue(token_future.cancelled())
+        self.assertEqual({
+            Task.DROP_CANCELLED: 2,
+            Task.DROP_EXPIRED: 1,
+        }, pool.get_dropped_counts())
+
+    @log_function('[cancel : cooperative]')
+    def test_td_cooperative(self):
+        ''' Ensures that running tasks receive the token, and can stop. '''
+        pool = Pool(max_workers=1)
+        started = threading.Event()
+        token = CancellationToken()
+
+        def long_running(cancel_token):
+            started.set()
+            cancel_token.wait(5)
+            cancel_token.raise_if_cancelled()
+            return 'finished'
+
+        future = pool.submit(long_running, cancel_token=token)
+        self.assertTrue(started.wait(5))
+        token.cancel()
+
+        with self.assertRaises(CancelledError):
+            future.result(timeout=5)
+        pool.shutdown(wait=True, timeout=5)
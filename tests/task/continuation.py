@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+
+'''
+tests/task/continuation.py
+Tests for future continuations and the main thread dispatcher.
+
+Ticks are captured and fired manually, in place of the main thread.
+'''
+
+import concurrent.futures
+import logging
+import threading
+import unittest
+
+from lib.task.continuation import (
+    ON_MAIN,
+    ON_WORKER,
+    MainThreadDispatcher,
+)
+from tests.lib.decorator import log_function
+
+logger = logging.getLogger('sublime-ycmd.' + __name__)
+
+
+class ManualTicks(object):
+    ''' Captures scheduled ticks, so they can be fired on demand. '''
+
+    def __init__(self):
+        self.callbacks = []
+
+    def __call__(self, callback, delay):
+        self.callbacks.append(callback)
+
+    def fire(self):
+        callbacks = self.callbacks
+        self.callbacks = []
+        for callback in callbacks:
+            callback()
+
+
+class TestContinuation(unittest.TestCase):
+    '''
+    Unit tests for continuations. Main thread continuations should be
+    batched into a single tick, while worker continuations run right away.
+    '''
+
+    @log_function('[continuation : batch]')
+    def test_ct_batch(self):
+        ''' Ensures that main thread continuations share a single tick. '''
+        ticks = ManualTicks()
+        dispatcher = MainThreadDispatcher(set_timeout=ticks)
+        futures = [concurrent.futures.Future() for _ in range(5)]
+        continuations = [
+            dispatcher.then(future, lambda f: f.result() * 2, on=ON_MAIN)
+            for future in futures
+        ]
+
+        for index, future in enumerate(futures):
+            future.set_result(index)
+        self.assertEqual(1, len(ticks.callbacks))
+        self.assertFalse(any(c.done() for c in continuations))
+
+        ticks.fire()
+        self.assertEqual(
+            [0, 2, 4, 6, 8], [c.result(timeout=0) for c in continuations],
+        )
+
+        stats = dispatcher.get_stats()
+        self.assertEqual(5, stats['dispatched'])
+        self.assertEqual(1, stats['ticks'])
+        self.assertEqual(0, stats['pending'])
+
+    @log_function('[continuation : worker]')
+    def test_ct_worker(self):
+        ''' Ensures that worker continuations run on the completing thread. '''
+        ticks = ManualTicks()
+        dispatcher = MainThreadDispatcher(set_timeout=ticks)
+        future = concurrent.futures.Future()
+        threads = []
+
+        def record_thread(done_future):
+            threads.append(threading.current_thread())
+            return done_future.result()
+
+        continuation = dispatcher.then(future, record_thread, on=ON_WORKER)
+        completer = threading.Thread(target=future.set_result, args=('done',))
+        completer.start()
+        completer.join(timeout=5)
+
+        self.assertEqual('done', continuation.result(timeout=5))
+        self.assertEqual([completer], threads)
+        self.assertEqual([], ticks.callbacks)
+
+    @log_function('[continuation : errors]')
+    def test_ct_errors(self):
+        '''
+        Ensures that errors in continuations are set on the returned future,
+        and do not stop the rest of the batch.
+        '''
+        ticks = ManualTicks()
+        dispatcher = MainThreadDispatcher(set_timeout=ticks)
+        future = concurrent.futures.Future()
+
+        def fail(done_future):
+            raise RuntimeError('failed')
+
+        failed = dispatcher.then(future, fail)
+        succeeded = dispatcher.then(future, lambda f: f.exception())
+        future.set_exception(ValueError('task failed'))
+        ticks.fire()
+
+        with self.assertRaises(RuntimeError):
+            failed.result(timeout=0)
+        self.assertIsInstance(succeeded.result(timeout=0), ValueError)
+
+        with self.assertRaises(ValueError):
+            dispatcher.then(future, fail, on='elsewhere')
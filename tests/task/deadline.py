@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+
+'''
+tests/task/deadline.py
+Tests for end-to-end request deadlines.
+'''
+
+import logging
+import time
+import unittest
+
+from concurrent.futures import CancelledError
+
+from lib.task import (
+    CancellationToken,
+    Pool,
+)
+from lib.task.deadline import (
+    PHASE_CONNECT,
+    PHASE_QUEUE,
+    PHASE_SEND,
+    Deadline,
+    check_remaining,
+    mark_phase,
+)
+from tests.lib.decorator import log_function
+
+logger = logging.getLogger('sublime-ycmd.' + __name__)
+
+
+class TestDeadline(unittest.TestCase):
+    ''' Unit tests for the deadline token. '''
+
+    @log_function('[deadline : phases]')
+    def test_dl_phases(self):
+        '''
+        Ensures that marked phases are recorded in order, that marking a phase
+        again adds to it, and that the total covers all of them.
+        '''
+        deadline = Deadline(5)
+        deadline.mark(PHASE_CONNECT)
+        time.sleep(0.02)
+        deadline.mark(PHASE_SEND)
+        deadline.mark(PHASE_CONNECT)
+
+        phases = deadline.get_phases()
+        self.assertEqual(
+            [PHASE_CONNECT, PHASE_SEND, 'total'], list(phases.keys()),
+        )
+        self.assertGreaterEqual(phases[PHASE_SEND], 0.02)
+        self.assertAlmostEqual(
+            phases['total'], phases[PHASE_CONNECT] + phases[PHASE_SEND],
+        )
+
+        # other tokens do not record anything
+        mark_phase(CancellationToken(), PHASE_SEND)
+        mark_phase(None, PHASE_SEND)
+
+    @log_function('[deadline : check remaining]')
+    def test_dl_check_remaining(self):
+        '''
+        Ensures that each phase is capped at what is left of the budget, and
+        that an expired deadline raises a `TimeoutError`.
+        '''
+        self.assertEqual(3, check_remaining(None, PHASE_SEND, 3))
+
+        deadline = Deadline(5)
+        self.assertLessEqual(check_remaining(deadline, PHASE_SEND), 5)
+        self.assertEqual(1, check_remaining(deadline, PHASE_SEND, 1))
+
+        expired = Deadline(0)
+        with self.assertRaises(TimeoutError):
+            check_remaining(expired, PHASE_SEND, 1)
+
+        token = CancellationToken(deadline=time.monotonic() - 1)
+        with self.assertRaises(CancelledError):
+            check_remaining(token, PHASE_SEND, 1)
+
+    @log_function('[deadline : queue phase]')
+    def test_dl_queue_phase(self):
+        '''
+        Ensures that the time a task spends waiting for a worker is recorded
+        on its deadline.
+        '''
+        pool = Pool(max_workers=1)
+        deadline = Deadline(5)
+        try:
+            future = pool.submit(
+                lambda cancel_token: cancel_token.get_phases(),
+                cancel_token=deadline,
+            )
+            phases = future.result(timeout=5)
+        finally:
+            pool.shutdown(wait=True, timeout=5)
+
+        self.assertIn(PHASE_QUEUE, phases)
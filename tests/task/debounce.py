@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+
+'''
+tests/task/debounce.py
+Tests for the keyed debouncer.
+
+Uses short real-time delays, so timings are generous to avoid flaky results.
+'''
+
+import logging
+import threading
+import time
+import unittest
+
+from concurrent.futures import Future
+
+from lib.task.debounce import Debouncer
+from tests.lib.decorator import log_function
+
+logger = logging.getLogger('sublime-ycmd.' + __name__)
+
+# debounce delay used in the tests, in seconds
+DELAY = 0.05
+
+
+class CountingTimer(object):
+    ''' Wraps `threading.Timer`, and counts how many timers were created. '''
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, callback, delay):
+        self.count += 1
+        timer = threading.Timer(delay, callback)
+        timer.daemon = True
+        timer.start()
+
+
+class TestDebouncer(unittest.TestCase):
+    '''
+    Unit tests for the debouncer. Bursts of activity should result in a single
+    run, with a single outstanding timer per key.
+    '''
+
+    @log_function('[debounce : burst]')
+    def test_db_burst(self):
+        ''' Ensures that a burst of touches results in a single run. '''
+        set_timeout = CountingTimer()
+        debouncer = Debouncer(DELAY, set_timeout=set_timeout)
+        runs = []
+
+        for _ in range(20):
+            debouncer.touch(1, lambda: runs.append(1))
+            time.sleep(DELAY / 10)
+
+        self.assertTrue(debouncer.is_scheduled(1))
+        self.assertEqual([], runs)
+
+        time.sleep(DELAY * 6)
+        self.assertEqual([1], runs)
+        self.assertFalse(debouncer.is_scheduled(1))
+        # the timer is re-armed rather than recreated on each touch
+        self.assertLess(set_timeout.count, 10)
+
+    @log_function('[debounce : flush]')
+    def test_db_flush(self):
+        ''' Ensures that a flush runs immediately, and cancels the timer. '''
+        debouncer = Debouncer(DELAY)
+        runs = []
+
+        debouncer.touch(1, lambda: runs.append('idle'))
+        debouncer.flush(1, lambda: runs.append('save'))
+        self.assertEqual(['save'], runs)
+
+        time.sleep(DELAY * 4)
+        self.assertEqual(['save'], runs)
+
+    @log_function('[debounce : in flight]')
+    def test_db_in_flight(self):
+        '''
+        Ensures that only one run is in flight per key, and that requests made
+        during a run are coalesced into one follow-up run.
+        '''
+        debouncer = Debouncer(DELAY)
+        futures = []
+
+        def start_run():
+            future = Future()
+            futures.append(future)
+            return future
+
+        debouncer.flush(1, start_run)
+        debouncer.flush(1, start_run)
+        debouncer.flush(1, start_run)
+        self.assertEqual(1, len(futures))
+
+        # other keys are independent
+        debouncer.flush(2, start_run)
+        self.assertEqual(2, len(futures))
+
+        futures[0].set_result(None)
+        self.assertEqual(3, len(futures))
+
+        futures[2].set_result(None)
+        futures[1].set_result(None)
+        self.assertEqual(3, len(futures))
+
+    @log_function('[debounce : cancel]')
+    def test_db_cancel(self):
+        ''' Ensures that cancelled keys do not run. '''
+        debouncer = Debouncer(DELAY)
+        runs = []
+
+        debouncer.touch(1, lambda: runs.append(1))
+        debouncer.cancel(1)
+        self.assertEqual(0, len(debouncer))
+
+        time.sleep(DELAY * 4)
+        self.assertEqual([], runs)
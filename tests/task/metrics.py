@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+
+'''
+tests/task/metrics.py
+Tests for the task pool metrics.
+'''
+
+import logging
+import threading
+import time
+import unittest
+
+from lib.task import Pool
+from lib.task.metrics import (
+    Histogram,
+    PoolMetrics,
+    get_callable_name,
+)
+from tests.lib.decorator import log_function
+
+logger = logging.getLogger('sublime-ycmd.' + __name__)
+
+
+class TestMetrics(unittest.TestCase):
+    ''' Unit tests for the histogram and metrics records. '''
+
+    @log_function('[metrics : histogram]')
+    def test_mt_histogram(self):
+        ''' Ensures that values are bucketed, and percentiles are bounded. '''
+        histogram = Histogram(bounds=(0.01, 0.1, 1))
+        for value in (0.005, 0.005, 0.05, 0.5, 3):
+            histogram.record(value)
+
+        summary = histogram.to_dict()
+        self.assertEqual(5, summary['count'])
+        self.assertEqual(3, summary['max'])
+        self.assertEqual(
+            [(0.01, 2), (0.1, 1), (1, 1), (None, 1)], summary['buckets'],
+        )
+        self.assertEqual(0.1, summary['p50'])
+        self.assertEqual(3, summary['p95'])
+
+    @log_function('[metrics : slow tasks]')
+    def test_mt_slow_tasks(self):
+        ''' Ensures that only the slowest tasks are kept, slowest first. '''
+        metrics = PoolMetrics(slow_task_count=2)
+        metrics.record_task('a', 0, 0.1)
+        metrics.record_task('b', 0, 0.3)
+        metrics.record_task('c', 0, 0.2)
+
+        slow_tasks = metrics.to_dict()['slow_tasks']
+        self.assertEqual(['b', 'c'], [task['name'] for task in slow_tasks])
+
+    @log_function('[metrics : callable name]')
+    def test_mt_callable_name(self):
+        ''' Ensures that callables are named after their definition. '''
+        self.assertEqual(
+            'lib.task.metrics.get_callable_name',
+            get_callable_name(get_callable_name),
+        )
+        self.assertTrue(get_callable_name(self.test_mt_callable_name).endswith(
+            'TestMetrics.test_mt_callable_name',
+        ))
+
+    @log_function('[metrics : pool]')
+    def test_mt_pool(self):
+        ''' Ensures that a pool records depth, wait, and run times. '''
+        pool = Pool(max_workers=1)
+        release = threading.Event()
+
+        futures = [pool.submit(release.wait, 5)]
+        futures.extend(pool.submit(time.sleep, 0.01) for _ in range(4))
+        release.set()
+        for future in futures:
+            future.result(timeout=5)
+
+        metrics = pool.get_metrics()
+        pool.shutdown(wait=True, timeout=5)
+
+        self.assertEqual(5, metrics['run_time']['count'])
+        self.assertEqual(5, metrics['wait_time']['count'])
+        self.assertGreaterEqual(metrics['peak_queue_depth'], 3)
+        self.assertEqual(0, metrics['queue_depth'])
+        self.assertGreater(metrics['busy_ratio'], 0)
+        self.assertLessEqual(metrics['busy_ratio'], 1)
+        self.assertEqual(5, len(metrics['slow_tasks']))
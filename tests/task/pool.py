@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+
+'''
+tests/task/pool.py
+Tests for the elastic task pool.
+
+Workers are started and stopped on other threads, so the tests poll for the
+expected worker count instead of checking it right away.
+'''
+
+import logging
+import threading
+import time
+import unittest
+
+from lib.task import Pool
+from tests.lib.decorator import log_function
+
+logger = logging.getLogger('sublime-ycmd.' + __name__)
+
+
+def wait_for_workers(pool, num_workers, timeout=5):
+    '''
+    Polls `pool` until it has `num_workers` workers. Returns the final count,
+    which may differ if `timeout` seconds pass first.
+    '''
+    deadline = time.monotonic() + timeout
+    while pool.num_workers != num_workers and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return pool.num_workers
+
+
+class TestElasticPool(unittest.TestCase):
+    '''
+    Unit tests for the elastic pool. Workers should be spawned on demand, and
+    exit once idle, without going outside the bounds.
+    '''
+
+    @log_function('[pool : burst]')
+    def test_ep_burst(self):
+        '''
+        Ensures that workers are spawned for a burst of tasks, and that they
+        exit once they are idle.
+        '''
+        pool = Pool(max_workers=4, idle_timeout=0.1)
+        self.assertEqual(1, pool.num_workers)
+
+        release = threading.Event()
+        futures = [pool.submit(release.wait, 5) for _ in range(8)]
+        self.assertEqual(4, wait_for_workers(pool, 4))
+
+        release.set()
+        for future in futures:
+            future.result(timeout=5)
+
+        self.assertEqual(1, wait_for_workers(pool, 1))
+        pool.shutdown(wait=True, timeout=5)
+
+    @log_function('[pool : resize]')
+    def test_ep_resize(self):
+        ''' Ensures that a running pool can be grown and shrunk in place. '''
+        pool = Pool(max_workers=2, min_workers=0, idle_timeout=60)
+        self.assertEqual(0, pool.num_workers)
+
+        pool.resize(min_workers=3, max_workers=6)
+        self.assertEqual(3, pool.num_workers)
+
+        pool.resize(min_workers=0, max_workers=1)
+        self.assertEqual(1, wait_for_workers(pool, 1))
+
+        future = pool.submit(lambda: 'done')
+        self.assertEqual('done', future.result(timeout=5))
+
+        with self.assertRaises(ValueError):
+            pool.resize(min_workers=2, max_workers=1)
+
+        pool.shutdown(wait=True, timeout=5)
+
+
+class TestKeyedPool(unittest.TestCase):
+    '''
+    Unit tests for keyed tasks. Tasks with the same key should run in order,
+    one at a time, while different keys run in parallel.
+    '''
+
+    @log_function('[pool : keyed order]')
+    def test_kp_order(self):
+        ''' Ensures that tasks for each key run in submission order. '''
+        pool = Pool(max_workers=8)
+        runs = dict((key, []) for key in range(4))
+        running = dict((key, 0) for key in range(4))
+        overlaps = []
+
+        def run(key, index):
+            running[key] += 1
+            if running[key] > 1:
+                overlaps.append(key)
+            time.sleep(0.001 * (index % 3))
+            runs[key].append(index)
+            running[key] -= 1
+
+        futures = [
+            pool.submit_keyed(key, run, key, index)
+            for index in range(20) for key in range(4)
+        ]
+        for future in futures:
+            future.result(timeout=5)
+        pool.shutdown(wait=True, timeout=5)
+
+        for key in range(4):
+            self.assertEqual(list(range(20)), runs[key])
+        self.assertEqual([], overlaps)
+        self.assertEqual({}, pool.get_keyed_depths())
+
+    @log_function('[pool : keyed parallel]')
+    def test_kp_parallel(self):
+        '''
+        Ensures that different keys run in parallel, and that the backlog
+        depth is reported per key. Cancelled backlog tasks are skipped.
+        '''
+        pool = Pool(max_workers=4)
+        barrier = threading.Barrier(2, timeout=5)
+        release = threading.Event()
+        runs = []
+
+        def wait_and_hold():
+            barrier.wait()
+            release.wait(5)
+
+        first = pool.submit_keyed('a', wait_and_hold)
+        second = pool.submit_keyed('b', barrier.wait)
+        skipped = pool.submit_keyed('a', runs.append, 'skipped')
+        last = pool.submit_keyed('a', runs.append, 'last')
+
+        self.assertEqual(3, pool.get_keyed_depths()['a'])
+        self.assertTrue(skipped.cancel())
+        release.set()
+
+        # would raise `BrokenBarrierError` if the keys ran one at a time
+        first.result(timeout=5)
+        second.result(timeout=5)
+        last.result(timeout=5)
+        pool.shutdown(wait=True, timeout=5)
+
+        self.assertEqual(['last'], runs)
+        self.assertEqual({}, pool.get_keyed_depths())
+
+
+class TestBulkPool(unittest.TestCase):
+    ''' Unit tests for queueing tasks in bulk. '''
+
+    @log_function('[pool : submit many]')
+    def test_bp_submit_many(self):
+        ''' Ensures that a batch of calls is run, and results line up. '''
+        pool = Pool(max_workers=4)
+        futures = pool.submit_many(
+            [(pow, (2, i)) for i in range(10)] +
+            [(int, ('ff',), {'base': 16})]
+        )
+        results = [future.result(timeout=5) for future in futures]
+        self.assertEqual([2 ** i for i in range(10)] + [255], results)
+
+        with self.assertRaises(TypeError):
+            pool.submit_many([pow])
+
+        pool.shutdown(wait=True, timeout=5)
+
+    @log_function('[pool : map]')
+    def test_bp_map(self):
+        ''' Ensures that map yields results in order. '''
+        pool = Pool(max_workers=4)
+
+        def slow_square(x):
+            time.sleep(0.001 * (5 - x % 5))
+            return x * x
+
+        self.assertEqual(
+            [x * x for x in range(20)],
+            list(pool.map(slow_square, range(20), timeout=5)),
+        )
+        pool.shutdown(wait=True, timeout=5)
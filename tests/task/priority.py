@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+
+'''
+tests/task/priority.py
+Tests for the priority task queue, and its use in the task pool.
+'''
+
+import logging
+import queue
+import threading
+import time
+import unittest
+
+from lib.task import Pool
+from lib.task.priority import (
+    PRIORITY_INTERACTIVE,
+    PRIORITY_HEALTH,
+    PRIORITY_NOTIFICATION,
+    PRIORITY_STARTUP,
+    PriorityTaskQueue,
+)
+from tests.lib.decorator import log_function
+
+logger = logging.getLogger('sublime-ycmd.' + __name__)
+
+
+class TestPriorityTaskQueue(unittest.TestCase):
+    '''
+    Unit tests for the priority task queue. Items should come out by class,
+    in FIFO order within each class, with aging for long waits.
+    '''
+
+    @log_function('[priority : order]')
+    def test_pq_order(self):
+        ''' Ensures that classes are ordered, and each class is a FIFO. '''
+        task_queue = PriorityTaskQueue(aging_interval=60)
+        task_queue.put('startup', priority=PRIORITY_STARTUP)
+        task_queue.put('notify-1')
+        task_queue.put('health', priority=PRIORITY_HEALTH)
+        task_queue.put('notify-2', priority=PRIORITY_NOTIFICATION)
+        task_queue.put(None)
+        task_queue.put('complete', priority=PRIORITY_INTERACTIVE)
+
+        items = [task_queue.get(block=False) for _ in range(6)]
+        self.assertEqual(
+            ['complete', 'health', 'notify-1', 'notify-2', 'startup', None],
+            items,
+        )
+        self.assertTrue(task_queue.empty())
+        with self.assertRaises(queue.Empty):
+            task_queue.get(block=False)
+        with self.assertRaises(queue.Empty):
+            task_queue.get(timeout=0.01)
+
+    @log_function('[priority : aging]')
+    def test_pq_aging(self):
+        ''' Ensures that long-waiting low priority items are promoted. '''
+        aging_interval = 0.05
+        task_queue = PriorityTaskQueue(aging_interval=aging_interval)
+        task_queue.put('startup', priority=PRIORITY_STARTUP)
+        time.sleep(aging_interval * 4)
+        task_queue.put('complete', priority=PRIORITY_INTERACTIVE)
+
+        self.assertEqual('startup', task_queue.get(block=False))
+        self.assertEqual('complete', task_queue.get(block=False))
+
+    @log_function('[priority : invalid]')
+    def test_pq_invalid(self):
+        ''' Ensures that unknown priorities are rejected. '''
+        task_queue = PriorityTaskQueue()
+        with self.assertRaises(ValueError):
+            task_queue.put('task', priority=42)
+        with self.assertRaises(TypeError):
+            task_queue.put('task', priority='high')
+
+    @log_function('[priority : pool]')
+    def test_pq_pool(self):
+        '''
+        Ensures that a pool runs queued interactive tasks ahead of a backlog,
+        and records the wait times for each class.
+        '''
+        pool = Pool(max_workers=1, aging_interval=60)
+        started = threading.Event()
+        release = threading.Event()
+        order = []
+
+        def block():
+            started.set()
+            release.wait(5)
+
+        pool.submit(block, priority=PRIORITY_STARTUP)
+        self.assertTrue(started.wait(5))
+
+        futures = [
+            pool.submit(order.append, 'notify-%d' % (i))
+            for i in range(5)
+        ]
+        futures.append(
+            pool.submit(order.append, 'complete',
+                        priority=PRIORITY_INTERACTIVE)
+        )
+
+        release.set()
+        for future in futures:
+            future.result(timeout=5)
+        pool.shutdown(wait=True, timeout=5)
+
+        self.assertEqual('complete', order[0])
+        self.assertEqual(['notify-%d' % (i) for i in range(5)], order[1:])
+
+        wait_stats = pool.get_wait_stats()
+        self.assertEqual(1, wait_stats['interactive']['count'])
+        self.assertEqual(5, wait_stats['notification']['count'])
+        self.assertEqual(1, wait_stats['startup']['count'])
+        self.assertEqual(0, wait_stats['health']['count'])
@@ -5,13 +5,21 @@ tests/task/simulate.py
 Tests for the task module as a whole.
 
 Sets up a task pool, workers, and tasks. Runs the tasks. Checks the results.
+
+The sleep workload is also run on each executor backend. The benchmark in
+`tests/task/benchmark.py` uses it to compare them.
 '''
 
+import concurrent.futures
 import logging
 import time
 import unittest
 
 from lib.task import Pool
+from lib.task.backend import (
+    EXECUTOR_BACKENDS,
+    create_executor,
+)
 from tests.lib.decorator import log_function
 
 logger = logging.getLogger('sublime-ycmd.' + __name__)
@@ -98,6 +106,47 @@ def stop_task_pool(pool, max_wait_time=5, sleep_interval=1):
         )
 
 
+def run_sleep_workload(executor, sleep_time, num_tasks, max_wait_time=5):
+    '''
+    Submits `num_tasks` tasks to `executor` that each sleep for `sleep_time`
+    seconds, and waits for them to finish.
+
+    Returns a tuple of the latency of each task (from submission until it
+    finished running), and the total run time. Times are in seconds.
+
+    Raises a `TimeoutError` if run time exceeds `max_wait_time` seconds.
+    '''
+    submit_times = []
+    finish_times = [None] * num_tasks
+
+    def _sleep(index):
+        time.sleep(sleep_time)
+        finish_times[index] = time.monotonic()
+
+    start_time = time.monotonic()
+    futures = []
+    for index in range(num_tasks):
+        submit_times.append(time.monotonic())
+        futures.append(executor.submit(_sleep, index))
+
+    finished_futures, unfinished_futures = concurrent.futures.wait(
+        futures, timeout=max_wait_time,
+    )
+    if unfinished_futures:
+        raise TimeoutError('run time exceeded %r seconds' % (max_wait_time))
+    total_time = time.monotonic() - start_time
+
+    for future in finished_futures:
+        # raises if the task failed
+        future.result(timeout=0)
+
+    latencies = [
+        finish_time - submit_time
+        for submit_time, finish_time in zip(submit_times, finish_times)
+    ]
+    return latencies, total_time
+
+
 def _calculate_expected_run_time(sleep_time, num_tasks, num_workers):
     return (float(sleep_time) * num_tasks) / num_workers
 
@@ -196,3 +245,29 @@ class TestSleepTasks(unittest.TestCase):
             sleep_time=sleep_time, num_tasks=num_tasks,
             num_workers=num_workers, max_wait_time=max_wait_time,
         )
+
+
+class TestBackendSleepTasks(unittest.TestCase):
+    '''
+    Runs the same sleep workload on each executor backend. Some backends only
+    have one thread, so the workload is kept small.
+    '''
+
+    @log_function('[task-sleep : backends]')
+    def test_sleep_backends(self):
+        ''' Ensures that each backend runs all of the tasks. '''
+        for backend in EXECUTOR_BACKENDS:
+            executor = create_executor(
+                backend, max_workers=4, thread_name_prefix='runtest-',
+            )
+            latencies, total_time = run_sleep_workload(
+                executor, sleep_time=0.01, num_tasks=8,
+            )
+            self.assertTrue(executor.shutdown(wait=True, timeout=5), backend)
+
+            self.assertEqual(8, len(latencies), backend)
+            self.assertGreaterEqual(min(latencies), 0.01, backend)
+            self.assertLessEqual(max(latencies), total_time, backend)
+            self.assertEqual(
+                8, executor.get_metrics()['run_time']['count'], backend,
+            )
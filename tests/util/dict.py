@@ -6,9 +6,13 @@ Tests for dictionary utility functions.
 '''
 
 import logging
+import threading
 import unittest
 
-from lib.util.dict import merge_dicts
+from lib.util.dict import (
+    CopyOnWriteDict,
+    merge_dicts,
+)
 from tests.lib.decorator import log_function
 from tests.lib.subtest import map_test_function
 
@@ -152,3 +156,92 @@ class TestMergeDictionaries(unittest.TestCase):
         map_test_function(
             self, test_md_overwrite_one, overwrite_cases,
         )
+
+
+class TestCopyOnWriteDict(unittest.TestCase):
+    '''
+    Unit tests for the copy-on-write dictionary. Readers should always see a
+    complete snapshot, even while writers are running.
+    '''
+
+    @log_function('[cow : basic]')
+    def test_cow_basic(self):
+        ''' Ensures that writes do not modify earlier snapshots. '''
+        cow = CopyOnWriteDict({'a': 1})
+        before = cow.snapshot()
+
+        cow['b'] = 2
+        self.assertEqual(1, cow.setdefault('a', 3))
+        self.assertEqual(4, cow.setdefault('c', 4))
+        self.assertEqual(2, cow.pop('b'))
+        self.assertIsNone(cow.pop('b'))
+
+        with cow.mutate() as data:
+            data['d'] = 5
+            del data['a']
+
+        self.assertEqual({'a': 1}, before)
+        self.assertEqual({'c': 4, 'd': 5}, cow.snapshot())
+        self.assertIn('c', cow)
+        self.assertNotIn('a', cow)
+        self.assertEqual(2, len(cow))
+
+    @log_function('[cow : aborted]')
+    def test_cow_mutate_aborted(self):
+        ''' Ensures that a failed `mutate` block publishes nothing. '''
+        cow = CopyOnWriteDict({'a': 1})
+
+        with self.assertRaises(KeyError):
+            with cow.mutate() as data:
+                data['b'] = 2
+                del data['missing']
+
+        self.assertEqual({'a': 1}, cow.snapshot())
+
+    @log_function('[cow : concurrent]')
+    def test_cow_concurrent(self):
+        '''
+        Runs readers alongside writers that move a fixed total between keys.
+        Each reader snapshot must always hold the full total.
+        '''
+        num_keys = 16
+        total = num_keys * 100
+        num_writes = 2000
+
+        cow = CopyOnWriteDict(
+            dict((key, total // num_keys) for key in range(num_keys))
+        )
+        stop = threading.Event()
+        errors = []
+
+        def writer(offset):
+            for index in range(num_writes):
+                src = (index + offset) % num_keys
+                dst = (index * 7 + offset + 1) % num_keys
+                with cow.mutate() as data:
+                    amount = min(data[src], 3)
+                    data[src] -= amount
+                    data[dst] += amount
+
+        def reader():
+            while not stop.is_set():
+                observed = sum(cow.snapshot().values())
+                if observed != total:
+                    errors.append(observed)
+                    return
+
+        readers = [threading.Thread(target=reader) for _ in range(4)]
+        writers = [
+            threading.Thread(target=writer, args=(offset,))
+            for offset in range(4)
+        ]
+        for thread in readers + writers:
+            thread.start()
+        for thread in writers:
+            thread.join()
+        stop.set()
+        for thread in readers:
+            thread.join()
+
+        self.assertEqual([], errors)
+        self.assertEqual(total, sum(cow.snapshot().values()))
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+
+'''
+tests/util/lock.py
+Tests for lock utilities.
+'''
+
+import logging
+import threading
+import time
+import unittest
+
+from lib.util.lock import (
+    InstrumentedLock,
+    get_lock_stats,
+    get_lock_stats_entry,
+    lock_guard,
+)
+from tests.lib.decorator import log_function
+
+logger = logging.getLogger('sublime-ycmd.' + __name__)
+
+
+class LockedCounter(object):
+    ''' Helper class with lock-guarded methods. '''
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.value = 0
+
+    @lock_guard()
+    def increment(self):
+        self.value += 1
+        return self.value
+
+    @lock_guard()
+    def is_lock_held(self):
+        # an `RLock` can only be re-acquired without blocking by its owner
+        # so if this succeeds from another thread, the lock was not held
+        result = []
+
+        def try_acquire():
+            acquired = self._lock.acquire(blocking=False)
+            if acquired:
+                self._lock.release()
+            result.append(acquired)
+
+        thread = threading.Thread(target=try_acquire)
+        thread.start()
+        thread.join()
+
+        return not result[0]
+
+
+class TestLockGuard(unittest.TestCase):
+    '''
+    Unit tests for the locking decorator. Methods should lock the instance,
+    not a lock shared across all instances.
+    '''
+
+    @log_function('[lock guard : instance]')
+    def test_lg_instance_lock(self):
+        ''' Ensures that methods acquire the instance lock. '''
+        counter = LockedCounter()
+        self.assertEqual(1, counter.increment())
+        self.assertTrue(counter.is_lock_held())
+
+    @log_function('[lock guard : independent]')
+    def test_lg_independent_instances(self):
+        ''' Ensures that separate instances do not serialize each other. '''
+        counter1 = LockedCounter()
+        counter2 = LockedCounter()
+
+        # hold the first instance lock on another thread, and ensure the
+        # second instance can still be used
+        holding = threading.Event()
+        release = threading.Event()
+
+        def hold_lock():
+            with counter1._lock:    # pylint: disable=protected-access
+                holding.set()
+                release.wait(timeout=5)
+
+        thread = threading.Thread(target=hold_lock)
+        thread.start()
+        holding.wait(timeout=5)
+
+        try:
+            result = []
+            worker = threading.Thread(
+                target=lambda: result.append(counter2.increment()),
+            )
+            worker.start()
+            worker.join(timeout=1)
+            self.assertEqual([1], result, 'second instance was blocked')
+        finally:
+            release.set()
+            thread.join()
+
+    @log_function('[lock guard : function]')
+    def test_lg_function(self):
+        ''' Ensures that plain functions use the explicit/default lock. '''
+        explicit_lock = threading.RLock()
+
+        @lock_guard(explicit_lock)
+        def is_locked(self=None):
+            # even with a `self` parameter, the explicit lock wins
+            # pylint: disable=protected-access
+            return explicit_lock._is_owned()
+
+        self.assertTrue(is_locked())
+
+
+class TestInstrumentedLock(unittest.TestCase):
+    '''
+    Unit tests for the instrumented lock. Statistics should reflect the
+    acquisitions, contention, and hold time.
+    '''
+
+    @log_function('[instrumented : uncontended]')
+    def test_il_uncontended(self):
+        ''' Ensures that reentrant acquisitions are counted once. '''
+        lock = InstrumentedLock('test-uncontended')
+        lock.stats.reset()
+
+        with lock:
+            with lock:
+                pass
+
+        stats = get_lock_stats()['test-uncontended']
+        self.assertEqual(1, stats['acquisitions'])
+        self.assertEqual(0, stats['contentions'])
+
+    @log_function('[instrumented : contended]')
+    def test_il_contended(self):
+        ''' Ensures that contention and wait time are recorded. '''
+        lock = InstrumentedLock('test-contended')
+        lock.stats.reset()
+        hold_time = 0.1
+
+        holding = threading.Event()
+
+        def hold_lock():
+            with lock:
+                holding.set()
+                time.sleep(hold_time)
+
+        thread = threading.Thread(target=hold_lock)
+        thread.start()
+        holding.wait(timeout=5)
+
+        with lock:
+            pass
+        thread.join()
+
+        stats = get_lock_stats_entry('test-contended').to_dict()
+        logger.debug('lock stats: %r', stats)
+        self.assertEqual(2, stats['acquisitions'])
+        self.assertEqual(1, stats['contentions'])
+        self.assertGreater(stats['max_wait_time'], 0)
+        self.assertGreaterEqual(stats['max_hold_time'], hold_time * 0.5)
+
+    @log_function('[instrumented : failed]')
+    def test_il_failed(self):
+        '''
+        Ensures that failed non-blocking and timed out acquisitions are only
+        counted as failed, and not as contended acquisitions.
+        '''
+        lock = InstrumentedLock('test-failed')
+        lock.stats.reset()
+
+        holding = threading.Event()
+        done = threading.Event()
+
+        def hold_lock():
+            with lock:
+                holding.set()
+                done.wait(timeout=5)
+
+        thread = threading.Thread(target=hold_lock)
+        thread.start()
+        holding.wait(timeout=5)
+
+        self.assertFalse(lock.acquire(blocking=False))
+        self.assertFalse(lock.acquire(timeout=0.01))
+        done.set()
+        thread.join()
+
+        stats = get_lock_stats_entry('test-failed').to_dict()
+        self.assertEqual(1, stats['acquisitions'])
+        self.assertEqual(0, stats['contentions'])
+        self.assertEqual(2, stats['failed'])
+        self.assertEqual(0.0, stats['total_wait_time'])
+
+    @log_function('[instrumented : condition]')
+    def test_il_condition(self):
+        ''' Ensures that the lock works with `threading.Condition`. '''
+        lock = InstrumentedLock('test-condition')
+        condition = threading.Condition(lock)
+        state = {'ready': False}
+
+        def notify():
+            with condition:
+                state['ready'] = True
+                condition.notify_all()
+
+        with lock:
+            thread = threading.Thread(target=notify)
+            thread.start()
+            with condition:
+                self.assertTrue(
+                    condition.wait_for(lambda: state['ready'], timeout=5),
+                )
+        thread.join()
+
+        # lock should be released entirely after leaving the blocks
+        self.assertTrue(lock.acquire(blocking=False))
+        lock.release()
+
+    @log_function('[instrumented : foreign release]')
+    def test_il_foreign_release(self):
+        '''
+        Ensures that releasing the lock from a thread that does not hold it
+        raises, and leaves the lock and its statistics untouched.
+        '''
+        lock = InstrumentedLock('test-foreign-release')
+        errors = []
+
+        def release():
+            try:
+                lock.release()
+            except RuntimeError as e:
+                errors.append(e)
+
+        with lock:
+            thread = threading.Thread(target=release)
+            thread.start()
+            thread.join()
+
+            self.assertEqual(1, len(errors))
+            # pylint: disable=protected-access
+            self.assertEqual(1, lock._depth)
+            self.assertIsNotNone(lock._acquired_at)
+            self.assertEqual(
+                0, get_lock_stats_entry('test-foreign-release')
+                .to_dict()['total_hold_time'],
+            )
+
+        self.assertFalse(lock._is_owned())
+        stats = get_lock_stats_entry('test-foreign-release').to_dict()
+        self.assertEqual(1, stats['acquisitions'])
+        self.assertGreater(stats['total_hold_time'], 0)
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+
+'''
+tests/util/trie.py
+Tests for the path trie.
+'''
+
+import logging
+import os
+import unittest
+
+from lib.util.trie import PathTrie
+from tests.lib.decorator import log_function
+from tests.lib.subtest import map_test_function
+
+logger = logging.getLogger('sublime-ycmd.' + __name__)
+
+if os.name == 'posix':
+    FS_ROOT = '/'
+elif os.name == 'nt':
+    FS_ROOT = 'C:\\'
+else:
+    logger.error('unknown os type, test data might be invalid')
+    FS_ROOT = ''
+
+
+def _path(*components):
+    return os.path.join(FS_ROOT, *components)
+
+
+class TestPathTrie(unittest.TestCase):
+    '''
+    Unit tests for the path trie. Exact lookups should only match stored
+    paths, and prefix lookups should match the closest stored ancestor.
+    '''
+
+    @log_function('[trie : exact]')
+    def test_pt_exact(self):
+        ''' Ensures that stored paths can be retrieved and removed. '''
+        trie = PathTrie()
+        trie[_path('usr', 'local')] = 1
+        trie[_path('usr', 'local', 'lib')] = 2
+
+        self.assertEqual(2, len(trie))
+        self.assertEqual(1, trie[_path('usr', 'local')])
+        self.assertEqual(1, trie[_path('usr', 'local') + os.sep])
+        self.assertEqual(2, trie[_path('usr', 'local', 'lib')])
+        self.assertNotIn(_path('usr'), trie)
+        self.assertIsNone(trie.get(_path('usr', 'local', 'bin')))
+
+        del trie[_path('usr', 'local')]
+        self.assertEqual(1, len(trie))
+        self.assertNotIn(_path('usr', 'local'), trie)
+        self.assertEqual(2, trie[_path('usr', 'local', 'lib')])
+
+        with self.assertRaises(KeyError):
+            del trie[_path('usr', 'local')]
+
+    @log_function('[trie : prefix]')
+    def test_pt_longest_prefix(self):
+        ''' Ensures that the closest stored ancestor is matched. '''
+        trie = PathTrie()
+        trie[_path('home', 'user', 'project')] = 'project'
+        trie[_path('home', 'user', 'project', 'vendor', 'lib')] = 'lib'
+
+        longest_prefix_cases = [
+            ((_path('home', 'user', 'project'),), {'expected': 'project'}),
+            ((_path('home', 'user', 'project', 'src'),),
+             {'expected': 'project'}),
+            ((_path('home', 'user', 'project', 'vendor'),),
+             {'expected': 'project'}),
+            ((_path('home', 'user', 'project', 'vendor', 'lib', 'a', 'b'),),
+             {'expected': 'lib'}),
+            ((_path('home', 'user', 'project2'),), {'expected': None}),
+            ((_path('home', 'user'),), {'expected': None}),
+            ((_path('home', 'user', 'project', '..', 'other'),),
+             {'expected': None}),
+        ]
+
+        def test_pt_longest_prefix_one(path, expected=None):
+            self.assertEqual(expected, trie.longest_prefix(path))
+
+        map_test_function(
+            self, test_pt_longest_prefix_one, longest_prefix_cases,
+        )
+
+    @log_function('[trie : prune]')
+    def test_pt_prune(self):
+        ''' Ensures that removing paths does not leave behind empty nodes. '''
+        trie = PathTrie()
+        paths = [
+            _path('a', 'b', 'c', str(i), str(j))
+            for i in range(32) for j in range(32)
+        ]
+        for path in paths:
+            trie.insert(path, path)
+        self.assertEqual(len(paths), len(trie))
+
+        for path in paths:
+            self.assertEqual(path, trie.remove(path))
+
+        self.assertEqual(0, len(trie))
+        # pylint: disable=protected-access
+        self.assertEqual({}, trie._root.children)
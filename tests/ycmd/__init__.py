@@ -0,0 +1,6 @@
+#!/usr/bin/env python3
+
+'''
+tests/ycmd
+Tests for the ycmd server module.
+'''
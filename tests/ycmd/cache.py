@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+
+'''
+tests/ycmd/cache.py
+Tests for the server startup artifact cache.
+'''
+
+import json
+import logging
+import os
+import sys
+import tempfile
+import unittest
+
+from lib.ycmd.cache import StartupCache
+from lib.ycmd.settings import (
+    generate_settings_data,
+    render_settings_template,
+)
+from tests.lib.decorator import log_function
+
+logger = logging.getLogger('sublime-ycmd.' + __name__)
+
+
+class TestStartupCache(unittest.TestCase):
+    ''' Unit tests for the startup cache. '''
+
+    def setUp(self):
+        self.cache = StartupCache()
+        temp_directory = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_directory.cleanup)
+        self.temp_directory = temp_directory.name
+
+    def _write_settings(self, settings):
+        settings_path = os.path.join(self.temp_directory, 'settings.json')
+        with open(settings_path, 'w') as settings_file:
+            json.dump(settings, settings_file)
+        return settings_path
+
+    @log_function('[cache : settings template]')
+    def test_sc_settings_template(self):
+        '''
+        Ensures that the rendered template matches the generated settings,
+        and that it is only regenerated when the file changes.
+        '''
+        settings_path = self._write_settings({
+            'filetype_whitelist': {}, 'filetype_blacklist': {},
+            'hmac_secret': '', 'max_diagnostics_to_display': 30,
+        })
+        hmac_secret = b'\x00secret\xff'
+
+        settings_template = self.cache.get_settings_template(settings_path)
+        self.assertEqual(
+            generate_settings_data(settings_path, hmac_secret),
+            json.loads(
+                render_settings_template(settings_template, hmac_secret)
+                .decode('utf-8')
+            ),
+        )
+        self.assertIs(
+            settings_template, self.cache.get_settings_template(settings_path),
+        )
+
+        self._write_settings({'max_diagnostics_to_display': 300})
+        settings_data = json.loads(render_settings_template(
+            self.cache.get_settings_template(settings_path), hmac_secret,
+        ).decode('utf-8'))
+        self.assertEqual(300, settings_data['max_diagnostics_to_display'])
+
+        stats = self.cache.get_stats()
+        self.assertEqual(1, stats['hits'])
+        self.assertEqual(2, stats['misses'])
+
+    @log_function('[cache : python binary]')
+    def test_sc_python_binary(self):
+        '''
+        Ensures that resolved binaries are cached, and that missing ones are
+        returned as-is without being cached.
+        '''
+        python_binary_path = os.path.abspath(sys.executable)
+        for _ in range(2):
+            self.assertEqual(
+                python_binary_path,
+                self.cache.resolve_python_binary(python_binary_path),
+            )
+        self.assertEqual(1, self.cache.get_stats()['hits'])
+
+        missing_path = os.path.join(self.temp_directory, 'python')
+        self.assertEqual(
+            missing_path, self.cache.resolve_python_binary(missing_path),
+        )
+        self.assertEqual(1, self.cache.get_stats()['entries'])
+
+    @log_function('[cache : module directory]')
+    def test_sc_module_directory(self):
+        '''
+        Ensures that a directory without a `__main__.py` is rejected, and
+        accepted once the file is added.
+        '''
+        with self.assertRaises(RuntimeError):
+            self.cache.check_ycmd_module_directory(self.temp_directory)
+
+        main_path = os.path.join(self.temp_directory, '__main__.py')
+        with open(main_path, 'w'):
+            pass
+        self.cache.check_ycmd_module_directory(self.temp_directory)
+        self.cache.check_ycmd_module_directory(self.temp_directory)
+        self.assertEqual(1, self.cache.get_stats()['hits'])
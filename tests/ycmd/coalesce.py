@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+
+'''
+tests/ycmd/coalesce.py
+Tests for the buffer event coalescer.
+
+Timers are captured and fired manually, so the tests do not depend on timing.
+'''
+
+import logging
+import unittest
+
+from concurrent.futures import Future
+
+from lib.ycmd.coalesce import EventCoalescer
+from tests.lib.decorator import log_function
+
+logger = logging.getLogger('sublime-ycmd.' + __name__)
+
+
+class ManualTimer(object):
+    ''' Captures timer callbacks, so they can be fired on demand. '''
+
+    def __init__(self):
+        self.callbacks = []
+
+    def __call__(self, callback, delay):
+        self.callbacks.append(callback)
+
+    def fire(self):
+        callbacks = self.callbacks
+        self.callbacks = []
+        for callback in callbacks:
+            callback()
+
+
+def submit_now(fn, server, key):
+    ''' Runs `fn` immediately, in place of a task pool. '''
+    fn()
+
+
+class TestEventCoalescer(unittest.TestCase):
+    '''
+    Unit tests for the event coalescer. Enter/leave events that cancel out
+    within the window should not be sent.
+    '''
+
+    @log_function('[coalesce : tab switching]')
+    def test_ec_tab_switching(self):
+        '''
+        Ensures that rapidly switching through tabs only sends the events for
+        the final state.
+        '''
+        timer = ManualTimer()
+        coalescer = EventCoalescer(0.1, submit_now, set_timeout=timer)
+        server = object()
+        sent = []
+
+        def sender(state, key):
+            return lambda: sent.append((state, key))
+
+        # start on buffer 0, which the server already knows about
+        coalescer.enter(server, 0, sender('enter', 0))
+        timer.fire()
+        self.assertEqual([('enter', 0)], sent)
+        del sent[:]
+
+        futures = []
+        current = 0
+        for _ in range(20):
+            for key in (1, 2, 3):
+                futures.append(
+                    coalescer.leave(server, current, sender('leave', current))
+                )
+                futures.append(
+                    coalescer.enter(server, key, sender('enter', key))
+                )
+                current = key
+        # a single timer for the whole burst
+        self.assertEqual(1, len(timer.callbacks))
+        timer.fire()
+
+        self.assertEqual(
+            sorted([('leave', 0), ('enter', 3)]), sorted(sent),
+        )
+        self.assertEqual(2, sum(1 for f in futures if f.done() and
+                                not f.cancelled()))
+
+        stats = coalescer.get_stats()
+        self.assertEqual(121, stats['received'])
+        self.assertEqual(3, stats['sent'])
+        self.assertEqual(118, stats['coalesced'])
+
+    @log_function('[coalesce : force]')
+    def test_ec_force(self):
+        ''' Ensures that forced enter events are always sent. '''
+        timer = ManualTimer()
+        coalescer = EventCoalescer(0.1, submit_now, set_timeout=timer)
+        server = object()
+        sent = []
+
+        coalescer.enter(server, 1, lambda: sent.append('enter'))
+        timer.fire()
+        self.assertEqual(['enter'], sent)
+
+        # already entered, so a plain enter is redundant
+        future = coalescer.enter(server, 1, lambda: sent.append('enter'))
+        timer.fire()
+        self.assertTrue(future.cancelled())
+        self.assertEqual(['enter'], sent)
+
+        # the forced flag is kept even if a plain enter supersedes it
+        coalescer.enter(server, 1, lambda: sent.append('parse'), force=True)
+        coalescer.enter(server, 1, lambda: sent.append('enter'))
+        timer.fire()
+        self.assertEqual(['enter', 'enter'], sent)
+
+    @log_function('[coalesce : rejected]')
+    def test_ec_rejected(self):
+        '''
+        Ensures that an event that fails to be sent is not recorded, so the
+        next enter for the buffer is still sent.
+        '''
+        timer = ManualTimer()
+        rejected = []
+        sent = []
+
+        def submit(fn, server, key):
+            if not rejected:
+                rejected.append(key)
+                future = Future()
+                future.set_exception(RuntimeError('rejected'))
+                return future
+            fn()
+            return None
+
+        coalescer = EventCoalescer(0.05, submit, set_timeout=timer)
+        server = object()
+
+        first_future = coalescer.enter(server, 1, lambda: sent.append(1))
+        timer.fire()
+        self.assertIsInstance(first_future.exception(), RuntimeError)
+
+        second_future = coalescer.enter(server, 1, lambda: sent.append(2))
+        timer.fire()
+        self.assertFalse(second_future.cancelled())
+        self.assertEqual([2], sent)
+        self.assertEqual(
+            {'received': 2, 'coalesced': 0, 'sent': 1},
+            coalescer.get_stats(),
+        )
+
+        # a failing request rolls back the same way
+        def fail():
+            raise RuntimeError('request failed')
+
+        coalescer.leave(server, 1, fail)
+        timer.fire()
+        leave_future = coalescer.leave(server, 1, lambda: sent.append(-1))
+        timer.fire()
+        self.assertFalse(leave_future.cancelled())
+        self.assertEqual([2, -1], sent)
+
+    @log_function('[coalesce : disabled]')
+    def test_ec_disabled(self):
+        ''' Ensures that a window of 0 sends every event immediately. '''
+        timer = ManualTimer()
+        coalescer = EventCoalescer(0, submit_now, set_timeout=timer)
+        server = object()
+        sent = []
+
+        for key in (1, 2, 1):
+            future = coalescer.enter(server, key, lambda: sent.append(key))
+            self.assertTrue(future.done())
+            coalescer.leave(server, key, lambda: sent.append(-key))
+
+        self.assertEqual([1, -1, 2, -2, 1, -1], sent)
+        self.assertEqual([], timer.callbacks)
+        self.assertEqual(0, coalescer.get_stats()['coalesced'])
+
+    @log_function('[coalesce : discard]')
+    def test_ec_discard(self):
+        ''' Ensures that discarded servers have no pending events. '''
+        timer = ManualTimer()
+        coalescer = EventCoalescer(0.1, submit_now, set_timeout=timer)
+        server = object()
+        sent = []
+
+        future = coalescer.enter(server, 1, lambda: sent.append(1))
+        coalescer.discard(server)
+        timer.fire()
+
+        self.assertTrue(future.cancelled())
+        self.assertEqual([], sent)
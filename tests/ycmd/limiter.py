@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+
+'''
+tests/ycmd/limiter.py
+Tests for the per-server in-flight request limit.
+
+Requests are submitted to a fake executor, which hands back futures that are
+finished manually, in place of a task pool and a ycmd server.
+'''
+
+import logging
+import unittest
+
+from concurrent.futures import Future
+
+from lib.ycmd.limiter import RequestLimiter
+from tests.lib.decorator import log_function
+
+logger = logging.getLogger('sublime-ycmd.' + __name__)
+
+
+class ManualExecutor(object):
+    ''' Records submitted requests, and finishes them on demand. '''
+
+    def __init__(self):
+        self.submitted = []
+
+    def submit(self, name):
+        future = Future()
+        self.submitted.append((name, future))
+        return future
+
+    def finish(self, name):
+        for submitted_name, future in self.submitted:
+            if submitted_name == name:
+                future.set_result(name)
+                return
+        raise KeyError(name)
+
+
+class TestRequestLimiter(unittest.TestCase):
+    ''' Unit tests for the request limiter. '''
+
+    def setUp(self):
+        self.executor = ManualExecutor()
+
+    def _submitted_names(self):
+        return [name for name, _ in self.executor.submitted]
+
+    @log_function('[limiter : limit]')
+    def test_rl_limit(self):
+        '''
+        Ensures that requests over the limit are queued until a slot frees
+        up, and that their futures resolve with the submitted result.
+        '''
+        limiter = RequestLimiter(max_in_flight=2)
+        futures = [
+            limiter.submit(None, 1, self.executor.submit, name)
+            for name in ('a', 'b', 'c')
+        ]
+        self.assertEqual(['a', 'b'], self._submitted_names())
+        self.assertEqual(1, limiter.get_stats()['queued'])
+
+        self.executor.finish('a')
+        self.assertEqual(['a', 'b', 'c'], self._submitted_names())
+        self.executor.finish('c')
+        self.assertEqual('c', futures[2].result(timeout=0))
+
+        stats = limiter.get_stats()
+        self.assertEqual(1, stats['in_flight'])
+        self.assertEqual(3, stats['dispatched'])
+        self.assertEqual(3, stats['queue_delay']['count'])
+
+    @log_function('[limiter : round robin]')
+    def test_rl_round_robin(self):
+        '''
+        Ensures that queued requests are sent round-robin across windows,
+        then across views, and in order within a view.
+        '''
+        limiter = RequestLimiter(max_in_flight=1)
+        limiter.submit(1, 1, self.executor.submit, 'first')
+        # a busy view in window 1, and two quieter views
+        for name in ('1a', '1b', '1c'):
+            limiter.submit(1, 1, self.executor.submit, name)
+        limiter.submit(1, 2, self.executor.submit, '2a')
+        limiter.submit(2, 3, self.executor.submit, '3a')
+
+        for name in ('first', '1a', '3a', '2a', '1b'):
+            self.executor.finish(name)
+        self.assertEqual(
+            ['first', '1a', '3a', '2a', '1b', '1c'],
+            self._submitted_names(),
+        )
+
+    @log_function('[limiter : cancel and resize]')
+    def test_rl_cancel_and_resize(self):
+        '''
+        Ensures that cancelled requests are skipped, and that raising the
+        limit sends queued requests right away.
+        '''
+        limiter = RequestLimiter(max_in_flight=1)
+        limiter.submit(None, 1, self.executor.submit, 'a')
+        cancelled_future = limiter.submit(None, 1, self.executor.submit, 'b')
+        limiter.submit(None, 1, self.executor.submit, 'c')
+        limiter.submit(None, 1, self.executor.submit, 'd')
+
+        self.assertTrue(cancelled_future.cancel())
+        self.executor.finish('a')
+        self.assertEqual(['a', 'c'], self._submitted_names())
+
+        limiter.set_max_in_flight(0)
+        self.assertEqual(['a', 'c', 'd'], self._submitted_names())
+        self.assertEqual(0, limiter.get_stats()['queued'])
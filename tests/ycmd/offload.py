@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+
+'''
+tests/ycmd/offload.py
+Tests and benchmark for parsing completion responses in a child process.
+
+The benchmark parses synthetic responses of increasing size, both in-process
+and offloaded, while a ticker thread measures how long it is kept waiting for
+the GIL. Run it directly to print the results:
+    python -m tests.ycmd.offload
+'''
+
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import unittest
+
+from lib.schema.columns import (
+    COLUMN_SEPARATOR,
+    decode_column,
+    decode_completion_response,
+    encode_column,
+)
+from lib.schema.completions import (
+    parse_completion_columns,
+    parse_completions,
+)
+from lib.ycmd import offload
+from lib.ycmd.offload import ResponseOffloader
+from tests.lib.decorator import log_function
+
+logger = logging.getLogger('sublime-ycmd.' + __name__)
+
+BENCHMARK_SIZES = (1000, 5000, 20000)
+# interval of the ticker thread, in seconds
+TICK_INTERVAL = 0.001
+
+
+def make_completion_response(num_candidates):
+    ''' Generates the raw json of a completion response, as `bytes`. '''
+    return json.dumps({
+        'completions': [
+            {
+                'insertion_text': 'candidate_%d' % (i),
+                'menu_text': 'candidate_%d(int a, int b)' % (i),
+                'extra_menu_info': 'int',
+                'kind': 'FUNCTION',
+                'detailed_info': 'int candidate_%d(int a, int b)\n' % (i),
+                'extra_data': {'doc_string': 'Candidate %d.' % (i)},
+            }
+            for i in range(num_candidates)
+        ],
+        'completion_start_column': 5,
+        'errors': [],
+    }).encode('utf-8')
+
+
+class GilTicker(object):
+    '''
+    Thread that sleeps for `TICK_INTERVAL` in a loop, and records the longest
+    delay past that interval. This is how long other threads were stalled.
+    '''
+
+    def __init__(self):
+        self.max_stall = 0.0
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+
+    def _run(self):
+        last_tick = time.perf_counter()
+        while not self._stop_event.is_set():
+            time.sleep(TICK_INTERVAL)
+            now = time.perf_counter()
+            self.max_stall = max(
+                self.max_stall, now - last_tick - TICK_INTERVAL,
+            )
+            last_tick = now
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop_event.set()
+        self._thread.join()
+
+
+def bench_parse(parse, content):
+    '''
+    Parses `content` with `parse`, and iterates the completion options.
+    Returns a tuple of the end-to-end latency and the longest GIL stall.
+    '''
+    with GilTicker() as ticker:
+        start_time = time.perf_counter()
+        response = parse(content)
+        for completion in response.completions:
+            completion.text()
+        latency = time.perf_counter() - start_time
+    return latency, ticker.max_stall
+
+
+def run_benchmarks(sizes=BENCHMARK_SIZES):
+    '''
+    Returns a list of tuples containing the number of candidates, response
+    size, and the in-process and offloaded (latency, stall) results.
+    '''
+    offloader = ResponseOffloader(
+        threshold=1, python_binary_path=sys.executable,
+    )
+    offloader.start()
+    # wait for the child process to start up
+    offloader.parse_completions(make_completion_response(1))
+
+    results = []
+    try:
+        for size in sizes:
+            content = make_completion_response(size)
+            results.append((
+                size, len(content),
+                bench_parse(parse_completions, content),
+                bench_parse(offloader.parse_completions, content),
+            ))
+    finally:
+        offloader.shutdown(wait=True)
+
+    return results
+
+
+def main():
+    print('%-10s %-10s %-30s %-30s' % (
+        'options', 'bytes', 'in-process latency/stall',
+        'offloaded latency/stall',
+    ))
+    for size, num_bytes, inline, offloaded in run_benchmarks():
+        print('%-10d %-10d %-30s %-30s' % (
+            size, num_bytes,
+            '%8.2fms / %8.2fms' % (inline[0] * 1000, inline[1] * 1000),
+            '%8.2fms / %8.2fms' % (offloaded[0] * 1000, offloaded[1] * 1000),
+        ))
+
+
+class TestColumns(unittest.TestCase):
+    ''' Unit tests for the columnar completion encoding. '''
+
+    @log_function('[columns : round trip]')
+    def test_co_round_trip(self):
+        ''' Ensures that columns decode to the original values. '''
+        values = ['a', None, '', 'b c']
+        self.assertEqual(
+            values, decode_column(encode_column(values), len(values)),
+        )
+        self.assertEqual([], decode_column(encode_column([]), 0))
+
+        with self.assertRaises(ValueError):
+            encode_column(['a' + COLUMN_SEPARATOR])
+        with self.assertRaises(ValueError):
+            encode_column([1])
+
+    @log_function('[columns : completions]')
+    def test_co_completions(self):
+        '''
+        Ensures that a response parsed from columns matches one parsed
+        directly.
+        '''
+        content = make_completion_response(10)
+        expected = parse_completions(content)
+        actual = parse_completion_columns(decode_completion_response(content))
+
+        self.assertEqual(len(expected.completions), len(actual.completions))
+        for expected_option, actual_option in zip(
+                expected.completions, actual.completions):
+            self.assertEqual(expected_option.text(), actual_option.text())
+            self.assertEqual(
+                expected_option.shortdesc(), actual_option.shortdesc(),
+            )
+            # pylint: disable=protected-access
+            self.assertEqual(
+                expected_option._extra_data, actual_option._extra_data,
+            )
+
+
+class TestResponseOffloader(unittest.TestCase):
+    ''' Unit tests for the response offloader. '''
+
+    @log_function('[offload : threshold]')
+    @unittest.skipUnless(sys.version_info >= (3, 7), 'requires python 3.7+')
+    def test_ro_threshold(self):
+        '''
+        Ensures that only responses over the threshold are sent to the child
+        process.
+        '''
+        small = make_completion_response(2)
+        large = make_completion_response(100)
+        offloader = ResponseOffloader(
+            threshold=len(small) + 1, python_binary_path=sys.executable,
+        )
+        try:
+            self.assertEqual(
+                2, len(offloader.parse_completions(small).completions),
+            )
+            self.assertEqual(
+                100, len(offloader.parse_completions(large).completions),
+            )
+        finally:
+            offloader.shutdown(wait=True)
+
+        stats = offloader.get_stats()
+        self.assertEqual(1, stats['inline'])
+        self.assertEqual(1, stats['offloaded'])
+        self.assertEqual(0, stats['failed'])
+
+    @log_function('[offload : fallback]')
+    @unittest.skipUnless(sys.version_info >= (3, 7), 'requires python 3.7+')
+    def test_ro_fallback(self):
+        ''' Ensures that responses the child cannot decode are parsed here. '''
+        content = json.dumps({
+            'completions': [{'insertion_text': 'a', 'kind': 1}],
+            'completion_start_column': 1,
+            'errors': [],
+        }).encode('utf-8')
+        offloader = ResponseOffloader(
+            threshold=1, python_binary_path=sys.executable,
+        )
+        try:
+            response = offloader.parse_completions(content)
+        finally:
+            offloader.shutdown(wait=True)
+
+        self.assertEqual('a', response.completions[0].text())
+        self.assertEqual(1, offloader.get_stats()['failed'])
+
+    @log_function('[offload : unsupported]')
+    def test_ro_unsupported(self):
+        '''
+        Ensures that responses are parsed in-process when the python version
+        or the package name does not support offloading.
+        '''
+        content = make_completion_response(10)
+        # pylint: disable=protected-access
+        has_mp_context = offload._HAS_MP_CONTEXT
+        columns_module_name = offload._COLUMNS_MODULE_NAME
+        try:
+            for patched_has_mp_context, patched_module_name in (
+                    (False, columns_module_name),
+                    (True, 'sublime-ycmd.lib.schema.columns')):
+                offload._HAS_MP_CONTEXT = patched_has_mp_context
+                offload._COLUMNS_MODULE_NAME = patched_module_name
+
+                offloader = ResponseOffloader(
+                    threshold=1, python_binary_path=sys.executable,
+                )
+                offloader.start()
+                response = offloader.parse_completions(content)
+                offloader.shutdown(wait=True)
+
+                self.assertEqual(10, len(response.completions))
+                stats = offloader.get_stats()
+                self.assertEqual(1, stats['inline'])
+                self.assertEqual(0, stats['offloaded'])
+                self.assertIsNotNone(stats['disabled'])
+        finally:
+            offload._HAS_MP_CONTEXT = has_mp_context
+            offload._COLUMNS_MODULE_NAME = columns_module_name
+
+    @log_function('[offload : start failure]')
+    def test_ro_start_failure(self):
+        '''
+        Ensures that offloading is disabled if the child process cannot start,
+        or cannot decode the warm up response.
+        '''
+        content = make_completion_response(10)
+        offloader = ResponseOffloader(
+            threshold=1,
+            python_binary_path=os.path.join(
+                os.path.dirname(sys.executable), 'missing-python',
+            ),
+        )
+        try:
+            offloader.start()
+            deadline = time.time() + 30
+            while offloader.get_stats()['disabled'] is None and \
+                    time.time() < deadline:
+                time.sleep(0.05)
+            self.assertIsNotNone(offloader.get_stats()['disabled'])
+
+            response = offloader.parse_completions(content)
+            self.assertEqual(10, len(response.completions))
+            self.assertEqual(1, offloader.get_stats()['inline'])
+        finally:
+            offloader.shutdown(wait=True)
+
+if __name__ == '__main__':
+    main()
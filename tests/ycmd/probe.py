@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+
+'''
+tests/ycmd/probe.py
+Tests for the readiness prober.
+
+Probes are scheduled with a fake `set_timeout`, which records the delays and
+runs the probe right away.
+'''
+
+import logging
+import unittest
+
+from concurrent.futures import CancelledError
+
+from lib.ycmd.probe import (
+    ReadinessProber,
+    get_backoff_delay,
+)
+from tests.lib.decorator import log_function
+
+logger = logging.getLogger('sublime-ycmd.' + __name__)
+
+
+class TestReadinessProber(unittest.TestCase):
+    ''' Unit tests for the readiness prober and its backoff delay. '''
+
+    def setUp(self):
+        self.delays = []
+        self.results = []
+
+    def _set_timeout(self, callback, delay):
+        self.delays.append(delay)
+        callback()
+
+    def _create_prober(self, probe, timeout=30):
+        return ReadinessProber(
+            probe,
+            lambda elapsed: self.results.append(('ready', elapsed)),
+            lambda error: self.results.append(('failed', error)),
+            timeout=timeout, initial_delay=0.1, max_delay=1,
+            set_timeout=self._set_timeout, random_fn=lambda: 1,
+        )
+
+    @log_function('[probe : backoff]')
+    def test_pr_backoff(self):
+        '''
+        Ensures that the delay doubles up to the maximum, and that only the
+        lower half of it is random.
+        '''
+        self.assertEqual(0.1, get_backoff_delay(0, 0.1, 1, lambda: 1))
+        self.assertEqual(0.4, get_backoff_delay(2, 0.1, 1, lambda: 1))
+        self.assertEqual(1, get_backoff_delay(10, 0.1, 1, lambda: 1))
+        self.assertEqual(0.5, get_backoff_delay(10, 0.1, 1, lambda: 0))
+        self.assertEqual(1, get_backoff_delay(10 ** 6, 0.1, 1, lambda: 1))
+
+    @log_function('[probe : ready]')
+    def test_pr_ready(self):
+        '''
+        Ensures that the server is probed until it is ready, backing off
+        between attempts, and that the ready callback is called once.
+        '''
+        responses = iter([False, False, False, True])
+        prober = self._create_prober(lambda: next(responses))
+        prober.start()
+
+        self.assertEqual(4, prober.attempts)
+        self.assertEqual([0.1, 0.2, 0.4], self.delays)
+        self.assertEqual(1, len(self.results))
+        self.assertEqual('ready', self.results[0][0])
+
+        prober.cancel()
+        self.assertEqual(1, len(self.results))
+
+    @log_function('[probe : failed]')
+    def test_pr_failed(self):
+        '''
+        Ensures that probing stops with an error if the probe raises, or if
+        the server is not ready in time.
+        '''
+        def probe():
+            raise RuntimeError('process exited')
+
+        self._create_prober(probe).start()
+        self.assertEqual('failed', self.results[0][0])
+        self.assertIsInstance(self.results[0][1], RuntimeError)
+
+        prober = self._create_prober(lambda: False, timeout=0)
+        prober.start()
+        self.assertEqual(1, prober.attempts)
+        self.assertIsInstance(self.results[1][1], TimeoutError)
+
+        prober = self._create_prober(lambda: False)
+        prober.cancel()
+        prober.start()
+        self.assertEqual(0, prober.attempts)
+        self.assertIsInstance(self.results[2][1], CancelledError)
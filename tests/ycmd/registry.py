@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+
+'''
+tests/ycmd/registry.py
+Tests for the server registry.
+
+Uses plain objects in place of servers, since the registry treats them as
+opaque values. Includes a rough benchmark of the registry operations.
+'''
+
+import logging
+import os
+import threading
+import time
+import unittest
+
+from lib.ycmd.registry import ServerRegistry
+from tests.lib.decorator import log_function
+
+logger = logging.getLogger('sublime-ycmd.' + __name__)
+
+if os.name == 'posix':
+    FS_ROOT = '/'
+elif os.name == 'nt':
+    FS_ROOT = 'C:\\'
+else:
+    logger.error('unknown os type, test data might be invalid')
+    FS_ROOT = ''
+
+
+class DummyServer(object):
+    ''' Stand-in for `Server`. Only needs to be hashable. '''
+
+    def __init__(self, label):
+        self.label = label
+
+    def __repr__(self):
+        return '%s(%r)' % ('DummyServer', self.label)
+
+
+def _project_path(project_index, *components):
+    return os.path.join(
+        FS_ROOT, 'home', 'user', 'project%d' % (project_index), *components
+    )
+
+
+def _populate_registry(registry, num_servers, views_per_server,
+                       dirs_per_server):
+    '''
+    Registers `num_servers` servers, each with a project directory, some
+    nested directories, and some views. Returns the list of servers.
+    '''
+    servers = []
+    view_id = 1
+    for server_index in range(num_servers):
+        server = DummyServer(server_index)
+        registry.add(server)
+        registry.bind_directory(_project_path(server_index), server)
+
+        for dir_index in range(dirs_per_server - 1):
+            registry.bind_directory(
+                _project_path(server_index, 'sub%d' % (dir_index)), server,
+            )
+        for _ in range(views_per_server):
+            registry.bind_view(view_id, server)
+            view_id += 1
+
+        servers.append(server)
+
+    return servers
+
+
+class TestServerRegistry(unittest.TestCase):
+    '''
+    Unit tests for the server registry. The forward and reverse indexes should
+    stay consistent as servers and bindings are added and removed.
+    '''
+
+    @log_function('[registry : nested]')
+    def test_sr_nested_directory(self):
+        ''' Ensures that nested files resolve to the enclosing project. '''
+        registry = ServerRegistry()
+        project_server = DummyServer('project')
+        vendor_server = DummyServer('vendor')
+
+        registry.bind_directory(_project_path(0), project_server)
+        registry.bind_directory(
+            _project_path(0, 'vendor', 'lib'), vendor_server,
+        )
+
+        self.assertIs(
+            project_server,
+            registry.lookup_directory(_project_path(0, 'src', 'deep')),
+        )
+        self.assertIs(
+            vendor_server,
+            registry.lookup_directory(_project_path(0, 'vendor', 'lib', 'x')),
+        )
+        self.assertIsNone(registry.lookup_directory(_project_path(1)))
+        self.assertIsNone(registry.lookup_directory(None))
+
+    @log_function('[registry : exact]')
+    def test_sr_exact_directory(self):
+        '''
+        Ensures that directories that are not project roots only match
+        exactly, so projects nested under them are not captured.
+        '''
+        registry = ServerRegistry()
+        loose_server = DummyServer('loose')
+        project_server = DummyServer('project')
+        home_path = os.path.join(FS_ROOT, 'home', 'user')
+
+        registry.bind_directory(home_path, loose_server, is_project_root=False)
+        self.assertIs(loose_server, registry.lookup_directory(home_path))
+        self.assertIsNone(registry.lookup_directory(_project_path(0)))
+
+        registry.bind_directory(_project_path(0), project_server)
+        self.assertIs(
+            project_server,
+            registry.lookup_directory(_project_path(0, 'src')),
+        )
+        self.assertIs(loose_server, registry.lookup_directory(home_path))
+
+        # rebinding it as a project root replaces the exact binding
+        registry.bind_directory(home_path, project_server)
+        self.assertEqual(set(), registry.get_directories(loose_server))
+        self.assertIs(
+            project_server, registry.lookup_directory(_project_path(1)),
+        )
+
+        registry.remove(project_server)
+        self.assertIsNone(registry.lookup_directory(home_path))
+
+    @log_function('[registry : rebind]')
+    def test_sr_rebind(self):
+        ''' Ensures that rebinding updates the reverse indexes. '''
+        registry = ServerRegistry()
+        server1 = DummyServer(1)
+        server2 = DummyServer(2)
+
+        registry.bind_view(10, server1)
+        registry.bind_view(10, server2)
+        registry.bind_directory(_project_path(0), server1)
+        registry.bind_directory(_project_path(0), server2)
+
+        self.assertIs(server2, registry.lookup_view(10))
+        self.assertEqual(set(), registry.get_view_ids(server1))
+        self.assertEqual({10}, registry.get_view_ids(server2))
+        self.assertEqual(set(), registry.get_directories(server1))
+        self.assertEqual(
+            {_project_path(0)}, registry.get_directories(server2),
+        )
+
+        view_ids, directories = registry.remove(server1)
+        self.assertEqual(set(), view_ids)
+        self.assertEqual(set(), directories)
+        self.assertIs(server2, registry.lookup_view(10))
+
+    @log_function('[registry : many]')
+    def test_sr_many(self):
+        '''
+        Ensures that the indexes stay consistent with thousands of views and
+        directories, while servers are unregistered.
+        '''
+        num_servers = 200
+        views_per_server = 25
+        dirs_per_server = 10
+
+        registry = ServerRegistry()
+        servers = _populate_registry(
+            registry, num_servers, views_per_server, dirs_per_server,
+        )
+        self.assertEqual(num_servers, len(registry))
+
+        # drop the view bindings for every other server (e.g. server died)
+        for server in servers[::2]:
+            unbound = registry.unbind_views(server)
+            self.assertEqual(views_per_server, len(unbound))
+            for view_id in unbound:
+                self.assertIsNone(registry.lookup_view(view_id))
+
+        for server_index, server in enumerate(servers):
+            nested_path = _project_path(server_index, 'src', 'a', 'b')
+            self.assertIs(server, registry.lookup_directory(nested_path))
+
+            view_ids, directories = registry.remove(server)
+            self.assertEqual(dirs_per_server, len(directories))
+            if server_index % 2:
+                self.assertEqual(views_per_server, len(view_ids))
+            else:
+                self.assertEqual(0, len(view_ids))
+
+            self.assertIsNone(registry.lookup_directory(nested_path))
+            self.assertNotIn(server, registry)
+
+        self.assertEqual(0, len(registry))
+        # pylint: disable=protected-access
+        self.assertEqual({}, registry._view_id_to_server.snapshot())
+        self.assertEqual(0, len(registry._directory_to_server))
+
+    @log_function('[registry : concurrent]')
+    def test_sr_concurrent(self):
+        '''
+        Runs lock-free lookups while other threads rebind views and register
+        and remove servers. Lookups must never fail, and must only ever return
+        servers that were registered at some point.
+        '''
+        num_servers = 20
+        views_per_server = 10
+        num_rounds = 200
+
+        registry = ServerRegistry()
+        servers = _populate_registry(
+            registry, num_servers, views_per_server, 2,
+        )
+        known_servers = set(servers)
+        stop = threading.Event()
+        errors = []
+
+        def reader():
+            try:
+                while not stop.is_set():
+                    for server_index in range(num_servers):
+                        for result in (
+                                registry.lookup_view(server_index + 1),
+                                registry.lookup_directory(
+                                    _project_path(server_index, 'x', 'y'),
+                                )):
+                            if result is not None and \
+                                    result not in known_servers:
+                                errors.append(result)
+                    len(registry)
+                    list(registry)
+            except Exception as exc:  # pylint: disable=broad-except
+                errors.append(exc)
+
+        def writer(offset):
+            try:
+                for index in range(num_rounds):
+                    server = servers[(index + offset) % num_servers]
+                    registry.bind_view(index % 50 + 1, server)
+                    registry.unbind_view((index + 25) % 50 + 1)
+
+                    extra = DummyServer('extra-%d-%d' % (offset, index))
+                    known_servers.add(extra)
+                    registry.bind_directory(
+                        _project_path(offset + num_servers, str(index)), extra,
+                    )
+                    registry.remove(extra)
+            except Exception as exc:  # pylint: disable=broad-except
+                errors.append(exc)
+
+        readers = [threading.Thread(target=reader) for _ in range(2)]
+        writers = [
+            threading.Thread(target=writer, args=(offset,))
+            for offset in range(4)
+        ]
+        for thread in readers + writers:
+            thread.start()
+        for thread in writers:
+            thread.join()
+        stop.set()
+        for thread in readers:
+            thread.join()
+
+        self.assertEqual([], errors)
+        self.assertEqual(set(servers), registry.get_servers())
+
+
+class TestServerRegistryBenchmark(unittest.TestCase):
+    '''
+    Rough benchmark for the registry. Timings are logged, not asserted, since
+    they depend on the machine running the tests.
+    '''
+
+    @log_function('[registry : benchmark]')
+    def test_srb_operations(self):
+        ''' Measures register, lookup, and unregister cost. '''
+        num_servers = 500
+        views_per_server = 20
+        dirs_per_server = 4
+        num_views = num_servers * views_per_server
+        num_dirs = num_servers * dirs_per_server
+
+        registry = ServerRegistry()
+
+        start_time = time.perf_counter()
+        servers = _populate_registry(
+            registry, num_servers, views_per_server, dirs_per_server,
+        )
+        register_time = time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        for view_id in range(1, num_views + 1):
+            registry.lookup_view(view_id)
+        view_lookup_time = time.perf_counter() - start_time
+
+        nested_paths = [
+            _project_path(i, 'src', 'module', 'file')
+            for i in range(num_servers)
+        ]
+        start_time = time.perf_counter()
+        for nested_path in nested_paths:
+            registry.lookup_directory(nested_path)
+        dir_lookup_time = time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        for server in servers:
+            registry.remove(server)
+        unregister_time = time.perf_counter() - start_time
+
+        def _per_op_us(total_time, num_ops):
+            return (total_time * 1e6) / num_ops
+
+        logger.info(
+            'registry benchmark, %d servers, %d views, %d dirs: '
+            'register %.2fus/binding, view lookup %.2fus, '
+            'dir lookup %.2fus, unregister %.2fus/server',
+            num_servers, num_views, num_dirs,
+            _per_op_us(register_time, num_views + num_dirs),
+            _per_op_us(view_lookup_time, num_views),
+            _per_op_us(dir_lookup_time, num_servers),
+            _per_op_us(unregister_time, num_servers),
+        )
+        self.assertEqual(0, len(registry))
@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+
+'''
+tests/ycmd/server.py
+Tests for the server request parking, readiness probing, and request
+deadlines.
+
+These only change the server status directly, so no ycmd process is needed.
+Requests are sent to a plain socket server that responds after a delay.
+'''
+
+import logging
+import socket
+import threading
+import time
+import unittest
+
+from lib.task.deadline import (
+    PHASE_CONNECT,
+    PHASE_READ,
+    PHASE_SEND,
+    Deadline,
+)
+from lib.util.hmac import calculate_hmac
+from lib.util.sys import get_unused_port
+from lib.ycmd.constants import (
+    YCMD_HANDLER_HEALTHY,
+    YCMD_HMAC_HEADER,
+)
+from lib.ycmd.server import Server
+from tests.lib.decorator import log_function
+
+logger = logging.getLogger('sublime-ycmd.' + __name__)
+
+
+class TestServerPendingRequests(unittest.TestCase):
+    ''' Unit tests for requests made while a server is starting. '''
+
+    def setUp(self):
+        self.server = Server()
+        self.calls = []
+
+    def _when_running(self, name):
+        return self.server.when_running(
+            lambda: self.calls.append(name),
+            lambda error: self.calls.append((name, error)),
+        )
+
+    @log_function('[server : flush in order]')
+    def test_sp_flush_in_order(self):
+        '''
+        Ensures that requests parked while starting are run in order once the
+        server is running, and later requests run right away.
+        '''
+        self.server.set_status(Server.STARTING)
+        self.assertTrue(self._when_running('a'))
+        self.assertTrue(self._when_running('b'))
+        self.assertEqual([], self.calls)
+        self.assertEqual(2, self.server.get_pending_request_count())
+
+        self.server.set_status(Server.RUNNING)
+        self.assertEqual(['a', 'b'], self.calls)
+        self.assertEqual(0, self.server.get_pending_request_count())
+
+        self.assertTrue(self._when_running('c'))
+        self.assertEqual(['a', 'b', 'c'], self.calls)
+
+    @log_function('[server : fail on stop]')
+    def test_sp_fail_on_stop(self):
+        '''
+        Ensures that parked requests fail if the server stops before it is
+        running, and that requests for a stopped server fail right away.
+        '''
+        self.server.set_status(Server.STARTING)
+        self._when_running('a')
+        self.server.set_status(Server.NULL)
+
+        self.assertEqual(1, len(self.calls))
+        name, error = self.calls[0]
+        self.assertEqual('a', name)
+        self.assertIsInstance(error, RuntimeError)
+
+        self.assertFalse(self._when_running('b'))
+        self.assertEqual('b', self.calls[1][0])
+
+        # a failed startup does not leave anything behind for the next one
+        self.server.set_status(Server.STARTING)
+        self.server.set_status(Server.RUNNING)
+        self.assertEqual(2, len(self.calls))
+
+    @log_function('[server : send not running]')
+    def test_sp_send_not_running(self):
+        '''
+        Ensures that requests sent while starting fail right away, instead of
+        blocking until the server is running.
+        '''
+        self.server.set_status(Server.STARTING)
+        with self.assertRaises(TimeoutError):
+            self.server._send_request(YCMD_HANDLER_HEALTHY, timeout=60)
+
+
+class SlowHttpServer(object):
+    '''
+    Accepts one connection at a time, reads the request, and waits `delay`
+    seconds before sending a json response signed with `hmac_secret`.
+    '''
+
+    def __init__(self, hmac_secret, delay, port=0):
+        self.hmac_secret = hmac_secret
+        self.delay = delay
+        self.stopped = threading.Event()
+
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.bind(('127.0.0.1', port))
+        self.sock.listen(4)
+        self.sock.settimeout(0.1)
+        self.port = self.sock.getsockname()[1]
+
+        self.thread = threading.Thread(target=self._serve, daemon=True)
+        self.thread.start()
+
+    def _serve(self):
+        while not self.stopped.is_set():
+            try:
+                conn, _ = self.sock.accept()
+            except socket.timeout:
+                continue
+            with conn:
+                conn.recv(65536)
+                if self.stopped.wait(self.delay):
+                    return
+                body = b'true'
+                conn.sendall(
+                    b'HTTP/1.1 200 OK\r\n'
+                    b'Content-Type: application/json\r\n'
+                    b'Content-Length: %d\r\n'
+                    b'%s: %s\r\n\r\n%s' % (
+                        len(body), YCMD_HMAC_HEADER.encode(),
+                        calculate_hmac(self.hmac_secret, body).encode(),
+                        body,
+                    )
+                )
+
+    def close(self):
+        self.stopped.set()
+        self.thread.join(5)
+        self.sock.close()
+
+
+class TestServerDeadline(unittest.TestCase):
+    ''' Unit tests for the end-to-end request deadline. '''
+
+    def _start(self, delay):
+        http_server = SlowHttpServer(b'secret', delay)
+        self.addCleanup(http_server.close)
+
+        server = Server()
+        server.hostname = '127.0.0.1'
+        server.port = http_server.port
+        server.hmac = b'secret'
+        server.set_status(Server.RUNNING)
+        return server
+
+    @log_function('[server : deadline phases]')
+    def test_sd_phases(self):
+        '''
+        Ensures that the time spent in each phase of a request is recorded on
+        its deadline.
+        '''
+        server = self._start(delay=0)
+        deadline = Deadline(5)
+
+        self.assertIs(True, server._send_request(
+            YCMD_HANDLER_HEALTHY, cancel_token=deadline,
+        ))
+        self.assertEqual(
+            [PHASE_CONNECT, PHASE_SEND, PHASE_READ],
+            [
+                phase for phase in deadline.get_phases()
+                if phase in (PHASE_CONNECT, PHASE_SEND, PHASE_READ)
+            ],
+        )
+
+    @log_function('[server : deadline budget]')
+    def test_sd_budget(self):
+        '''
+        Ensures that a slow response times out once the whole budget is used
+        up, and not after a fresh timeout for reading.
+        '''
+        server = self._start(delay=2)
+        deadline = Deadline(0.3)
+
+        start_time = time.monotonic()
+        with self.assertRaises(TimeoutError):
+            server._send_request(
+                YCMD_HANDLER_HEALTHY, timeout=5, cancel_token=deadline,
+            )
+        self.assertLess(time.monotonic() - start_time, 1)
+        self.assertIn(PHASE_SEND, deadline.get_phases())
+
+    @log_function('[server : read timeout]')
+    def test_sd_read_timeout(self):
+        '''
+        Ensures that a socket timeout while reading is raised as a
+        `TimeoutError`, and that a health check treats it as "maybe alive".
+        '''
+        server = self._start(delay=2)
+        server._process_handle = FakeProcess()
+
+        with self.assertRaises(TimeoutError):
+            server._send_request(YCMD_HANDLER_HEALTHY, timeout=0.2)
+
+        self.assertFalse(server.is_alive(timeout=0.2))
+        self.assertFalse(server.is_null())
+
+
+class FakeProcess(object):
+    ''' Stands in for the server process handle. '''
+
+    def __init__(self):
+        self.is_alive = True
+        self.killed = False
+
+    def alive(self):
+        return self.is_alive
+
+    def kill(self):
+        self.killed = True
+        self.is_alive = False
+
+
+class TestServerReadiness(unittest.TestCase):
+    ''' Unit tests for readiness probing after the process is launched. '''
+
+    def setUp(self):
+        self.port = get_unused_port('127.0.0.1')
+        self.process = FakeProcess()
+        self.calls = []
+
+        self.server = Server()
+        self.server.hostname = '127.0.0.1'
+        self.server.port = self.port
+        self.server.hmac = b'secret'
+        self.server.set_status(Server.STARTING)
+        self.server._process_handle = self.process
+        self.server.when_running(
+            lambda: self.calls.append('sent'),
+            lambda error: self.calls.append(error),
+        )
+
+    @log_function('[server : ready after probes]')
+    def test_sr_ready_after_probes(self):
+        '''
+        Ensures that the server stays in the starting status, with requests
+        parked, until it responds to a readiness probe.
+        '''
+        self.server._wait_until_ready()
+        self.assertTrue(self.server.is_starting())
+        self.assertEqual([], self.calls)
+        self.assertIsNone(self.server.time_to_ready)
+
+        http_server = SlowHttpServer(b'secret', 0, port=self.port)
+        self.addCleanup(http_server.close)
+
+        self.server.wait_for_status(Server.RUNNING, timeout=5)
+        self.assertEqual(['sent'], self.calls)
+        self.assertGreater(self.server.time_to_ready, 0)
+
+    @log_function('[server : slow probe]')
+    def test_sr_slow_probe(self):
+        '''
+        Ensures that a probe that times out while reading the response is
+        retried, instead of failing startup.
+        '''
+        http_server = SlowHttpServer(b'secret', 2, port=self.port)
+        self.addCleanup(http_server.close)
+
+        self.server._wait_until_ready()
+        time.sleep(1)
+        self.assertTrue(self.server.is_starting())
+        self.assertFalse(self.process.killed)
+        self.assertEqual([], self.calls)
+
+        http_server.delay = 0
+        self.server.wait_for_status(Server.RUNNING, timeout=10)
+        self.assertEqual(['sent'], self.calls)
+
+    @log_function('[server : process exited]')
+    def test_sr_process_exited(self):
+        '''
+        Ensures that the server is reset, and parked requests fail, if the
+        process exits before it is ready.
+        '''
+        self.server._wait_until_ready()
+        self.process.is_alive = False
+
+        self.server.wait_for_status(Server.NULL, timeout=5)
+        self.assertIsInstance(self.calls[0], RuntimeError)
+        self.assertFalse(self.process.killed)
+
+    @log_function('[server : stop while probing]')
+    def test_sr_stop_while_probing(self):
+        '''
+        Ensures that stopping a server that is not ready yet kills it.
+        '''
+        self.server._wait_until_ready()
+        self.server.stop()
+
+        self.assertTrue(self.server.is_null())
+        self.assertTrue(self.process.killed)
+        self.assertIsInstance(self.calls[0], RuntimeError)
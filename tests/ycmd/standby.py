@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+
+'''
+tests/ycmd/standby.py
+Tests for the warm standby server pool.
+
+Servers are stood in for by fakes that only track their status, and timers
+are run manually, so no ycmd process is needed.
+'''
+
+import logging
+import time
+import unittest
+
+from lib.ycmd.server import Server
+from lib.ycmd.standby import StandbyPool
+from tests.lib.decorator import log_function
+
+logger = logging.getLogger('sublime-ycmd.' + __name__)
+
+
+class FakeServer(object):
+    ''' Stands in for a `Server`, with a status that is set directly. '''
+
+    def __init__(self, name):
+        self.name = name
+        self.status = Server.STARTING
+        self.status_callbacks = []
+
+    def add_status_callback(self, callback):
+        self.status_callbacks.append(callback)
+
+    def set_status(self, status):
+        previous_status = self.status
+        self.status = status
+        for callback in self.status_callbacks:
+            callback(self, previous_status, status)
+
+    def is_starting(self):
+        return self.status == Server.STARTING
+
+    def is_alive(self, timeout=None):
+        return self.status == Server.RUNNING
+
+    def __repr__(self):
+        return 'FakeServer(%r)' % (self.name)
+
+
+class TestStandbyPool(unittest.TestCase):
+    ''' Unit tests for claiming, refilling, and reaping standbys. '''
+
+    def setUp(self):
+        self.spawned = []
+        self.stopped = []
+        self.timers = []
+
+    def _spawn(self):
+        server = FakeServer(len(self.spawned))
+        self.spawned.append(server)
+        return server
+
+    def _set_timeout(self, callback, delay):
+        self.timers.append(callback)
+
+    def _run_timers(self):
+        timers, self.timers = self.timers, []
+        for callback in timers:
+            callback()
+
+    def _create_pool(self, size, idle_seconds=600):
+        return StandbyPool(
+            self._spawn, self.stopped.append, size=size,
+            idle_seconds=idle_seconds, set_timeout=self._set_timeout,
+        )
+
+    @log_function('[standby : claim]')
+    def test_sb_claim(self):
+        '''
+        Ensures that standbys are started in the background, that ready ones
+        are claimed first, and that claimed ones are replaced.
+        '''
+        pool = self._create_pool(2)
+        self.assertEqual([], self.spawned)
+        self._run_timers()
+        self.assertEqual(2, len(self.spawned))
+
+        self.spawned[1].set_status(Server.RUNNING)
+        self.assertIs(self.spawned[1], pool.claim())
+        self.assertIs(self.spawned[0], pool.claim())
+        self.assertEqual(2, len(self.spawned))
+
+        self._run_timers()
+        self.assertEqual(4, len(self.spawned))
+        stats = pool.get_stats()
+        self.assertEqual(2, stats['standby'])
+        self.assertEqual(2, stats['claimed'])
+
+    @log_function('[standby : stopped]')
+    def test_sb_stopped(self):
+        '''
+        Ensures that standbys that stop on their own are not claimed, and
+        that shrinking the pool stops the extra ones.
+        '''
+        pool = self._create_pool(2)
+        self._run_timers()
+
+        self.spawned[0].set_status(Server.NULL)
+        self.spawned[1].set_status(Server.NULL)
+        self.assertIsNone(pool.claim())
+        self.assertEqual(1, pool.get_stats()['missed'])
+
+        self._run_timers()
+        pool.configure(1)
+        self.assertEqual([self.spawned[3]], self.stopped)
+
+        pool.clear()
+        self.assertEqual([self.spawned[3], self.spawned[2]], self.stopped)
+        self._run_timers()
+        self.assertEqual(4, len(self.spawned))
+
+    @log_function('[standby : reap]')
+    def test_sb_reap(self):
+        '''
+        Ensures that standbys are stopped once no claims are made for a while,
+        and that the next claim starts them again.
+        '''
+        pool = self._create_pool(1, idle_seconds=0.01)
+        self._run_timers()
+        self.assertEqual(1, len(self.spawned))
+
+        time.sleep(0.02)
+        self._run_timers()
+        self.assertEqual(self.spawned, self.stopped)
+        self.assertEqual(1, pool.get_stats()['reaped'])
+
+        self.assertIsNone(pool.claim())
+        self._run_timers()
+        self.assertEqual(2, len(self.spawned))